@@ -0,0 +1,93 @@
+""" Benchmark of array_transport against pickle for client/server calls.
+
+Starts an unauthenticated GenericServer on localhost whose service returns the
+same histogram either pickled or binary-encoded, and times round trips from a
+ClientBase connection. Run as a script:
+
+    python benchmarks/benchmark_array_transport.py
+"""
+
+import pickle
+import time
+import numpy as np
+from pylabnet.network.core.service_base import ServiceBase
+from pylabnet.network.core.client_base import ClientBase
+from pylabnet.network.core.generic_server import GenericServer
+from pylabnet.network.core import array_transport
+
+
+class Service(ServiceBase):
+
+    _data = np.zeros(0)
+
+    def exposed_set_size(self, n_points):
+        Service._data = np.random.randint(0, 1000, size=n_points).astype(np.int32)
+
+    def exposed_get_pickle(self):
+        return pickle.dumps(self._data)
+
+    def exposed_get_binary(self):
+        return array_transport.dumps(self._data)
+
+
+class Client(ClientBase):
+
+    def set_size(self, n_points):
+        return self._service.exposed_set_size(n_points)
+
+    def get_pickle(self):
+        return pickle.loads(self._service.exposed_get_pickle())
+
+    def get_binary(self):
+        return array_transport.loads(self._service.exposed_get_binary())
+
+
+def _time_call(func, n_reps):
+    """ Average duration of func() over n_reps calls [s] """
+
+    start = time.perf_counter()
+    for _ in range(n_reps):
+        func()
+    return (time.perf_counter() - start) / n_reps
+
+
+def benchmark(sizes=(int(1e3), int(1e5), int(1e6)), n_reps=20, port=18999):
+    """ Compare pickle and binary transport for int32 histograms.
+
+    :param sizes: (iterable) histogram lengths to transfer
+    :param n_reps: (int) number of round trips averaged per size
+    :param port: (int) localhost port used for the benchmark server
+    :return: (list) of (size, t_pickle, t_binary) tuples, times in seconds
+    """
+
+    server = GenericServer(service=Service(), host='localhost', port=port, key=None)
+    server.start()
+    time.sleep(0.5)
+    client = Client(host='localhost', port=port, key=None)
+
+    results = []
+    try:
+        for size in sizes:
+            client.set_size(size)
+            if not np.array_equal(client.get_pickle(), client.get_binary()):
+                raise RuntimeError(f'Transport mismatch for size {size}')
+
+            t_pickle = _time_call(client.get_pickle, n_reps)
+            t_binary = _time_call(client.get_binary, n_reps)
+            results.append((size, t_pickle, t_binary))
+    finally:
+        client._connection.close()
+        server.stop()
+
+    return results
+
+
+def main():
+    print(f'{"elements":>10}{"pickle [ms]":>14}{"binary [ms]":>14}{"binary [MB/s]":>16}')
+    for size, t_pickle, t_binary in benchmark():
+        throughput = size * 4 / t_binary / 1e6
+        print(f'{size:10d}{t_pickle * 1e3:14.3f}{t_binary * 1e3:14.3f}{throughput:16.1f}')
+
+
+if __name__ == "__main__":
+    main()
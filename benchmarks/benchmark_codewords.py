@@ -0,0 +1,94 @@
+""" Benchmark of DIO codeword generation in AWGPulseBlockHandler.
+
+Compares the vectorized gen_digital_codewords() against the sample-by-sample
+reference gen_digital_codewords_per_sample() on pulse trains of increasing
+length. Run as a script:
+
+    python benchmarks/benchmark_codewords.py
+"""
+
+import time
+import numpy as np
+from pylabnet.utils.logging.logger import LogHandler
+from pylabnet.utils.pulseblock.pulse_block import PulseBlock
+from pylabnet.utils.pulseblock.pulse import PTrue
+from pylabnet.utils.zi_hdawg_pulseblock_handler.zi_hdawg_pb_handler import AWGPulseBlockHandler
+
+
+class _DummyHDAWG:
+    """ Stand-in for zi_hdawg.Driver providing only a log attribute. """
+
+    def __init__(self):
+        self.log = LogHandler()
+
+
+def make_pulse_train(dur, n_ch=4, period=1e-6):
+    """ Build a PulseBlock with staggered 50% duty-cycle pulses on n_ch channels.
+
+    :param dur: (float) total duration of the pulse train [s]
+    :param n_ch: (int) number of DIO channels
+    :param period: (float) period of each pulse train [s]
+    :return: (PulseBlock) pulse train
+    """
+
+    pb = PulseBlock(name='benchmark')
+    n_periods = int(dur / period)
+    for ch_idx in range(n_ch):
+        for period_idx in range(n_periods):
+            pb._insert(PTrue(
+                ch=f'ch{ch_idx}',
+                t0=period_idx * period + ch_idx * period / (2 * n_ch),
+                dur=period / 2
+            ), cflct_er=False)
+    pb.reset_edges()
+    return pb
+
+
+def benchmark(durations=(1e-5, 1e-4, 1e-3), n_ch=4, skip_reference_above=1e-3):
+    """ Time both codeword generation paths for each pulse-train duration.
+
+    :param durations: (iterable) pulse-train durations to benchmark [s]
+    :param n_ch: (int) number of DIO channels
+    :param skip_reference_above: (float) do not run the per-sample reference
+        for durations longer than this [s]
+    :return: (list) of (duration, n_samples, t_vectorized, t_per_sample) tuples,
+        t_per_sample is None if the reference was skipped
+    """
+
+    results = []
+    for dur in durations:
+        pb = make_pulse_train(dur, n_ch=n_ch)
+        handler = AWGPulseBlockHandler(
+            pb,
+            assignment_dict={f'ch{ch_idx}': ['dio', ch_idx] for ch_idx in range(n_ch)},
+            exp_config_dict={'preserve_bits': False},
+            hd=_DummyHDAWG()
+        )
+
+        start = time.perf_counter()
+        codewords = handler.gen_digital_codewords()
+        t_vectorized = time.perf_counter() - start
+
+        t_per_sample = None
+        if dur <= skip_reference_above:
+            start = time.perf_counter()
+            reference = handler.gen_digital_codewords_per_sample()
+            t_per_sample = time.perf_counter() - start
+            if not np.array_equal(codewords, reference):
+                raise RuntimeError(f'Codeword mismatch for duration {dur:.2e} s')
+
+        results.append((dur, handler.num_digital_samples, t_vectorized, t_per_sample))
+
+    return results
+
+
+def main():
+    print(f'{"duration [s]":>14}{"samples":>12}{"vectorized [s]":>16}{"per-sample [s]":>16}{"speed-up":>10}')
+    for dur, n_samples, t_vec, t_ref in benchmark():
+        ref_str = f'{t_ref:16.4f}' if t_ref is not None else f'{"-":>16}'
+        speedup_str = f'{t_ref / t_vec:10.0f}' if t_ref is not None else f'{"-":>10}'
+        print(f'{dur:14.1e}{n_samples:12d}{t_vec:16.4f}{ref_str}{speedup_str}')
+
+
+if __name__ == "__main__":
+    main()
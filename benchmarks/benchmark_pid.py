@@ -0,0 +1,75 @@
+""" Benchmark of the PID loop rate against the number of locked channels.
+
+Steps N channels with random process variables, once with N separate PID
+objects and once with a single MultiPID, and reports the achieved update
+rate of all channels. Run as a script:
+
+    python benchmarks/benchmark_pid.py
+"""
+
+import time
+import numpy as np
+from pylabnet.scripts.pid import PID, MultiPID
+
+
+PID_PARAMS = dict(p=1, i=0.1, d=0.01, setpoint=0, memory=20)
+
+
+def _rate_single(n_channels, n_steps):
+    """ Loop rate of n_channels separate PID objects
+
+    :param n_channels: (int) number of channels
+    :param n_steps: (int) number of loop iterations
+    :return: (float) loop iterations per second
+    """
+
+    pids = [PID(**PID_PARAMS) for _ in range(n_channels)]
+    pv = np.random.normal(size=(n_steps, n_channels))
+
+    start = time.perf_counter()
+    for step_pv in pv:
+        for pid, channel_pv in zip(pids, step_pv):
+            pid.step(channel_pv)
+    return n_steps / (time.perf_counter() - start)
+
+
+def _rate_multi(n_channels, n_steps):
+    """ Loop rate of a MultiPID with n_channels channels
+
+    :param n_channels: (int) number of channels
+    :param n_steps: (int) number of loop iterations
+    :return: (float) loop iterations per second
+    """
+
+    pid = MultiPID(n_channels=n_channels, **PID_PARAMS)
+    pv = np.random.normal(size=(n_steps, n_channels))
+
+    start = time.perf_counter()
+    for step_pv in pv:
+        pid.step(step_pv)
+    return n_steps / (time.perf_counter() - start)
+
+
+def benchmark(channel_counts=(1, 4, 16, 64, 256), n_steps=2000):
+    """ Measure the PID loop rate for increasing channel counts.
+
+    :param channel_counts: (iterable) numbers of channels
+    :param n_steps: (int) number of loop iterations per measurement
+    :return: (list) of (n_channels, rate_single, rate_multi) tuples, rates in
+        loop iterations (updates of all channels) per second
+    """
+
+    return [
+        (n_channels, _rate_single(n_channels, n_steps), _rate_multi(n_channels, n_steps))
+        for n_channels in channel_counts
+    ]
+
+
+def main():
+    print(f'{"channels":>10}{"PID [Hz]":>14}{"MultiPID [Hz]":>16}')
+    for n_channels, rate_single, rate_multi in benchmark():
+        print(f'{n_channels:10d}{rate_single:14.0f}{rate_multi:16.0f}')
+
+
+if __name__ == "__main__":
+    main()
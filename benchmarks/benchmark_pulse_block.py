@@ -0,0 +1,100 @@
+""" Benchmark of PulseBlock construction for long pulse sequences.
+
+Builds a block of N alternating digital pulses on a few channels in three
+ways and times each: repeated insert(), a single extend() and repeated
+append_pb() of one-pulse blocks. Run as a script:
+
+    python benchmarks/benchmark_pulse_block.py
+"""
+
+import time
+from pylabnet.utils.pulseblock.pulse import PTrue
+from pylabnet.utils.pulseblock.pulse_block import PulseBlock
+
+
+N_CHANNELS = 4
+PULSE_DUR = 1e-6
+PULSE_PERIOD = 2e-6
+
+
+def _make_pulses(n_pulses):
+    """ Non-overlapping PTrue pulses distributed round-robin over channels
+
+    :param n_pulses: (int) number of pulses
+    :return: (list) of PTrue objects
+    """
+
+    return [
+        PTrue(
+            ch=f'ch{i % N_CHANNELS}',
+            dur=PULSE_DUR,
+            t0=(i // N_CHANNELS) * PULSE_PERIOD
+        )
+        for i in range(n_pulses)
+    ]
+
+
+def _build_insert(pulses):
+    pb = PulseBlock()
+    for p_obj in pulses:
+        pb.insert(p_obj)
+    return pb
+
+
+def _build_extend(pulses):
+    pb = PulseBlock()
+    pb.extend(pulses)
+    return pb
+
+
+def _build_append_pb(pulses):
+    pb = PulseBlock()
+    for p_obj in pulses[:N_CHANNELS]:
+        pb.insert(p_obj)
+
+    step = PulseBlock()
+    for p_obj in pulses[:N_CHANNELS]:
+        step.insert(p_obj)
+
+    for _ in range(len(pulses) // N_CHANNELS - 1):
+        pb.append_pb(step, offset=PULSE_PERIOD - PULSE_DUR)
+    return pb
+
+
+def benchmark(sizes=(int(1e3), int(1e4), int(1e5))):
+    """ Time PulseBlock construction for increasing pulse counts.
+
+    :param sizes: (iterable) numbers of pulses
+    :return: (list) of (size, t_insert, t_extend, t_append_pb) tuples, times
+        in seconds
+    """
+
+    builders = (_build_insert, _build_extend, _build_append_pb)
+
+    results = []
+    for size in sizes:
+        pulses = _make_pulses(size)
+        times = []
+        for build in builders:
+            start = time.perf_counter()
+            pb = build(pulses)
+            times.append(time.perf_counter() - start)
+
+            n_built = sum(len(p_list) for p_list in pb.p_dict.values())
+            if n_built != size:
+                raise RuntimeError(
+                    f'{build.__name__} built {n_built} pulses instead of {size}'
+                )
+        results.append((size, *times))
+
+    return results
+
+
+def main():
+    print(f'{"pulses":>10}{"insert [s]":>14}{"extend [s]":>14}{"append_pb [s]":>16}')
+    for size, t_insert, t_extend, t_append_pb in benchmark():
+        print(f'{size:10d}{t_insert:14.4f}{t_extend:14.4f}{t_append_pb:16.4f}')
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,254 @@
+""" Benchmark of ASCII versus binary trace transfer from SCPI instruments.
+
+Reads traces from the Tektronix DPO2014 and Agilent E4405B drivers, once with
+ASCII transfer and all settings and axis queries sent for every trace (the
+previous behavior of the drivers), and once with binary block transfer and
+cached preamble and axis state. The instruments are simulated by resources
+that answer with the same message format as the instruments and delay each
+message according to a model of the GPIB link, so the benchmark runs without
+hardware. Run as a script:
+
+    python benchmarks/benchmark_scpi_transfer.py
+"""
+
+import re
+import time
+import numpy as np
+from pyvisa import util
+from pylabnet.hardware.oscilloscopes.tektronix_dpo2014 import Driver as ScopeDriver
+from pylabnet.hardware.spectrum_analyzer.agilent_e4405B import Driver as SpectrumDriver
+
+
+# Throughput (bytes/s) and latency per message (s) of the simulated link
+GPIB_RATE = 500e3
+GPIB_LATENCY = 1e-3
+
+
+class SimulatedResource:
+    """ Message based instrument with a simulated link
+
+    Implements the parts of the pyvisa MessageBasedResource API used by the
+    drivers. Blocks are encoded and decoded with pyvisa's own helpers.
+    """
+
+    def __init__(self, rate=GPIB_RATE, latency=GPIB_LATENCY):
+        """ Instantiates the resource
+
+        :param rate: (float) throughput of the link in bytes/s
+        :param latency: (float) latency per message in s
+        """
+
+        self.rate = rate
+        self.latency = latency
+        self.timeout = 2000
+        self.bytes_transferred = 0
+
+    def write(self, command):
+        self._transfer(len(command) + 1)
+        self.handle_write(command)
+
+    def query(self, command):
+        self.write(command)
+        response = self.respond(command)
+        self._transfer(len(response))
+        return response.decode('ascii')
+
+    def query_ascii_values(self, command, converter='f', separator=',', container=list):
+        return util.from_ascii_block(self.query(command), converter, separator, container)
+
+    def query_binary_values(self, command, datatype='f', is_big_endian=False, container=list):
+        self.write(command)
+        response = self.respond(command)
+        self._transfer(len(response))
+        return util.from_ieee_block(response, datatype, is_big_endian, container)
+
+    def handle_write(self, command):
+        """ Applies a command to the simulated state
+
+        :param command: (str) command sent to the instrument
+        """
+        pass
+
+    def respond(self, command):
+        """ Returns the response to a query
+
+        :param command: (str) query sent to the instrument
+        :return: (bytes) response including termination
+        """
+        return b'0\n'
+
+    def _transfer(self, n_bytes):
+        self.bytes_transferred += n_bytes
+        time.sleep(self.latency + n_bytes / self.rate)
+
+
+class SimulatedScope(SimulatedResource):
+    """ DPO2014 returning a noisy sine wave on all channels """
+
+    def __init__(self, n_points=10000, **kwargs):
+        """ Instantiates the scope
+
+        :param n_points: (int) record length
+        :param kwargs: parameters of the link, see SimulatedResource
+        """
+
+        super().__init__(**kwargs)
+        self.n_points = n_points
+        self.binary = False
+        self.width = 1
+
+    def handle_write(self, command):
+        if re.match('data:encdg', command, re.IGNORECASE):
+            self.binary = 'RIB' in command.upper()
+        elif re.match('data:width', command, re.IGNORECASE):
+            self.width = int(command.split()[-1])
+
+    def respond(self, command):
+        if command == '*IDN?':
+            return b'TEKTRONIX,DPO2014,SIMULATED,v1.0\n'
+
+        if command.upper() == 'WFMPRE?':
+            y_mult = 4e-2 / 2**(8 * (self.width - 1))
+            return (
+                f':WFMP:BYT_N {self.width};BIT_N {8 * self.width};ENC {"BIN" if self.binary else "ASC"};'
+                f'BN_F RI;BYT_O MSB;WFI "Ch1, DC coupling, 1.0V/div, 4.0us/div, {self.n_points} points, Sample mode";'
+                f'NR_P {self.n_points};PT_F Y;XUN "s";XIN 4.0000E-9;XZE -20.0000E-6;PT_O 0;'
+                f'YUN "V";YMU {y_mult:.4E};YOF 0.0E+0;YZE 0.0E+0\n'
+            ).encode('ascii')
+
+        if command.upper() == 'CURVE?':
+            max_value = 2**(8 * self.width - 1) - 1
+            values = (0.8 * max_value * np.sin(np.linspace(0, 20 * np.pi, self.n_points))
+                      + np.random.normal(0, 0.05 * max_value, self.n_points))
+            values = np.clip(values, -max_value, max_value).astype(int)
+            if self.binary:
+                block = util.to_ieee_block(values.tolist(), 'b' if self.width == 1 else 'h', True)
+                return b':CURV ' + block + b'\n'
+            return (':CURV ' + ','.join(str(value) for value in values) + '\n').encode('ascii')
+
+        return super().respond(command)
+
+
+class SimulatedSpectrumAnalyzer(SimulatedResource):
+    """ E4405B returning a noise floor with a single peak """
+
+    def __init__(self, n_points=401, **kwargs):
+        """ Instantiates the spectrum analyzer
+
+        :param n_points: (int) number of sweep points
+        :param kwargs: parameters of the link, see SimulatedResource
+        """
+
+        super().__init__(**kwargs)
+        self.n_points = n_points
+        self.binary = False
+
+    def handle_write(self, command):
+        if command.upper().startswith('FORM:DATA'):
+            self.binary = 'REAL' in command.upper()
+
+    def respond(self, command):
+        if command == '*IDN?':
+            return b'Agilent Technologies,E4405B,SIMULATED,A.14.06\n'
+        if command == ':SENSe:FREQuency:STARt?':
+            return b'+1.00000000E+009\n'
+        if command == ':SENSe:FREQuency:STOP?':
+            return b'+2.00000000E+009\n'
+        if command == 'SENSE:SWEEP:POINTS?':
+            return f'{self.n_points}\n'.encode('ascii')
+
+        if command == 'TRAC:DATA? TRACE1':
+            values = -90 + np.random.normal(0, 1, self.n_points)
+            values[self.n_points // 2] = -20
+            if self.binary:
+                return util.to_ieee_block(values.tolist(), 'f', True) + b'\n'
+            return (','.join(f'{value:.3E}' for value in values) + '\n').encode('ascii')
+
+        return super().respond(command)
+
+
+class _ResourceManager:
+    """ Stand-in for pyvisa.ResourceManager that opens a given resource """
+
+    def __init__(self, resource):
+        self.resource = resource
+
+    def open_resource(self, address):
+        return self.resource
+
+
+def _time_reads(read, clear_cache, resource, n_reads, cached):
+    """ Mean time and transferred bytes per trace
+
+    :param read: (callable) reads one trace
+    :param clear_cache: (callable) clears the driver's cached state
+    :param resource: (SimulatedResource) simulated instrument
+    :param n_reads: (int) number of traces to read
+    :param cached: (bool) whether to keep the driver's cached state between reads
+    :return: (tuple) time per trace in s and bytes per trace
+    """
+
+    # Warm up the cache
+    read()
+
+    resource.bytes_transferred = 0
+    start = time.perf_counter()
+    for _ in range(n_reads):
+        if not cached:
+            clear_cache()
+        read()
+    return (time.perf_counter() - start) / n_reads, resource.bytes_transferred / n_reads
+
+
+def benchmark(n_reads=10, rate=GPIB_RATE, latency=GPIB_LATENCY, scope_points=10000, spectrum_points=401):
+    """ Measure the trace transfer time of the DPO2014 and E4405B drivers.
+
+    :param n_reads: (int) number of traces read per measurement
+    :param rate: (float) throughput of the simulated link in bytes/s
+    :param latency: (float) latency per message of the simulated link in s
+    :param scope_points: (int) record length of the scope
+    :param spectrum_points: (int) number of sweep points of the spectrum analyzer
+    :return: (list) of (name, time_ascii, bytes_ascii, time_binary, bytes_binary)
+        tuples, with times in s and bytes per trace
+    """
+
+    scope = SimulatedScope(n_points=scope_points, rate=rate, latency=latency)
+    scope_driver = ScopeDriver('GPIB0::1::INSTR', logger=None, resource_manager=_ResourceManager(scope))
+
+    spectrum = SimulatedSpectrumAnalyzer(n_points=spectrum_points, rate=rate, latency=latency)
+    spectrum_driver = SpectrumDriver('GPIB0::2::INSTR', logger=None, resource_manager=_ResourceManager(spectrum))
+
+    results = []
+    for name, read_ascii, read_binary, driver, resource in (
+        (
+            'DPO2014 CH1',
+            lambda: scope_driver.read_out_trace('CH1', binary=False),
+            lambda: scope_driver.read_out_trace('CH1', binary=True),
+            scope_driver, scope
+        ),
+        (
+            'E4405B TRACE1',
+            lambda: spectrum_driver.read_trace(binary=False),
+            lambda: spectrum_driver.read_trace(binary=True),
+            spectrum_driver, spectrum
+        )
+    ):
+        time_ascii, bytes_ascii = _time_reads(read_ascii, driver.clear_cache, resource, n_reads, cached=False)
+        time_binary, bytes_binary = _time_reads(read_binary, driver.clear_cache, resource, n_reads, cached=True)
+        results.append((name, time_ascii, bytes_ascii, time_binary, bytes_binary))
+
+    return results
+
+
+def main():
+    print(f'Simulated link: {GPIB_RATE / 1e3:.0f} kB/s, {GPIB_LATENCY * 1e3:.1f} ms per message')
+    print(f'{"trace":>14}{"ASCII [ms]":>12}{"[kB]":>8}{"binary [ms]":>13}{"[kB]":>8}{"speedup":>9}')
+    for name, time_ascii, bytes_ascii, time_binary, bytes_binary in benchmark():
+        print(
+            f'{name:>14}{time_ascii * 1e3:12.1f}{bytes_ascii / 1e3:8.1f}'
+            f'{time_binary * 1e3:13.1f}{bytes_binary / 1e3:8.1f}{time_ascii / time_binary:9.1f}'
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+""" Paced acquisition loop for live-updating GUIs
+
+Monitor scripts typically poll a device server and redraw in a tight loop:
+
+    while self._is_running:
+        self._update_output()
+        self.gui.force_update()
+
+which keeps a CPU core busy and sends requests as fast as the server can
+answer. AcquisitionLoop instead splits an update into acquire(), called on a
+worker thread at a target rate, and display(data), called on the GUI thread:
+
+    self.loop = AcquisitionLoop(
+        acquire=self._get_output,       # e.g. fetches counts, no GUI access
+        display=self._update_output,    # e.g. sets curve data
+        rate=20,
+        status_bar=self.gui.statusBar()
+    )
+    self.loop.run()     # or start() if the Qt event loop is already running
+    ...
+    self.loop.stop()    # e.g. from pause(), thread-safe
+
+Results are delivered through a coalescing signal: if the GUI is still busy
+with a previous result, only the newest result is displayed. acquire() may
+return None if there is nothing new to display. Latencies of both steps are
+recorded, see get_statistics(), and optionally shown in a status bar.
+"""
+
+import time
+import threading
+import numpy as np
+from PyQt5 import QtCore
+from pylabnet.utils.logging.logger import LogHandler
+from pylabnet.utils.ring_buffer import RingBuffer
+
+
+class AcquisitionLoop(QtCore.QObject):
+    """ Polls data on a worker thread at a target rate and displays it on the GUI thread """
+
+    # Number of iterations used for latency statistics
+    HISTORY = 1000
+
+    # Minimum interval between status bar updates in s
+    STATUS_INTERVAL = 1
+
+    _data_ready = QtCore.pyqtSignal()
+    _finished = QtCore.pyqtSignal()
+
+    def __init__(self, acquire, display, rate=20, status_bar=None, logger=None, name='Acquisition'):
+        """ Instantiates the loop, must be called from the GUI thread
+
+        :param acquire: (callable) called without arguments on the worker
+            thread, returns data to display or None
+        :param display: (callable) called as display(data) on the GUI thread
+        :param rate: (float) target number of acquisitions per second, None
+            for no limit
+        :param status_bar: (QStatusBar, optional) bar to show statistics in
+        :param logger: (LogClient, optional) for reporting errors
+        :param name: (str) name used in log and status messages
+        """
+
+        super().__init__()
+
+        self._acquire = acquire
+        self._display = display
+        self.rate = rate
+        self.status_bar = status_bar
+        self.log = LogHandler(logger)
+        self.name = name
+
+        self._thread = None
+        self._stop = threading.Event()
+        self._restart = False
+        self._error = None
+
+        # Latest undisplayed result, guarded by _lock
+        self._lock = threading.Lock()
+        self._latest = None
+        self._pending = False
+
+        self.reset_statistics()
+
+        self._data_ready.connect(self._deliver)
+        self._finished.connect(self._on_finished)
+        self._event_loop = None
+
+    def start(self):
+        """ Starts acquiring on the worker thread, if not running yet """
+
+        if self.is_running():
+            return
+
+        self._error = None
+
+        # A previous worker that has been asked to stop may still be finishing
+        # its iteration. The GUI thread doesn't wait for it, the new worker is
+        # started by _on_finished() instead.
+        if self._thread is not None and self._thread.is_alive():
+            if QtCore.QThread.currentThread() is self.thread():
+                self._restart = True
+                return
+            self._thread.join()
+
+        self._launch()
+
+    def stop(self):
+        """ Stops acquiring after the current iteration, can be called from any thread """
+
+        self._restart = False
+        self._stop.set()
+
+    def is_running(self):
+        """ Returns whether the loop is acquiring or about to restart """
+
+        return self._restart or (
+            self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+        )
+
+    def run(self):
+        """ Starts acquiring and blocks until the loop is stopped
+
+        On the GUI thread, Qt events (and thereby the display of results)
+        are processed while waiting. Errors raised by acquire() or display()
+        are re-raised.
+        """
+
+        self.start()
+
+        if QtCore.QThread.currentThread() is self.thread():
+            self._event_loop = QtCore.QEventLoop()
+            if self.is_running():
+                self._event_loop.exec_()
+            self._event_loop = None
+        self._thread.join()
+
+        if self._error is not None:
+            raise self._error
+
+    def set_rate(self, rate):
+        """ Sets the target acquisition rate
+
+        :param rate: (float) acquisitions per second, None for no limit
+        """
+
+        self.rate = rate
+
+    def get_statistics(self):
+        """ Returns statistics of the recent iterations
+
+        :return: (dict) with total number of 'iterations', results 'displayed'
+            and results 'coalesced' (replaced before being displayed), the
+            achieved 'rate' in Hz, and 'acquire_ms', 'acquire_max_ms',
+            'display_ms', 'display_max_ms' mean and maximum latencies in ms
+        """
+
+        stats = dict(
+            iterations=self._iterations,
+            displayed=self._displayed,
+            coalesced=self._coalesced,
+            rate=0,
+            acquire_ms=0,
+            acquire_max_ms=0,
+            display_ms=0,
+            display_max_ms=0
+        )
+
+        starts = self._start_times.view()
+        if len(starts) > 1 and starts[-1] > starts[0]:
+            stats['rate'] = float((len(starts) - 1) / (starts[-1] - starts[0]))
+
+        for key, buffer in (('acquire', self._acquire_times), ('display', self._display_times)):
+            times = buffer.view()
+            if len(times) > 0:
+                stats[f'{key}_ms'] = float(1e3 * np.mean(times))
+                stats[f'{key}_max_ms'] = float(1e3 * np.max(times))
+
+        return stats
+
+    def get_statistics_text(self):
+        """ Returns a one-line summary of get_statistics()
+
+        :return: (str) summary
+        """
+
+        stats = self.get_statistics()
+        return (
+            f'{self.name}: {stats["rate"]:.1f} Hz, '
+            f'acquire {stats["acquire_ms"]:.1f} ms (max {stats["acquire_max_ms"]:.1f} ms), '
+            f'display {stats["display_ms"]:.1f} ms (max {stats["display_max_ms"]:.1f} ms), '
+            f'{stats["coalesced"]} coalesced'
+        )
+
+    def reset_statistics(self):
+        """ Resets the statistics returned by get_statistics() """
+
+        self._iterations = 0
+        self._displayed = 0
+        self._coalesced = 0
+        self._start_times = RingBuffer(self.HISTORY)
+        self._acquire_times = RingBuffer(self.HISTORY)
+        self._display_times = RingBuffer(self.HISTORY)
+        self._last_status = 0
+
+    # Technical methods
+
+    def _launch(self):
+        """ Starts a new worker thread """
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        """ Worker thread: acquires at the target rate until stopped """
+
+        next_start = time.perf_counter()
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                data = self._acquire()
+                duration = time.perf_counter() - start
+
+                self._iterations += 1
+                self._start_times.append(start)
+                self._acquire_times.append(duration)
+
+                if data is not None:
+                    with self._lock:
+                        coalesced = self._pending
+                        self._latest = data
+                        self._pending = True
+                    if coalesced:
+                        self._coalesced += 1
+                    else:
+                        self._data_ready.emit()
+
+                # Don't try to catch up after slow iterations
+                if self.rate:
+                    next_start = max(next_start + 1 / self.rate, time.perf_counter())
+                    self._stop.wait(next_start - time.perf_counter())
+
+        except Exception as error:
+            self._error = error
+            self.log.error(f'{self.name} stopped: {error}')
+
+        finally:
+            self._stop.set()
+            self._finished.emit()
+
+    def _deliver(self):
+        """ GUI thread: displays the latest result """
+
+        with self._lock:
+            data = self._latest
+            self._latest = None
+            self._pending = False
+
+        if data is None:
+            return
+
+        start = time.perf_counter()
+        try:
+            self._display(data)
+        except Exception as error:
+            self._error = error
+            self.log.error(f'{self.name} stopped: {error}')
+            self.stop()
+            return
+        self._display_times.append(time.perf_counter() - start)
+        self._displayed += 1
+
+        if self.status_bar is not None and start - self._last_status > self.STATUS_INTERVAL:
+            self._last_status = start
+            self.status_bar.showMessage(self.get_statistics_text())
+
+    def _on_finished(self):
+        """ GUI thread: displays the last result and ends a blocking run() """
+
+        self._deliver()
+
+        # Start the worker requested while the previous one was finishing
+        if self._restart:
+            self._restart = False
+            self._launch()
+
+        # A restarted loop keeps blocking
+        if self._event_loop is not None and not self.is_running():
+            self._event_loop.quit()
@@ -34,6 +34,7 @@ import ctypes
 import sys
 import copy
 import os
+import time
 import numpy as np
 from PyQt5 import QtWidgets, uic, QtCore, QtGui
 import qdarkstyle
@@ -126,6 +127,13 @@ class Window(QtWidgets.QMainWindow):
         # List of Numerical widgets for future use in dynamical step size updating
         self.num_widgets = None
 
+        # Maximum rate of widget updates (None for no limit). Updates requested
+        # in between are merged into one deferred update.
+        self.max_fps = 60
+        self._last_update = 0
+        self._update_pending = False
+        self.reset_update_statistics()
+
         # Load and run the GUI
         self._load_gui(gui_template=gui_template, run=run)
 
@@ -577,16 +585,61 @@ class Window(QtWidgets.QMainWindow):
                 pass
 
     def update_widgets(self):
-        """ Updates all widgets on the physical GUI to current data"""
+        """ Updates all widgets on the physical GUI to current data
+
+        Only curves whose data changed (or whose view was zoomed/resized) are
+        redrawn. Calls more frequent than max_fps are deferred and merged.
+        """
+
+        now = time.perf_counter()
+        if self.max_fps is not None and now - self._last_update < 1 / self.max_fps:
+            self._update_statistics['skipped'] += 1
+
+            # Make sure the latest data is eventually displayed
+            if not self._update_pending:
+                self._update_pending = True
+                delay = 1 / self.max_fps - (now - self._last_update)
+                QtCore.QTimer.singleShot(int(np.ceil(1000 * delay)), self._deferred_update)
+            return
+
+        self._last_update = now
 
         # Update all plots
+        rendered = 0
         for plot in self.plots.values():
-            plot.update_output()
+            rendered += plot.update_output()
 
         # Update all scalars
         for scalar in self.scalars.values():
             scalar.update_output()
 
+        duration = time.perf_counter() - now
+        stats = self._update_statistics
+        stats['updates'] += 1
+        stats['curves_rendered'] += rendered
+        stats['total_time'] += duration
+        stats['last_time'] = duration
+        stats['max_time'] = max(stats['max_time'], duration)
+
+    def get_update_statistics(self):
+        """ Returns timing statistics of update_widgets()
+
+        :return: (dict) with number of 'updates' performed, updates 'skipped'
+            by the frame rate cap, number of 'curves_rendered', and 'mean_time',
+            'last_time' and 'max_time' of an update in s
+        """
+
+        stats = dict(self._update_statistics)
+        stats['mean_time'] = stats['total_time'] / stats['updates'] if stats['updates'] > 0 else 0
+        return stats
+
+    def reset_update_statistics(self):
+        """ Resets the statistics returned by get_update_statistics() """
+
+        self._update_statistics = dict(
+            updates=0, skipped=0, curves_rendered=0, total_time=0, last_time=0, max_time=0
+        )
+
     def force_update(self):
         """ Forces the GUI to update.
 
@@ -599,6 +652,12 @@ class Window(QtWidgets.QMainWindow):
 
     # Technical methods
 
+    def _deferred_update(self):
+        """ Performs an update that was postponed by the frame rate cap """
+
+        self._update_pending = False
+        self.update_widgets()
+
     def _load_gui(self, gui_template=None, run=True):
         """ Loads a GUI template to the main window.
 
@@ -981,6 +1040,10 @@ class Plot:
         # Set up legend
         self._set_legend(legend_widget=legend_widget)
 
+        # Decimated curves need to be redrawn when zooming or panning
+        self.view_box = self.widget.getPlotItem().getViewBox()
+        self.view_box.sigXRangeChanged.connect(self._update_decimated)
+
     def add_curve(self, curve_label, error=False):
         """ Adds a curve to the plot
 
@@ -1016,21 +1079,28 @@ class Plot:
         del self.curves[curve_label]
 
     def update_output(self):
-        """ Updates plot output to latest data"""
+        """ Updates plot output to latest data
+
+        :return: (int) number of curves that were redrawn
+        """
+
+        # Visible x-range and its width in pixels, used for decimation
+        x_range = tuple(self.view_box.viewRange()[0])
+        n_pixels = max(int(self.view_box.width()), 1)
+        auto_range = bool(self.view_box.autoRangeEnabled()[0])
 
+        rendered = 0
         for curve in self.curves.values():
+            if curve.render(x_range, n_pixels, auto_range):
+                rendered += 1
 
-            # Set data without error bars
-            curve.widget.setData(
-                curve.data
-            )
+        return rendered
 
-            if curve.error_data is not None:
-                curve.error.setData(
-                    x=np.arange(len(curve.data)),
-                    y=curve.data,
-                    height=2 * curve.error_data
-                )
+    def _update_decimated(self, *args):
+        """ Redraws decimated curves after the visible range has changed """
+
+        if any(curve.is_decimated() for curve in self.curves.values()):
+            self.update_output()
 
     # Technical methods
 
@@ -1104,6 +1174,14 @@ class Curve:
 
         self.data = np.array([])
 
+        # Whether data has changed since it was last drawn, and the view the
+        # data was last decimated for (None if not decimated)
+        self.dirty = True
+        self._decimated_view = None
+
+        # x and y arrays of the data if it can be decimated
+        self._xy = None
+
     def set_curve_data(self, data, error=None):
         """ Stores data to a new curve
 
@@ -1116,6 +1194,137 @@ class Curve:
         if self.error_data is not None:
             self.error_data = error
 
+        self.dirty = True
+        self._xy = None
+
+    def render(self, x_range, n_pixels, auto_range=True):
+        """ Draws the data if it has changed since it was last drawn
+
+        Traces much longer than the pixel width of the plot are reduced to
+        the minimum and maximum of each pixel column (see min_max_decimate),
+        which looks identical but is much faster to draw. Decimated traces are
+        redrawn when the visible range or the plot width changes.
+
+        :param x_range: (tuple) visible x-range of the plot
+        :param n_pixels: (int) width of the plot in pixels
+        :param auto_range: (bool) whether the x-axis follows the data
+        :return: (bool) whether the curve was redrawn
+        """
+
+        # With auto-range, the full data is drawn regardless of the x-range
+        view = (None if auto_range else x_range, n_pixels, auto_range)
+        if not self.dirty and (self._decimated_view is None or self._decimated_view == view):
+            return False
+
+        self.dirty = False
+        self._decimated_view = None
+
+        # Error bars are drawn at full resolution
+        if self.error_data is not None:
+            self.widget.setData(self.data)
+            self.error.setData(
+                x=np.arange(len(self.data)),
+                y=self.data,
+                height=2 * self.error_data
+            )
+            return True
+
+        if self._xy is None:
+            self._xy = self._get_xy(self.data)
+
+        if self._xy is None or len(self._xy[1]) <= 2 * n_pixels:
+            self.widget.setData(self.data)
+            return True
+
+        x, y = self._xy
+        if auto_range:
+            n_buckets = n_pixels
+        else:
+            # Visible part with one view width of margin on each side, such
+            # that small pans don't show missing data
+            width = x_range[1] - x_range[0]
+            start = max(np.searchsorted(x, x_range[0] - width, side='left') - 1, 0)
+            stop = min(np.searchsorted(x, x_range[1] + width, side='right') + 1, len(x))
+            x, y = x[start:stop], y[start:stop]
+            n_buckets = 3 * n_pixels
+
+        self.widget.setData(*min_max_decimate(x, y, n_buckets))
+        self._decimated_view = view
+        return True
+
+    def is_decimated(self):
+        """ Returns whether the drawn data is a decimated version of the data """
+
+        return self._decimated_view is not None
+
+    @staticmethod
+    def _get_xy(data):
+        """ Returns x and y arrays of the data if it can be decimated
+
+        :param data: curve data as passed to set_curve_data()
+        :return: (tuple) x and y arrays, None for data that is not a 1D array
+            or an array of (x, y) columns with increasing x
+        """
+
+        try:
+            data = np.asarray(data, dtype=float)
+        except (TypeError, ValueError):
+            return None
+
+        if data.ndim == 1:
+            return np.arange(len(data)), data
+
+        if data.ndim == 2 and data.shape[1] == 2 and len(data) > 1:
+            x = data[:, 0]
+            if np.all(x[1:] >= x[:-1]):
+                return x, data[:, 1]
+
+        return None
+
+
+def min_max_decimate(x, y, n_buckets):
+    """ Reduces a trace to the minimum and maximum of each of n_buckets
+    equally long segments, keeping their order and the end points
+
+    NaNs within a segment are ignored, segments of only NaNs are kept as a
+    single NaN, such that gaps in the trace remain visible.
+
+    :param x: (np.array) x values
+    :param y: (np.array) y values
+    :param n_buckets: (int) number of segments, e.g. the width of the plot in pixels
+    :return: (tuple) decimated x and y arrays
+    """
+
+    n_points = len(y)
+    if n_points <= 2 * n_buckets:
+        return x, y
+
+    size = int(np.ceil(n_points / n_buckets))
+    n_full = (n_points // size) * size
+    buckets = y[:n_full].reshape(-1, size)
+
+    # NaNs are ignored, a segment of only NaNs is reduced to its first point
+    nan = np.isnan(buckets)
+    if nan.any():
+        i_min = np.where(nan, np.inf, buckets).argmin(axis=1)
+        i_max = np.where(nan, -np.inf, buckets).argmax(axis=1)
+    else:
+        i_min = buckets.argmin(axis=1)
+        i_max = buckets.argmax(axis=1)
+    offsets = np.arange(len(buckets)) * size
+    indices = [
+        [0],
+        (offsets[:, None] + np.sort(np.column_stack((i_min, i_max)), axis=1)).ravel()
+    ]
+
+    # Remaining points that do not fill a segment
+    if n_full < n_points:
+        indices.append(np.arange(n_full, n_points))
+    indices.append([n_points - 1])
+
+    indices = np.unique(np.concatenate(indices).astype(int))
+    return x[indices], y[indices]
+
 
 class Scalar:
     """ A scalar display object (e.g. a number or boolean)
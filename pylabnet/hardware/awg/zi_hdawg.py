@@ -525,12 +525,13 @@ class AWGModule():
         """ Compile and upload AWG sequence to AWG Module.
 
         :sequence: Instance of Sequence class.
+        :return: (bool) True if the sequence was compiled and uploaded
         """
 
         # First check if all values have been replaced in sequence:
         if not sequence.is_ready():
             self.hd.log.error("Sequence is not ready: Not all placeholders have been replaced.")
-            return
+            return False
 
         self.module.set('compiler/sourcestring', sequence.sequence)
         # Note: when using an AWG program from a source file
@@ -542,7 +543,7 @@ class AWGModule():
         if self.module.getInt('compiler/status') == 1:
             # compilation failed, raise an exception
             self.hd.log.warn(self.module.getString('compiler/statusstring'))
-            return
+            return False
 
         if self.module.getInt('compiler/status') == 0:
             self.hd.log.info(
@@ -570,6 +571,9 @@ class AWGModule():
             self.hd.log.info("Upload to the instrument successful.")
         if self.module.getInt('elf/status') == 1:
             self.hd.log.warn("Upload to the instrument failed.")
+            return False
+
+        return True
 
     def dyn_waveform_upload(self, wave_index, wave1, wave2=None, marker=None, index=None):
         """ Dynamically upload a numpy array into HDAWG Memory
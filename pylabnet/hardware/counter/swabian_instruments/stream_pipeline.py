@@ -0,0 +1,452 @@
+""" Online processing of time tag streams on the Time Tagger server
+
+A StreamPipeline periodically drains a TimeTagStream in chunks and feeds the
+(channels, timestamps) arrays of each chunk to a set of registered analyzers.
+Analyzers are vectorized over a chunk and keep the state needed to process
+events spanning chunk boundaries, so only their reduced results (histograms,
+gate counts) have to be sent to clients rather than the full tag stream.
+
+Analyzers are selected by name from ANALYZERS, and new ones can be added with
+register_analyzer(). All timestamps and bin widths are in ps.
+"""
+
+import time
+import threading
+import numpy as np
+from pylabnet.utils.logging.logger import LogHandler
+from pylabnet.utils.ring_buffer import RingBuffer
+
+
+class StreamAnalyzer:
+    """ Base class for online time tag analyzers
+
+    Subclasses implement process() and get_result(), and list in
+    channel_params the constructor arguments that are channel numbers, so the
+    Time Tagger wrapper can resolve virtual channel names before instantiation.
+    """
+
+    channel_params = ()
+
+    def process(self, channels, timestamps):
+        """ Processes one chunk of time tags
+
+        :param channels: (np.ndarray) channel of each event
+        :param timestamps: (np.ndarray) int64 timestamp of each event in ps,
+            increasing and continuing from the previous chunk
+        """
+
+        raise NotImplementedError
+
+    def get_result(self):
+        """ Returns the current result of the analysis
+
+        :return: (np.ndarray) result array
+        """
+
+        raise NotImplementedError
+
+    def get_x_axis(self):
+        """ Returns the x axis belonging to get_result(), if any
+
+        :return: (np.ndarray) x axis values or None
+        """
+
+        return None
+
+    def clear(self):
+        """ Resets the accumulated result and internal state """
+
+        raise NotImplementedError
+
+
+class ConditionalHistogram(StreamAnalyzer):
+    """ Histogram of click arrival times relative to the most recent start event
+
+    Equivalent to a TT.TimeDifferences measurement with a single histogram.
+    """
+
+    channel_params = ('start_ch', 'click_ch')
+
+    def __init__(self, start_ch, click_ch, binwidth=1000, n_bins=1000):
+        """ Instantiates an empty histogram
+
+        :param start_ch: (int) start channel
+        :param click_ch: (int) click channel
+        :param binwidth: (int) width of bin in ps
+        :param n_bins: (int) number of bins
+        """
+
+        self.start_ch = start_ch
+        self.click_ch = click_ch
+        self.binwidth = int(binwidth)
+        self.n_bins = int(n_bins)
+        self.clear()
+
+    def process(self, channels, timestamps):
+
+        start_times = timestamps[channels == self.start_ch]
+        click_times = timestamps[channels == self.click_ch]
+
+        # Prepend the last start of the previous chunk
+        if self._last_start is not None:
+            start_times = np.concatenate(([self._last_start], start_times))
+        if len(start_times) == 0:
+            return
+        self._last_start = start_times[-1]
+
+        if len(click_times) == 0:
+            return
+
+        start_idx = np.searchsorted(start_times, click_times, side='right') - 1
+        has_start = start_idx >= 0
+        bins = (click_times[has_start] - start_times[start_idx[has_start]]) // self.binwidth
+        bins = bins[bins < self.n_bins]
+
+        self._hist += np.bincount(bins, minlength=self.n_bins)
+
+    def get_result(self):
+        return self._hist.copy()
+
+    def get_x_axis(self):
+        return np.arange(self.n_bins, dtype=np.int64) * self.binwidth
+
+    def clear(self):
+        self._hist = np.zeros(self.n_bins, dtype=np.int64)
+        self._last_start = None
+
+
+class G2Correlator(StreamAnalyzer):
+    """ Histogram of time differences t_2 - t_1 between all pairs of events
+
+    Bins are centered around zero delay, as for a TT.Correlation measurement.
+    """
+
+    channel_params = ('ch_1', 'ch_2')
+
+    def __init__(self, ch_1, ch_2, binwidth=1000, n_bins=1000):
+        """ Instantiates an empty correlation histogram
+
+        :param ch_1: (int) first click channel
+        :param ch_2: (int) second click channel
+        :param binwidth: (int) width of bin in ps
+        :param n_bins: (int) number of bins
+        """
+
+        self.ch_1 = ch_1
+        self.ch_2 = ch_2
+        self.binwidth = int(binwidth)
+        self.n_bins = int(n_bins)
+
+        # Histogram covers time differences in [_lo_edge, _lo_edge + _span)
+        self._span = self.n_bins * self.binwidth
+        self._lo_edge = -(self._span // 2)
+        self.clear()
+
+    def _add_pairs(self, times_1, times_2):
+        """ Adds all pairs within the histogram range to the histogram
+
+        :param times_1: (np.ndarray) sorted event times on ch_1
+        :param times_2: (np.ndarray) sorted event times on ch_2
+        """
+
+        if len(times_1) == 0 or len(times_2) == 0:
+            return
+
+        # Range of ch_2 events falling into the histogram of each ch_1 event
+        first = np.searchsorted(times_2, times_1 + self._lo_edge)
+        last = np.searchsorted(times_2, times_1 + self._lo_edge + self._span)
+        n_pairs = last - first
+        n_total = n_pairs.sum()
+        if n_total == 0:
+            return
+
+        # Flat indices of all pairs
+        idx_1 = np.repeat(np.arange(len(times_1)), n_pairs)
+        offsets = np.arange(n_total) - np.repeat(np.cumsum(n_pairs) - n_pairs, n_pairs)
+        idx_2 = np.repeat(first, n_pairs) + offsets
+
+        bins = (times_2[idx_2] - times_1[idx_1] - self._lo_edge) // self.binwidth
+        self._hist += np.bincount(bins, minlength=self.n_bins)
+
+    def process(self, channels, timestamps):
+
+        if len(timestamps) == 0:
+            return
+
+        new_1 = timestamps[channels == self.ch_1]
+        new_2 = timestamps[channels == self.ch_2]
+
+        # New ch_1 events with all ch_2 events, previous ch_1 events with new
+        # ch_2 events, such that no pair is counted twice
+        self._add_pairs(new_1, np.concatenate((self._tail_2, new_2)))
+        self._add_pairs(self._tail_1, new_2)
+
+        # Keep only events that can still pair with future events
+        t_min = timestamps[-1] - self._span
+        tail_1 = np.concatenate((self._tail_1, new_1))
+        tail_2 = np.concatenate((self._tail_2, new_2))
+        self._tail_1 = tail_1[tail_1 > t_min]
+        self._tail_2 = tail_2[tail_2 > t_min]
+
+    def get_result(self):
+        return self._hist.copy()
+
+    def get_x_axis(self):
+        return self._lo_edge + np.arange(self.n_bins, dtype=np.int64) * self.binwidth
+
+    def clear(self):
+        self._hist = np.zeros(self.n_bins, dtype=np.int64)
+        self._tail_1 = np.zeros(0, dtype=np.int64)
+        self._tail_2 = np.zeros(0, dtype=np.int64)
+
+
+class GatedCounter(StreamAnalyzer):
+    """ Number of clicks within each gate window
+
+    A window opens on a gate_ch event and closes on the next gate_stop_ch
+    event. A second gate_ch event before the window closes restarts it. The
+    counts of the most recent n_bins completed windows are stored.
+    """
+
+    channel_params = ('click_ch', 'gate_ch', 'gate_stop_ch')
+
+    def __init__(self, click_ch, gate_ch, gate_stop_ch=None, n_bins=1000):
+        """ Instantiates an empty counter
+
+        :param click_ch: (int) click channel
+        :param gate_ch: (int) channel opening the gate window
+        :param gate_stop_ch: (int, optional) channel closing the gate window,
+            defaults to the falling edge -gate_ch
+        :param n_bins: (int) number of gate windows to store
+        """
+
+        self.click_ch = click_ch
+        self.gate_ch = gate_ch
+        self.gate_stop_ch = -gate_ch if gate_stop_ch is None else gate_stop_ch
+        self.n_bins = int(n_bins)
+        self._counts = RingBuffer(self.n_bins, dtype=np.int64)
+        self.clear()
+
+    def process(self, channels, timestamps):
+
+        edge_pos = np.flatnonzero((channels == self.gate_ch) | (channels == self.gate_stop_ch))
+        click_pos = np.flatnonzero(channels == self.click_ch)
+        edge_is_start = channels[edge_pos] == self.gate_ch
+
+        # Last gate edge preceding each click, -1 if it was in a previous chunk
+        prev_edge = np.searchsorted(edge_pos, click_pos) - 1
+
+        if self._open:
+            self._open_count += np.count_nonzero(prev_edge < 0)
+
+        in_gate = prev_edge >= 0
+        in_gate[in_gate] = edge_is_start[prev_edge[in_gate]]
+        edge_counts = np.bincount(prev_edge[in_gate], minlength=len(edge_pos))
+
+        if len(edge_pos) == 0:
+            return
+
+        # A stop edge completes the window opened by the preceding start edge
+        prev_is_start = np.concatenate(([self._open], edge_is_start[:-1]))
+        completes = ~edge_is_start & prev_is_start
+        prev_counts = np.concatenate(([self._open_count], edge_counts[:-1]))
+        self._counts.append(prev_counts[completes])
+
+        self._open = bool(edge_is_start[-1])
+        self._open_count = int(edge_counts[-1]) if self._open else 0
+
+    def get_result(self):
+        return self._counts.view().copy()
+
+    def clear(self):
+        self._counts.clear()
+        self._open = False
+        self._open_count = 0
+
+
+# Analyzers available by name
+ANALYZERS = {
+    'conditional_histogram': ConditionalHistogram,
+    'g2': G2Correlator,
+    'gated_counter': GatedCounter
+}
+
+
+def register_analyzer(analyzer_type, analyzer_class):
+    """ Makes a custom analyzer available by name
+
+    :param analyzer_type: (str) name used to select the analyzer
+    :param analyzer_class: (class) StreamAnalyzer subclass
+    """
+
+    if not issubclass(analyzer_class, StreamAnalyzer):
+        raise TypeError(f'{analyzer_class} is not a StreamAnalyzer')
+    ANALYZERS[analyzer_type] = analyzer_class
+
+
+class StreamPipeline:
+    """ Drains a time tag stream in chunks and feeds registered analyzers
+
+    Failed reads are logged once, and processing stops after
+    MAX_FAILURES consecutive failures. The error is then reported by
+    get_status().
+    """
+
+    MAX_FAILURES = 100
+
+    def __init__(self, read_chunk, chunk_interval=0.05, logger=None):
+        """ Instantiates a pipeline without analyzers
+
+        :param read_chunk: (callable) returns the (channels, timestamps,
+            first_index) recorded since the previous call, see
+            Wrap.get_timetag_stream_arrays()
+        :param chunk_interval: (float) time between reads in s
+        :param logger: instance of LogClient class, optional
+        """
+
+        self.log = LogHandler(logger=logger)
+        self._read_chunk = read_chunk
+        self.chunk_interval = chunk_interval
+
+        self._analyzers = {}
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        # Index of the next expected event, used to detect lost tags
+        self._next_index = None
+        self.n_events = 0
+
+        # Last processing error and number of consecutive failures
+        self.error = None
+        self.n_failures = 0
+
+    def add_analyzer(self, name, analyzer):
+        """ Registers an analyzer, replacing any existing one with the same name
+
+        :param name: (str) identifier of the analyzer
+        :param analyzer: (StreamAnalyzer) analyzer instance
+        """
+
+        with self._lock:
+            self._analyzers[name] = analyzer
+
+    def remove_analyzer(self, name):
+        """ Removes an analyzer
+
+        :param name: (str) identifier of the analyzer
+        """
+
+        with self._lock:
+            del self._analyzers[name]
+
+    def get_result(self, name):
+        """ Returns the current result of an analyzer
+
+        :param name: (str) identifier of the analyzer
+        :return: (np.ndarray) result array
+        """
+
+        with self._lock:
+            return self._analyzers[name].get_result()
+
+    def get_x_axis(self, name):
+        """ Returns the x axis of an analyzer result
+
+        :param name: (str) identifier of the analyzer
+        :return: (np.ndarray) x axis values or None
+        """
+
+        with self._lock:
+            return self._analyzers[name].get_x_axis()
+
+    def clear(self, name=None):
+        """ Resets one or all analyzers
+
+        :param name: (str, optional) identifier of the analyzer, all
+            analyzers are cleared if None
+        """
+
+        with self._lock:
+            names = self._analyzers if name is None else [name]
+            for analyzer_name in names:
+                self._analyzers[analyzer_name].clear()
+
+    def process_chunk(self):
+        """ Reads one chunk from the stream and feeds it to all analyzers
+
+        :return: (int) number of events in the chunk
+        """
+
+        channels, timestamps, first_index = self._read_chunk()
+
+        if self._next_index is not None and first_index != self._next_index:
+            self.log.warn(f'Time tag stream skipped {first_index - self._next_index} '
+                          'events, they were read by another client')
+        self._next_index = first_index + len(timestamps)
+
+        if len(timestamps) == 0:
+            return 0
+
+        with self._lock:
+            for analyzer in self._analyzers.values():
+                analyzer.process(channels, timestamps)
+        self.n_events += len(timestamps)
+
+        return len(timestamps)
+
+    def _run(self):
+        """ Processes chunks until stop() is called """
+
+        while not self._stop_event.is_set():
+            start = time.monotonic()
+            try:
+                self.process_chunk()
+            except Exception as error:
+                self.error = str(error)
+                self.n_failures += 1
+                if self.n_failures == 1:
+                    self.log.error(f'Time tag stream processing failed: {error}')
+                if self.n_failures >= self.MAX_FAILURES:
+                    self.log.error(f'Stopped time tag stream processing after {self.n_failures} '
+                                   f'consecutive failures: {error}')
+                    return
+            else:
+                if self.n_failures > 0:
+                    self.log.info(f'Time tag stream processing recovered after {self.n_failures} failures')
+                    self.n_failures = 0
+            self._stop_event.wait(max(self.chunk_interval - (time.monotonic() - start), 0))
+
+    def get_status(self):
+        """ Returns the state of background processing
+
+        :return: (dict) with 'running' (bool), 'n_events' (int, number of
+            processed events), 'n_failures' (int, consecutive failed reads)
+            and 'error' (str, last error or None)
+        """
+
+        return dict(
+            running=self._thread is not None and self._thread.is_alive(),
+            n_events=self.n_events,
+            n_failures=self.n_failures,
+            error=self.error
+        )
+
+    def start(self):
+        """ Starts processing in a background thread """
+
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop_event.clear()
+        self.error = None
+        self.n_failures = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """ Stops background processing after the current chunk """
+
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
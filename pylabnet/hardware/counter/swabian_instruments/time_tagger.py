@@ -2,8 +2,10 @@
 
 import TimeTagger as TT
 import time
+import uuid
 import numpy as np
 from pylabnet.utils.logging.logger import LogHandler
+from pylabnet.hardware.counter.swabian_instruments.stream_pipeline import StreamPipeline, ANALYZERS
 
 
 class Wrap:
@@ -47,6 +49,23 @@ class Wrap:
         self._ctr = {}
         self._channels = {}
 
+        # Bin width (ps) of each count trace measurement
+        self._bin_widths = {}
+
+        # Token of each measurement that changes whenever it is cleared or
+        # set up again, see get_counts_since()
+        self._epochs = {}
+
+        # Configuration of each measurement, with a version that changes
+        # whenever the measurement is set up again
+        self._metadata = {}
+
+        # Number of events already read out from each TimeTagStream
+        self._stream_read_pos = {}
+
+        # Online analysis pipelines fed by TimeTagStreams
+        self._pipelines = {}
+
     def start_trace(self, name=None, ch_list=[1], bin_width=1000000000,
                     n_bins=10000):
         """Start counter - used for count-trace applications
@@ -69,6 +88,9 @@ class Wrap:
             binwidth=bin_width,
             n_values=n_bins
         )
+        self._bin_widths[name] = bin_width
+        self._epochs[name] = uuid.uuid4().hex
+        self._set_metadata(name, channels=ch_list, binwidth=bin_width, n_bins=n_bins)
 
         self.log.info('Set up count trace measurement on channel(s)'
                       f' {ch_list}')
@@ -85,6 +107,7 @@ class Wrap:
 
         # Clear counter (see TT documentation)
         self._ctr[name].clear()
+        self._epochs[name] = uuid.uuid4().hex
 
     def get_counts(self, name=None):
         """Gets a 2D array of counts on all channels. See the
@@ -98,6 +121,91 @@ class Wrap:
         # Get count data (see TT documentation)
         return self._ctr[name].getData()
 
+    def get_counts_versioned(self, name=None):
+        """Gets a 2D array of counts on all channels together with the
+            version of the measurement configuration, see get_metadata()
+
+        :param name: (str) identifier for the counter measurement
+
+        :return: (tuple) counts and version (str, None if unknown)
+        """
+
+        name = self.handle_name(name)
+        return self._ctr[name].getData(), self.get_version(name)
+
+    def get_version(self, name=None):
+        """Gets the version of the configuration of a measurement
+
+        :param name: (str) identifier for the measurement
+
+        :return: (str) version, changes whenever the measurement is set up
+            again. None if the measurement was not set up by this instance.
+        """
+
+        metadata = self._metadata.get(self.handle_name(name))
+        return None if metadata is None else metadata['version']
+
+    def get_metadata(self, name=None):
+        """Gets the static properties of a measurement, which only change
+            when the measurement is set up again
+
+        :param name: (str) identifier for the measurement
+
+        :return: (dict) with 'version' (see get_version()), 'channels',
+            'x_axis' (see get_x_axis(), None if not available) and the
+            parameters used to set up the measurement, e.g. 'binwidth' and 'n_bins'
+        """
+
+        name = self.handle_name(name)
+        metadata = dict(self._metadata.get(name, dict(version=None)))
+
+        ctr = self._ctr[name]
+        metadata['x_axis'] = ctr.getIndex() if hasattr(ctr, 'getIndex') else None
+        return metadata
+
+    def get_counts_since(self, name=None, last_index=None, last_epoch=None):
+        """Gets the count bins of a count trace completed since a previous call
+
+        Bins are numbered from the start (or last clear) of the measurement
+        using its capture duration, such that passing the returned write
+        index and epoch to the next call only returns the bins completed in
+        between. The epoch changes whenever the measurement is cleared or set
+        up again, since the write index alone can't tell a cleared counter
+        that has grown past last_index from one that hasn't been cleared.
+
+        :param name: (str) identifier for the counter measurement
+        :param last_index: (int) write index returned by the previous call,
+            None to get the full trace
+        :param last_epoch: (str) epoch returned by the previous call
+
+        :return: (tuple) 2D array of the new counts on all channels, the
+            write index (number of bins completed so far) and the epoch. The
+            full trace is returned if last_index is None, the epoch differs
+            from last_epoch, or more bins than the trace holds are new.
+        """
+
+        name = self.handle_name(name)
+        ctr = self._ctr[name]
+        bin_width = self._bin_widths[name]
+
+        # Make sure the index and epoch belong to the data, even if a bin was
+        # completed or the counter was cleared while reading
+        for _ in range(3):
+            epoch = self._epochs[name]
+            write_index = int(ctr.getCaptureDuration() // bin_width)
+            counts = ctr.getData()
+            if (int(ctr.getCaptureDuration() // bin_width) == write_index
+                    and self._epochs[name] == epoch):
+                break
+
+        n_bins = counts.shape[1]
+        if last_index is None or epoch != last_epoch or write_index < last_index:
+            n_new = n_bins
+        else:
+            n_new = min(write_index - last_index, n_bins)
+
+        return counts[:, n_bins - n_new:], write_index, epoch
+
     def get_counts_normalized(self, name=None):
         """Gets a 2D array of normalized counts on all channels. See the
             getDataNormalized() method of Counter class in TT
@@ -164,6 +272,7 @@ class Wrap:
             self._tagger,
             channels=ch_list
         )
+        self._set_metadata(name, channels=ch_list)
 
         self.log.info('Set up count rate measurement on channel(s)'
                       f' {ch_list}')
@@ -216,6 +325,8 @@ class Wrap:
                 n_values=bins
             )
 
+        self._set_metadata(name, channels=[click_ch, gate_ch], n_bins=bins)
+
     def start_histogram(self, name, start_ch, click_ch, next_ch=-134217728,
                         sync_ch=-134217728, binwidth=1000, n_bins=1000,
                         n_histograms=1, start_delay=None):
@@ -254,6 +365,10 @@ class Wrap:
             n_bins=n_bins,
             n_histograms=n_histograms
         )
+        self._set_metadata(
+            name, channels=[start_ch, click_ch], binwidth=binwidth,
+            n_bins=n_bins, n_histograms=n_histograms
+        )
 
     def start_correlation(self, name, ch_1, ch_2, binwidth=1000, n_bins=1000, delay=None):
         """ Sets up a correlation measurement using TT.Correlation measurement class
@@ -284,6 +399,7 @@ class Wrap:
             binwidth=binwidth,
             n_bins=n_bins
         )
+        self._set_metadata(name, channels=[ch_1, ch_2], binwidth=binwidth, n_bins=n_bins)
 
     def start_timetag_stream(self, name, n_max_events, channel_list):
 
@@ -294,11 +410,144 @@ class Wrap:
             n_max_events=n_max_events,
             channels=channels
         )
+        self._stream_read_pos[name] = 0
+
+    def get_timetag_stream_arrays(self, name):
+        """ Reads all time tags recorded since the last read of the stream
+
+        :param name: (str) name of TimeTagStream instance
+
+        :return: (tuple) of
+            channels - (np.ndarray) channel of each event, int8 if all channel
+                numbers fit (physical channels), int32 otherwise (virtual channels)
+            timestamps - (np.ndarray, int64) timestamp of each event in ps
+            first_index - (int) index of the first returned event counted from
+                the start of the stream, such that consecutive reads can be
+                checked for continuity
+        """
+
+        # getData() returns the buffered tags and clears the buffer
+        timetag_stream_buffer = self._ctr[name].getData()
+
+        if timetag_stream_buffer.hasOverflows():
+            self.log.warn(f'TimeTagStream {name} overflowed, some time tags were lost')
+
+        channels = np.asarray(timetag_stream_buffer.getChannels())
+        timestamps = np.asarray(timetag_stream_buffer.getTimestamps(), dtype=np.int64)
+
+        # Physical channels (-18...18) fit into int8, virtual channels do not
+        if len(channels) == 0 or (channels.min() >= np.iinfo(np.int8).min
+                                  and channels.max() <= np.iinfo(np.int8).max):
+            channels = channels.astype(np.int8)
+        else:
+            channels = channels.astype(np.int32)
+
+        first_index = self._stream_read_pos.get(name, 0)
+        self._stream_read_pos[name] = first_index + len(timestamps)
+
+        return channels, timestamps, first_index
 
     def get_timetag_stream_data(self, name):
-        timetag_stream_buffer = self.get_counts(name=name)
-        return ([int(i) for i in timetag_stream_buffer.getChannels()],
-                [int(i) for i in timetag_stream_buffer.getTimestamps()])
+        """ Returns channels and timestamps of TimeTagStream object as lists
+
+        Prefer get_timetag_stream_arrays(), which avoids conversion to Python ints.
+
+        :param name: (str) name of TimeTagStream instance
+        """
+
+        channels, timestamps, _ = self.get_timetag_stream_arrays(name)
+        return channels.tolist(), timestamps.tolist()
+
+    def start_stream_pipeline(self, name, n_max_events, channel_list, chunk_interval=0.05):
+        """ Sets up a time tag stream processed online by stream analyzers
+
+        The stream is drained in a background thread, so it should not be read
+        with get_timetag_stream_arrays() at the same time.
+
+        :param name: (str) name of measurement for future reference
+        :param n_max_events: (int) max number of events to buffer between reads
+        :param channel_list: (list) list of channels to use
+        :param chunk_interval: (float) time between reads of the stream in s
+        """
+
+        if name in self._pipelines:
+            self._pipelines[name].stop()
+
+        self.start_timetag_stream(name, n_max_events, channel_list)
+        self._pipelines[name] = StreamPipeline(
+            read_chunk=lambda: self.get_timetag_stream_arrays(name),
+            chunk_interval=chunk_interval,
+            logger=self.log
+        )
+        self._pipelines[name].start()
+        self.log.info(f'Started stream pipeline {name} on channel(s) {channel_list}')
+
+    def add_stream_analyzer(self, name, analyzer_name, analyzer_type, **params):
+        """ Adds an analyzer to a stream pipeline
+
+        :param name: (str) name of the stream pipeline
+        :param analyzer_name: (str) identifier of the analyzer for future reference
+        :param analyzer_type: (str) key of stream_pipeline.ANALYZERS, e.g.
+            'conditional_histogram', 'g2' or 'gated_counter'
+        :param params: keyword arguments of the analyzer class, channels can
+            be given as physical channel indices or virtual channel names
+        """
+
+        analyzer_class = ANALYZERS[analyzer_type]
+        for param in analyzer_class.channel_params:
+            if params.get(param) is not None:
+                params[param] = self._get_channel(params[param])
+
+        self._pipelines[name].add_analyzer(analyzer_name, analyzer_class(**params))
+        self.log.info(f'Added {analyzer_type} analyzer {analyzer_name} to stream pipeline {name}')
+
+    def get_analyzer_result(self, name, analyzer_name):
+        """ Returns the current result of a stream analyzer
+
+        :param name: (str) name of the stream pipeline
+        :param analyzer_name: (str) identifier of the analyzer
+        :return: (np.ndarray) result, e.g. histogram or gate counts
+        """
+
+        return self._pipelines[name].get_result(analyzer_name)
+
+    def get_analyzer_x_axis(self, name, analyzer_name):
+        """ Returns the x axis of a stream analyzer result in ps
+
+        :param name: (str) name of the stream pipeline
+        :param analyzer_name: (str) identifier of the analyzer
+        """
+
+        return self._pipelines[name].get_x_axis(analyzer_name)
+
+    def clear_analyzer(self, name, analyzer_name=None):
+        """ Resets one or all analyzers of a stream pipeline
+
+        :param name: (str) name of the stream pipeline
+        :param analyzer_name: (str, optional) identifier of the analyzer,
+            all analyzers of the pipeline are cleared if None
+        """
+
+        self._pipelines[name].clear(analyzer_name)
+
+    def get_stream_pipeline_status(self, name):
+        """ Returns the state of a stream pipeline
+
+        :param name: (str) name of the stream pipeline
+        :return: (dict) see StreamPipeline.get_status(), e.g. whether it
+            stopped after repeated failures
+        """
+
+        return self._pipelines[name].get_status()
+
+    def stop_stream_pipeline(self, name):
+        """ Stops a stream pipeline and its time tag stream
+
+        :param name: (str) name of the stream pipeline
+        """
+
+        self._pipelines.pop(name).stop()
+        self._ctr[name].stop()
 
     def start(self, name):
         """ Starts a measurement.
@@ -420,6 +669,15 @@ class Wrap:
         new_trigger_val = self._tagger.getTriggerLevel(int(channel))
         self.log.info(f"Changed trigger level of channel {channel} to {new_trigger_val} V.")
 
+    def _set_metadata(self, name, **params):
+        """Stores the configuration of a newly set up measurement
+
+        :param name: (str) identifier for the measurement
+        :param params: parameters of the measurement, e.g. channels
+        """
+
+        self._metadata[name] = dict(version=uuid.uuid4().hex, **params)
+
     @staticmethod
     def handle_name(name):
         if name is None:
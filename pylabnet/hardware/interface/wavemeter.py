@@ -1,4 +1,6 @@
 import abc
+import time
+import numpy as np
 
 
 class WavemeterInterface(abc.ABC):
@@ -7,6 +9,24 @@ class WavemeterInterface(abc.ABC):
     def get_wavelength(self, channel=1, units="Frequency (THz)"):
         pass
 
+    def get_wavelengths(self, channels=(1,), units="Frequency (THz)"):
+        """ Returns the wavelengths of several channels
+
+        :param channels: (iterable) channel numbers
+        :param units: units of the readings, see get_wavelength()
+        :return: (tuple) np.array of readings and np.array of the times
+            (time.time()) at which each channel was read
+        """
+
+        channels = list(channels)
+        values = np.zeros(len(channels))
+        timestamps = np.zeros(len(channels))
+        for index, channel in enumerate(channels):
+            values[index] = self.get_wavelength(channel=channel, units=units)
+            timestamps[index] = time.time()
+
+        return values, timestamps
+
 
 class WavemeterError(Exception):
     pass
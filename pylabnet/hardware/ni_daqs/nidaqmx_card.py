@@ -12,7 +12,13 @@ from pylabnet.hardware.interface.gated_ctr import GatedCtrInterface
 from pylabnet.utils.logging.logger import LogHandler
 from pylabnet.network.core.service_base import ServiceBase
 from pylabnet.network.core.client_base import ClientBase
-from pylabnet.utils.decorators.dummy_wrapper import dummy_wrap
+from pylabnet.hardware.ni_daqs.task_pool import TaskPool, DummyTask
+
+# Errors raised if the device is not available, recent nidaqmx versions raise
+# DaqNotFoundError if the NI-DAQmx runtime is not installed
+DEVICE_ERRORS = (nidaqmx.DaqError, OSError) + tuple(
+    [nidaqmx.errors.DaqNotFoundError] if hasattr(nidaqmx.errors, 'DaqNotFoundError') else []
+)
 
 
 class Driver:
@@ -23,6 +29,7 @@ class Driver:
         """Instantiate NI DAQ mx card
 
         :device_name: (str) Name of NI DAQ mx card, as displayed in the measurement and automation explorer
+        :dummy: (bool) if True, tasks are simulated by DummyTask objects
         """
 
         # Device name
@@ -44,7 +51,7 @@ class Driver:
             )
 
         # If failed, provide info about connected DAQs
-        except (nidaqmx.DaqError, OSError):
+        except DEVICE_ERRORS:
 
             # Log exception message
 
@@ -71,46 +78,64 @@ class Driver:
 
         self.counters = {}
 
-    @dummy_wrap
+        # Open tasks for analog and digital I/O, kept between calls. In dummy
+        # mode, tasks are simulated but go through the same pool.
+        if self.dummy:
+            reservations = {}
+            self._tasks = TaskPool(
+                create_task=lambda: DummyTask(logger=self.log, reservations=reservations),
+                logger=self.log
+            )
+        else:
+            self._tasks = TaskPool(create_task=nidaqmx.Task, logger=self.log)
+
     def set_ao_voltage(self, ao_channel, voltages):
         """Set analog output of NI DAQ mx card to a series of voltages
 
-        :ao_channel: (str) Name of output channel (e.g. 'ao1', 'ao2')
+        The output task is kept open, so repeated calls for the same
+        channel(s) only write the new values.
+
+        :ao_channel: (str) Name of output channel (e.g. 'ao1', 'ao2'), or list of names
         :voltages: (list of int) list of voltages which will be output
         """
 
         # TODO: Understand the timing between output voltages (sample-wise?)
 
-        if isinstance(ao_channel, list) or isinstance(ao_channel, np.ndarray):
-            channel = []
-            for channel_entry in ao_channel:
-                channel.append(self._gen_ch_path(channel_entry))
+        channels = self._gen_ch_paths(ao_channel)
 
-            with nidaqmx.Task() as task:
-                for channel_path in channel:
-                    task.ao_channels.add_ao_voltage_chan(channel_path)
-                task.write(voltages, auto_start=True)
+        def configure(task):
+            for channel_path in channels:
+                task.ao_channels.add_ao_voltage_chan(channel_path)
 
-        else:
-            channel = self._gen_ch_path(ao_channel)
+            # Start once, such that on-demand writes don't restart the task
+            task.start()
 
-            with nidaqmx.Task() as task:
-                task.ao_channels.add_ao_voltage_chan(channel)
-                task.write(voltages, auto_start=True)
+        with self._tasks.lock:
+            task = self._tasks.open(('ao', tuple(channels)), channels, configure)
+            self._run_task(('ao', tuple(channels)), task.write, voltages)
 
     def get_ai_voltage(self, ai_channel, num_samples=1, max_range=10.0):
         """Measures the analog input voltage of NI DAQ mx card
 
+        The input task is kept open, so repeated calls with the same
+        channel and range only read. Reading another channel closes it, since
+        all analog inputs of a device share one timing engine.
+
         :param ao_channel: (str) Name of output channel (e.g. 'ao1', 'ao2')
         :aram num_samplies: (int) Number of samples to take
         :param max_range: (float) Maximum range of voltage that will be measured
         """
         channel = self._gen_ch_path(ai_channel)
-        with nidaqmx.Task() as task:
+        key = ('ai', channel, max_range)
+
+        def configure(task):
             task.ai_channels.add_ai_voltage_chan(channel)
             task.ai_channels[0].ai_rng_high = max_range
-            return task.read(number_of_samples_per_channel=num_samples)
-        return -1
+            task.start()
+
+        with self._tasks.lock:
+            task = self._tasks.open(key, [channel, self._ai_resource()], configure)
+            return self._run_task(key, task.read, number_of_samples_per_channel=num_samples)
 
     def get_di_state(self, port, di_channel):
         """Measures the state of a digital Input of a of NI DAQ mx card
@@ -119,10 +144,82 @@ class Driver:
         :param channel: (str) channel name ['line1']
         """
         channel = self._gen_di_ch_path(port, di_channel)
-        with nidaqmx.Task() as task:
+        key = ('di', channel)
+
+        def configure(task):
             task.di_channels.add_di_chan(channel, line_grouping=nidaqmx.constants.LineGrouping.CHAN_PER_LINE)
-            return task.read(number_of_samples_per_channel=1)
-        return -1
+            task.start()
+
+        with self._tasks.lock:
+            task = self._tasks.open(key, [channel], configure)
+            return self._run_task(key, task.read, number_of_samples_per_channel=1)
+
+    def write_ao_waveform(self, ao_channel, voltages, sample_rate, timeout=10.0):
+        """Outputs a hardware-timed waveform on one or several analog outputs
+
+        Blocks until the waveform has been output. The task is kept open and
+        reused for waveforms with the same channels, rate and length.
+
+        :param ao_channel: (str) Name of output channel (e.g. 'ao1'), or list of names
+        :param voltages: (array) voltages, of shape (n_samples,) or
+            (n_channels, n_samples)
+        :param sample_rate: (float) sample rate in Hz
+        :param timeout: (float) maximum time to wait for the output in s
+        """
+
+        channels = self._gen_ch_paths(ao_channel)
+        voltages = np.asarray(voltages, dtype=float)
+        n_samples = voltages.shape[-1]
+        key = ('ao_timed', tuple(channels), float(sample_rate), n_samples)
+
+        def configure(task):
+            for channel_path in channels:
+                task.ao_channels.add_ao_voltage_chan(channel_path)
+            task.timing.cfg_samp_clk_timing(
+                rate=sample_rate,
+                sample_mode=nidaqmx.constants.AcquisitionType.FINITE,
+                samps_per_chan=n_samples
+            )
+
+        with self._tasks.lock:
+            task = self._tasks.open(key, channels, configure)
+            self._run_task(key, self._output_waveform, task, voltages, timeout)
+
+    def read_ai_waveform(self, ai_channel, num_samples, sample_rate, max_range=10.0, timeout=10.0):
+        """Acquires a hardware-timed record of an analog input
+
+        The task is kept open and reused for records with the same channel,
+        rate, length and range.
+
+        :param ai_channel: (str) Name of input channel (e.g. 'ai0')
+        :param num_samples: (int) Number of samples to acquire
+        :param sample_rate: (float) sample rate in Hz
+        :param max_range: (float) Maximum range of voltage that will be measured
+        :param timeout: (float) maximum time to wait for the samples in s
+
+        :return: (np.array) measured voltages
+        """
+
+        channel = self._gen_ch_path(ai_channel)
+        key = ('ai_timed', channel, float(sample_rate), int(num_samples), max_range)
+
+        def configure(task):
+            task.ai_channels.add_ai_voltage_chan(channel)
+            task.ai_channels[0].ai_rng_high = max_range
+            task.timing.cfg_samp_clk_timing(
+                rate=sample_rate,
+                sample_mode=nidaqmx.constants.AcquisitionType.FINITE,
+                samps_per_chan=int(num_samples)
+            )
+
+        with self._tasks.lock:
+            task = self._tasks.open(key, [channel, self._ai_resource()], configure)
+            return np.asarray(self._run_task(key, self._acquire_record, task, int(num_samples), timeout))
+
+    def close_tasks(self):
+        """ Closes all open analog and digital I/O tasks, releasing their channels """
+
+        self._tasks.close_all()
 
     def create_timed_counter(
         self, counter_channel, physical_channel, duration=0.1, name=None
@@ -192,6 +289,51 @@ class Driver:
 
     # Technical methods
 
+    def _run_task(self, key, function, *args, **kwargs):
+        """ Calls function(*args, **kwargs), closing the task for key on failure
+
+        :param key: (tuple) key of the task in the task pool
+        :param function: (callable) operation on the task
+        :return: return value of function
+        """
+
+        try:
+            return function(*args, **kwargs)
+
+        # Recreate the task on the next call, e.g. after the device was reset
+        except Exception:
+            self._tasks.close(key)
+            raise
+
+    @staticmethod
+    def _output_waveform(task, voltages, timeout):
+        """ Writes, outputs and waits for a finite waveform """
+
+        task.write(voltages, auto_start=False)
+        task.start()
+        task.wait_until_done(timeout=timeout)
+        task.stop()
+
+    @staticmethod
+    def _acquire_record(task, num_samples, timeout):
+        """ Acquires a finite record of samples """
+
+        task.start()
+        data = task.read(number_of_samples_per_channel=num_samples, timeout=timeout)
+        task.stop()
+        return data
+
+    def _gen_ch_paths(self, channel):
+        """ Auxiliary method to build a list of channel path strings.
+
+        :param channel: (str) channel name ['ao1'], or list of names
+        :return: (list) full channel names [['Dev1/ao1']]
+        """
+
+        if isinstance(channel, list) or isinstance(channel, np.ndarray):
+            return [self._gen_ch_path(channel_entry) for channel_entry in channel]
+        return [self._gen_ch_path(channel)]
+
     def _gen_ch_path(self, channel):
         """ Auxiliary method to build channel path string.
 
@@ -204,6 +346,19 @@ class Driver:
             channel=channel
         )
 
+    def _ai_resource(self):
+        """ Name of the analog input timing engine, reserved by every AI task
+
+        Multifunction cards sample all analog inputs with one timing engine
+        and ADC, so only one AI task can run at a time. Listing it as a
+        channel of the AI tasks makes the task pool close the other AI tasks
+        of the device before opening a new one.
+
+        :return: (str) resource name ['Dev1/ai']
+        """
+
+        return f"{self.dev}/ai"
+
     def _gen_di_ch_path(self, port, di_channel):
         """ Auxiliary method to build channel path string for digital inputs.
 
@@ -0,0 +1,225 @@
+""" Pool of configured NI-DAQmx tasks
+
+Creating, configuring and committing a nidaqmx.Task takes milliseconds, which
+dominates short reads and writes such as a single AO update of a lock loop.
+TaskPool keeps tasks open between calls, keyed by their channels and
+configuration (e.g. sample rate and number of samples):
+
+    pool = TaskPool(create_task=nidaqmx.Task)
+    task = pool.open(('ao', ('Dev1/ao0',)), ['Dev1/ao0'], configure)
+
+A physical channel can only be reserved by one task at a time. Opening a
+task whose channels overlap with a pooled task of a different configuration
+therefore closes the old task first, while reopening the same configuration
+reuses the reserved task. Resources shared by several channels, such as the
+analog input timing engine of a multifunction card, can be listed as
+additional channels of each task that uses them.
+
+DummyTask mimics the parts of the nidaqmx.Task API used by the NI DAQmx
+driver, such that the pool can be exercised in dummy mode without hardware.
+"""
+
+import threading
+
+
+class TaskPool:
+    """ Cache of open tasks keyed by channels and configuration """
+
+    def __init__(self, create_task, logger=None):
+        """ Instantiates an empty pool
+
+        :param create_task: (callable) returns a new, unconfigured task
+        :param logger: (LogHandler, optional) used to report task creation
+        """
+
+        self._create_task = create_task
+        self.log = logger
+
+        # {key: (task, set of physical channels)}
+        self._tasks = {}
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._tasks)
+
+    @property
+    def lock(self):
+        """ Lock to hold while using a task of the pool from several threads """
+        return self._lock
+
+    def open(self, key, channels, configure):
+        """ Returns the task for key, creating and configuring it if necessary
+
+        :param key: (hashable) identifier of channels and configuration
+        :param channels: (iterable) physical channels and shared resources
+            used by the task
+        :param configure: (callable) called as configure(task) on a new task
+            to add channels and set up timing
+        :return: configured task
+        """
+
+        with self._lock:
+            if key in self._tasks:
+                return self._tasks[key][0]
+
+            # Release reservations of the channels by other tasks
+            channels = set(channels)
+            for other_key, (_, other_channels) in list(self._tasks.items()):
+                if channels & other_channels:
+                    self.close(other_key)
+
+            task = self._create_task()
+            try:
+                configure(task)
+            except Exception:
+                task.close()
+                raise
+
+            self._tasks[key] = (task, channels)
+            if self.log is not None:
+                self.log.info(f'Opened NI DAQmx task for {sorted(channels)}')
+            return task
+
+    def close(self, key):
+        """ Stops and closes the task for key, if it is open
+
+        :param key: (hashable) identifier used in open()
+        """
+
+        with self._lock:
+            entry = self._tasks.pop(key, None)
+
+        if entry is None:
+            return
+
+        task = entry[0]
+        try:
+            task.stop()
+        except Exception:
+            pass
+        try:
+            task.close()
+        except Exception:
+            if self.log is not None:
+                self.log.warn(f'Failed to close NI DAQmx task for {sorted(entry[1])}')
+
+    def close_all(self):
+        """ Closes all tasks of the pool """
+
+        with self._lock:
+            keys = list(self._tasks)
+        for key in keys:
+            self.close(key)
+
+
+class _DummyChannel:
+    """ Channel of a DummyTask """
+
+    def __init__(self, name):
+        self.name = name
+        self.ai_rng_high = 10.0
+
+
+class _DummyChannelCollection(list):
+    """ Channel collection of a DummyTask, e.g. task.ao_channels """
+
+    def _add(self, physical_channel):
+        channel = _DummyChannel(physical_channel)
+        self.append(channel)
+        return channel
+
+    def add_ao_voltage_chan(self, physical_channel, *args, **kwargs):
+        return self._add(physical_channel)
+
+    def add_ai_voltage_chan(self, physical_channel, *args, **kwargs):
+        return self._add(physical_channel)
+
+    def add_di_chan(self, lines, *args, **kwargs):
+        return self._add(lines)
+
+
+class _DummyTiming:
+    """ Timing of a DummyTask """
+
+    def __init__(self):
+        self.samp_clk_rate = None
+        self.samp_quant_samp_per_chan = None
+
+    def cfg_samp_clk_timing(self, rate, source='', active_edge=None, sample_mode=None, samps_per_chan=1000):
+        self.samp_clk_rate = rate
+        self.samp_quant_samp_per_chan = samps_per_chan
+
+
+class DummyTask:
+    """ Stand-in for nidaqmx.Task without hardware
+
+    Writes are stored in last_write, reads return zeros (False for digital
+    inputs) in the shape nidaqmx would return. Like on a multifunction card,
+    only one task per device can run analog inputs at a time, starting
+    another one raises a RuntimeError.
+    """
+
+    def __init__(self, logger=None, reservations=None):
+        """ Instantiates a task without channels
+
+        :param logger: (LogHandler, optional) used to log the dummy calls
+        :param reservations: (dict, optional) {device: task} of running
+            analog input tasks, shared by the tasks of a driver
+        """
+
+        self.log = logger
+        self.reservations = {} if reservations is None else reservations
+        self.ao_channels = _DummyChannelCollection()
+        self.ai_channels = _DummyChannelCollection()
+        self.di_channels = _DummyChannelCollection()
+        self.timing = _DummyTiming()
+        self.running = False
+        self.closed = False
+        self.last_write = None
+
+    def _log(self, msg):
+        if self.log is not None:
+            self.log.info(f'Dummy NI DAQmx task: {msg}')
+
+    def _ai_devices(self):
+        return {channel.name.split('/')[0] for channel in self.ai_channels}
+
+    def start(self):
+        for device in self._ai_devices():
+            owner = self.reservations.get(device)
+            if owner is not None and owner is not self:
+                raise RuntimeError(f'Analog inputs of {device} are reserved by another task')
+        for device in self._ai_devices():
+            self.reservations[device] = self
+        self.running = True
+
+    def stop(self):
+        self.running = False
+        for device in self._ai_devices():
+            if self.reservations.get(device) is self:
+                del self.reservations[device]
+
+    def close(self):
+        self.stop()
+        self.closed = True
+
+    def wait_until_done(self, timeout=10.0):
+        self.running = False
+
+    def write(self, data, auto_start=False, timeout=10.0):
+        self.last_write = data
+        if auto_start:
+            self.start()
+        self._log(f'write {data}')
+        try:
+            return len(data)
+        except TypeError:
+            return 1
+
+    def read(self, number_of_samples_per_channel=1, timeout=10.0):
+        value = False if len(self.di_channels) > 0 else 0.0
+        n_channels = len(self.ai_channels) + len(self.di_channels)
+        samples = [value] * number_of_samples_per_channel
+        if n_channels > 1:
+            return [list(samples) for _ in range(n_channels)]
+        return samples
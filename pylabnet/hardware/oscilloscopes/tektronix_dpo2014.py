@@ -13,15 +13,22 @@ TRIGGER_SOURCE_LIST = np.append(CHANNEL_LIST, ['EXT', 'EXT5', 'LINE'])
 # Available signal attenuation settings.
 ATTENUATIONS = [1, 10, 20, 50, 100, 200, 500, 1000]
 
+# Waveform preamble fields, see unitize_trace().
+WAVE_PRE_REGEX = re.compile('NR_P (?P<n_points>[0-9\.\+Ee-]+).+PT_F (?P<pf_f>[^"]+).+XUN "(?P<x_unit>[^"]+).+XIN (?P<x_incr>[0-9\\.\\+Ee-]+).+XZE (?P<x_zero>[0-9\\.\\+Ee-]+).+PT_O (?P<pt_off>[0-9\\.\\+Ee-]+).+YUN "(?P<y_unit>[^"]+).+YMU (?P<y_mult>[0-9\\.\\+Ee-]+).+YOF (?P<y_off>[0-9\\.\\+Ee-]+).+YZE (?P<y_zero>[0-9\\.\\+Ee-]+)')
+
+# Datatypes of signed binary curve data by bit resolution, see read_out_trace().
+BINARY_DATATYPES = {1: 'b', 2: 'h'}
+
 
 class Driver():
 
     def reset(self):
         """ Create factory reset"""
         self.device.write('FAC;WAIT')
+        self.clear_cache()
         self.log.info("Reset to factory settings successfull.")
 
-    def __init__(self, gpib_address, logger):
+    def __init__(self, gpib_address, logger, resource_manager=None):
         """Instantiate driver class.
 
         :gpib_address: GPIB-address of the scope, e.g. 'GPIB0::12::INSTR'
@@ -29,12 +36,19 @@ class Driver():
                 rm = pyvisa.ResourceManager()
                 rm.list_resources()
         :logger: And instance of a LogClient.
+        :resource_manager: (optional) pyvisa ResourceManager used to open the
+            scope, e.g. ResourceManager('@sim') for a pyvisa-sim instrument.
+            A default ResourceManager if not given.
         """
 
         # Instantiate log.
         self.log = LogHandler(logger=logger)
 
-        self.rm = ResourceManager()
+        # Data settings and parsed waveform preamble of the last read out.
+        self._data_config = None
+        self._preamble = None
+
+        self.rm = ResourceManager() if resource_manager is None else resource_manager
 
         try:
             self.device = self.rm.open_resource(gpib_address)
@@ -86,6 +100,7 @@ class Driver():
         :scale: Time per division (in s)
         """
         self.device.write(":HORIZONTAL:MAIN:SCALE {:e}".format(scale))
+        self._preamble = None
 
     def extract_params(self, command, value):
         """ Uses regex to extract float values from return values.
@@ -134,27 +149,26 @@ class Driver():
                 f"The channel '{channel}' is not available, available channels are {CHANNEL_LIST}."
             )
 
-    def unitize_trace(self, trace, trace_preamble):
-        """Transform unitless trace to trace with units, constructs time array.
+    def clear_cache(self):
+        """ Forget the cached data settings and waveform preamble.
 
-        :trace: (np.array) Unitless array as provided by oscilloscope.
-        :trace_preamble: (string) Waveform preamble.
-
-        Returns trace, a np.array in correct units, ts, the time
-        array in seconds, and y_unit, the unit of the Y-axis.
+        Settings changed through this driver clear the cache automatically,
+        call this after changing settings by other means, e.g. on the scope.
         """
 
-        # Overcharged regex extracting all relevant paramters.
-        wave_pre_regex = 'NR_P (?P<n_points>[0-9\.\+Ee-]+).+PT_F (?P<pf_f>[^"]+).+XUN "(?P<x_unit>[^"]+).+XIN (?P<x_incr>[0-9\\.\\+Ee-]+).+XZE (?P<x_zero>[0-9\\.\\+Ee-]+).+PT_O (?P<pt_off>[0-9\\.\\+Ee-]+).+YUN "(?P<y_unit>[^"]+).+YMU (?P<y_mult>[0-9\\.\\+Ee-]+).+YOF (?P<y_off>[0-9\\.\\+Ee-]+).+YZE (?P<y_zero>[0-9\\.\\+Ee-]+)'
+        self._data_config = None
+        self._preamble = None
 
-        wave_pre_matches = re.search(wave_pre_regex, trace_preamble)
+    def parse_preamble(self, trace_preamble):
+        """Extract the scaling parameters from a waveform preamble.
 
-        # Adjust trace as shown in the coding manual 2-255.
-        trace = (
-            trace - float(wave_pre_matches['y_off'])
-        ) * \
-            float(wave_pre_matches['y_mult']) + \
-            float(wave_pre_matches['y_zero'])
+        :trace_preamble: (string) Waveform preamble.
+
+        Returns a dictionary of the preamble parameters, the time array 'ts'
+        in seconds, and the units 'x_unit' and 'y_unit'.
+        """
+
+        wave_pre_matches = WAVE_PRE_REGEX.search(trace_preamble)
 
         # Construct timing array as shown in the coding manual 2-250.
         ts = float(wave_pre_matches['x_zero']) + \
@@ -163,25 +177,58 @@ class Driver():
                 int(wave_pre_matches['pt_off'])
         ) * float(wave_pre_matches['x_incr'])
 
-        x_unit = wave_pre_matches['x_unit']
-        y_unit = wave_pre_matches['y_unit']
+        # The time array is shared between traces with the same preamble.
+        ts.flags.writeable = False
+
+        return {
+            'n_points': int(wave_pre_matches['n_points']),
+            'y_off': float(wave_pre_matches['y_off']),
+            'y_mult': float(wave_pre_matches['y_mult']),
+            'y_zero': float(wave_pre_matches['y_zero']),
+            'ts': ts,
+            'x_unit': wave_pre_matches['x_unit'],
+            'y_unit': wave_pre_matches['y_unit']
+        }
+
+    def unitize_trace(self, trace, trace_preamble):
+        """Transform unitless trace to trace with units, constructs time array.
+
+        :trace: (np.array) Unitless array as provided by oscilloscope.
+        :trace_preamble: (string or dict) Waveform preamble, or its parameters
+            as returned by parse_preamble().
+
+        Returns trace, a np.array in correct units, ts, the time
+        array in seconds, and y_unit, the unit of the Y-axis.
+        """
+
+        if isinstance(trace_preamble, str):
+            trace_preamble = self.parse_preamble(trace_preamble)
+
+        # Adjust trace as shown in the coding manual 2-255.
+        trace = (
+            trace - trace_preamble['y_off']
+        ) * trace_preamble['y_mult'] + trace_preamble['y_zero']
 
         # Construct trace dictionary.
         trace_dict = {
             'trace': trace,
-            'ts': ts,
-            'x_unit': x_unit,
-            'y_unit': y_unit
+            'ts': trace_preamble['ts'],
+            'x_unit': trace_preamble['x_unit'],
+            'y_unit': trace_preamble['y_unit']
         }
 
         return trace_dict
 
-    def read_out_trace(self, channel, curve_res=1):
+    def read_out_trace(self, channel, curve_res=1, binary=True, refresh_preamble=False):
         """ Read out trace
 
         :channel: Channel to read out (must be in CHANNEL_LIST).
         :curve_res: Bit resolution for returned data. If 1, value range is from -127 to 127,
             if 2, the value range is from -32768 to 32768.
+        :binary: If True, transfer the curve as a binary block (RIBinary),
+            otherwise as comma separated ASCII values.
+        :refresh_preamble: If True, query the waveform preamble even if a
+            cached one is available (see clear_cache()).
 
         Returns np.array of sample points (in unit of Voltage divisions) and
         corresponding array of times (in seconds).
@@ -198,29 +245,47 @@ class Driver():
         if curve_res not in [1, 2]:
             self.log.error("The bit resolution of the curve data must be either 1 or 2.")
 
-        # Set curve data to desired bit.
-        self.device.write(f'DATa:WIDth {curve_res}')
+        # Only send data settings that changed since the last read out,
+        # the preamble depends on them.
+        data_config = (channel, curve_res, binary)
+        if data_config != self._data_config:
+
+            # Set curve data to desired bit.
+            self.device.write(f'DATa:WIDth {curve_res}')
 
-        # Set trace we want to look at.
-        self.device.write(f'DATa:SOUrce {channel}')
+            # Set trace we want to look at.
+            self.device.write(f'DATa:SOUrce {channel}')
 
-        # Set encoding.
-        self.device.write('data:encdg ascii')
+            # Set encoding, signed integers with the most significant byte first.
+            self.device.write('DATa:ENCdg RIBinary' if binary else 'data:encdg ascii')
+
+            self._data_config = data_config
+            self._preamble = None
 
         # Read out trace.
-        res = self.device.query('curve?')
+        if binary:
+            trace = self.device.query_binary_values(
+                'CURVe?',
+                datatype=BINARY_DATATYPES[curve_res],
+                is_big_endian=True,
+                container=np.array
+            )
+        else:
+            res = self.device.query('curve?')
 
-        # Tidy up curve.
-        raw_curve = res.replace(':CURV', '').replace(' ', '').replace('\n', '')
+            # Tidy up curve.
+            raw_curve = res.replace(':CURV', '').replace(' ', '').replace('\n', '')
 
-        # Transform in numpy array.
-        trace = np.fromstring(raw_curve, dtype=int, sep=',')
+            # Transform in numpy array.
+            trace = np.fromstring(raw_curve, dtype=int, sep=',')
 
-        # Read wave preamble.
-        wave_pre = self.device.query('WFMPre?')
+        # Read wave preamble, unless the settings did not change. A changed
+        # record length (e.g. on the scope) is detected by the trace length.
+        if refresh_preamble or self._preamble is None or len(trace) != self._preamble['n_points']:
+            self._preamble = self.parse_preamble(self.device.query('WFMPre?'))
 
         # Transform units of trace.
-        trace_dict = self.unitize_trace(trace, wave_pre)
+        trace_dict = self.unitize_trace(trace, self._preamble)
 
         return trace_dict
 
@@ -282,6 +347,7 @@ class Driver():
 
         # Set attenuation.
         self.device.write(f'{channel}:PRO:GAIN {attenuation}')
+        self._preamble = None
 
     def get_channel_scale(self, channel):
         """ Return vertical scale of channel.
@@ -314,6 +380,7 @@ class Driver():
 
         # Set scale.
         self.device.write(f'{channel}:SCAle {range}')
+        self._preamble = None
 
     def get_channel_pos(self, channel):
         """Get vertical position of channel trace.
@@ -343,6 +410,7 @@ class Driver():
         self._check_channel(channel)
 
         self.device.write(f'{channel}:POS {pos}')
+        self._preamble = None
 
     def get_horizontal_position(self):
         """Get the horizontal position of the traces.
@@ -369,6 +437,7 @@ class Driver():
 
         command = ":HOR:MAI:POS"
         self.device.write(f"{command} {hor_pos}")
+        self._preamble = None
 
     def trig_level_to_fifty(self):
         """Set main trigger level to 50%"""
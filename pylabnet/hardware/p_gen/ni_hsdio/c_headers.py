@@ -213,6 +213,7 @@ def build_c_func_prototypes(ni_hsdio_dll_instance):
     ni_hsdio_dll_instance.niHSDIO_GetAttributeViReal64.restype = NITypes.ViStatus
     ni_hsdio_dll_instance.niHSDIO_GetAttributeViString.restype = NITypes.ViStatus
 
+    ni_hsdio_dll_instance.niHSDIO_AllocateNamedWaveform.restype = NITypes.ViStatus
     ni_hsdio_dll_instance.niHSDIO_WriteNamedWaveformU32.restype = NITypes.ViStatus
     ni_hsdio_dll_instance.niHSDIO_DeleteNamedWaveform.restype = NITypes.ViStatus
 
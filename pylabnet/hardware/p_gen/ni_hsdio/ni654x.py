@@ -4,7 +4,8 @@ from pylabnet.hardware.p_gen.ni_hsdio.c_headers import NITypes, NIConst, build_c
 from pylabnet.hardware.interface.p_gen import PGenError
 from pylabnet.network.core.service_base import ServiceBase
 from pylabnet.network.core.client_base import ClientBase
-from pylabnet.utils.pulseblock.pb_sample import pb_sample
+from pylabnet.utils.pulseblock.pb_sample import get_n_pts, pb_digital_word_chunks
+from pylabnet.utils.pulseblock.pulse_block import Channel
 from pylabnet.utils.logging.logger import LogHandler
 import numpy as np
 import copy
@@ -299,7 +300,19 @@ class Driver:
     # Waveform Generation
     # ================================================================
 
-    def write_wfm(self, pb_obj, len_adj=True):
+    def write_wfm(self, pb_obj, len_adj=True, chunk_size=2**20):
+        """ Samples PulseBlock and loads the waveform into the card memory
+
+        The uint32 sample words are rendered directly from the pulse edges
+        and streamed to the card in chunks of chunk_size samples, so memory
+        use does not grow with the waveform length.
+
+        :param pb_obj: (PulseBlock) pulse block with digital pulses only
+        :param len_adj: (bool) if True, pad waveform with default values to
+            meet hardware length constraints (see pb_sample())
+        :param chunk_size: (int) number of samples rendered and written per
+            DLL call
+        """
 
         #
         # Sanity checks
@@ -311,23 +324,21 @@ class Driver:
         if hrdw_data_width != 32:
             msg_txt = 'write_wfm(): the card you use has data_width = {0} bits. \n' \
                       'The method was written assuming 32-bit width and have to be modified for your card. \n' \
-                      'Rewrite bit_ar construction part and use niHSDIO_WriteNamedWaveformU{1}() DLL function' \
+                      'Rewrite word construction part and use niHSDIO_WriteNamedWaveformU{1}() DLL function' \
                       ''.format(hrdw_data_width, hrdw_data_width)
 
             self.log.error(msg_txt)
             raise PGenError(msg_txt)
 
         #
-        # Sample PulseBlock
+        # Determine waveform length
         #
 
         # Map user-friendly names onto physical channel numbers
-        pb_obj = copy.deepcopy(pb_obj)
-        pb_obj.ch_map(map_dict=self.map_dict)
+        bit_dict = self._get_bit_dict(pb_obj)
 
-        # Sample pulse block
         samp_rate = self.get_samp_rate()
-        samp_dict, n_pts, add_pts = pb_sample(
+        n_pts, add_pts = get_n_pts(
             pb_obj=pb_obj,
             samp_rate=samp_rate,
             len_min=self.constraints['wfm_len']['min'],
@@ -336,39 +347,15 @@ class Driver:
             len_adj=len_adj
         )
         wfm_name = pb_obj.name
-        del pb_obj
 
         self.log.info(
-            'write_wfm(): sampled PulseBlock "{}". \n'
+            'write_wfm(): sampling PulseBlock "{}". \n'
             'Sample array has {} points. {} samples were added to match hardware wfm len step'
             ''.format(wfm_name, n_pts, add_pts)
         )
 
         #
-        # Pack samp_dict into bit_ar
-        #
-
-        # Create a blank bit_ar - all elements zero (all channels off)
-        bit_ar = np.zeros(shape=n_pts, dtype=np.uint32)
-
-        # Iterate through each channel and set corresponding bit to '1'
-        # if value is True
-        for ch_num in samp_dict.keys():
-
-            # This number in uint32 representation has all zeros and
-            # exactly one '1' at the ch_num-th bit from the LSB
-            ch_bit_one = 2**ch_num
-
-            for idx, val in enumerate(samp_dict[ch_num]):
-                if val:
-                    bit_ar[idx] += ch_bit_one
-
-            # TODO: consider making very fast with numpy:
-            # ch_bit_ar = samp_dict[ch_num].astype(int) * 2**ch_num
-            # bit_ar = np.add(bit_ar, ch_bit_ar)
-
-        #
-        # Load bit_ar to memory
+        # Stream sample words to memory
         #
 
         # Delete waveform with the same name,
@@ -376,25 +363,63 @@ class Driver:
         if wfm_name in self.writn_wfm_set:
             self.del_wfm(wfm_name=wfm_name)
 
-        # Create C-pointer to bit_ar using numpy.ndarray.ctypes attribute
-        bit_ar_ptr = bit_ar.ctypes.data_as(
-            ctypes.POINTER(NITypes.ViUInt32)
-        )
-
-        # Call DLL function
+        # Allocate full waveform, such that subsequent writes are appended
         self._er_chk(
-            self.dll.niHSDIO_WriteNamedWaveformU32(
+            self.dll.niHSDIO_AllocateNamedWaveform(
                 self._handle,                                     # ViSession vi
                 NITypes.ViConstString(wfm_name.encode('ascii')),  # ViConstString waveformName
-                NITypes.ViInt32(n_pts),                           # ViInt32 samplesToWrite
-                bit_ar_ptr                                        # ViUInt32 data[]
+                NITypes.ViInt32(n_pts)                            # ViInt32 sizeInSamples
             )
         )
-
         self.writn_wfm_set.add(wfm_name)
 
+        for word_ar in pb_digital_word_chunks(pb_obj, samp_rate, bit_dict, n_pts, chunk_size=chunk_size):
+
+            # Create C-pointer to word_ar using numpy.ndarray.ctypes attribute
+            word_ar_ptr = word_ar.ctypes.data_as(
+                ctypes.POINTER(NITypes.ViUInt32)
+            )
+
+            # Call DLL function
+            self._er_chk(
+                self.dll.niHSDIO_WriteNamedWaveformU32(
+                    self._handle,                                     # ViSession vi
+                    NITypes.ViConstString(wfm_name.encode('ascii')),  # ViConstString waveformName
+                    NITypes.ViInt32(len(word_ar)),                    # ViInt32 samplesToWrite
+                    word_ar_ptr                                       # ViUInt32 data[]
+                )
+            )
+
         return 0
 
+    def _get_bit_dict(self, pb_obj):
+        """ Looks up the physical channel (bit) of each digital channel in self.map_dict
+
+        :param pb_obj: (PulseBlock) pulse block to be written
+        :return: (dict) {'ch_name': bit index}
+        """
+
+        bit_dict = dict()
+        for ch in pb_obj.dflt_dict.keys():
+            if ch.is_analog:
+                continue
+
+            # map_dict may be keyed by Channel objects or by channel names
+            if ch in self.map_dict:
+                phys_ch = self.map_dict[ch]
+            elif ch.name in self.map_dict:
+                phys_ch = self.map_dict[ch.name]
+            else:
+                raise ValueError(
+                    'write_wfm(): map_dict does not include channel {} \n'
+                    '   map_dict.keys()={}'
+                    ''.format(ch.name, list(self.map_dict.keys()))
+                )
+
+            bit_dict[ch.name] = int(phys_ch.name if isinstance(phys_ch, Channel) else phys_ch)
+
+        return bit_dict
+
     def del_wfm(self, wfm_name):
         self._er_chk(
             self.dll.niHSDIO_DeleteNamedWaveform(
@@ -11,9 +11,10 @@ class Driver():
     def reset(self):
         """ Create factory reset"""
         self.device.write('*RST')
+        self.clear_cache()
         self.log.info("Reset to factory settings successfull.")
 
-    def __init__(self, gpib_address, logger):
+    def __init__(self, gpib_address, logger, resource_manager=None):
         """Instantiate driver class
 
         :gpib_address: GPIB-address of spectrum analyzer, e.g. 'GPIB0::12::INSTR'
@@ -21,12 +22,19 @@ class Driver():
                 rm = pyvisa.ResourceManager()
                 rm.list_resources()
         :logger: And instance of a LogClient
+        :resource_manager: (optional) pyvisa ResourceManager used to open the
+            spectrum analyzer, e.g. ResourceManager('@sim') for a pyvisa-sim
+            instrument. A default ResourceManager if not given.
         """
 
         # Instantiate log
         self.log = LogHandler(logger=logger)
 
-        self.rm = ResourceManager()
+        # Trace data format (binary or not) and frequency axis of the last trace
+        self._trace_format = None
+        self._frequencies = None
+
+        self.rm = ResourceManager() if resource_manager is None else resource_manager
 
         try:
             self.device = self.rm.open_resource(gpib_address)
@@ -79,6 +87,7 @@ class Driver():
             )
 
         self.device.write(f':SENSe:FREQuency:CENTer {center_frequency}')
+        self._frequencies = None
         self.log.info(f'Center frequency set to {center_frequency} Hz')
 
     def set_frequency_span(self, frequency_span):
@@ -92,6 +101,7 @@ class Driver():
             )
 
         self.device.write(f':SENSe:FREQuency:SPAN {frequency_span}')
+        self._frequencies = None
         self.log.info(f'Frequency span set {frequency_span} Hz')
 
     def toggle_cont(self, target_state):
@@ -101,6 +111,16 @@ class Driver():
         """
         self.device.write(f'INIT:CONT {target_state}')
 
+    def clear_cache(self):
+        """ Forget the cached trace data format and frequency axis
+
+        Settings changed through this driver clear the cache automatically,
+        call this after changing settings by other means, e.g. on the device.
+        """
+
+        self._trace_format = None
+        self._frequencies = None
+
     def get_frequency_array(self):
         """Constructs array of frequencies associated with trace points"""
 
@@ -118,9 +138,12 @@ class Driver():
 
         return frequencies
 
-    def read_trace(self):
+    def read_trace(self, binary=True):
         """ Read and return trace
 
+        :binary: If True, transfer the trace as a binary block of 32 bit
+            floats, otherwise as comma separated ASCII values.
+
         Retruns array trace contaning frequencies (in Hz) of data points in
         trace[:,0] and power levels (in dBm) in trace[:,1]
         """
@@ -131,23 +154,43 @@ class Driver():
         # Trigger a sweep and wait for sweep to complete.
         self.device.write('INIT:IMM;*WAI')
 
-        # Specify units in dBm.
-        self.device.write('UNIT:POW DBM')
+        # Only send the data format if it changed since the last trace.
+        if self._trace_format != binary:
+
+            # Specify units in dBm.
+            self.device.write('UNIT:POW DBM')
 
-        # Specify data format as ASCII.
-        self.device.write('FORM:DATA ASC')
+            # Specify data format as big endian 32 bit floats or ASCII.
+            if binary:
+                self.device.write('FORM:BORD NORM')
+                self.device.write('FORM:DATA REAL,32')
+            else:
+                self.device.write('FORM:DATA ASC')
+
+            self._trace_format = binary
 
         # Trigger a sweep and wait for sweep to complete.
         self.device.write('INIT:IMM;*WAI')
 
         # Query trace data
-        dbm_measurement = self.device.query_ascii_values('TRAC:DATA? TRACE1')
+        if binary:
+            dbm_measurement = self.device.query_binary_values(
+                'TRAC:DATA? TRACE1',
+                datatype='f',
+                is_big_endian=True,
+                container=np.array
+            )
+        else:
+            dbm_measurement = self.device.query_ascii_values('TRAC:DATA? TRACE1')
 
         # Return to continuos monitoring mode
         self.toggle_cont(1)
 
-        # Read frequency axis
-        frequencies = self.get_frequency_array()
+        # Read frequency axis, unless the settings did not change. A changed
+        # number of sweep points (e.g. on the device) is detected by the trace length.
+        if self._frequencies is None or len(self._frequencies) != len(dbm_measurement):
+            self._frequencies = self.get_frequency_array()
+        frequencies = self._frequencies
 
         # Combine trace data
         trace = np.stack((frequencies, dbm_measurement), axis=-1)
@@ -1,4 +1,6 @@
 import ctypes
+import time
+import numpy as np
 
 from pylabnet.hardware.interface.wavemeter import WavemeterInterface, WavemeterError
 from pylabnet.utils.logging.logger import LogHandler
@@ -64,3 +66,26 @@ class Driver(WavemeterInterface):
 
         else:
             return self._wavemeterdll.GetFrequencyNum(channel, 0)
+
+    def get_wavelengths(self, channels=(1,), units='Frequency (THz)'):
+        """ Returns the wavelengths of several channels in one call
+
+        :param channels: (iterable) channel numbers from 1-8
+        :param units: "Frequency (THz)" or "Wavelength (nm)". Defaults to frequency.
+        :return: (tuple) np.array of readings and np.array of the times
+            (time.time()) at which each channel was read
+        """
+
+        if units == 'Wavelength (nm)':
+            read = self._wavemeterdll.GetWavelengthNum
+        else:
+            read = self._wavemeterdll.GetFrequencyNum
+
+        channels = list(channels)
+        values = np.zeros(len(channels))
+        timestamps = np.zeros(len(channels))
+        for index, channel in enumerate(channels):
+            values[index] = read(channel, 0)
+            timestamps[index] = time.time()
+
+        return values, timestamps
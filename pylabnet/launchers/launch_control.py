@@ -6,13 +6,12 @@ import time
 from contextlib import closing
 import copy
 import ctypes
-import re
 import traceback
 
 from pylabnet.utils.logging.logger import LogService
 from PyQt5 import QtWidgets, QtGui, QtCore
 from datetime import datetime
-from queue import Queue
+from queue import Queue, Empty
 import numpy as np
 
 from pylabnet.utils.logging.logger import LogService
@@ -179,7 +178,6 @@ class Controller:
         self.logfile_date_str = None
         self.filenamepath = None
         self.MAX_LOG_FILE_SIZE = 50000000 # 50MB
-        self.last_seen_buffer = ""
 
         # setting selection mode for server list to multi-select
         self.main_window.client_list.setSelectionMode(QtWidgets.QAbstractItemView.ExtendedSelection)
@@ -273,13 +271,6 @@ class Controller:
             # Now update GUI to mirror clients
             self._copy_master()
 
-            # Get the latest update index
-            buffer = self.gui_client.get_text('buffer')
-            try:
-                self.update_index = int(re.findall(r'\d+', re.findall(r'!~\d+~!', buffer)[-1])[0])
-            except IndexError:
-                self.update_index = 0
-
             self.gui_service = Service()
             self.gui_service.assign_module(module=self.main_window)
             self.gui_service.assign_logger(logger=self.gui_logger)
@@ -451,14 +442,12 @@ class Controller:
         self.main_window.force_update()
 
     def update_proxy(self, new_msg):
-        """ Updates the proxy with new content using the buffer terminal continuously"""
+        """ Updates the proxy with log records pushed by the master log server"""
 
-        # Remove the !~ bookmark from the message
-        new_msg_cleaned = re.sub(r'!~\d+~!', '', new_msg)
         # Append the new message to the message terminal after message filtering
-        self.main_window.terminal.appendPlainText(self._filter_string_list(new_msg_cleaned.split("\n")))
+        self.main_window.terminal.appendPlainText(self._filter_string_list(new_msg.split("\n")))
         # Append to full logs
-        self.full_logs = self.full_logs + new_msg_cleaned.split("\n")
+        self.full_logs = self.full_logs + new_msg.split("\n")
 
         if not self.autoscroll_off:
             try:
@@ -466,13 +455,6 @@ class Controller:
             except TypeError:
                 pass
 
-        # New update index is the last !~ index found in the message
-        indices_found = re.findall(r'!~\d+~!', new_msg)
-        if len(indices_found) != 0:
-            self.update_index = int(re.findall(r'\d+', indices_found[-1])[0])
-        else:
-            self.update_index = None
-
     def kill_servers(self):
         """ Kills all servers connected to the logger, including the Log GUI and Log Server"""
 
@@ -1088,97 +1070,112 @@ class UpdateReceiver(QtCore.QObject):
 
 
 class ProxyUpdater(QtCore.QObject):
-    """ Process to run in separate thread to synchronize proxy GUI """
+    """ Process to run in separate thread to synchronize proxy GUI
+
+    Log records are pushed by the master log server through a subscription.
+    After a lost or replaced connection, the updater resubscribes from the
+    last received sequence number, so missed records are replayed. If the
+    master was restarted in the meantime, its journal is replayed from the
+    start. Only log records are mirrored, not the master's stdout.
+    """
 
     update_signal = QtCore.pyqtSignal(str)
 
+    # Time between updates of the client list [s]
+    PULL_INTERVAL = 0.5
+
     def __init__(self, controller, *args, **kwargs):
         QtCore.QObject.__init__(self, *args, **kwargs)
         self.controller = controller
+        self.records = Queue()
+        self.last_seq = None
 
-    @QtCore.pyqtSlot()
-    def run(self):
-        while True:
-            time.sleep(0.001)
+        # Journal epoch of the master log server, and number of the current
+        # subscription, used to discard records of previous subscriptions
+        self.epoch = None
+        self.generation = 0
 
-            # Check clients and update
-            self.controller._pull_connections()
+    def _subscribe(self):
+        """ Subscribes to the master log server, reconnecting if needed
 
-            # Get buffer terminal
-            buffer_terminal = self.controller.gui_client.get_text('buffer')
+        :return: (bool) whether the subscription succeeded
+        """
 
-            # Get the list of all bookmarks that exist in the buffer
-            bookmark_list = re.findall(r'!~\d+~!', buffer_terminal)
+        log_client = self.controller.gui_logger
+        self.generation += 1
+        generation = self.generation
 
-            # Find the first bookmark in the buffer
-            if len(bookmark_list) > 0:
-                first_index = int(re.findall(r'\d+', bookmark_list[0])[0])
+        def put(records):
+            self.records.put((generation, records))
 
-            # If the buffer has no bookmarks, it means the entire buffer is
-            # filled with an extremely long message.
-            else:
-                first_index = None
+        try:
+            if not log_client.is_connected():
+                log_client.connect()
+            from_seq = None if self.last_seq is None else self.last_seq + 1
+            _, epoch = log_client.subscribe(put, from_seq=from_seq, epoch=self.epoch)
+        except Exception:
+            return False
+
+        # Sequence numbers of a restarted master start again at 0
+        if self.epoch is not None and epoch != self.epoch:
+            self.last_seq = None
+            self.update_signal.emit("\n ----------\nMASTER LOG SERVER WAS RESTARTED\n---------- \n")
+        self.epoch = epoch
+
+        return True
+
+    def _get_new_msg(self, timeout):
+        """ Waits for pushed records and joins them into a single message
+
+        :param timeout: (float) maximum time to wait for records [s]
+        :return: (str) new message, empty if there were no new records
+        """
 
-            ####
+        lines = []
+        try:
+            batches = [self.records.get(timeout=timeout)]
+            while not self.records.empty():
+                batches.append(self.records.get_nowait())
+        except Empty:
+            return ''
 
-            # If this new buffer has no indices, it could be:
-            # (1) the buffer has not changed from before, if so do nothing.
-            # (2) the buffer has changed, but since there are no bookmarks for
-            # reference, we have no choice but to dump the entire buffer.
-            if first_index is None:
+        for generation, batch in batches:
 
-                # No change from before. Need to do this to check for no change
-                # since no bookmarks are present for reference.
-                if buffer_terminal == self.controller.last_seen_buffer:
-                    new_msg = ""
+            # Records of a previous subscription are replayed by the current one
+            if generation != self.generation:
+                continue
 
-                # The buffer changed, we dump the entire buffer.
-                else:
-                    new_msg = buffer_terminal
-                    new_msg += "\n\n ----------\nDumping entire buffer as no index was found in current buffer.\n"
-                    new_msg += "MESSAGES MAY HAVE BEEN OMITTED DUE TO EXCESSIVE LOGS\n---------- \n\n"
+            for seq, text in batch:
 
-            # There exists an index in the current buffer.
-            else:
+                # Records skipped by the master journal cannot be replayed
+                if self.last_seq is not None and seq > self.last_seq + 1:
+                    lines.append("\n ----------\nMESSAGES MAY HAVE BEEN OMITTED DUE TO EXCESSIVE LOGS\n---------- \n")
+                if self.last_seq is None or seq > self.last_seq:
+                    lines.append(text)
+                    self.last_seq = seq
 
-                # Parse buffer terminal to get part of the message that is new.
-                # This is indicated by the bookmark with the update index incremented by 1.
-                if self.controller.update_index is not None:
-
-                    # Exclude last character as it some sort of whitespace
-                    new_msg = buffer_terminal[buffer_terminal.rfind(f'!~{self.controller.update_index+1}~!'):-1]
-
-                    # If no new messages, it means either
-                    # (1) there is just nothing to update (i.e. update_index+1 doesn't exist)
-                    # (2) there has been too many logs and the bookmark we are looking for has already been
-                    #     ejected out of the buffer
-                    if new_msg == "":
-                        # If the buffer is ahead of our expected next-index,
-                        # we dump the entire buffer as our new message.
-                        if first_index > (self.controller.update_index + 1):
-
-                            new_msg = buffer_terminal
-                            new_msg += "\n\n ----------\nDumping entire buffer as index found in current buffer exceeded our last update's index.\n"
-                            new_msg += "MESSAGES MAY HAVE BEEN OMITTED DUE TO EXCESSIVE LOGS\n---------- \n\n"
-
-                        # If the index present is <= our update index,
-                        # it means that there is no new message to update.
-                        else:
-                            pass
-
-                # update_index being None means the previous buffer did not contain any
-                # indices so we have no idea what the latest index is, so we just
-                # output everything that appears after the first index (which we know exists).
-                else:
-                    new_msg = buffer_terminal[buffer_terminal.rfind(f'!~{first_index}~!'):-1]
-                    new_msg += "\n\n ----------\nPrevious buffer did not contain an index, contiuing from next received index.\n"
-                    new_msg += "MESSAGES MAY HAVE BEEN OMITTED DUE TO EXCESSIVE LOGS\n---------- \n\n"
+        return '\n'.join(lines)
 
-            # If we have a new message to add, add it
+    @QtCore.pyqtSlot()
+    def run(self):
+        last_pull = 0
+
+        while True:
+            # (Re)subscribe after start-up or a lost connection. The GUI
+            # thread's logger can also replace the connection by reconnecting.
+            if not self.controller.gui_logger.is_subscribed():
+                if not self._subscribe():
+                    time.sleep(1)
+                    continue
+
+            new_msg = self._get_new_msg(timeout=self.PULL_INTERVAL)
             if new_msg != '':
                 self.update_signal.emit(new_msg)
 
-            self.controller.last_seen_buffer = buffer_terminal
+            # Check clients and update
+            if time.monotonic() - last_pull > self.PULL_INTERVAL:
+                self.controller._pull_connections()
+                last_pull = time.monotonic()
 
 
 def main():
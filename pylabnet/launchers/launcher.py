@@ -44,14 +44,20 @@ import traceback
 import re
 import os
 import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 from pylabnet.utils.logging import logger
 from pylabnet.utils.helper_methods import get_ip, parse_args, hide_console, create_server, load_config, load_script_config, load_device_config, launch_device_server
 from pylabnet.network.client_server import external_gui
 from pylabnet.network.core.service_base import ServiceBase
 from pylabnet.network.core.generic_server import GenericServer
+from pylabnet.network.core.connection_pool import get_client_pool
 from pylabnet.gui.pyqt.external_gui import ParameterPopup, fresh_popup, warning_popup
 
 
+# Client classes by server module name, shared by all launchers in this process
+_client_classes = {}
+
+
 class Launcher:
 
     def __init__(self):
@@ -201,11 +207,22 @@ class Launcher:
         :param port: (int) port number of server
         """
         server = module
+        client_class = self._get_client_class(module)
+        self.clients[(server, device_id)] = get_client_pool().get_client(client_class, host, port)
+
+    @staticmethod
+    def _get_client_class(module):
+        """ Returns the Client class of a server module, importing it only once per process
+
+        :param module: (str) name of the hardware/server module (e.g. nidaqmx)
+        """
+
+        if module in _client_classes:
+            return _client_classes[module]
+
         try:
             full_module_name = 'pylabnet.network.client_server.' + module
             client_class = getattr(importlib.import_module(full_module_name), "Client")
-
-            self.clients[(server, device_id)] = client_class(host=host, port=port)
         except:
             spec = importlib.util.spec_from_file_location(
                 module,
@@ -217,10 +234,47 @@ class Launcher:
             )
             mod = importlib.util.module_from_spec(spec)
             spec.loader.exec_module(mod)
-            self.clients[(server, device_id)] = mod.Client(host=host, port=port)
+            client_class = mod.Client
+
+        _client_classes[module] = client_class
+        return client_class
+
+    def _connect_to_new_server(self, module, host, port, device_id, num_tries):
+        """ Connects to a freshly launched server, retrying while it starts up
+
+        Waits between attempts grow exponentially from 10 ms to 0.5 s, so
+        servers that come up quickly are connected to without delay.
+
+        :param module: (str) name of the hardware/server module (e.g. nidaqmx)
+        :param host: (str) IP address of host
+        :param port: (int) port number of host
+        :param device_id: (str) device_id of server
+        :param num_tries: (int) maximum number of connection attempts
+
+        :return: (bool) whether the connection succeeded
+        """
+
+        wait = 0.01
+        for _ in range(num_tries):
+            try:
+                self._connect_to_server(module, host, port, device_id)
+                return True
+            except ConnectionRefusedError:
+                time.sleep(wait)
+                wait = min(2 * wait, 0.5)
+        self.logger.error(f'Failed to connect to {module}')
+        return False
 
     def _launch_servers(self):
-        """ Searches through active servers and connects/launches them """
+        """ Searches through active servers and connects/launches them
+
+        Running servers are connected to directly. Missing servers are all
+        launched at once and connected to in parallel as they become ready,
+        followed by a timing report of both phases.
+        """
+
+        start_time = time.monotonic()
+        pending_launches = []
 
         for server in self.config_dict['servers']:
             module_name = server['type']
@@ -261,7 +315,71 @@ class Launcher:
                 optional_clients = False
                 self.logger.info('Optional Clients disabled')
 
-            self._connect_matched_servers(matches, module_name, server['config'], server_config, auto_connect, optional_clients)
+            pending_launches += self._connect_matched_servers(
+                matches, module_name, server['config'], server_config, auto_connect, optional_clients
+            )
+
+        connect_time = time.monotonic() - start_time
+        launch_timings = self._launch_pending_servers(pending_launches)
+        self._report_timings(connect_time, launch_timings, time.monotonic() - start_time)
+
+    def _launch_pending_servers(self, pending_launches):
+        """ Launches device servers concurrently and connects to them once ready
+
+        :param pending_launches: (list) of (module, config_name, device_id)
+            tuples of servers to launch
+
+        :return: (list) of (module, config_name, launch_time, ready_time,
+            connected) tuples, times in s
+        """
+
+        if len(pending_launches) == 0:
+            return []
+
+        #specify the number of times we want to try to connect to a server
+        num_tries = self.config_dict.get('num_connect_tries', 10)
+
+        def launch_and_connect(module, config_name, device_id):
+            start_time = time.monotonic()
+            address = launch_device_server(
+                server=module,
+                dev_config=config_name,
+                log_ip=self.log_ip,
+                log_port=self.log_port,
+                server_port=np.random.randint(1024, 49151),
+                debug=self.server_debug,
+                logger=self.logger
+            )
+            launch_time = time.monotonic() - start_time
+
+            # launch_device_server returns None for disabled devices
+            if address is None:
+                return module, config_name, launch_time, 0, False
+
+            host, port = address
+            connected = self._connect_to_new_server(module, host, port, device_id, num_tries)
+            return module, config_name, launch_time, time.monotonic() - start_time - launch_time, connected
+
+        with ThreadPoolExecutor(max_workers=len(pending_launches)) as executor:
+            futures = [executor.submit(launch_and_connect, *launch) for launch in pending_launches]
+            return [future.result() for future in futures]
+
+    def _report_timings(self, connect_time, launch_timings, total_time):
+        """ Logs the time spent in each phase of server startup
+
+        :param connect_time: (float) time spent matching and connecting to
+            running servers in s
+        :param launch_timings: (list) output of _launch_pending_servers()
+        :param total_time: (float) total server startup time in s
+        """
+
+        msg_str = (f'Server startup took {total_time:.3f} s\n'
+                   f'Connecting to running servers: {connect_time:.3f} s\n')
+        for module, config_name, launch_time, ready_time, connected in launch_timings:
+            status = '' if connected else ' (failed)'
+            msg_str += (f'{module} ({config_name}): launch {launch_time:.3f} s, '
+                        f'ready after {ready_time:.3f} s{status}\n')
+        self.logger.info(msg_str)
 
     def _connect_matched_servers(self, matches, module, config_name, config, auto_connect, optional_clients):
         """ Connects to a list of servers that have been matched to a given device
@@ -273,6 +391,9 @@ class Launcher:
         :param config: (dict) actual config dict for the server
         :param auto_connect: (bool) whether or not to automatically connect to the device/server
         :param optional_clients: (bool) whether the current script should still run if it cannot connect to a desired client server
+
+        :return: (list) of (module, config_name, device_id) tuples of servers
+            that still need to be launched
         """
 
         device_id = config['device_id']
@@ -285,12 +406,6 @@ class Launcher:
         else:
             launch_stop = False
 
-        #specify the number of times we want to try to connect to a server
-        if 'num_connect_tries' in self.config_dict:
-            NUM_TRIES = self.config_dict['num_connect_tries']
-        else:
-            NUM_TRIES = 10
-
         # If there are no matches, launch and connect to the server manually
         if num_matches == 0:
             if launch_stop:
@@ -301,26 +416,7 @@ class Launcher:
             else:
                 self.logger.info(f'No active servers matching module {module_name}'
                                  ' were found. Instantiating a new server.')
-                host, port = launch_device_server(
-                    server=module,
-                    dev_config=config_name,
-                    log_ip=self.log_ip,
-                    log_port=self.log_port,
-                    server_port=np.random.randint(1024, 49151),
-                    debug=self.server_debug,
-                    logger=self.logger
-                )
-
-                tries = 0
-                while tries < NUM_TRIES:
-                    try:
-                        self._connect_to_server(module, host, port, device_id)
-                        tries = NUM_TRIES + 1
-                    except ConnectionRefusedError:
-                        time.sleep(0.1)
-                        tries += 1
-                if tries == NUM_TRIES:
-                    self.logger.error(f'Failed to connect to {module}')
+                return [(module, config_name, device_id)]
 
         # If there is exactly 1 match, try to connect automatically
         elif num_matches == 1 and auto_connect:
@@ -356,28 +452,12 @@ class Launcher:
             # If the user's choice did not exist, just launch a new GUI
             except IndexError:
                 self.logger.info('Launching new server')
-                host, port = launch_device_server(
-                    server=module,
-                    dev_config=config_name,
-                    log_ip=self.log_ip,
-                    log_port=self.log_port,
-                    server_port=np.random.randint(1024, 49151),
-                    debug=self.server_debug,
-                    logger=self.logger
-                )
-
-                tries = 0
-                while tries < NUM_TRIES:
-                    try:
-                        self._connect_to_server(module, host, port, device_id)
-                        tries = NUM_TRIES + 1
-                    except ConnectionRefusedError:
-                        time.sleep(0.1)
-                        tries += 1
-                if tries == NUM_TRIES:
-                    self.logger.error(f'Failed to connect to {module}')
+                hide_console()
+                return [(module, config_name, device_id)]
             hide_console()
 
+        return []
+
     def find_index(self, params):
         """ Loads the index of device to use """
 
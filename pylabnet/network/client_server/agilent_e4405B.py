@@ -30,8 +30,8 @@ class Service(ServiceBase):
     def exposed_set_frequency_span(self, frequency_span):
         return self._module.set_frequency_span(frequency_span)
 
-    def exposed_read_trace(self):
-        trace = self._module.read_trace()
+    def exposed_read_trace(self, binary=True):
+        trace = self._module.read_trace(binary=binary)
         return pickle.dumps(trace)
 
     def exposed_query(self, command):
@@ -39,8 +39,14 @@ class Service(ServiceBase):
         return pickle.dumps(query)
 
     def exposed_write(self, command):
+
+        # Raw commands may change cached settings
+        self._module.clear_cache()
         return self._module.device.write(command)
 
+    def exposed_clear_cache(self):
+        return self._module.clear_cache()
+
     def exposed_acquire_background_spectrum(self, num_point):
         return self._module.acquire_background_spectrum(num_point)
 
@@ -72,13 +78,16 @@ class Client(ClientBase):
     def set_frequency_span(self, frequency_span):
         return self._service.exposed_set_frequency_span(frequency_span)
 
-    def read_trace(self):
-        pickled_trace = self._service.exposed_read_trace()
+    def read_trace(self, binary=True):
+        pickled_trace = self._service.exposed_read_trace(binary)
         return pickle.loads(pickled_trace)
 
     def write(self, command):
         return self._service.exposed_write(command)
 
+    def clear_cache(self):
+        return self._service.exposed_clear_cache()
+
     def query(self, command):
         pickled_query = self._service.exposed_query(command)
         return pickle.loads(pickled_query)
@@ -1,18 +1,203 @@
+import pickle
+import threading
+import numpy as np
+import rpyc
+
 from pylabnet.network.core.service_base import ServiceBase
 from pylabnet.network.core.client_base import ClientBase
+from pylabnet.network.core import array_transport
 from pylabnet.hardware.interface.wavemeter import WavemeterInterface
 
 
+class _WavelengthSubscriber:
+    """ Pushes new wavemeter readings to one remote subscriber
+
+    The wavemeter software only updates a channel's reading after a new
+    measurement, so a background thread polls the selected channels and
+    sends the channels whose reading changed since the last push.
+    """
+
+    def __init__(self, module, callback, channels, units, interval):
+        """ Instantiates subscriber and starts polling thread
+
+        :param module: wavemeter driver
+        :param callback: (netref) remote function taking pickled tuples of
+            (channels, readings, timestamps) arrays
+        :param channels: (list) channel numbers to watch
+        :param units: units of the readings, see get_wavelength()
+        :param interval: (float) polling interval in s
+        """
+
+        self._module = module
+        self._callback = callback
+        self._channels = np.array(channels)
+        self._units = units
+        self._interval = interval
+        self._stop = threading.Event()
+        self.active = True
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        last_values = np.full(len(self._channels), np.nan)
+
+        while not self._stop.is_set():
+            try:
+                values, timestamps = self._module.get_wavelengths(
+                    channels=self._channels.tolist(),
+                    units=self._units
+                )
+                updated = values != last_values
+                if updated.any():
+                    last_values = values
+                    self._callback(pickle.dumps((
+                        self._channels[updated], values[updated], timestamps[updated]
+                    )))
+
+            # Subscriber went away
+            except Exception:
+                break
+
+            self._stop.wait(self._interval)
+
+        self.active = False
+
+
 class Service(ServiceBase):
 
+    def __init__(self):
+        super().__init__()
+        self._subscribers = {}
+        self._next_subscriber_id = 0
+        self._subscriber_lock = threading.Lock()
+
     def exposed_get_wavelength(self, channel, units):
         return self._module.get_wavelength(
             channel=channel,
             units=units
         )
 
+    def exposed_get_wavelengths(self, channels, units):
+        values, timestamps = self._module.get_wavelengths(
+            channels=list(channels),
+            units=units
+        )
+        return array_transport.dumps(np.vstack((values, timestamps)))
+
+    def exposed_subscribe(self, callback, channels, units, interval):
+        """ Subscribes a client to new readings of the given channels
+
+        :param callback: (callable) function on the client called with a
+            pickled tuple of (channels, readings, timestamps) arrays, containing
+            only the channels with a new reading
+        :param channels: (list) channel numbers to watch
+        :param units: units of the readings, see get_wavelength()
+        :param interval: (float) polling interval of the wavemeter in s
+
+        :return: (int) subscription id
+        """
+
+        with self._subscriber_lock:
+
+            # Remove subscribers that went away
+            for subscriber_id, subscriber in list(self._subscribers.items()):
+                if not subscriber.active:
+                    del self._subscribers[subscriber_id]
+
+            subscriber_id = self._next_subscriber_id
+            self._next_subscriber_id += 1
+            self._subscribers[subscriber_id] = _WavelengthSubscriber(
+                self._module, callback, list(channels), units, interval
+            )
+
+        return subscriber_id
+
+    def exposed_unsubscribe(self, subscriber_id):
+        """ Ends a subscription
+
+        :param subscriber_id: (int) id returned by exposed_subscribe()
+        """
+
+        with self._subscriber_lock:
+            subscriber = self._subscribers.pop(subscriber_id, None)
+        if subscriber is not None:
+            subscriber.stop()
+
 
 class Client(ClientBase, WavemeterInterface):
 
+    def __init__(self, host, port, key='pylabnet.pem'):
+        self._serving_thread = None
+        self._subscription_callbacks = {}
+        super().__init__(host=host, port=port, key=key)
+
+    def connect(self, host='place_holder', port=-1, key='pylabnet.pem'):
+
+        # Subscriptions are bound to the old connection
+        if self._serving_thread is not None:
+            try:
+                self._serving_thread.stop()
+            except:
+                pass
+            self._serving_thread = None
+            self._subscription_callbacks = {}
+
+        return super().connect(host=host, port=port, key=key)
+
     def get_wavelength(self, channel=1, units="Frequency(THz)"):
         return self._service.exposed_get_wavelength(channel, units)
+
+    def get_wavelengths(self, channels=(1,), units="Frequency(THz)"):
+        """ Returns the readings of several channels with a single request
+
+        :param channels: (iterable) channel numbers
+        :param units: "Frequency (THz)" or "Wavelength (nm)". Defaults to frequency.
+        :return: (tuple) np.array of readings and np.array of the times
+            (time.time() on the server) at which each channel was read
+        """
+
+        data = array_transport.loads(
+            self._service.exposed_get_wavelengths(list(channels), units)
+        )
+        return data[0], data[1]
+
+    def subscribe(self, callback, channels=(1,), units="Frequency(THz)", interval=0.01):
+        """ Subscribes to new readings pushed by the server
+
+        Readings are delivered by a background thread serving this client's
+        connection, only when the reading of a channel has changed.
+
+        :param callback: (callable) called as callback(channels, readings,
+            timestamps) with np.arrays of the updated channels
+        :param channels: (iterable) channel numbers to watch
+        :param units: "Frequency (THz)" or "Wavelength (nm)". Defaults to frequency.
+        :param interval: (float) polling interval of the wavemeter on the
+            server in s
+
+        :return: (int) subscription id
+        """
+
+        if self._serving_thread is None:
+            self._serving_thread = rpyc.BgServingThread(self._connection)
+
+        def deliver(update_pickle):
+            callback(*pickle.loads(update_pickle))
+
+        subscription_id = self._service.exposed_subscribe(deliver, list(channels), units, interval)
+
+        # Keep a reference, since the server only holds a netref to it
+        self._subscription_callbacks[subscription_id] = deliver
+        return subscription_id
+
+    def unsubscribe(self, subscription_id):
+        """ Stops the delivery of readings to a subscription
+
+        :param subscription_id: (int) id returned by subscribe()
+        """
+
+        self._service.exposed_unsubscribe(subscription_id)
+        self._subscription_callbacks.pop(subscription_id, None)
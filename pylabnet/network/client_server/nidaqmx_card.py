@@ -1,7 +1,9 @@
 import pickle
+import numpy as np
 
 from pylabnet.network.core.service_base import ServiceBase
 from pylabnet.network.core.client_base import ClientBase
+from pylabnet.network.core import array_transport
 
 
 class Service(ServiceBase):
@@ -21,6 +23,27 @@ class Service(ServiceBase):
         state = self._module.get_di_state(port=port, di_channel=di_channel)
         return pickle.dumps(state)
 
+    def exposed_write_ao_waveform(self, ao_channel, voltage_pickle, sample_rate, timeout):
+        return self._module.write_ao_waveform(
+            ao_channel=pickle.loads(ao_channel) if isinstance(ao_channel, bytes) else ao_channel,
+            voltages=array_transport.loads(voltage_pickle),
+            sample_rate=sample_rate,
+            timeout=timeout
+        )
+
+    def exposed_read_ai_waveform(self, ai_channel, num_samples, sample_rate, max_range, timeout):
+        voltages = self._module.read_ai_waveform(
+            ai_channel=ai_channel,
+            num_samples=num_samples,
+            sample_rate=sample_rate,
+            max_range=max_range,
+            timeout=timeout
+        )
+        return array_transport.dumps(np.asarray(voltages))
+
+    def exposed_close_tasks(self):
+        return self._module.close_tasks()
+
     def exposed_create_timed_counter(
         self, counter_channel, physical_channel, duration=0.1, name=None
     ):
@@ -68,6 +91,44 @@ class Client(ClientBase):
         state_pickle = self._service.exposed_get_di_state(port=port, di_channel=di_channel)
         return pickle.loads(state_pickle)
 
+    def write_ao_waveform(self, ao_channel, voltages, sample_rate, timeout=10.0):
+        """Outputs a hardware-timed waveform on one or several analog outputs
+
+        :param ao_channel: (str) Name of output channel (e.g. 'ao1'), or list of names
+        :param voltages: (array) voltages, of shape (n_samples,) or
+            (n_channels, n_samples)
+        :param sample_rate: (float) sample rate in Hz
+        :param timeout: (float) maximum time to wait for the output in s
+        """
+        return self._service.exposed_write_ao_waveform(
+            ao_channel=pickle.dumps(list(ao_channel)) if isinstance(ao_channel, (list, np.ndarray)) else ao_channel,
+            voltage_pickle=array_transport.dumps(np.asarray(voltages, dtype=float)),
+            sample_rate=sample_rate,
+            timeout=timeout
+        )
+
+    def read_ai_waveform(self, ai_channel, num_samples, sample_rate, max_range=10, timeout=10.0):
+        """Acquires a hardware-timed record of an analog input
+
+        :param ai_channel: (str) Name of input channel (e.g. 'ai0')
+        :param num_samples: (int) Number of samples to acquire
+        :param sample_rate: (float) sample rate in Hz
+        :param max_range: (float) Maximum range of voltage that will be measured
+        :param timeout: (float) maximum time to wait for the samples in s
+        """
+        voltages_pickle = self._service.exposed_read_ai_waveform(
+            ai_channel=ai_channel,
+            num_samples=num_samples,
+            sample_rate=sample_rate,
+            max_range=max_range,
+            timeout=timeout
+        )
+        return array_transport.loads(voltages_pickle)
+
+    def close_tasks(self):
+        """ Closes all open analog and digital I/O tasks of the card """
+        return self._service.exposed_close_tasks()
+
     def create_timed_counter(
         self, counter_channel, physical_channel, duration=0.1, name=None
     ):
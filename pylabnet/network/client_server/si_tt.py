@@ -1,7 +1,10 @@
 import pickle
+import numpy as np
 
 from pylabnet.network.core.service_base import ServiceBase
 from pylabnet.network.core.client_base import ClientBase
+from pylabnet.network.core import array_transport
+from pylabnet.utils.ring_buffer import RingBuffer
 
 
 class Service(ServiceBase):
@@ -21,27 +24,40 @@ class Service(ServiceBase):
 
     def exposed_get_counts(self, name):
         res_pickle = self._module.get_counts(name=name)
-        return pickle.dumps(res_pickle)
+        return array_transport.dumps(res_pickle)
+
+    def exposed_get_counts_versioned(self, name):
+        counts, version = self._module.get_counts_versioned(name=name)
+        return array_transport.encode_array(counts), version
+
+    def exposed_get_metadata(self, name):
+        return pickle.dumps(self._module.get_metadata(name=name))
+
+    def exposed_get_counts_since(self, name, last_index=None, last_epoch=None):
+        counts, write_index, epoch = self._module.get_counts_since(
+            name=name, last_index=last_index, last_epoch=last_epoch
+        )
+        return array_transport.encode_array(counts), write_index, epoch
 
     def exposed_get_counts_normalized(self, name):
         res_pickle = self._module.get_counts_normalized(name=name)
-        return pickle.dumps(res_pickle)
+        return array_transport.dumps(res_pickle)
 
     def exposed_get_counts_total(self, name):
         res_pickle = self._module.get_counts_total(name=name)
-        return pickle.dumps(res_pickle)
+        return array_transport.dumps(res_pickle)
 
     def exposed_get_bin_widths(self, name):
         res_pickle = self._module.get_bin_widths(name=name)
-        return pickle.dumps(res_pickle)
+        return array_transport.dumps(res_pickle)
 
     def exposed_get_bin_widths(self, name):
         res_pickle = self._module.get_bin_widths(name=name)
-        return pickle.dumps(res_pickle)
+        return array_transport.dumps(res_pickle)
 
     def exposed_get_x_axis(self, name):
         res_pickle = self._module.get_x_axis(name=name)
-        return pickle.dumps(res_pickle)
+        return array_transport.dumps(res_pickle)
 
     def exposed_start_rate_monitor(self, name=None, ch_list=[1]):
         ch_list = pickle.loads(ch_list)
@@ -53,11 +69,19 @@ class Service(ServiceBase):
             ctr_index=ctr_index,
             integration=integration
         )
-        return pickle.dumps(res_pickle)
+        return array_transport.dumps(res_pickle)
 
     def exposed_get_timetag_stream_data(self, name):
         res_pickle = self._module.get_timetag_stream_data(name=name)
-        return pickle.dumps(res_pickle)
+        return array_transport.dumps(res_pickle)
+
+    def exposed_get_timetag_stream_arrays(self, name):
+        channels, timestamps, first_index = self._module.get_timetag_stream_arrays(name=name)
+        return (
+            array_transport.encode_array(channels),
+            array_transport.encode_array(timestamps),
+            first_index
+        )
 
     def exposed_start_gated_counter(self, name, click_ch, gate_ch, gated=True, bins=1000, end_channel=None):
         return self._module.start_gated_counter(name, click_ch, gate_ch, gated, bins, end_channel=end_channel)
@@ -75,6 +99,31 @@ class Service(ServiceBase):
     def exposed_start_timetag_stream(self, name, n_max_events, channel_list):
         return self._module.start_timetag_stream(name, n_max_events, channel_list)
 
+    def exposed_start_stream_pipeline(self, name, n_max_events, channel_list, chunk_interval=0.05):
+        channel_list = pickle.loads(channel_list)
+        return self._module.start_stream_pipeline(name, n_max_events, channel_list, chunk_interval)
+
+    def exposed_add_stream_analyzer(self, name, analyzer_name, analyzer_type, params):
+        params = pickle.loads(params)
+        return self._module.add_stream_analyzer(name, analyzer_name, analyzer_type, **params)
+
+    def exposed_get_analyzer_result(self, name, analyzer_name):
+        res_pickle = self._module.get_analyzer_result(name, analyzer_name)
+        return array_transport.dumps(res_pickle)
+
+    def exposed_get_analyzer_x_axis(self, name, analyzer_name):
+        res_pickle = self._module.get_analyzer_x_axis(name, analyzer_name)
+        return array_transport.dumps(res_pickle)
+
+    def exposed_clear_analyzer(self, name, analyzer_name=None):
+        return self._module.clear_analyzer(name, analyzer_name)
+
+    def exposed_get_stream_pipeline_status(self, name):
+        return pickle.dumps(self._module.get_stream_pipeline_status(name))
+
+    def exposed_stop_stream_pipeline(self, name):
+        return self._module.stop_stream_pipeline(name)
+
     def exposed_start(self, name):
         return self._module.start(name)
 
@@ -100,6 +149,15 @@ class Service(ServiceBase):
 
 class Client(ClientBase):
 
+    def __init__(self, host, port, key='pylabnet.pem'):
+
+        # Metadata of each measurement (see get_metadata()), and the version
+        # of the measurement reported with the latest counts
+        self._metadata = {}
+        self._versions = {}
+
+        super().__init__(host=host, port=port, key=key)
+
     def start_trace(self, name=None, ch_list=[1], bin_width=1000000000, n_bins=10000):
         """Start counter - used for count-trace applications
 
@@ -110,6 +168,7 @@ class Client(ClientBase):
                             wrapping around
         """
 
+        self._metadata.pop(name, None)
         ch_list = pickle.dumps(ch_list)
         return self._service.exposed_start_trace(
             name=name,
@@ -132,11 +191,55 @@ class Client(ClientBase):
         """Gets a 2D array of counts on all channels. See the
             getData() method of Counter class in TT
 
+        The version of the measurement configuration is transferred along
+        with the counts, which invalidates cached metadata (see
+        get_metadata()) if the measurement was set up again.
+
+        :param name: (str) identifier for the counter measurement
+        """
+
+        counts, self._versions[name] = self._service.exposed_get_counts_versioned(name)
+        return array_transport.decode_array(counts)
+
+    def get_metadata(self, name=None):
+        """Gets the static properties of a measurement, cached on the client
+
+        The cache is refreshed when get_counts() reports a new version of the
+        measurement, or when the measurement is set up by this client.
+
+        :param name: (str) identifier for the measurement
+
+        :return: (dict) with 'version', 'channels', 'x_axis' (in ps, None if
+            not available) and the setup parameters, e.g. 'binwidth' and 'n_bins'
+        """
+
+        metadata = self._metadata.get(name)
+        if (metadata is None or metadata['version'] is None
+                or metadata['version'] != self._versions.get(name, metadata['version'])):
+            metadata = pickle.loads(self._service.exposed_get_metadata(name))
+            self._metadata[name] = metadata
+            self._versions[name] = metadata['version']
+
+        return metadata
+
+    def get_counts_since(self, name=None, last_index=None, last_epoch=None):
+        """Gets the count bins completed since a previous call
+
+        Only the new bins are transferred, see CountTrace for keeping the
+        full trace on the client.
+
         :param name: (str) identifier for the counter measurement
+        :param last_index: (int) write index returned by the previous call,
+            None to get the full trace
+        :param last_epoch: (str) epoch returned by the previous call
+
+        :return: (tuple) 2D array of the new counts on all channels, and the
+            write index and epoch to pass to the next call. The full trace is
+            returned if the counter was cleared or set up again in between.
         """
 
-        res_pickle = self._service.exposed_get_counts(name=name)
-        return pickle.loads(res_pickle)
+        counts, write_index, epoch = self._service.exposed_get_counts_since(name, last_index, last_epoch)
+        return array_transport.decode_array(counts), write_index, epoch
 
     def get_counts_normalized(self, name=None):
         """Gets a 2D array of normalized counts on all channels. See the
@@ -146,7 +249,7 @@ class Client(ClientBase):
         """
 
         res_pickle = self._service.exposed_get_counts_normalized(name=name)
-        return pickle.loads(res_pickle)
+        return array_transport.loads(res_pickle)
 
     def get_counts_total(self, name=None):
         """Gets a 2D array of all counts on all channels. See the
@@ -156,7 +259,7 @@ class Client(ClientBase):
         """
 
         res_pickle = self._service.exposed_get_counts_total(name=name)
-        return pickle.loads(res_pickle)
+        return array_transport.loads(res_pickle)
 
     def get_bin_widths(self, name=None):
         """Gets a 2D array of counts on all channels. See the
@@ -166,7 +269,7 @@ class Client(ClientBase):
         """
 
         res_pickle = self._service.exposed_get_counts_total(name=name)
-        return pickle.loads(res_pickle)
+        return array_transport.loads(res_pickle)
 
     def get_bin_widths(self, name=None):
         """Gets a 2D array of counts on all channels. See the
@@ -176,17 +279,22 @@ class Client(ClientBase):
         """
 
         res_pickle = self._service.exposed_get_bin_widths(name=name)
-        return pickle.loads(res_pickle)
+        return array_transport.loads(res_pickle)
 
     def get_x_axis(self, name=None):
         """Gets the x axis in picoseconds for the count array.
             See the getIndex() method of Counter class in TT
 
+        The axis is cached, see get_metadata().
+
         :param name: (str) identifier for the counter measurement
         """
 
-        res_pickle = self._service.exposed_get_x_axis(name=name)
-        return pickle.loads(res_pickle)
+        x_axis = self.get_metadata(name)['x_axis']
+        if x_axis is None:
+            res_pickle = self._service.exposed_get_x_axis(name=name)
+            return array_transport.loads(res_pickle)
+        return x_axis
 
     def start_rate_monitor(self, name=None, ch_list=[1]):
         """Sets up a measurement for count rates
@@ -195,6 +303,8 @@ class Client(ClientBase):
         :param ch_list: (list) list of channels to measure
         """
 
+        self._metadata.pop(name, None)
+
         ch_list = pickle.dumps(ch_list)
         return self._service.exposed_start_rate_monitor(name=name, ch_list=ch_list)
 
@@ -211,7 +321,7 @@ class Client(ClientBase):
             ctr_index=ctr_index,
             integration=integration
         )
-        return pickle.loads(res_pickle)
+        return array_transport.loads(res_pickle)
 
     def get_timetag_stream_data(self, name):
         """ returns channels and timestamps of TimeTagStream object in a tuple
@@ -219,7 +329,25 @@ class Client(ClientBase):
         """
 
         res_pickle = self._service.exposed_get_timetag_stream_data(name)
-        return pickle.loads(res_pickle)
+        return array_transport.loads(res_pickle)
+
+    def get_timetag_stream_arrays(self, name):
+        """ Returns the time tags recorded since the last read of a TimeTagStream
+
+        Data is transferred as raw int8/int32 channel and int64 timestamp buffers.
+
+        :param name: (str) name of TimeTagStream instance
+
+        :return: (tuple) of channels (np.ndarray), timestamps (np.ndarray, ps)
+            and index of the first returned event since the start of the stream
+        """
+
+        channels, timestamps, first_index = self._service.exposed_get_timetag_stream_arrays(name)
+        return (
+            array_transport.decode_array(channels),
+            array_transport.decode_array(timestamps),
+            first_index
+        )
 
     def start_gated_counter(self, name, click_ch, gate_ch, gated=True, bins=1000, end_channel=None):
         """ Starts a new gated counter
@@ -233,6 +361,7 @@ class Client(ClientBase):
         :param bins: (int) number of bins (gate windows) to store
         """
 
+        self._metadata.pop(name, None)
         self._service.exposed_start_gated_counter(name, click_ch, gate_ch, gated, bins, end_channel=end_channel)
 
     def count_between_markers(self, name, click_ch, marker_ch, bins=1000, end_channel=None):
@@ -247,6 +376,7 @@ class Client(ClientBase):
         :param bins: (int) number of bins (gate windows) to store
         """
 
+        self._metadata.pop(name, None)
         self._service.exposed_start_gated_counter(name, click_ch, marker_ch, False, bins, end_channel=end_channel)
 
     def start_histogram(self, name, start_ch, click_ch, next_ch=-134217728,
@@ -268,6 +398,7 @@ class Client(ClientBase):
         :param start_delay: (optional, int) delay for marker in ps
         """
 
+        self._metadata.pop(name, None)
         return self._service.exposed_start_histogram(name, start_ch, click_ch,
                                                      next_ch=next_ch,
                                                      sync_ch=sync_ch,
@@ -288,6 +419,7 @@ class Client(ClientBase):
         :param delay: (optional, int) delay for channel 1
         """
 
+        self._metadata.pop(name, None)
         return self._service.exposed_start_correlation(
             name, ch_1, ch_2, binwidth, n_bins, delay
         )
@@ -304,6 +436,85 @@ class Client(ClientBase):
             name, n_max_events, channel_list
         )
 
+    def start_stream_pipeline(self, name, n_max_events, channel_list, chunk_interval=0.05):
+        """ Sets up a time tag stream that is processed online on the server
+
+        Only results of analyzers added with add_stream_analyzer() are
+        transferred, not the time tags themselves.
+
+        :param name: (str) name of measurement for future reference
+        :param n_max_events: (int) max number of events to buffer between reads
+        :param channel_list: (list) list of channels to use
+        :param chunk_interval: (float) time between reads of the stream in s
+        """
+
+        return self._service.exposed_start_stream_pipeline(
+            name, n_max_events, pickle.dumps(channel_list), chunk_interval
+        )
+
+    def add_stream_analyzer(self, name, analyzer_name, analyzer_type, **params):
+        """ Adds an analyzer to a stream pipeline
+
+        :param name: (str) name of the stream pipeline
+        :param analyzer_name: (str) identifier of the analyzer for future reference
+        :param analyzer_type: (str) 'conditional_histogram' (start_ch, click_ch,
+            binwidth, n_bins), 'g2' (ch_1, ch_2, binwidth, n_bins) or
+            'gated_counter' (click_ch, gate_ch, gate_stop_ch, n_bins)
+        :param params: keyword arguments of the analyzer
+        """
+
+        return self._service.exposed_add_stream_analyzer(
+            name, analyzer_name, analyzer_type, pickle.dumps(params)
+        )
+
+    def get_analyzer_result(self, name, analyzer_name):
+        """ Returns the current result of a stream analyzer
+
+        :param name: (str) name of the stream pipeline
+        :param analyzer_name: (str) identifier of the analyzer
+        """
+
+        res_pickle = self._service.exposed_get_analyzer_result(name, analyzer_name)
+        return array_transport.loads(res_pickle)
+
+    def get_analyzer_x_axis(self, name, analyzer_name):
+        """ Returns the x axis of a stream analyzer result in ps
+
+        :param name: (str) name of the stream pipeline
+        :param analyzer_name: (str) identifier of the analyzer
+        """
+
+        res_pickle = self._service.exposed_get_analyzer_x_axis(name, analyzer_name)
+        return array_transport.loads(res_pickle)
+
+    def clear_analyzer(self, name, analyzer_name=None):
+        """ Resets one or all analyzers of a stream pipeline
+
+        :param name: (str) name of the stream pipeline
+        :param analyzer_name: (str, optional) identifier of the analyzer,
+            all analyzers of the pipeline are cleared if None
+        """
+
+        return self._service.exposed_clear_analyzer(name, analyzer_name)
+
+    def get_stream_pipeline_status(self, name):
+        """ Returns the state of a stream pipeline
+
+        :param name: (str) name of the stream pipeline
+        :return: (dict) with 'running', 'n_events', 'n_failures' and 'error',
+            processing stops after repeated failures
+        """
+
+        return pickle.loads(self._service.exposed_get_stream_pipeline_status(name))
+
+    def stop_stream_pipeline(self, name):
+        """ Stops a stream pipeline and its time tag stream
+
+        :param name: (str) name of the stream pipeline
+        """
+
+        return self._service.exposed_stop_stream_pipeline(name)
+
     def start(self, name):
         """ Starts a measurement.
 
@@ -361,3 +572,77 @@ class Client(ClientBase):
 
     def set_trigger_level(self, channel, voltage):
         return self._service.exposed_set_trigger_level(channel, voltage)
+
+
+class CountTrace:
+    """ Local copy of a count trace, updated by fetching only new bins
+
+    Each update() transfers the bins completed since the previous update
+    (see Client.get_counts_since()) and appends them to ring buffers of
+    the trace length, so network traffic and CPU load scale with the number
+    of new bins rather than with the trace length.
+
+    Channels can be combined into traces (e.g. the sum of two detectors) by
+    a weight matrix, which is applied to the new bins only.
+    """
+
+    def __init__(self, client, name, n_bins, n_channels=1, combine=None):
+        """ Instantiates an empty trace
+
+        :param client: (Client) client of the time tagger
+        :param name: (str) identifier of the count trace measurement
+        :param n_bins: (int) number of bins of the measurement
+        :param n_channels: (int) number of channels of the measurement
+        :param combine: (array, optional) weights of shape (n_traces,
+            n_channels), trace k being the weighted sum of the channels with
+            combine[k]. Defaults to one trace per channel.
+        """
+
+        self._client = client
+        self.name = name
+
+        if combine is None:
+            combine = np.eye(n_channels)
+        self._combine = np.asarray(combine, dtype=float)
+
+        self._buffers = [RingBuffer(int(n_bins)) for _ in range(len(self._combine))]
+        self._last_index = None
+        self._last_epoch = None
+
+        # Counts of the latest bin of each channel
+        self.last_counts = np.zeros(n_channels)
+
+    def update(self):
+        """ Fetches the bins completed since the last update
+
+        :return: (int) number of new bins
+        """
+
+        # After a clear, the full trace is returned and replaces the buffers
+        counts, self._last_index, self._last_epoch = self._client.get_counts_since(
+            self.name, self._last_index, self._last_epoch
+        )
+
+        n_new = counts.shape[1]
+        if n_new > 0:
+            self.last_counts = counts[:, -1].astype(float)
+            for buffer, trace in zip(self._buffers, self._combine @ counts):
+                buffer.append(trace)
+
+        return n_new
+
+    def get_traces(self):
+        """ Returns the combined traces, oldest bin first
+
+        :return: (list) of np.ndarray views, valid until the next update()
+        """
+
+        return [buffer.view() for buffer in self._buffers]
+
+    def reset(self):
+        """ Fetches the full trace with the next update
+
+        Clearing the counter is detected by update() without a reset.
+        """
+
+        self._last_index = None
@@ -33,8 +33,8 @@ class Service(ServiceBase):
     def exposed_acquire_single_run(self):
         return self._module.acquire_single_run()
 
-    def exposed_read_out_trace(self, channel, curve_res):
-        trace = self._module.read_out_trace(channel, curve_res)
+    def exposed_read_out_trace(self, channel, curve_res, binary=True, refresh_preamble=False):
+        trace = self._module.read_out_trace(channel, curve_res, binary=binary, refresh_preamble=refresh_preamble)
         return pickle.dumps(trace)
 
     def exposed_show_trace(self, channel):
@@ -81,8 +81,14 @@ class Service(ServiceBase):
         return pickle.dumps(query)
 
     def exposed_write(self, command):
+
+        # Raw commands may change cached settings
+        self._module.clear_cache()
         return self._module.device.write(command)
 
+    def exposed_clear_cache(self):
+        return self._module.clear_cache()
+
     def exposed_extract_params(self, command, value):
         val = self._module.extract_params(command, value)
         return pickle.dumps(val)
@@ -114,10 +120,12 @@ class Client(ClientBase):
     def acquire_single_run(self):
         return self._service.exposed_acquire_single_run()
 
-    def read_out_trace(self, channel, curve_res=1):
+    def read_out_trace(self, channel, curve_res=1, binary=True, refresh_preamble=False):
         pickled_trace = self._service.exposed_read_out_trace(
             channel,
-            curve_res
+            curve_res,
+            binary,
+            refresh_preamble
         )
         return pickle.loads(pickled_trace)
 
@@ -170,6 +178,9 @@ class Client(ClientBase):
     def write(self, command):
         return self._service.exposed_write(command)
 
+    def clear_cache(self):
+        return self._service.exposed_clear_cache()
+
     def extract_params(self, command, value):
         val = self._service.exposed_extract_params(command, value)
         return pickle.loads(val)
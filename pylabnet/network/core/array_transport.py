@@ -0,0 +1,131 @@
+""" Binary transport of NumPy arrays for client/server calls
+
+By default, data-returning exposed methods pickle their result on the server
+and unpickle it on the client. For large numerical arrays (histograms, count
+traces, voltage records) most of that time is spent serializing the array.
+
+This module provides drop-in replacements for pickle.dumps / pickle.loads:
+`dumps` sends a NumPy array as its raw buffer preceded by a small header
+containing the dtype and shape, and `loads` decodes it on the client with
+np.frombuffer. The result is copied into a writeable array, unless copy=False
+is passed to get a read-only view on the payload (e.g. for data that is only
+read once and then discarded). Anything that is not a plain
+NumPy array is still pickled, and `loads` also accepts ordinary pickles, so a
+Service/Client pair can opt in method by method:
+
+    # Service
+    def exposed_get_counts(self, name):
+        return array_transport.dumps(self._module.get_counts(name=name))
+
+    # Client
+    def get_counts(self, name=None):
+        return array_transport.loads(self._service.exposed_get_counts(name=name))
+
+Payload layout of an encoded array:
+
+    MAGIC (4 bytes) | header length (uint16, little endian) | header | raw data
+
+where header is the ASCII string '<dtype.str>|<comma separated shape>'.
+"""
+
+import pickle
+import struct
+import numpy as np
+
+
+# Marks a binary-encoded array. Pickle payloads start with b'\x80', so there
+# is no ambiguity between the two formats.
+MAGIC = b'PLNA'
+
+_LEN_FORMAT = '<H'
+_PREFIX_LEN = len(MAGIC) + struct.calcsize(_LEN_FORMAT)
+
+
+def is_encodable(obj):
+    """ Checks whether an object can be sent as a raw array buffer
+
+    :param obj: object to check
+    :return: (bool) True for NumPy arrays with a fixed-size, non-object dtype
+    """
+
+    return (
+        isinstance(obj, np.ndarray)
+        and not obj.dtype.hasobject
+        and obj.dtype.fields is None
+    )
+
+
+def encode_array(arr):
+    """ Encodes a NumPy array as header + raw buffer
+
+    :param arr: (np.ndarray) array with a fixed-size, non-object dtype
+    :return: (bytes) encoded array
+    """
+
+    # np.ascontiguousarray would promote 0-d arrays to 1-d, so only copy
+    # when the memory layout requires it.
+    if not arr.flags.c_contiguous:
+        arr = np.ascontiguousarray(arr)
+    shape_str = ','.join(str(dim) for dim in arr.shape)
+    header = f'{arr.dtype.str}|{shape_str}'.encode('ascii')
+
+    return b''.join((
+        MAGIC,
+        struct.pack(_LEN_FORMAT, len(header)),
+        header,
+        arr.data
+    ))
+
+
+def decode_array(payload, copy=True):
+    """ Decodes an array encoded with encode_array()
+
+    :param payload: (bytes) encoded array
+    :param copy: (bool) if True, returns a writeable copy. If False, the
+        returned array is a read-only view on the payload.
+    :return: (np.ndarray) decoded array
+    """
+
+    if bytes(payload[:len(MAGIC)]) != MAGIC:
+        raise ValueError('Payload is not a binary-encoded array')
+
+    header_len, = struct.unpack_from(_LEN_FORMAT, payload, len(MAGIC))
+    header = bytes(payload[_PREFIX_LEN:_PREFIX_LEN + header_len]).decode('ascii')
+    dtype_str, shape_str = header.split('|')
+    shape = tuple(int(dim) for dim in shape_str.split(',')) if shape_str else ()
+
+    arr = np.frombuffer(
+        payload,
+        dtype=np.dtype(dtype_str),
+        offset=_PREFIX_LEN + header_len
+    ).reshape(shape)
+
+    if copy:
+        arr = arr.copy()
+
+    return arr
+
+
+def dumps(obj):
+    """ Serializes obj, using the binary array format whenever possible
+
+    :param obj: object to serialize
+    :return: (bytes) encoded array if obj is a NumPy array, pickle otherwise
+    """
+
+    if is_encodable(obj):
+        return encode_array(obj)
+    return pickle.dumps(obj)
+
+
+def loads(payload, copy=True):
+    """ Deserializes a payload produced by dumps() or pickle.dumps()
+
+    :param payload: (bytes) serialized object
+    :param copy: (bool) see decode_array()
+    :return: deserialized object
+    """
+
+    if bytes(payload[:len(MAGIC)]) == MAGIC:
+        return decode_array(payload, copy=copy)
+    return pickle.loads(payload)
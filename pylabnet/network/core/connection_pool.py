@@ -0,0 +1,130 @@
+""" Process-level pool of client connections to pylabnet servers
+
+Instantiating a Client opens a new rpyc connection (including the SSL
+handshake for authenticated servers). ClientPool keeps one Client per
+server, keyed by host, port and key, and hands out the same instance on
+subsequent requests:
+
+    pool = get_client_pool()
+    client = pool.get_client(nidaqmx.Client, host, port)
+
+Before a cached client is reused, its connection is checked with a ping. If
+the server went away and came back, the client is reconnected in place via
+ClientBase.connect(), so references held by running scripts stay valid.
+"""
+
+import time
+import threading
+
+
+class ClientPool:
+    """ Cache of connected Client instances keyed by (host, port, key) """
+
+    def __init__(self, ping_timeout=1, health_check_interval=1):
+        """ Instantiates an empty pool
+
+        :param ping_timeout: (float) timeout of the health check ping in s
+        :param health_check_interval: (float) minimum time between health
+            checks of the same client in s, clients checked more recently are
+            handed out directly
+        """
+
+        self.ping_timeout = ping_timeout
+        self.health_check_interval = health_check_interval
+
+        self._clients = {}
+        self._last_check = {}
+        self._lock = threading.Lock()
+        self._key_locks = {}
+
+    def _is_healthy(self, client):
+        """ Checks whether the connection of a client is still usable
+
+        :param client: (ClientBase) client to check
+        :return: (bool) True if the server responds
+        """
+
+        connection = client._connection
+        if connection is None or connection.closed:
+            return False
+        try:
+            connection.ping(timeout=self.ping_timeout)
+            return True
+        except Exception:
+            return False
+
+    def get_client(self, client_class, host, port, key='pylabnet.pem'):
+        """ Returns a connected client, reusing a cached one if possible
+
+        :param client_class: (class) ClientBase subclass to instantiate
+        :param host: (str) hostname
+        :param port: (int) port number
+        :param key: (str) name of keyfile, None for unauthenticated servers
+        :return: (ClientBase) connected client instance
+        """
+
+        pool_key = (host, int(port), key)
+
+        # Connections to different servers can be set up concurrently
+        with self._lock:
+            key_lock = self._key_locks.setdefault(pool_key, threading.Lock())
+
+        with key_lock:
+            client = self._clients.get(pool_key)
+
+            # Only reuse clients of the requested type
+            if client is not None and type(client) is not client_class:
+                client = None
+
+            if client is None:
+                client = client_class(host=host, port=port, key=key)
+
+                # ClientBase leaves the connection empty on SSL/timeout errors
+                if client._connection is None:
+                    return client
+                self._clients[pool_key] = client
+            elif time.monotonic() - self._last_check.get(pool_key, 0) > self.health_check_interval:
+                if not self._is_healthy(client):
+                    client.connect(host=host, port=port, key=key)
+
+            self._last_check[pool_key] = time.monotonic()
+            return client
+
+    def discard(self, host, port, key='pylabnet.pem'):
+        """ Closes and removes a client from the pool
+
+        :param host: (str) hostname
+        :param port: (int) port number
+        :param key: (str) name of keyfile
+        """
+
+        pool_key = (host, int(port), key)
+        with self._lock:
+            key_lock = self._key_locks.setdefault(pool_key, threading.Lock())
+
+        with key_lock:
+            client = self._clients.pop(pool_key, None)
+            self._last_check.pop(pool_key, None)
+        if client is not None and client._connection is not None:
+            try:
+                client._connection.close()
+            except Exception:
+                pass
+
+    def close_all(self):
+        """ Closes all pooled connections """
+
+        for host, port, key in list(self._clients):
+            self.discard(host, port, key)
+
+
+_client_pool = ClientPool()
+
+
+def get_client_pool():
+    """ Returns the pool shared by all launchers in this process
+
+    :return: (ClientPool) process-level client pool
+    """
+
+    return _client_pool
@@ -4,6 +4,7 @@ import numpy as np
 import time
 import pyqtgraph as pg
 from pylabnet.gui.pyqt.external_gui import Window
+from pylabnet.gui.pyqt.acquisition_loop import AcquisitionLoop
 from pylabnet.utils.logging.logger import LogClient
 from pylabnet.scripts.pause_script import PauseService
 from pylabnet.network.core.generic_server import GenericServer
@@ -11,6 +12,9 @@ from pylabnet.network.client_server import si_tt, nidaqmx_card
 from pylabnet.utils.helper_methods import load_script_config, get_ip, unpack_launcher, load_config, get_gui_widgets, get_legend_from_graphics_view, find_client, load_script_config, get_gui_widgets_dummy
 import time
 
+
+REFRESH_RATE = 30   # number of voltage readings per second
+
 # Static methods
 
 # def generate_widgets():
@@ -68,6 +72,15 @@ class CountMonitor:
         # Setup stylesheet.
         self.gui.apply_stylesheet()
 
+        # Read voltages on a worker thread at a limited rate
+        self._loop = AcquisitionLoop(
+            acquire=self._get_output,
+            display=self._update_output,
+            rate=REFRESH_RATE,
+            status_bar=self.gui.statusBar(),
+            logger=self.log
+        )
+
         if self.combined_channel:
             num_plots = 3
         else:
@@ -123,55 +136,26 @@ class CountMonitor:
         self.x = np.ones(self._n_bins) * dt_timestamp
 
     def run(self):
-        """ Runs the counter from scratch"""
-
-        try:
+        """ Runs the counter from scratch, blocks until paused """
 
-            # Start the counter with desired parameters
-            self._initialize_display()
+        # Start the counter with desired parameters
+        self._initialize_display()
 
-            # Give time to initialize
-            # time.sleep(0.05)
-            self._is_running = True
-
-            # self._ctr.start_trace(
-            #     name=self.config['name'],
-            #     ch_list=self._ch_list,
-            #     bin_width=self._bin_width,
-            #     n_bins=self._n_bins
-            # )
-
-            # Continuously update data until paused
-            while self._is_running:
-                self._update_output()
-                self.gui.force_update()
-
-        except Exception as exc_obj:
-            self._is_running = False
-            raise exc_obj
+        # Continuously update data until paused
+        self._loop.run()
 
     def pause(self):
         """ Pauses the counter"""
 
-        self._is_running = False
+        self._loop.stop()
 
     def resume(self):
-        """ Resumes the counter.
+        """ Resumes the counter, blocks until paused.
 
         To be used to resume after the counter has been paused.
         """
 
-        try:
-            self._is_running = True
-
-            # Clear counter and resume plotting
-            # self._ctr.clear_ctr(name=self.config['name'])
-            while self._is_running:
-                self._update_output()
-
-        except Exception as exc_obj:
-            self._is_running = False
-            raise exc_obj
+        self._loop.run()
 
     # Technical methods
 
@@ -244,18 +228,31 @@ class CountMonitor:
 
         # self._ctr.clear_ctr(name=self.config['name'])
 
-    def _update_output(self):
-        """ Updates the output to all current values"""
+    def _get_output(self):
+        """ Reads the voltages, runs on the acquisition thread
+
+        :return: (tuple) timestamp and mean voltage of each channel
+        """
+
+        dt_timestamp = time.time()
+        voltages = [np.mean(self._ctr.get_ai_voltage(channel, 1, 10)) for channel in self._ch_list]
+        return dt_timestamp, voltages
+
+    def _update_output(self, output):
+        """ Updates the output to the values read by _get_output()
+
+        :param output: (tuple) timestamp and mean voltage of each channel
+        """
 
         # Update all active channels
         # x_axis = self._ctr.get_x_axis()/1e12
 
-        dt_timestamp = time.time()
+        dt_timestamp, voltages = output
         dt_timestamp = np.array([dt_timestamp]).flatten()
         self.x = np.concatenate((self.x[1:], dt_timestamp))
 
         for index, channel in enumerate(self._ch_list):
-            v = np.array([np.mean(self._ctr.get_ai_voltage(channel, 1, 10))]).flatten()
+            v = np.array([voltages[index]]).flatten()
 
             # self.log.debug(self.x)
             self.data[index] = np.concatenate((self.data[index][1:], v))
@@ -2,6 +2,7 @@ from pylabnet.network.client_server import si_tt
 from pylabnet.utils.logging.logger import LogClient, LogHandler
 from pylabnet.gui.igui.iplot import SingleTraceFig, MultiTraceFig
 from pylabnet.gui.pyqt.external_gui import Window
+from pylabnet.gui.pyqt.acquisition_loop import AcquisitionLoop
 from pylabnet.utils.helper_methods import (generic_save, get_gui_widgets,
                                            get_legend_from_graphics_view, add_to_legend, create_server, unpack_launcher,
                                            load_config, pyqtgraph_save, find_client, get_ip, load_script_config)
@@ -14,6 +15,9 @@ import pyqtgraph as pg
 from PyQt5 import QtWidgets
 
 
+REFRESH_RATE = 20   # default number of histogram updates per second
+
+
 class TimeTrace:
     """ Convenience class for handling time-trace measurements """
 
@@ -309,6 +313,17 @@ class TimeTraceGui(TimeTrace):
         self.gui.apply_stylesheet()
         self.fitting = False
 
+        # Fetch histograms on a worker thread at a limited rate
+        self._snapshot_gates()
+        self.loop = AcquisitionLoop(
+            acquire=self._get_data,
+            display=self._update_data,
+            rate=self.config.get('refresh_rate', REFRESH_RATE),
+            status_bar=self.gui.statusBar(),
+            logger=log,
+            name=self.hist
+        )
+
     def clear_all(self):
         """ Clears all plots """
 
@@ -360,6 +375,8 @@ class TimeTraceGui(TimeTrace):
 
         # If box isn't checked, remove popup
         else:
+            if self.fit_popup is not None:
+                self.fit_popup.stop_fit()
             self.fit_popup = None
             self.fitting = False
 
@@ -390,22 +407,27 @@ class TimeTraceGui(TimeTrace):
         self.init_plot()
 
         self.is_paused = False
-        last_save = time.time()
-        last_clear = last_save
-        while not self.is_paused:
+        self._last_save = time.time()
+        self._last_clear = self._last_save
+        self._snapshot_gates()
+        self.loop.start()
 
-            if self.gui.autosave.isChecked():
-                current_time = time.time()
-                if current_time - last_save > self.gui.save_time.value():
-                    self.save()
-                    last_save = current_time
-            if self.gui.auto_clear.isChecked():
-                current_time = time.time()
-                if current_time - last_clear > self.gui.clear_time.value():
-                    self.clear_all()
-                    last_clear = current_time
-            self._update_data()
-            self.gui.force_update()
+    def resume(self):
+        """ Runs an already instantiated counter."""
+
+        self.is_paused = False
+        self._snapshot_gates()
+        self.loop.start()
+
+    def pause(self):
+        """ Pauses the go/run loop.
+
+        NOTE: does not actually stop counter acquisition!
+        There does not seem to be a way to do that from SI-TT API
+        """
+
+        self.is_paused = True
+        self.loop.stop()
 
     def init_plot(self):
         """ Initializes the plot """
@@ -430,36 +452,71 @@ class TimeTraceGui(TimeTrace):
                 self.gates[gate_name].ctr.get_counts(self.gates[gate_name].hist)[0]
             )
 
-    def _update_data(self):
-        """ Adds latest data to the plot """
+    def _get_data(self):
+        """ Fetches the latest histograms, runs on the acquisition thread
 
-        self.curve.setData(
-            self.ctr.get_x_axis(self.hist) / 1e12,
-            self.ctr.get_counts(self.hist)[0]
-        )
+        :return: (dict) of (x axis in s, counts) tuples, keyed by None for the
+            main histogram and by gate name for gated histograms
+        """
+
+        # Counts first, such that the cached x axis matches their version
+        data = {}
+        for gate_name, ctr, hist in self._acquired:
+            counts = ctr.get_counts(hist)[0]
+            data[gate_name] = (ctr.get_x_axis(hist) / 1e12, counts)
+
+        return data
+
+    def _snapshot_gates(self):
+        """ Fixes the histograms fetched by _get_data(), such that the worker
+        thread doesn't iterate over self.gates while the GUI modifies it """
+
+        self._acquired = [(None, self.ctr, self.hist)] + [
+            (gate_name, gate.ctr, gate.hist) for gate_name, gate in self.gates.items()
+        ]
+
+    def _update_data(self, data):
+        """ Adds latest data to the plot
+
+        :param data: (dict) histograms fetched by _get_data()
+        """
+
+        # Periodic saving and clearing
+        current_time = time.time()
+        if self.gui.autosave.isChecked() and current_time - self._last_save > self.gui.save_time.value():
+            self.save()
+            self._last_save = current_time
+        if self.gui.auto_clear.isChecked() and current_time - self._last_clear > self.gui.clear_time.value():
+            self.clear_all()
+            self._last_clear = current_time
+
+        self.curve.setData(*data[None])
 
         if self.fitting:
-            self._update_fit()
+            self._update_fit(*data[None])
 
         for gate_name, gate_curve in self.gate_curves.items():
-            gate_curve.setData(
-                self.gates[gate_name].ctr.get_x_axis(self.gates[gate_name].hist) / 1e12,
-                self.gates[gate_name].ctr.get_counts(self.gates[gate_name].hist)[0]
-            )
+            if gate_name in data:
+                gate_curve.setData(*data[gate_name])
+
+    def _update_fit(self, x=None, counts=None):
+        """ Schedules a fit in the background and plots new fit results
 
-    def _update_fit(self):
-        """ Updates fits """
+        :param x: (np.array, optional) x axis in s, fetched if not given
+        :param counts: (np.array, optional) histogram, fetched if not given
+        """
         if self.fit_popup.mod is not None and self.fit_popup.mod.init_params is not None:
-            self.fit_popup.data = np.array(self.ctr.get_counts(self.hist)[0])
-            self.fit_popup.x = np.array(self.ctr.get_x_axis(self.hist) / 1e12)
-            if self.p0 is not None:
-                self.fit_popup.p0 = self.p0
-            self.fit, self.p0 = self.fit_popup.fit_mod()
-            if self.fit_popup.fit_suc:
-                self.fit_curve.setData(
-                    self.ctr.get_x_axis(self.hist) / 1e12,
-                    self.fit
-                )
+            if counts is None:
+                counts = self.ctr.get_counts(self.hist)[0]
+                x = self.ctr.get_x_axis(self.hist) / 1e12
+            self.fit_popup.data = np.array(counts)
+            self.fit_popup.x = np.array(x)
+            self.fit_popup.submit_fit()
+
+            result = self.fit_popup.take_fit()
+            if result is not None and result.success:
+                self.fit, self.p0 = result.fit, result.popt
+                self.fit_curve.setData(result.x, self.fit)
 
     def _get_binwidth(self):
         """ Gets the binwidth using the unit combo box
@@ -602,6 +659,4 @@ def launch(**kwargs):
 
     # Run continuously
     # Note that the actual operation inside run() can be paused using the update server
-    while True:
-
-        trace.gui.force_update()
+    trace.gui.app.exec_()
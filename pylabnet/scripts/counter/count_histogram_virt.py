@@ -339,6 +339,8 @@ class TimeTraceGui(TimeTrace):
 
         # If box isn't checked, remove popup
         else:
+            if self.fit_popup is not None:
+                self.fit_popup.stop_fit()
             self.fit_popup = None
             self.fitting = False
 
@@ -427,18 +429,16 @@ class TimeTraceGui(TimeTrace):
             )
 
     def _update_fit(self):
-        """ Updates fits """
+        """ Schedules a fit in the background and plots new fit results """
         if self.fit_popup.mod is not None and self.fit_popup.mod.init_params is not None:
             self.fit_popup.data = np.array(self.ctr.get_counts(self.hist)[0])
             self.fit_popup.x = np.array(self.ctr.get_x_axis(self.hist) / 1e12)
-            if self.p0 is not None:
-                self.fit_popup.p0 = self.p0
-            self.fit, self.p0 = self.fit_popup.fit_mod()
-            if self.fit_popup.fit_suc:
-                self.fit_curve.setData(
-                    self.ctr.get_x_axis(self.hist) / 1e12,
-                    self.fit
-                )
+            self.fit_popup.submit_fit()
+
+            result = self.fit_popup.take_fit()
+            if result is not None and result.success:
+                self.fit, self.p0 = result.fit, result.popt
+                self.fit_curve.setData(result.x, self.fit)
 
     def _get_binwidth(self):
         """ Gets the binwidth using the unit combo box
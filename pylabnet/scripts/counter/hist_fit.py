@@ -5,12 +5,23 @@ from PyQt5.QtWidgets import (
     QApplication, QDialog, QMainWindow, QMessageBox)
 from scipy.optimize import curve_fit # is not automatically installed?
 import numpy as np
+from pylabnet.scripts.fit_engine import FitEngine
 
 
 def exp_decay(t, a, b, T1):
     return a - (a - b) * np.exp(-t / T1)
 
 
+def exp_decay_jac(t, a, b, T1):
+    """ Jacobian of exp_decay() with respect to its parameters """
+    decay = np.exp(-t / T1)
+    return np.stack([
+        1 - decay,
+        decay,
+        -(a - b) * decay * t / T1**2
+    ], axis=-1)
+
+
 class FitPopup(Popup):
     def __init__(self, ui, x, data, p0, config, log):
         super().__init__(ui)
@@ -22,11 +33,15 @@ class FitPopup(Popup):
         self.fit_suc = True
         self.mod = None
 
+        # Runs fits of the histogram in the background
+        self.engine = FitEngine(max_workers=1, logger=log)
+
     def fit_selection(self, index):
         if index == 0:
             self.mod = FitModel("Exponential Decay", exp_decay,
-                                "Midpoint", " Lowpoint", "T")
+                                "Midpoint", " Lowpoint", "T", jac=exp_decay_jac)
 
+        self.engine.clear()
         self.mod.load_mod(config=self.config)
         self.close()
 
@@ -37,10 +52,43 @@ class FitPopup(Popup):
             self.p0)
         return fit, self.p0
 
+    def submit_fit(self):
+        """ Schedules a fit of the current data in the background
+
+        The result is retrieved with take_fit().
+        """
+
+        self.mod.submit_fit(self.engine, self.x, self.data)
+
+    def take_fit(self):
+        """ Returns and displays a new result of the background fit
+
+        :return: (FitResult) new result, None if there is none
+        """
+
+        result = self.engine.take_result('hist')
+        if result is not None:
+            self.fit_suc = result.success
+            self.mod.show_result(result, status=self.engine.get_statistics_text())
+        return result
+
+    def stop_fit(self):
+        """ Stops the background fitting """
+
+        self.engine.close()
+
 
 class FitModel():
-    def __init__(self, name, func, *fit_params):
+    def __init__(self, name, func, *fit_params, jac=None):
+        """ Instantiates a fit model
+
+        :param name: (str) name of the model, also used for the config entry
+        :param func: (callable) model func(x, *params)
+        :param fit_params: (str) names of the parameters
+        :param jac: (callable, optional) analytic Jacobian jac(x, *params)
+        """
         self.func = func
+        self.jac = jac
         self.name = name
         self.fit_params = fit_params
         self.p0_updated = False
@@ -74,7 +122,7 @@ class FitModel():
             else:
                 p0_f = p0
             try:
-                popt, pcov = curve_fit(self.func, x, data, p0=p0_f)
+                popt, pcov = curve_fit(self.func, x, data, p0=p0_f, jac=self.jac)
                 p0_f = popt
                 #print(pcov1)
                 fit_suc = True
@@ -87,6 +135,33 @@ class FitModel():
                 #self.pop.fparams2[param].setText(str(popt2[ind]))
             return self.func(x, *popt), p0_f, fit_suc
 
+    def submit_fit(self, engine, x, data):
+        """ Schedules a fit on a FitEngine
+
+        The fit is warm-started from the previous result, unless new initial
+        guesses were entered.
+
+        :param engine: (FitEngine) engine to run the fit
+        :param x: (np.array) x values
+        :param data: (np.array) data to fit
+        """
+        if self.init_params is not None:
+            p0 = [self.init_params[param] for param in self.fit_params]
+            reset = self.p0_updated
+            self.p0_updated = False
+            engine.submit('hist', self.func, x, data, p0, jac=self.jac, reset=reset)
+
+    def show_result(self, result, status=''):
+        """ Displays fitted parameters in the popup
+
+        :param result: (FitResult) result to display
+        :param status: (str) fit statistics to display
+        """
+        popt = result.popt if result.success else np.zeros(len(self.fit_params))
+        for ind, param in enumerate(self.fit_params):
+            self.pop.fparams[param].setText(str(popt[ind]))
+        self.pop.status.setText(status)
+
     def init_ui(self, obj):
         obj.setObjectName("Form")
         obj.resize(982, 793)
@@ -151,6 +226,11 @@ class FitModel():
         col = 2
 
         obj.main.setLayout(lab_ct + 1, QtWidgets.QFormLayout.FieldRole, obj.gridlayout)
+
+        obj.status = QtWidgets.QLabel(obj.formLayoutWidget)
+        obj.status.setObjectName("status")
+        obj.status.setText("")
+        obj.main.setWidget(lab_ct + 2, QtWidgets.QFormLayout.SpanningRole, obj.status)
         QtCore.QMetaObject.connectSlotsByName(obj)
         obj.show()
 
@@ -4,6 +4,7 @@ import numpy as np
 import time
 import pyqtgraph as pg
 from pylabnet.gui.pyqt.external_gui import Window
+from pylabnet.gui.pyqt.acquisition_loop import AcquisitionLoop
 from pylabnet.utils.logging.logger import LogClient
 from pylabnet.scripts.pause_script import PauseService
 from pylabnet.network.core.generic_server import GenericServer
@@ -15,6 +16,9 @@ from pyqtgraph.graphicsItems.LegendItem import LegendItem
 from PyQt5 import QtWidgets
 
 
+REFRESH_RATE = 30   # default number of updates per second
+
+
 class CountMonitor:
 
     def __init__(self, ctr_client: si_tt.Client, ui='count_monitor_flex', logger_client=None, server_port=None, config=None):
@@ -33,6 +37,8 @@ class CountMonitor:
         self._ch_list = None
         self._plot_list = None  # List of channels to assign to each plot (e.g. [[1,2], [3,4]])
         self._plots_assigned = []  # List of plots on the GUI that have been assigned
+        self._trace = None  # Local copy of the plotted count traces
+        self._clear_requested = False  # Clear counter and trace on the acquisition thread
 
         # Instantiate GUI window
         self.gui = Window(
@@ -58,6 +64,16 @@ class CountMonitor:
 
         generate_widgets(self, num_plots)
 
+        # Fetch counts on a worker thread at a limited rate
+        self._loop = AcquisitionLoop(
+            acquire=self._get_output,
+            display=self._update_output,
+            rate=self.config.get('refresh_rate', REFRESH_RATE),
+            status_bar=self.gui.statusBar(),
+            logger=self.log,
+            name=self.config['name']
+        )
+
         # Get all GUI widgets
         self.widgets = get_gui_widgets(
             self.gui,
@@ -110,55 +126,42 @@ class CountMonitor:
             self._ch_names = {}
 
     def run(self):
-        """ Runs the counter from scratch"""
+        """ Runs the counter from scratch, blocks until paused """
 
-        try:
+        # Start the counter with desired parameters
+        self._initialize_display()
 
-            # Start the counter with desired parameters
-            self._initialize_display()
-
-            # Give time to initialize
-            # time.sleep(0.05)
-            self._is_running = True
-
-            self._ctr.start_trace(
-                name=self.config['name'],
-                ch_list=self._ch_list,
-                bin_width=self._bin_width,
-                n_bins=self._n_bins
-            )
-
-            # Continuously update data until paused
-            while self._is_running:
-                self._update_output()
-                self.gui.force_update()
+        self._ctr.start_trace(
+            name=self.config['name'],
+            ch_list=self._ch_list,
+            bin_width=self._bin_width,
+            n_bins=self._n_bins
+        )
+        self._trace = si_tt.CountTrace(
+            self._ctr,
+            name=self.config['name'],
+            n_bins=self._n_bins,
+            n_channels=len(self._ch_list),
+            combine=self._get_plot_weights()
+        )
 
-        except Exception as exc_obj:
-            self._is_running = False
-            raise exc_obj
+        # Continuously update data until paused
+        self._loop.run()
 
     def pause(self):
         """ Pauses the counter"""
 
-        self._is_running = False
+        self._loop.stop()
 
     def resume(self):
-        """ Resumes the counter.
+        """ Resumes the counter, blocks until paused.
 
         To be used to resume after the counter has been paused.
         """
 
-        try:
-            self._is_running = True
-
-            # Clear counter and resume plotting
-            self._ctr.clear_ctr(name=self.config['name'])
-            while self._is_running:
-                self._update_output()
-
-        except Exception as exc_obj:
-            self._is_running = False
-            raise exc_obj
+        # Clear counter and resume plotting
+        self._clear_requested = True
+        self._loop.run()
 
     # Technical methods
 
@@ -258,36 +261,59 @@ class CountMonitor:
         #     np.ones(self._n_bins) * self.widgets[f'curve_{plot_index}'].yData[-1]
         # )
 
-        self._ctr.clear_ctr(name=self.config['name'])
+        # The trace is updated on the acquisition thread, see _get_output()
+        self._clear_requested = True
 
-    def _update_output(self):
-        """ Updates the output to all current values"""
+    def _get_plot_weights(self):
+        """ Returns the weights of the channels in each plotted curve
 
-        # Update all active channels
-        counts = self._ctr.get_counts(name=self.config['name'])
-        counts_per_sec = counts * (1e12 / self._bin_width)
+        :return: (np.ndarray) array of shape (number of plots, number of
+            channels), converting counts per bin into the count rate of each curve
+        """
+
+        weights = np.zeros([len(self._plot_list), len(self._ch_list)])
+        for plot_index, plot_entry in enumerate(self._plot_list):
+            plot_channels = plot_entry if np.iterable(plot_entry) else [plot_entry]
+            for index, channel in enumerate(self._ch_list):
+                if channel in plot_channels:
+                    weights[plot_index, index] = 1e12 / self._bin_width
+
+        return weights
+
+    def _get_output(self):
+        """ Fetches new counts, runs on the acquisition thread
+
+        :return: (tuple) latest count rate of each channel and copies of the
+            plotted traces, None if no bin was completed since the last call
+        """
+
+        if self._clear_requested:
+            self._clear_requested = False
+            self._ctr.clear_ctr(name=self.config['name'])
+            self._trace.reset()
 
-        # container for all plotted curves
-        plot_data = np.zeros([len(self._plot_list), self._n_bins])
+        # Only fetch the bins completed since the last update
+        if self._trace.update() == 0:
+            return None
 
-        # cycle through measured channels
-        for index, count_array in enumerate(counts_per_sec):
+        counts_per_sec = self._trace.last_counts * (1e12 / self._bin_width)
+        return counts_per_sec, [trace.copy() for trace in self._trace.get_traces()]
 
-            # check if current channel is in any plotted curves
-            # if yes, add current channel data to appropriate curves
-            for plot_index, plot_entry in enumerate(self._plot_list):
-                if self._ch_list[index] in plot_entry:
-                    plot_data[plot_index] += count_array
+    def _update_output(self, output):
+        """ Updates the output to the values fetched by _get_output()
 
-            # Figure out which plot to assign to
-            channel = self._ch_list[index]
+        :param output: (tuple) count rates and traces
+        """
+
+        counts_per_sec, traces = output
 
-            # Update GUI labels
-            self.widgets[f'number_label'][channel - 1].setText(str(count_array[-1]))
+        # Update GUI labels
+        for index, channel in enumerate(self._ch_list):
+            self.widgets[f'number_label'][channel - 1].setText(str(counts_per_sec[index]))
 
         # Update GUI curves
-        for plot_index, plot_entry in enumerate(self._plot_list):
-            self.widgets[f'curve_{plot_index}'].setData(plot_data[plot_index])
+        for plot_index, trace in enumerate(traces):
+            self.widgets[f'curve_{plot_index}'].setData(trace)
 
 
 def launch(**kwargs):
@@ -9,6 +9,7 @@ from pyqtgraph.widgets.MatplotlibWidget import MatplotlibWidget
 from pylabnet.gui.pyqt.external_gui import Window, ParameterPopup, GraphPopup, Confluence_support_GraphPopup, Confluence_Handler, GraphPopupTabs, Confluence_support_GraphPopupTabs
 from pylabnet.utils.logging.logger import LogClient, LogHandler
 from pylabnet.utils.helper_methods import save_metadata, generic_save, npy_generic_save, pyqtgraph_save, fill_2dlist, TimeAxisItem
+from pylabnet.utils.ring_buffer import RingBuffer, GrowableBuffer
 
 import sys
 
@@ -339,6 +340,24 @@ class Dataset():
             for child in self.children.values():
                 child.save(filename, directory, date_dir, unique_id)
 
+    def get_save_arrays(self):
+        """ Returns the arrays of this dataset and its children to save
+
+        Used for incremental autosaves with IncrementalWriter, names are
+        chosen as in save().
+
+        :return: (dict) {name: array}
+        """
+
+        arrays = {self.name: self.data}
+        if self.x is not None:
+            arrays[f'{self.name}_x'] = self.x
+
+        for child in self.children.values():
+            arrays.update(child.get_save_arrays())
+
+        return arrays
+
     def add_params_to_gui(self, **params):
         """ Adds parameters of dataset to gui
 
@@ -680,10 +699,17 @@ class InvisibleRollingData(Dataset):
 
 class RollingLine(Dataset):
     """ Implements a rolling dataset where new values are
-        added incrementally e.g. in time-traces """
+        added incrementally e.g. in time-traces
+
+        Values are stored in a preallocated RingBuffer, so adding a value
+        costs O(1) and self.data is a contiguous view of the buffer. The view
+        is overwritten in place by later values, so copies are plotted. """
 
     def __init__(self, *args, **kwargs):
 
+        # Storage for the data, created once data_length is known
+        self._buffer = None
+
         # We need to know the data length, so prompt if necessary
         if 'data_length' in kwargs and kwargs['data_length'] is not None:
             self.data_length = kwargs['data_length']
@@ -698,30 +724,77 @@ class RollingLine(Dataset):
         self.data_length = params['data_length']
         self.waiting = False
 
+    def _new_buffer(self):
+        """ Creates the storage for the data """
+
+        return RingBuffer(capacity=self.data_length)
+
+    @property
+    def data(self):
+        """ Stored values, oldest first (view of the buffer, not a copy) """
+
+        if self._buffer is None or len(self._buffer) == 0:
+            return None
+        return self._buffer.view()
+
+    @data.setter
+    def data(self, data):
+        """ Replaces all stored values
+
+        :param data: (array or None) new values, None clears the data
+        """
+
+        if data is None:
+            if self._buffer is not None:
+                self._buffer.clear()
+            return
+
+        # Copy first, data may be a view of the current buffer
+        data = np.array(data, dtype=float)
+        self._buffer = self._new_buffer()
+        self._buffer.append(data)
+
     def set_data(self, data):
         """ Updates data
 
         :param data: (scalar) data to add
         """
 
-        if self.data is None:
-            self.data = np.array([data])
-
-        else:
-            if len(self.data) == self.data_length:
-                self.data = np.append(self.data, data)[1:]
-            else:
-                self.data = np.append(self.data, data)
+        if self._buffer is None:
+            self._buffer = self._new_buffer()
+        self._buffer.append(data)
 
         for name, child in self.children.items():
             # If we need to process the child data, do it
             if name in self.mapping:
                 self.mapping[name](self, prev_dataset=child)
 
+    def update(self, **kwargs):
+        """ Updates current data to plot"""
+
+        # pyqtgraph keeps the arrays passed to setData(), pass copies of the
+        # buffer views since they change with the next set_data()
+        if self.data is not None:
+            if self.x is not None:
+                self.curve.setData(np.array(self.x[:len(self.data)]), np.array(self.data))
+            else:
+                self.curve.setData(np.array(self.data))
+
+        for child in self.children.values():
+            child.update(**kwargs)
+
 
 class InfiniteRollingLine(RollingLine):
     """ Extension of RollingLine that stores the data
-        indefinitely, but still only plots a finite amount """
+        indefinitely, but still only plots a finite amount
+
+        Values are stored in a GrowableBuffer, so adding values costs
+        amortized O(1) and only the plotted tail is copied. """
+
+    def _new_buffer(self):
+        """ Creates the storage for the data """
+
+        return GrowableBuffer()
 
     def set_data(self, data):
         """ Updates data
@@ -729,13 +802,9 @@ class InfiniteRollingLine(RollingLine):
         :param data: (scalar or array) data to add
         """
 
-        if self.data is None:
-            if (np.isscalar(data)):
-                self.data = np.array([data])
-            else:
-                self.data = np.array(data)
-        else:
-            self.data = np.append(self.data, data)
+        if self._buffer is None:
+            self._buffer = self._new_buffer()
+        self._buffer.append(data)
 
     def update(self, **kwargs):
         """ Updates current data to plot"""
@@ -744,9 +813,9 @@ class InfiniteRollingLine(RollingLine):
 
             if len(self.data) > self.data_length:
                 if self.x is not None:
-                    self.curve.setData(self.x, self.data[-self.data_length:])
+                    self.curve.setData(self.x, np.array(self._buffer.tail(self.data_length)))
                 else:
-                    self.curve.setData(self.data[-self.data_length:])
+                    self.curve.setData(np.array(self._buffer.tail(self.data_length)))
 
                 for name, child in self.children.items():
                     # If we need to process the child data, do it
@@ -759,11 +828,38 @@ class InfiniteRollingLine(RollingLine):
 
 class time_trace_monitor(RollingLine):
     def __init__(self, *args, **kwargs):
+        # Storage for the time stamps, created with the data buffer
+        self._x_buffer = None
+
         if ('data_length' not in kwargs):
             kwargs['data_length'] = "just to bypass the popup window and the datalength will be set up later"
         kwargs['datetime_axis'] = True
         super().__init__(*args, **kwargs)
 
+    @property
+    def x(self):
+        """ Time stamps of the stored values (view of the buffer, not a copy) """
+
+        if self._x_buffer is None or len(self._x_buffer) == 0:
+            return None
+        return self._x_buffer.view()
+
+    @x.setter
+    def x(self, x):
+        """ Replaces all stored time stamps
+
+        :param x: (array or None) new time stamps, None clears them
+        """
+
+        if x is None:
+            if self._x_buffer is not None:
+                self._x_buffer.clear()
+            return
+
+        x = np.array(x, dtype=float)
+        self._x_buffer = RingBuffer(capacity=self.data_length)
+        self._x_buffer.append(x)
+
     def set_data(self, data):
         """ Updates data
 
@@ -771,23 +867,13 @@ class time_trace_monitor(RollingLine):
         """
         dt_timestamp = time.time()
 
-        if self.data is None:
-            self.data = np.array([data])
-
-        else:
-            if len(self.data) >= self.data_length:
-                self.data = np.append(self.data, data)[-1 * self.data_length:]
-            else:
-                self.data = np.append(self.data, data)
+        if self._buffer is None:
+            self._buffer = self._new_buffer()
+        self._buffer.append(data)
 
-        if self.x is None:
-            self.x = np.array([dt_timestamp])
-
-        else:
-            if len(self.x) >= self.data_length:
-                self.x = np.append(self.x, dt_timestamp)[-1 * self.data_length:]
-            else:
-                self.x = np.append(self.x, dt_timestamp)
+        if self._x_buffer is None:
+            self._x_buffer = RingBuffer(capacity=self.data_length)
+        self._x_buffer.append(dt_timestamp)
 
         for name, child in self.children.items():
             # If we need to process the child data, do it
@@ -1600,6 +1686,19 @@ class Plot2D(Dataset):
                 self.data[y, x] = value
                 self.position += 1
 
+    def get_save_arrays(self):
+
+        arrays = {
+            self.name: self.data,
+            f'{self.name}_x': np.linspace(self.min_x, self.max_x, self.pts_x),
+            f'{self.name}_y': np.linspace(self.min_y, self.max_y, self.pts_y)
+        }
+
+        for child in self.children.values():
+            arrays.update(child.get_save_arrays())
+
+        return arrays
+
     def save(self, filename=None, directory=None, date_dir=True, unique_id=None):
 
         # save axes
@@ -1790,6 +1889,16 @@ class Plot2DWithAvg(Plot2D):
 
         self.set_children_data()
 
+    def get_save_arrays(self):
+
+        arrays = super().get_save_arrays()
+
+        # Completed frames only grow, such that they are appended incrementally
+        arrays[self.name] = self.all_data if len(self.all_data) > 0 else None
+        arrays[f'{self.name}_current'] = self.data
+
+        return arrays
+
     def save(self, filename=None, directory=None, date_dir=True, unique_id=None):
 
         # save axes
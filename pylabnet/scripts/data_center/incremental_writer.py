@@ -0,0 +1,400 @@
+""" Background writer for incremental autosaves of datasets
+
+Dataset.save() rewrites every array as text on the GUI thread, so the cost
+of an autosave grows with the size of the dataset. IncrementalWriter instead
+receives the current arrays of all datasets (see Dataset.get_save_arrays())
+and writes only what changed since the last save, in a background thread:
+
+    writer = IncrementalWriter(path, logger=log)
+    writer.save(dataset.get_save_arrays())  # returns immediately
+    ...
+    writer.close()
+
+Each array is stored as a stream of .npy segments in its own subdirectory of
+path. If an array grew and its previously saved rows are unchanged (e.g. a
+rolling trace or a sweep), only the new rows are written as a new segment.
+To keep the cost of a save independent of the size of the dataset, the
+previously saved rows are not compared in full, but only the last saved row
+and a uniform random sample of SAMPLED_ROWS saved rows (kept with reservoir
+sampling as rows are appended). Changes to many saved rows, as well as to any
+row of short arrays, are therefore detected, while a change to a single early
+row of a long array may go unnoticed: the writer is meant for data that is
+appended to.
+Otherwise (e.g. an averaged histogram), a full snapshot replaces the stream,
+and arrays that did not change at all are skipped. The segments of each
+stream are listed in manifest.json, which is replaced atomically after each
+save, such that it always describes a consistent state:
+
+    {"version": 1, "saves": 12, "streams": {"counts": {"dtype": "float64",
+     "rows": 2000, "segments": ["counts/00000011.npy", ...]}}}
+
+load_incremental() reassembles the arrays from a save directory.
+
+fsync policy:
+    'none': leave writing to disk to the operating system
+    'save': fsync the segments and the manifest once per save
+    'segment': additionally fsync each segment directly after writing it
+"""
+
+import os
+import json
+import queue
+import hashlib
+import threading
+import numpy as np
+from pylabnet.utils.logging.logger import LogHandler
+
+
+MANIFEST = 'manifest.json'
+FSYNC_POLICIES = ('none', 'save', 'segment')
+
+# Number of earlier saved rows compared on each save to detect changed data
+SAMPLED_ROWS = 16
+
+
+def _fsync(path):
+    """ Flushes a file or directory to disk
+
+    :param path: (str) path of file or directory
+    """
+
+    flags = os.O_RDONLY
+    if os.path.isdir(path):
+        # Directories cannot be opened on Windows, nor do they need syncing
+        if os.name == 'nt':
+            return
+        flags |= getattr(os, 'O_DIRECTORY', 0)
+
+    fd = os.open(path, flags)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class _Stream:
+    """ Saved state of one array """
+
+    def __init__(self, name):
+        self.name = name
+
+        # Array as of the last call to save(), used by the calling thread to
+        # detect appended data. samples are {index: row} copies of the last
+        # saved row and of the rows in the reservoir sample_indices.
+        self.rows = 0
+        self.row_shape = None
+        self.dtype = None
+        self.sample_indices = []
+        self.samples = {}
+
+        # State on disk, only used by the writer thread. The digest of the
+        # last snapshot is used to skip unchanged arrays. Appends are skipped
+        # after a failed write until the next snapshot has been written.
+        self.written_rows = 0
+        self.needs_snapshot = False
+        self.written_dtype = None
+        self.digest = None
+        self.segments = []
+
+    def to_dict(self):
+        return dict(dtype=self.written_dtype, rows=self.written_rows, segments=list(self.segments))
+
+
+class IncrementalWriter:
+    """ Writes only new data of a set of arrays to .npy segments in a background thread """
+
+    def __init__(self, path, fsync='save', logger=None):
+        """ Instantiates a writer and starts its thread
+
+        :param path: (str) directory to save to, created if it does not exist
+        :param fsync: (str) fsync policy, 'none', 'save' or 'segment'
+        :param logger: (LogClient, optional) for reporting write errors
+        """
+
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f'fsync policy must be one of {FSYNC_POLICIES}, not {fsync}')
+
+        self.path = path
+        self.fsync = fsync
+        self.log = LogHandler(logger)
+
+        self.saves = 0
+        self.bytes_written = 0
+
+        self._streams = {}
+        self._segment_index = 0
+        self._queue = queue.Queue()
+        self._error_logged = False
+        self._rng = np.random.default_rng()
+
+        # Guards the caller side state of the streams, which is reset by the
+        # writer thread after a failed write
+        self._lock = threading.Lock()
+
+        os.makedirs(self.path, exist_ok=True)
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def save(self, arrays):
+        """ Schedules a save of the new data in arrays
+
+        Appended rows are copied immediately, so the arrays may be modified
+        after this call returns.
+
+        :param arrays: (dict) {name: array}, names may contain '/' but no '..'.
+            Lists of equally shaped rows are accepted as well.
+        """
+
+        if not self._thread.is_alive():
+            raise RuntimeError('IncrementalWriter is closed')
+
+        updates = {}
+        for name, data in arrays.items():
+            if data is None:
+                continue
+            try:
+                with self._lock:
+                    updates[name] = self._prepare(name, data)
+            except ValueError:
+                self._log_error(f'Cannot save {name}: not a numeric array')
+
+        self._queue.put(updates)
+
+    def flush(self):
+        """ Blocks until all scheduled saves are written """
+
+        self._queue.join()
+
+    def close(self):
+        """ Writes all scheduled saves and stops the writer thread """
+
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _prepare(self, name, data):
+        """ Determines which part of data needs to be written
+
+        Runs in the calling thread, such that the writer only sees copies.
+
+        :param name: (str) name of the array
+        :param data: (np.ndarray or list) current array
+        :return: (tuple) ('append', new rows) or ('snapshot', full array)
+        """
+
+        if not isinstance(data, list):
+            data = np.atleast_1d(np.asarray(data))
+
+        stream = self._streams.get(name)
+        if stream is None:
+            stream = self._streams[name] = _Stream(name)
+
+        rows = None
+
+        # Data grew and the sampled saved rows are unchanged
+        if stream.rows > 0 and len(data) > stream.rows and self._samples_unchanged(stream, data):
+            rows = np.array(data[stream.rows:])
+            if rows.shape[1:] == stream.row_shape and rows.dtype.str == stream.dtype:
+                kind = 'append'
+            else:
+                rows = None
+
+        if rows is None:
+            rows = np.array(data)
+            kind = 'snapshot'
+
+        if rows.dtype == object:
+            raise ValueError(f'{name} is not a numeric array')
+
+        stream.rows = len(data)
+        stream.row_shape = rows.shape[1:]
+        stream.dtype = rows.dtype.str
+
+        # Keep copies of the rows to check on the next save
+        if kind == 'snapshot':
+            stream.sample_indices = []
+            stream.samples = {}
+        self._update_samples(stream, rows)
+        return kind, rows
+
+    def _update_samples(self, stream, rows):
+        """ Adds newly saved rows to the reservoir sample of a stream
+
+        :param stream: (_Stream) saved state of the array, with rows already updated
+        :param rows: (np.ndarray) rows saved last, at the end of the array
+        """
+
+        offset = stream.rows - len(rows)
+        indices = np.arange(offset, stream.rows)
+
+        # Fill the reservoir, then replace a random slot with probability
+        # SAMPLED_ROWS / (index + 1) for each further row
+        fill = max(0, SAMPLED_ROWS - len(stream.sample_indices))
+        stream.sample_indices.extend(indices[:fill].tolist())
+        indices = indices[fill:]
+        if len(indices) > 0:
+            slots = self._rng.integers(0, indices + 1)
+            replaced = slots < SAMPLED_ROWS
+            for index, slot in zip(indices[replaced].tolist(), slots[replaced].tolist()):
+                stream.sample_indices[slot] = index
+
+        sampled = set(stream.sample_indices)
+        if stream.rows > 0:
+            sampled.add(stream.rows - 1)
+        stream.samples = {
+            index: np.array(rows[index - offset]) if index >= offset else stream.samples[index]
+            for index in sampled
+        }
+
+    @staticmethod
+    def _samples_unchanged(stream, data):
+        """ Checks whether the sampled saved rows of a stream are unchanged in data
+
+        :param stream: (_Stream) saved state of the array
+        :param data: (np.ndarray or list) current array
+        :return: (bool) whether all sampled rows are unchanged
+        """
+
+        # The last saved row is checked first, as it is the most likely to change
+        for index in sorted(stream.samples, reverse=True):
+            row = np.asarray(data[index])
+            if (row.shape != stream.row_shape
+                    or row.dtype.str != stream.dtype
+                    or not np.array_equal(row, stream.samples[index])):
+                return False
+        return True
+
+    def _run(self):
+        while True:
+            updates = self._queue.get()
+            try:
+                if updates is None:
+                    return
+                self._write(updates)
+            except Exception as error:
+                self._log_error(f'Incremental save to {self.path} failed: {error}')
+
+                # Appended rows may be missing, write full snapshots next time.
+                # Appends already scheduled are skipped until then.
+                with self._lock:
+                    for stream in self._streams.values():
+                        stream.rows = 0
+                        stream.needs_snapshot = True
+            finally:
+                self._queue.task_done()
+
+    def _write(self, updates):
+        """ Writes the segments of one save and replaces the manifest
+
+        :param updates: (dict) {name: (kind, array)} from _prepare()
+        """
+
+        written = []
+        obsolete = []
+        for name, (kind, data) in updates.items():
+            stream = self._streams[name]
+
+            if kind == 'snapshot':
+                digest = hashlib.sha1(data.tobytes()).hexdigest() + str(data.shape)
+                if digest == stream.digest:
+                    stream.needs_snapshot = False
+                    continue
+            elif len(data) == 0 or stream.needs_snapshot:
+                continue
+
+            segment = f'{name}/{self._segment_index:08d}.npy'
+            self._segment_index += 1
+            filepath = os.path.join(self.path, *segment.split('/'))
+            os.makedirs(os.path.dirname(filepath), exist_ok=True)
+
+            with open(filepath, 'wb') as segment_file:
+                np.save(segment_file, data)
+                if self.fsync == 'segment':
+                    segment_file.flush()
+                    os.fsync(segment_file.fileno())
+
+            # Only update the stream once its segment is written
+            if kind == 'snapshot':
+                obsolete.extend(stream.segments)
+                stream.segments = []
+                stream.written_rows = 0
+                stream.digest = digest
+                stream.needs_snapshot = False
+            else:
+                stream.digest = None
+
+            stream.segments.append(segment)
+            stream.written_rows += len(data)
+            stream.written_dtype = data.dtype.str
+            written.append(filepath)
+            self.bytes_written += data.nbytes
+
+        if self.fsync == 'save':
+            for filepath in written:
+                _fsync(filepath)
+
+        self.saves += 1
+        self._write_manifest()
+
+        # Only remove replaced segments once the manifest no longer lists them
+        for segment in obsolete:
+            try:
+                os.remove(os.path.join(self.path, *segment.split('/')))
+            except OSError:
+                pass
+
+    def _write_manifest(self):
+        """ Atomically replaces the manifest with the current state """
+
+        manifest = dict(
+            version=1,
+            saves=self.saves,
+            streams={name: stream.to_dict() for name, stream in self._stream_items() if stream.segments}
+        )
+
+        filepath = os.path.join(self.path, MANIFEST)
+        tmp_filepath = filepath + '.tmp'
+        with open(tmp_filepath, 'w') as manifest_file:
+            json.dump(manifest, manifest_file, indent=4)
+            if self.fsync != 'none':
+                manifest_file.flush()
+                os.fsync(manifest_file.fileno())
+        os.replace(tmp_filepath, filepath)
+
+        if self.fsync != 'none':
+            _fsync(self.path)
+
+    def _stream_items(self):
+        """ Returns a snapshot of the streams, which may be added to by the calling thread """
+
+        with self._lock:
+            return list(self._streams.items())
+
+    def _log_error(self, msg):
+        """ Logs an error once per writer, to avoid flooding the log on each autosave """
+
+        if not self._error_logged:
+            self.log.error(msg)
+            self._error_logged = True
+
+
+def load_incremental(path):
+    """ Loads the arrays saved by an IncrementalWriter
+
+    :param path: (str) save directory of the writer
+    :return: (dict) {name: np.ndarray}
+    """
+
+    with open(os.path.join(path, MANIFEST), 'r') as manifest_file:
+        manifest = json.load(manifest_file)
+
+    arrays = {}
+    for name, stream in manifest['streams'].items():
+        segments = [
+            np.load(os.path.join(path, *segment.split('/')))
+            for segment in stream['segments']
+        ]
+        arrays[name] = np.concatenate(segments) if len(segments) > 1 else segments[0]
+
+    return arrays
@@ -13,8 +13,9 @@ from PyQt5.QtCore import Qt
 
 from pylabnet.utils.logging.logger import LogHandler
 from pylabnet.gui.pyqt.external_gui import Window
-from pylabnet.utils.helper_methods import load_config, generic_save, unpack_launcher, save_metadata, load_script_config, find_client, get_ip
+from pylabnet.utils.helper_methods import load_config, generic_save, unpack_launcher, save_metadata, load_script_config, find_client, get_ip, generate_filepath
 from pylabnet.scripts.data_center import datasets
+from pylabnet.scripts.data_center.incremental_writer import IncrementalWriter
 from PyQt5.QtWidgets import QLabel, QLineEdit, QPushButton
 
 
@@ -28,6 +29,9 @@ class DataTaker:
         self.log = LogHandler(logger)
         self.dataset = None
 
+        # Background writer for incremental autosaves of the current run
+        self.writer = None
+
         # Instantiate GUI window
         self.gui = Window(
             gui_template='data_taker',
@@ -59,6 +63,11 @@ class DataTaker:
             if self.config['auto_save']:
                 self.gui.autosave.setChecked(True)
 
+        # Whether autosaves only append new data to .npy segments in the
+        # background, instead of saving all data as text (see IncrementalWriter)
+        self.incremental_save = self.config.get('incremental_save', False)
+        self.fsync = self.config.get('fsync', 'save')
+
         # Retrieve Clients
         for client_entry in self.config['servers']:
             client_type = client_entry['type']
@@ -322,7 +331,7 @@ class DataTaker:
                 save_time=self.gui.autosave_interval.value()
             )
             self.update_thread.data_updated.connect(self.dataset.update)
-            self.update_thread.save_flag.connect(self.save)
+            self.update_thread.save_flag.connect(self.autosave)
             self.gui.autosave.toggled.connect(self.update_thread.update_autosave)
             self.gui.autosave_interval.valueChanged.connect(self.update_thread.update_autosave_interval)
 
@@ -403,7 +412,34 @@ class DataTaker:
 
         # Autosave if relevant
         if self.gui.autosave.isChecked():
+            self.autosave()
+
+        if self.writer is not None:
+            self.writer.close()
+            self.log.info(f'Incremental save completed in {self.writer.path}')
+            self.writer = None
+
+    def autosave(self):
+        """ Saves data, only appending new data in the background if incremental saves are enabled """
+
+        if not self.incremental_save:
             self.save()
+            return
+
+        # One save directory per run
+        if self.writer is None:
+            unique_id = str(uuid.uuid4())
+            filename = self.gui.save_name.text()
+            directory = self.config['save_path']
+            self.log.update_metadata(notes=self.gui.notes.toPlainText())
+            self.writer = IncrementalWriter(
+                path=generate_filepath(f'{filename}_{unique_id}', directory, True),
+                fsync=self.fsync,
+                logger=self.log
+            )
+            save_metadata(self.log, filename, directory, True, unique_id)
+
+        self.writer.save(self.dataset.get_save_arrays())
 
     def save(self):
         """ Saves data """
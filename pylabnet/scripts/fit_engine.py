@@ -0,0 +1,336 @@
+""" Background fitting of live data
+
+The fit add-ons of the scan and histogram GUIs used to call curve_fit on the
+GUI thread on every update, which stalls the display whenever a fit is slow.
+FitEngine runs the fits on a thread pool instead. Fits are identified by a
+key (e.g. 'fwd' and 'bwd' for the two directions of a scan):
+
+    engine = FitEngine(logger=log)
+    engine.submit('fwd', lorentzian, x, y, p0, jac=lorentzian_jac)  # returns immediately
+    ...
+    result = engine.take_result('fwd')  # None until a new result is available
+    if result is not None and result.success:
+        curve.setData(result.x, result.fit)
+
+Each fit of a key is warm-started from the parameters of the previous
+successful fit, unless reset=True (e.g. after new initial guesses were
+entered). A submission is skipped if the data changed by less than rtol
+(relative to its norm) since the last fit, and if a fit of the key is still
+running, only the latest submission is kept and fitted afterwards.
+"""
+
+import time
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from scipy.optimize import curve_fit
+from pylabnet.utils.logging.logger import LogHandler
+from pylabnet.utils.ring_buffer import RingBuffer
+
+
+class FitResult:
+    """ Outcome of a fit """
+
+    def __init__(self, x, popt, pcov, fit, success, latency, warm_start, error=None):
+        """ Instantiates a result
+
+        :param x: (np.array) x values that were fitted
+        :param popt: (np.array) fitted parameters, None if the fit failed
+        :param pcov: (np.array) covariance of popt, None if the fit failed
+        :param fit: (np.array) fitted function evaluated at x, None if the fit failed
+        :param success: (bool) whether the fit converged
+        :param latency: (float) duration of the fit in s
+        :param warm_start: (bool) whether the fit started from a previous result
+        :param error: (Exception, optional) error raised by the fit
+        """
+
+        self.x = x
+        self.popt = popt
+        self.pcov = pcov
+        self.fit = fit
+        self.success = success
+        self.latency = latency
+        self.warm_start = warm_start
+        self.error = error
+
+
+class _FitJob:
+    """ State of the fits of one key """
+
+    def __init__(self):
+
+        # Latest submission that has not been started, (func, x, y, p0, jac, reset)
+        self.pending = None
+        self.running = False
+
+        # Data and function of the last started fit, used to skip unchanged data
+        self.func = None
+        self.x = None
+        self.y = None
+
+        # Parameters of the last successful fit, used to warm-start
+        self.popt = None
+
+        self.result = None
+        self.new_result = False
+
+
+class FitEngine:
+    """ Runs fits on a thread pool, warm-started from previous results """
+
+    # Number of fits used for latency statistics
+    HISTORY = 1000
+
+    def __init__(self, max_workers=2, rtol=1e-3, logger=None):
+        """ Instantiates the engine
+
+        :param max_workers: (int) number of fits that can run in parallel
+        :param rtol: (float) minimum relative change of the data to refit
+        :param logger: (LogClient, optional) for reporting errors
+        """
+
+        self.rtol = rtol
+        self.log = LogHandler(logger)
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='fit')
+        self._jobs = {}
+        self._lock = threading.Condition()
+
+        # Number of fits in progress, including those of cleared keys
+        self._running = 0
+
+        self.reset_statistics()
+
+    def submit(self, key, func, x, y, p0, jac=None, reset=False):
+        """ Schedules a fit of func to y(x)
+
+        :param key: (hashable) identifier of the fitted dataset
+        :param func: (callable) model func(x, *params)
+        :param x: (np.array) x values
+        :param y: (np.array) data to fit
+        :param p0: (list) initial guesses, used unless a previous fit of the
+            same func can be warm-started from
+        :param jac: (callable, optional) analytic Jacobian jac(x, *params),
+            returning an array of shape (len(x), len(params))
+        :param reset: (bool) whether to start from p0 and refit even if
+            the data did not change
+
+        :return: (bool) whether the fit was scheduled, False if it was skipped
+            because the data did not change meaningfully
+        """
+
+        x = np.array(x, dtype=float)
+        y = np.array(y, dtype=float)
+
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None:
+                job = self._jobs[key] = _FitJob()
+
+            if not reset and job.pending is None and not self._changed(job, func, x, y):
+                self._skipped += 1
+                return False
+
+            # Keep a reset requested by a replaced submission
+            if job.pending is not None:
+                self._coalesced += 1
+                reset = reset or job.pending[5]
+            job.pending = (func, x, y, p0, jac, reset)
+
+            if not job.running:
+                self._start(key, job)
+
+        return True
+
+    def take_result(self, key):
+        """ Returns the latest result of a key, if it has not been taken yet
+
+        :param key: (hashable) identifier used in submit()
+        :return: (FitResult) new result or None
+        """
+
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or not job.new_result:
+                return None
+            job.new_result = False
+            return job.result
+
+    def get_result(self, key):
+        """ Returns the latest result of a key
+
+        :param key: (hashable) identifier used in submit()
+        :return: (FitResult) latest result or None
+        """
+
+        with self._lock:
+            job = self._jobs.get(key)
+            return None if job is None else job.result
+
+    def wait(self, timeout=None):
+        """ Blocks until all submitted fits are done
+
+        :param timeout: (float, optional) maximum time to wait in s
+        :return: (bool) whether all fits are done
+        """
+
+        with self._lock:
+            return self._lock.wait_for(lambda: self._running == 0, timeout=timeout)
+
+    def clear(self, key=None):
+        """ Forgets previous results, such that the next fit starts from p0
+
+        :param key: (hashable, optional) identifier used in submit(), all
+            keys if not given
+        """
+
+        # Fits that are still running finish on the discarded state, but are
+        # still waited for by wait()
+        with self._lock:
+            if key is None:
+                self._jobs = {}
+            else:
+                self._jobs.pop(key, None)
+
+    def close(self):
+        """ Stops the worker threads after the running fits """
+
+        with self._lock:
+            for job in self._jobs.values():
+                job.pending = None
+        self._executor.shutdown(wait=False)
+
+    def get_statistics(self):
+        """ Returns statistics of the recent fits
+
+        :return: (dict) with total number of 'fits', 'failed' fits, 'skipped'
+            submissions (unchanged data) and 'coalesced' submissions (replaced
+            before being fitted), and 'latency_ms', 'latency_max_ms' mean and
+            maximum fit durations in ms
+        """
+
+        with self._lock:
+            stats = dict(
+                fits=self._fits,
+                failed=self._failed,
+                skipped=self._skipped,
+                coalesced=self._coalesced,
+                latency_ms=0,
+                latency_max_ms=0
+            )
+
+            latencies = self._latencies.view()
+            if len(latencies) > 0:
+                stats['latency_ms'] = float(1e3 * np.mean(latencies))
+                stats['latency_max_ms'] = float(1e3 * np.max(latencies))
+
+        return stats
+
+    def get_statistics_text(self):
+        """ Returns a one-line summary of get_statistics()
+
+        :return: (str) summary
+        """
+
+        stats = self.get_statistics()
+        return (
+            f'Fit latency {stats["latency_ms"]:.1f} ms (max {stats["latency_max_ms"]:.1f} ms), '
+            f'{stats["fits"]} fits, {stats["failed"]} failed, {stats["skipped"]} skipped'
+        )
+
+    def reset_statistics(self):
+        """ Resets the statistics returned by get_statistics() """
+
+        with self._lock:
+            self._fits = 0
+            self._failed = 0
+            self._skipped = 0
+            self._coalesced = 0
+            self._latencies = RingBuffer(self.HISTORY)
+
+    # Technical methods
+
+    def _changed(self, job, func, x, y):
+        """ Checks whether data differs meaningfully from the last fitted data
+
+        :param job: (_FitJob) state of the key
+        :param func: (callable) model to fit
+        :param x: (np.array) x values
+        :param y: (np.array) data
+        :return: (bool) whether a new fit is needed
+        """
+
+        if job.func is not func or job.x is None or x.shape != job.x.shape or y.shape != job.y.shape:
+            return True
+        if not np.array_equal(x, job.x):
+            return True
+        return np.linalg.norm(y - job.y) > self.rtol * np.linalg.norm(job.y)
+
+    def _start(self, key, job):
+        """ Starts the pending fit of a key, must hold the lock
+
+        :param key: (hashable) identifier of the job
+        :param job: (_FitJob) state of the key
+        """
+
+        func, x, y, p0, jac, reset = job.pending
+        job.pending = None
+
+        warm_start = not reset and job.func is func and job.popt is not None
+        if warm_start:
+            p0 = job.popt
+
+        job.func = func
+        job.x = x
+        job.y = y
+        job.running = True
+        self._running += 1
+
+        try:
+            self._executor.submit(self._fit, key, job, func, x, y, p0, jac, warm_start)
+        except RuntimeError:
+            # Engine was closed
+            job.running = False
+            self._running -= 1
+
+    def _fit(self, key, job, func, x, y, p0, jac, warm_start):
+        """ Worker thread: runs one fit and starts the next pending one """
+
+        start = time.perf_counter()
+        try:
+            if jac is None:
+                popt, pcov = curve_fit(func, x, y, p0=p0)
+            else:
+                popt, pcov = curve_fit(func, x, y, p0=p0, jac=jac)
+            result = FitResult(x, popt, pcov, func(x, *popt), True, 0, warm_start)
+        except Exception as error:
+            result = FitResult(x, None, None, None, False, 0, warm_start, error=error)
+        result.latency = time.perf_counter() - start
+
+        with self._lock:
+            self._fits += 1
+            self._latencies.append(result.latency)
+
+            # Only report the first of a series of failures
+            report = not result.success and (job.result is None or job.result.success)
+
+            if result.success:
+                job.popt = popt
+            else:
+                self._failed += 1
+
+                # Start from the initial guesses next time
+                job.popt = None
+
+            job.result = result
+            job.new_result = True
+            job.running = False
+            self._running -= 1
+
+            if job.pending is not None:
+                self._start(key, job)
+
+            self._lock.notify_all()
+
+        if report:
+            self.log.warn(f'Fit {key} failed: {result.error}')
@@ -87,6 +87,11 @@ class LaserStabilizer:
         self.paramI = self.config["pid"]["i"]
         self.paramD = self.config["pid"]["d"]
         self.paramMemory = self.config["memory"] #
+        # The integral term now averages over the full memory. Gains tuned
+        # before that used only the latest sample, i.e. an integral term up to
+        # memory times smaller. Set "legacy_history": true in the "pid" section
+        # to keep such gains, or divide "i" by the memory.
+        self.paramLegacyHistory = self.config["pid"].get("legacy_history", False)
         self._update_voltageSetpoint_fromGUI()
         self._update_PID()
 
@@ -250,7 +255,8 @@ class LaserStabilizer:
     def _update_PID(self):
         """Creates a new PID object based on the current PID member variables to be used for power
         feedbacking"""
-        self.pid = PID(p=self.paramP, i=self.paramI, d=self.paramD, setpoint=self.voltageSetpoint, memory=self.paramMemory)
+        self.pid = PID(p=self.paramP, i=self.paramI, d=self.paramD, setpoint=self.voltageSetpoint, memory=self.paramMemory,
+                       legacy_history=self.paramLegacyHistory)
 
     def _update_feedback(self):
         """ Runs the actual feedback loop"""
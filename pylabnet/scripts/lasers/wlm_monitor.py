@@ -6,6 +6,7 @@ from pylabnet.utils.helper_methods import (unpack_launcher, create_server,
                                            load_config, get_gui_widgets, get_legend_from_graphics_view, add_to_legend, find_client,
                                            load_script_config, get_ip)
 from pylabnet.utils.logging.logger import LogClient, LogHandler
+from pylabnet.utils.ring_buffer import RingBuffer
 
 import numpy as np
 import time
@@ -172,6 +173,7 @@ class WlmMonitor:
 
                     if 'memory' in parameter:
                         channel.memory = parameter['memory']
+                        channel.pid.set_parameters(memory=channel.memory)
                     if 'pid' in parameter:
                         channel.pid.set_parameters(
                             p=parameter['pid']['p'],
@@ -418,6 +420,11 @@ class WlmMonitor:
         Called continuously inside run() method to refresh WLM data and output on GUI
         """
 
+        # Read all channels with a single request
+        wavelengths, _ = self.wlm_client.get_wavelengths(
+            [channel.number for channel in self.channels]
+        )
+
         for index, channel in enumerate(self.channels):
 
             # Check for override (freq)
@@ -431,14 +438,15 @@ class WlmMonitor:
                 channel.lock_override = -1
 
             # Update data with the new wavelength
-            channel.update(self.wlm_client.get_wavelength(channel.number))
+            channel.update(wavelengths[index])
 
-            # Update frequency
-            self.widgets['curve'][4 * index].setData(channel.data)
+            # Update frequency. The channel traces are views of ring buffers
+            # overwritten by the next update, pyqtgraph gets copies.
+            self.widgets['curve'][4 * index].setData(np.array(channel.data))
             self.widgets['freq'][index].setValue(channel.data[-1])
 
             # Update setpoints
-            self.widgets['curve'][4 * index + 1].setData(channel.sp_data)
+            self.widgets['curve'][4 * index + 1].setData(np.array(channel.sp_data))
 
             # Set the error boolean (true if the lock is active and we are outside the error threshold)
             if channel.lock and np.abs(channel.data[-1] - channel.setpoint) > self.threshold:
@@ -447,9 +455,9 @@ class WlmMonitor:
                 self.widgets['error_status'][index].setChecked(False)
 
             # Now update lock + voltage plots
-            self.widgets['curve'][4 * index + 2].setData(channel.voltage)
+            self.widgets['curve'][4 * index + 2].setData(np.array(channel.voltage))
             self.widgets['voltage'][index].setValue(channel.voltage[-1])
-            self.widgets['curve'][4 * index + 3].setData(channel.error)
+            self.widgets['curve'][4 * index + 3].setData(np.array(channel.error))
             self.widgets['error'][index].setValue(channel.error[-1])
 
     def _get_gui_data(self):
@@ -586,11 +594,9 @@ class Channel:
         self.ao_clients = ao_clients
         self.log = log
         self.ao = None  # Dict with client name and channel for ao to use
-        self.voltage = None  # Array of voltage values for ao, used for plotting/monitoring voltage
         self.current_voltage = 0
         self.setpoint = None
         self.lock = False
-        self.error = None  # Array of error values, used for plotting/monitoring lock error
         self.labels_updated = False  # Flag to check if we have updated all labels
         self.setpoint_override = 0  # Flag to check if setpoint has been updated + GUI should be overridden
         self.lock_override = -1 # Flag to check if lock has been updated + GUI should be overridden; -1: not overridden; 0: overriden with false; 1: overriden with true
@@ -605,9 +611,52 @@ class Channel:
         # Set all relevant parameters to default values
         self._overwrite_parameters(channel_params)
 
-        # Initialize relevant placeholders
-        self.data = np.array([])
-        self.sp_data = np.array([])
+        # Initialize relevant placeholders, rolling arrays of the wavelength,
+        # setpoint, voltage and lock error used for plotting/monitoring
+        self._data = None
+        self._sp_data = None
+        self._voltage = None
+        self._error = None
+
+    @property
+    def data(self):
+        return self._view(self._data)
+
+    @property
+    def sp_data(self):
+        return self._view(self._sp_data)
+
+    @property
+    def voltage(self):
+        return self._view(self._voltage)
+
+    @property
+    def error(self):
+        return self._view(self._error)
+
+    @staticmethod
+    def _view(buffer):
+        """ Returns the contents of a rolling array buffer, oldest first
+
+        :param buffer: (RingBuffer) buffer, None if not initialized
+        :return: (np.ndarray) view of the buffer, only valid until the next update
+        """
+
+        if buffer is None:
+            return np.array([])
+        return buffer.view()
+
+    @staticmethod
+    def _filled_buffer(display_pts, value):
+        """ Returns a full RingBuffer of display_pts constant values
+
+        :param display_pts: (int) capacity of the buffer
+        :param value: (float) value to fill the buffer with
+        """
+
+        buffer = RingBuffer(display_pts)
+        buffer.append(np.full(display_pts, value, dtype=float))
+        return buffer
 
     def initialize(self, wavelength, display_pts=5000):
         """
@@ -617,25 +666,28 @@ class Channel:
         :param display_pts: number of points to display on the plot
         """
 
-        self.data = np.ones(display_pts) * wavelength
+        self._data = self._filled_buffer(display_pts, wavelength)
 
         # if self.sp_data already exists, keep its last value so that the
         # clear data functionality doesn't override the setpoint
         if len(self.sp_data) > 0:
-            self.sp_data = np.ones(display_pts) * self.sp_data[-1]
+            self._sp_data = self._filled_buffer(display_pts, self.sp_data[-1])
         else:
-            self.sp_data = np.ones(display_pts) * self.data[-1]
+            self._sp_data = self._filled_buffer(display_pts, wavelength)
 
         self.setpoint = self.sp_data[-1]
 
+        # Fill the integral memory of the pid with the current wavelength
+        self.pid.set_pv(pv=np.full(self.pid.memory, wavelength))
+
         # Initialize voltage and error
-        self.voltage = np.ones(display_pts) * self.current_voltage
+        self._voltage = self._filled_buffer(display_pts, self.current_voltage)
 
         # Check that setpoint is reasonable, otherwise set error to 0
-        self.error = np.ones(display_pts) * (wavelength - self.setpoint)
+        self._error = self._filled_buffer(display_pts, wavelength - self.setpoint)
 
     def initialize_sp_data(self, display_pts=5000):
-        self.sp_data = np.ones(display_pts) * self.data[-1]
+        self._sp_data = self._filled_buffer(display_pts, self.data[-1])
 
     def update(self, wavelength):
         """
@@ -644,7 +696,7 @@ class Channel:
         :param wavelength: (float) current wavelength
         """
 
-        self.data = np.append(self.data[1:], wavelength)
+        self._data.append(wavelength)
 
         # Check if the GUI has changed, and if so, update the setpoint in the script to match
         if self.gui_setpoint != self.prev_gui_setpoint:
@@ -656,22 +708,21 @@ class Channel:
 
         # Store the latest GUI setpoint
         self.prev_gui_setpoint = copy.deepcopy(self.gui_setpoint)
-        self.sp_data = np.append(self.sp_data[1:], self.setpoint)
+        self._sp_data.append(self.setpoint)
 
         # Now deal with pid stuff
         self.pid.set_parameters(setpoint=0 if self.setpoint is None else self.setpoint)
 
-        # Implement lock
-        # Set process variable
-        self.pid.set_pv(pv=self.data[len(self.data) - self.memory:])
-        # Set control variable
-        self.pid.set_cv()
-
         if self.gui_lock != self.prev_gui_lock:
             self.lock = copy.deepcopy(self.gui_lock)
 
         self.prev_gui_lock = copy.deepcopy(self.gui_lock)
 
+        # Implement lock
+        # Add the new process variable and calculate the control variable,
+        # stopping the integral if the voltage is stuck at one of its limits
+        self.pid.step(self.data[-1], saturated=self._saturation())
+
         if self.lock:
             try:
                 if self.ao is not None:
@@ -689,8 +740,23 @@ class Channel:
                 self.ao = None
 
         # Update voltage and error data
-        self.voltage = np.append(self.voltage[1:], self.current_voltage)
-        self.error = np.append(self.error[1:], self.pid.error * self._gain)
+        self._voltage.append(self.current_voltage)
+        self._error.append(self.pid.error * self._gain)
+
+    def _saturation(self):
+        """ Returns the saturation of the voltage in units of the pid output
+
+        :return: (int) +1 (-1) if a positive (negative) pid output cannot
+            change the voltage, since it is at its limit, 0 otherwise
+        """
+
+        if not self.lock or self.ao is None or not self._gain:
+            return 0
+        if self._max_voltage is not None and self.current_voltage >= self._max_voltage:
+            return int(np.sign(self._gain))
+        if self._min_voltage is not None and self.current_voltage <= self._min_voltage:
+            return -int(np.sign(self._gain))
+        return 0
 
     def zero_voltage(self):
         """Zeros the voltage (if applicable)"""
@@ -798,8 +864,6 @@ class Channel:
             self.ao = None
 
         # Configure voltage monitor arrays if desired
-        self.voltage = np.array([])
-        self.error = np.array([])
         self.aux_name = '{} Auxiliary Monitor'.format(self.name)
         self.voltage_curve = '{} Voltage'.format(self.name)
         self.error_curve = '{} Lock Error'.format(self.name)
@@ -1,10 +1,247 @@
 import numpy as np
 
 
+class MultiPID:
+    """ PID controller for several independent channels, stepped at once
+
+    The process variable history of all channels is kept in a preallocated
+    ring buffer of shape (memory, n_channels) together with a running sum,
+    so that a new sample updates the controller in O(n_channels), independent
+    of the integral memory.
+
+    The control variable follows the conventions of PID:
+
+        cv = p * e + i * mean(e over memory) + d * (e - e_previous)
+
+    where e = pv - setpoint. The derivative can be low-pass filtered
+    (d_filter), and the control variable can be limited to [cv_min, cv_max].
+    Samples that would drive a limited (or externally saturated, see step())
+    output further into saturation are left out of the integral.
+    """
+
+    def __init__(self, n_channels=1, p=0, i=0, d=0, setpoint=0, memory=20,
+                 cv_min=-np.inf, cv_max=np.inf, d_filter=0):
+        """ Constructor for MultiPID class
+
+        :param n_channels: (int) number of channels
+        :param p: (float or array) proportional gain
+        :param i: (float or array) integral gain
+        :param d: (float or array) differential gain
+        :param setpoint: (float or array) setpoint for process variable
+        :param memory: (int) number of samples for integral memory, shared by
+            all channels
+        :param cv_min: (float or array) lower limit of the control variable
+        :param cv_max: (float or array) upper limit of the control variable
+        :param d_filter: (float or array) derivative filter coefficient in
+            [0, 1). The derivative term is averaged exponentially as
+            d_term = d_filter * d_term + (1 - d_filter) * (e - e_previous),
+            0 disables the filter.
+        """
+
+        self.n_channels = int(n_channels)
+        self.memory = max(int(memory), 1)
+
+        # Ring buffer of the process variable, _newest is the row of the
+        # latest sample
+        self._pv = np.zeros((self.memory, self.n_channels))
+        self._newest = self.memory - 1
+        self._pv_sum = np.zeros(self.n_channels)
+
+        # Number of samples pushed since the running sum was last recomputed
+        self._n_pushed = 0
+
+        self._last_pv = np.zeros(self.n_channels)
+        self._d_term = np.zeros(self.n_channels)
+
+        self.cv = np.zeros(self.n_channels)
+        self.error = np.zeros(self.n_channels)
+
+        self.p = self._channel_array(p)
+        self.i = self._channel_array(i)
+        self.d = self._channel_array(d)
+        self.setpoint = self._channel_array(setpoint)
+        self.cv_min = self._channel_array(cv_min)
+        self.cv_max = self._channel_array(cv_max)
+        self.d_filter = self._channel_array(d_filter)
+
+    def _channel_array(self, value):
+        """ Broadcasts a scalar or per-channel value to an array of n_channels
+
+        :param value: (float or array) value
+        :return: (np.ndarray) array of shape (n_channels,)
+        """
+
+        return np.array(np.broadcast_to(np.asarray(value, dtype=float), (self.n_channels,)))
+
+    def set_parameters(self, p=None, i=None, d=None, setpoint=None, memory=None,
+                       cv_min=None, cv_max=None, d_filter=None):
+        """ Sets parameters of PID controller, None leaves a parameter unchanged
+
+        :param p: (float or array) proportional gain
+        :param i: (float or array) integral gain
+        :param d: (float or array) differential gain
+        :param setpoint: (float or array) setpoint for process variable
+        :param memory: (int) number of samples for integral memory
+        :param cv_min: (float or array) lower limit of the control variable
+        :param cv_max: (float or array) upper limit of the control variable
+        :param d_filter: (float or array) derivative filter coefficient
+        """
+
+        if p is not None:
+            self.p = self._channel_array(p)
+        if i is not None:
+            self.i = self._channel_array(i)
+        if d is not None:
+            self.d = self._channel_array(d)
+        if setpoint is not None:
+            self.setpoint = self._channel_array(setpoint)
+        if cv_min is not None:
+            self.cv_min = self._channel_array(cv_min)
+        if cv_max is not None:
+            self.cv_max = self._channel_array(cv_max)
+        if d_filter is not None:
+            self.d_filter = self._channel_array(d_filter)
+        if memory is not None and max(int(memory), 1) != self.memory:
+            self._resize(max(int(memory), 1))
+
+    def history(self):
+        """ Returns the process variable history used for the integral
+
+        :return: (np.ndarray) array of shape (memory, n_channels), oldest first
+        """
+
+        return np.concatenate((self._pv[self._newest + 1:], self._pv[:self._newest + 1]))
+
+    def _resize(self, memory):
+        """ Changes the integral memory, keeping the most recent samples
+
+        :param memory: (int) new number of samples
+        """
+
+        history = self.history()
+
+        # Pad constants onto the beginning of the history if it is too short
+        if len(history) < memory:
+            padding = np.repeat(history[:1], memory - len(history), axis=0)
+            history = np.concatenate((padding, history))
+
+        self.memory = memory
+        self._pv = np.array(history[-memory:])
+        self._newest = memory - 1
+        self._resum()
+
+    def _resum(self):
+        """ Recomputes the running sum to avoid accumulating rounding errors """
+
+        self._pv_sum = self._pv.sum(axis=0)
+        self._n_pushed = 0
+
+    def push(self, pv):
+        """ Adds process variable samples to the history
+
+        :param pv: (float or array) new samples, either one value per channel
+            (shape (n_channels,)) or several samples (shape (n_samples,
+            n_channels)). For a single channel, a 1D array is interpreted as
+            consecutive samples.
+        """
+
+        pv = np.asarray(pv, dtype=float).reshape(-1, self.n_channels)
+        n_samples = len(pv)
+
+        if n_samples == 0:
+            return
+
+        # The whole history is replaced
+        if n_samples >= self.memory:
+            self._pv[:] = pv[-self.memory:]
+            self._newest = self.memory - 1
+            self._resum()
+
+        elif n_samples == 1:
+            row = (self._newest + 1) % self.memory
+            self._pv_sum += pv[0] - self._pv[row]
+            self._pv[row] = pv[0]
+            self._newest = row
+            self._n_pushed += 1
+
+        else:
+            rows = (self._newest + 1 + np.arange(n_samples)) % self.memory
+            self._pv_sum += pv.sum(axis=0) - self._pv[rows].sum(axis=0)
+            self._pv[rows] = pv
+            self._newest = rows[-1]
+            self._n_pushed += n_samples
+
+        if self._n_pushed >= self.memory:
+            self._resum()
+
+        # Advance the derivative filter once per new sample. If only a single
+        # sample is kept, the derivative is undefined.
+        if self.memory > 1:
+            for diff in np.diff(np.concatenate((self._last_pv[np.newaxis], pv)), axis=0):
+                self._d_term = self.d_filter * self._d_term + (1 - self.d_filter) * diff
+        self._last_pv = pv[-1].copy()
+
+    def _raw_cv(self):
+        """ Calculates the unlimited control variable and updates the error
+
+        :return: (np.ndarray) control variable of each channel
+        """
+
+        self.error = self._last_pv - self.setpoint
+        integral = self._pv_sum / self.memory - self.setpoint
+
+        return self.p * self.error + self.i * integral + self.d * self._d_term
+
+    def compute(self):
+        """ Calculates the control variable from the current history, without
+        changing the controller state
+
+        :return: (np.ndarray) control variable of each channel
+        """
+
+        self.cv = np.clip(self._raw_cv(), self.cv_min, self.cv_max)
+        return self.cv
+
+    def step(self, pv, saturated=None):
+        """ Adds one sample per channel and calculates the control variable
+
+        :param pv: (float or array) new process variable value of each channel
+        :param saturated: (array, optional) actuator saturation of each channel
+            in units of the control variable: +1 if a positive cv cannot be
+            applied anymore, -1 if a negative cv cannot be applied anymore,
+            0 otherwise
+        :return: (np.ndarray) control variable of each channel
+        """
+
+        self.push(pv)
+        cv = self._raw_cv()
+
+        # Anti-windup: leave the sample out of the integral if the output is
+        # saturated without it and the sample drives it further
+        contribution = self.i * (self._pv[self._newest] - self.setpoint) / self.memory
+        cv_without = cv - contribution
+        hold = (((cv_without >= self.cv_max) & (contribution > 0))
+                | ((cv_without <= self.cv_min) & (contribution < 0)))
+        if saturated is not None:
+            saturated = np.broadcast_to(saturated, (self.n_channels,))
+            hold |= (saturated != 0) & (np.sign(contribution) == saturated)
+
+        if hold.any():
+            # Store the setpoint instead of the sample, i.e. no error
+            correction = np.where(hold, self._pv[self._newest] - self.setpoint, 0)
+            self._pv[self._newest] -= correction
+            self._pv_sum -= correction
+            cv = np.where(hold, cv_without, cv)
+
+        self.cv = np.clip(cv, self.cv_min, self.cv_max)
+        return self.cv
+
+
 class PID:
     """Generic class for PID locking"""
 
-    def __init__(self, p=0, i=0, d=0, setpoint=0, memory=20):
+    def __init__(self, p=0, i=0, d=0, setpoint=0, memory=20, cv_min=-np.inf, cv_max=np.inf, d_filter=0,
+                 legacy_history=False):
         """ Constructor for PID class
 
         :rtype: object
@@ -13,18 +250,77 @@ class PID:
         :param d: differential
         :param setpoint: setpoint for process variable
         :param memory: number of samples for integral memory
+        :param cv_min: lower limit of the control variable
+        :param cv_max: upper limit of the control variable
+        :param d_filter: derivative filter coefficient in [0, 1), see MultiPID
+        :param legacy_history: (bool) whether set_pv() and set_cv() keep the
+            history of earlier versions, which kept only the latest samples
+            when arrays shorter than the memory were passed (a single sample
+            for single-sample updates, such that the integral term was
+            i * e / memory and the derivative was never applied). Loops tuned
+            with such updates need their integral gain reduced by up to a
+            factor of memory without this flag. Ignored by step().
         """
 
-        self.p = p
-        self.i = i
-        self.d = d
-        self.memory = memory
-        self.setpoint = setpoint
-        self._pv = np.zeros(self.memory)
+        self._pid = MultiPID(
+            n_channels=1, p=p, i=i, d=d, setpoint=setpoint, memory=memory,
+            cv_min=cv_min, cv_max=cv_max, d_filter=d_filter
+        )
         self.cv = 0
         self.error = 0
 
-    def set_parameters(self, p=None, i=None, d=None, setpoint=None, memory=None):
+        self.legacy_history = legacy_history
+        self._legacy_pv = np.zeros(self.memory)
+
+    @property
+    def p(self):
+        return float(self._pid.p[0])
+
+    @p.setter
+    def p(self, value):
+        self._pid.set_parameters(p=value)
+
+    @property
+    def i(self):
+        return float(self._pid.i[0])
+
+    @i.setter
+    def i(self, value):
+        self._pid.set_parameters(i=value)
+
+    @property
+    def d(self):
+        return float(self._pid.d[0])
+
+    @d.setter
+    def d(self, value):
+        self._pid.set_parameters(d=value)
+
+    @property
+    def setpoint(self):
+        return float(self._pid.setpoint[0])
+
+    @setpoint.setter
+    def setpoint(self, value):
+        self._pid.set_parameters(setpoint=value)
+
+    @property
+    def memory(self):
+        return self._pid.memory
+
+    @memory.setter
+    def memory(self, value):
+        self._pid.set_parameters(memory=value)
+
+    @property
+    def _pv(self):
+        """ Process variable history, oldest first """
+        if self.legacy_history:
+            return self._legacy_pv
+        return self._pid.history()[:, 0]
+
+    def set_parameters(self, p=None, i=None, d=None, setpoint=None, memory=None,
+                       cv_min=None, cv_max=None, d_filter=None):
         """ Sets parameters of PID controller
 
         :param p: proportional gain
@@ -32,54 +328,65 @@ class PID:
         :param d: differential
         :param setpoint: setpoint for process variable
         :param memory: number of samples for integral memory
+        :param cv_min: lower limit of the control variable
+        :param cv_max: upper limit of the control variable
+        :param d_filter: derivative filter coefficient
         """
 
-        if p is not None:
-            self.p = p
-        if i is not None:
-            self.i = i
-        if d is not None:
-            self.d = d
-        if memory is not None:
-            self.memory = memory
-        if setpoint is not None:
-            self.setpoint = setpoint
+        self._pid.set_parameters(
+            p=p, i=i, d=d, setpoint=setpoint, memory=memory,
+            cv_min=cv_min, cv_max=cv_max, d_filter=d_filter
+        )
 
-        # Update process variable history to have appropriate length if too short
-        pv_length = len(self._pv)
-        if pv_length < self.memory:
-
-            # Pad constants onto the beginning of the array
-            self._pv = np.hstack((np.ones(self.memory - pv_length) * self._pv[0], self._pv))
+        # Pad constants onto the beginning of the legacy history if it is too short
+        if len(self._legacy_pv) < self.memory:
+            self._legacy_pv = np.hstack((
+                np.ones(self.memory - len(self._legacy_pv)) * self._legacy_pv[0], self._legacy_pv
+            ))
 
     def set_pv(self, pv=np.zeros(10)):
         """ Sets process variable
 
         :param pv: process variable (measured value of process to be locked).
-            This should ideally be a numpy array of recent data points
+            Either the latest data point or a numpy array of recent data
+            points. Arrays shorter than the memory are appended to the
+            history, longer arrays replace it (see legacy_history for the
+            behaviour of earlier versions).
         """
 
-        # Check the length of the input
-        pv_length = len(pv)
-
-        # If it's too short, append it onto the current pv
-        if pv_length < self.memory:
-            self._pv = np.append(self._pv[self.memory - pv_length:], pv)
-
-        # Otherwise just take the last elements
+        pv = np.ravel(pv)
+        if not self.legacy_history:
+            self._pid.push(pv)
+        elif len(pv) < self.memory:
+            self._legacy_pv = np.append(self._legacy_pv[self.memory - len(pv):], pv)
         else:
-            self._pv = pv[pv_length - self.memory:]
+            self._legacy_pv = pv[len(pv) - self.memory:]
 
     def set_cv(self):
         """Calculates the appropriate value of the control variable"""
 
-        # Calculate error
-        error = self._pv - self.setpoint
-        self.error = error[-1]
+        if self.legacy_history:
+            error = self._legacy_pv - self.setpoint
+            cv = self.p * error[-1] + self.i * np.sum(error) / self.memory
+            # If only a single error is kept, the derivative is undefined
+            if len(error) > 1:
+                cv += self.d * (error[-1] - error[-2])
+            self.cv = float(np.clip(cv, self._pid.cv_min[0], self._pid.cv_max[0]))
+            self.error = float(error[-1])
+            return
 
-        # Calculate response
-        if len(error) > 1:
-            self.cv = self.p * error[-1] + self.i * np.sum(error) / self.memory + self.d * (error[-1] - error[-2])
-        else:
-            #if only have a single error so far, then derivative is undefined so do not calculate it
-            self.cv = self.p * error[-1] + self.i * np.sum(error) / self.memory
+        self.cv = float(self._pid.compute()[0])
+        self.error = float(self._pid.error[0])
+
+    def step(self, pv, saturated=0):
+        """ Adds the latest data point and calculates the control variable
+
+        :param pv: (float) latest process variable
+        :param saturated: (int) +1 or -1 if a positive or negative control
+            variable cannot be applied by the actuator, 0 otherwise
+        :return: (float) control variable
+        """
+
+        self.cv = float(self._pid.step(pv, saturated=saturated)[0])
+        self.error = float(self._pid.error[0])
+        return self.cv
@@ -168,6 +168,11 @@ class PulseMaster:
             self.plot_points = 800 # Default value
 
         self.awg_running = False
+        self.awg = None
+
+        # Structure of the last uploaded experiment, used to skip the
+        # compilation if only user register variables have changed
+        self.uploaded_structure_key = None
 
     def apply_custom_styles(self):
         """Apply all style changes which are not specified in the .css file."""
@@ -404,8 +409,18 @@ class PulseMaster:
             iplot=False
         )
 
-        # Upload to HDAWG
-        self.awg = self.pulsed_experiment.get_ready(awg_num)
+        # Upload to HDAWG, only the user registers are updated if the
+        # sequence structure did not change since the last upload
+        self.awg = self.pulsed_experiment.get_ready(
+            awg_num,
+            awg=self.awg,
+            structure_key=self.uploaded_structure_key
+        )
+
+        if self.pulsed_experiment.uploaded:
+            self.uploaded_structure_key = self.pulsed_experiment.structure_key
+        else:
+            self.uploaded_structure_key = None
 
         # Retrieve uploaded sequence
         uploaded_sequence = self.pulsed_experiment.seq.sequence
@@ -372,6 +372,8 @@ class Controller(MultiChSweep1D):
             '''
         # If box isn't checked, remove popup
         else:
+            if self.fit_popup is not None:
+                self.fit_popup.stop_fits()
             self.fit_popup = None
 
     def _configure_plots(self, plot=True):
@@ -399,6 +401,8 @@ class Controller(MultiChSweep1D):
             self.fit_bwd = []
             self.p0_fwd = None
             self.p0_bwd = None
+            if self.fit_popup is not None:
+                self.fit_popup.engine.clear()
             self.x_fwd = self._generate_x_axis()
             if self.sweep_type != 'sawtooth':
                 self.x_bwd = self._generate_x_axis(backward=True)
@@ -651,6 +655,7 @@ class Controller(MultiChSweep1D):
                         autoRange=False
                     )
 
+        self._show_fits()
         self.gui.force_update()
 
     def _update_hmaps(self, reps_done):
@@ -678,30 +683,28 @@ class Controller(MultiChSweep1D):
         self._update_fits()
 
     def _update_fits(self):
-        """ Updates fits """
+        """ Schedules fits of the averaged data in the background """
         if len(self.avg_fwd) != 0 and self.fit_popup is not None:
             if self.fit_popup.mod is not None and\
                     self.fit_popup.mod.init_params is not None:
+                self.fit_popup.x_fwd = self.x_fwd
+                self.fit_popup.x_bwd = self.x_bwd
                 self.fit_popup.data_fwd = np.array(self.avg_fwd)
                 self.fit_popup.data_bwd = np.array(self.avg_bwd)
-                if self.p0_fwd is not None and self.p0_bwd is not None:
-                    self.fit_popup.p0_fwd = self.p0_fwd
-                    self.fit_popup.p0_bwd = self.p0_bwd
-                #method = getattr(self.fit_popup, self.fit_popup.fit_method)
-                self.fit_fwd, self.fit_bwd, self.p0_fwd, self.p0_bwd = self.fit_popup.fit_mod()
-                if self.fit_popup.fit_suc:
-                    self.widgets['fit_avg'][0].setData(
-                        self.x_fwd,
-                        self.fit_fwd
-                    )
-                    self.widgets['fit_avg'][1].setData(
-                        self.x_bwd,
-                        self.fit_bwd
-                    )
-                #print(self.avg_fwd)
-        else:
-            pass
-        #print(self.config)
+                self.fit_popup.submit_fits()
+        self._show_fits()
+
+    def _show_fits(self):
+        """ Plots new results of the background fits """
+        if self.fit_popup is None or self.fit_popup.mod is None:
+            return
+        result_fwd, result_bwd = self.fit_popup.take_fits()
+        if result_fwd is not None and result_fwd.success:
+            self.fit_fwd, self.p0_fwd = result_fwd.fit, result_fwd.popt
+            self.widgets['fit_avg'][0].setData(result_fwd.x, self.fit_fwd)
+        if result_bwd is not None and result_bwd.success:
+            self.fit_bwd, self.p0_bwd = result_bwd.fit, result_bwd.popt
+            self.widgets['fit_avg'][1].setData(result_bwd.x, self.fit_bwd)
 
     def _update_autosave(self):
         """ Updates autosave status """
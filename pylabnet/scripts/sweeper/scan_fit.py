@@ -5,6 +5,7 @@ from PyQt5.QtWidgets import (
     QApplication, QDialog, QMainWindow, QMessageBox)
 from scipy.optimize import curve_fit # is not automatically installed?
 import numpy as np
+from pylabnet.scripts.fit_engine import FitEngine
 
 
 def lorentzian(x, *params):
@@ -18,18 +19,75 @@ def lorentzian(x, *params):
     return off + amp * 0.5 * wid / ((x - cen)**2 + (0.5 * wid)**2)
 
 
+def lorentzian_jac(x, *params):
+    """ Jacobian of lorentzian() with respect to its parameters
+
+    :return: (np.array) of shape (len(x), 4)
+    """
+    cen, wid, amp = params[0], params[1], params[2]
+    dx = x - cen
+    denom = dx**2 + (0.5 * wid)**2
+    return np.stack([
+        amp * wid * dx / denom**2,
+        amp * 0.5 * (dx**2 - (0.5 * wid)**2) / denom**2,
+        0.5 * wid / denom,
+        np.ones_like(dx)
+    ], axis=-1)
+
+
 def doubleGaussian(x, a1, a2, c1, c2, w1, w2, o):
     return a1 * np.exp(-(x - c1)**2 / (2 * w1**2)) + a2 * np.exp(-(x - c2)**2 / (2 * w2**2)) + o
 
 
+def doubleGaussian_jac(x, a1, a2, c1, c2, w1, w2, o):
+    """ Jacobian of doubleGaussian() with respect to its parameters """
+    dx1 = x - c1
+    dx2 = x - c2
+    e1 = np.exp(-dx1**2 / (2 * w1**2))
+    e2 = np.exp(-dx2**2 / (2 * w2**2))
+    return np.stack([
+        e1,
+        e2,
+        a1 * e1 * dx1 / w1**2,
+        a2 * e2 * dx2 / w2**2,
+        a1 * e1 * dx1**2 / w1**3,
+        a2 * e2 * dx2**2 / w2**3,
+        np.ones_like(dx1)
+    ], axis=-1)
+
+
 def gaussian(x, a1, c1, w1, o):
     return a1 * np.exp(-(x - c1)**2 / (2 * w1**2)) + o
 
 
+def gaussian_jac(x, a1, c1, w1, o):
+    """ Jacobian of gaussian() with respect to its parameters """
+    dx = x - c1
+    e1 = np.exp(-dx**2 / (2 * w1**2))
+    return np.stack([
+        e1,
+        a1 * e1 * dx / w1**2,
+        a1 * e1 * dx**2 / w1**3,
+        np.ones_like(dx)
+    ], axis=-1)
+
+
 def Rabi(x, a1, p1, w1, o):
     return a1 * np.sin(2 * np.pi * (x / (2 * w1)) + np.pi / 180 * p1) + o
 
 
+def Rabi_jac(x, a1, p1, w1, o):
+    """ Jacobian of Rabi() with respect to its parameters """
+    phase = 2 * np.pi * (x / (2 * w1)) + np.pi / 180 * p1
+    cos = np.cos(phase)
+    return np.stack([
+        np.sin(phase),
+        a1 * cos * np.pi / 180,
+        -a1 * cos * np.pi * x / w1**2,
+        np.ones_like(phase)
+    ], axis=-1)
+
+
 def dbl_lorentzian(x, *params):
     """
     :param params: parameters for lorentzian in the order center, width, amp
@@ -50,6 +108,29 @@ def ref_int(Delta, Delta_ac, g, kwg, k, a, offset):
     return a * np.abs(reflection((Delta - 406.64) * 1000, Delta_ac, g, 0.1, kwg, k))**2 + offset
 
 
+def ref_int_jac(Delta, Delta_ac, g, kwg, k, a, offset):
+    """ Jacobian of ref_int() with respect to its parameters """
+    detuning = (Delta - 406.64) * 1000
+    atom = 1j * (detuning - Delta_ac) + 0.1 / 2
+    coupling = g**2 / atom
+    denom = 1j * detuning + coupling + k / 2
+    r = (denom - kwg) / denom
+
+    # Derivatives of r, using that numerator and denominator differ by kwg
+    dr_dcoupling = kwg / denom**2
+    dr = [
+        dr_dcoupling * 1j * g**2 / atom**2,
+        dr_dcoupling * 2 * g / atom,
+        -1 / denom,
+        dr_dcoupling / 2
+    ]
+    return np.stack(
+        [a * 2 * np.real(np.conj(r) * dr_dp) for dr_dp in dr]
+        + [np.abs(r)**2, np.ones_like(detuning)],
+        axis=-1
+    )
+
+
 class FitPopup(Popup):
     def __init__(self, ui, x_fwd, data_fwd, x_bwd,
                  data_bwd, p0_fwd, p0_bwd, config, log):
@@ -65,23 +146,28 @@ class FitPopup(Popup):
         self.fit_suc = True
         self.mod = None
 
+        # Runs fits of the forward and backward data in the background
+        self.engine = FitEngine(logger=log)
+
     def fit_selection(self, index):
         if index == 0:
             self.mod = FitModel("Lorentzian fit", lorentzian,
-                                "Center", "FWHM", "Amp", "Ver. Offset")
+                                "Center", "FWHM", "Amp", "Ver. Offset", jac=lorentzian_jac)
         elif index == 1:
             self.mod = FitModel("Gaussian fit", gaussian,
-                                "Amp", "Center", "Width", "Ver. Offset")
+                                "Amp", "Center", "Width", "Ver. Offset", jac=gaussian_jac)
         elif index == 2:
             self.mod = FitModel("Double Gaussian fit", doubleGaussian,
-                                "Amp 1", "Amp 2", "Center 1", "Center 2", "Width 1", "Width 2", "Ver. Offset")
+                                "Amp 1", "Amp 2", "Center 1", "Center 2", "Width 1", "Width 2", "Ver. Offset",
+                                jac=doubleGaussian_jac)
         elif index == 3:
             self.mod = FitModel("Rabi fit", Rabi,
-                                "Amp", "phase (deg)", "pi time", "Ver. Offset")
+                                "Amp", "phase (deg)", "pi time", "Ver. Offset", jac=Rabi_jac)
         elif index == 4:
             self.mod = FitModel("cQED fit", ref_int,
-                                "Delta_ac", "g", "kwg", "k", "Amp", "Ver. Offset")
+                                "Delta_ac", "g", "kwg", "k", "Amp", "Ver. Offset", jac=ref_int_jac)
 
+        self.engine.clear()
         self.mod.load_mod(config=self.config)
         self.close()
 
@@ -96,10 +182,45 @@ class FitPopup(Popup):
                 self.p0_bwd)
         return fit_fwd, fit_bwd, self.p0_fwd, self.p0_bwd
 
+    def submit_fits(self):
+        """ Schedules fits of the current data in the background
+
+        Results are retrieved with take_fits().
+        """
+
+        self.mod.submit_fits(self.engine, self.x_fwd, self.data_fwd,
+                             self.x_bwd, self.data_bwd)
+
+    def take_fits(self):
+        """ Returns and displays new results of the background fits
+
+        :return: (list) forward and backward FitResult, None for a direction
+            without a new result
+        """
+
+        results = [self.engine.take_result(key) for key in ('fwd', 'bwd')]
+        if any(result is not None for result in results):
+            self.fit_suc = all(result is None or result.success for result in results)
+            self.mod.show_results(*results, status=self.engine.get_statistics_text())
+        return results
+
+    def stop_fits(self):
+        """ Stops the background fitting """
+
+        self.engine.close()
+
 
 class FitModel():
-    def __init__(self, name, func, *fit_params):
+    def __init__(self, name, func, *fit_params, jac=None):
+        """ Instantiates a fit model
+
+        :param name: (str) name of the model, also used for the config entry
+        :param func: (callable) model func(x, *params)
+        :param fit_params: (str) names of the parameters
+        :param jac: (callable, optional) analytic Jacobian jac(x, *params)
+        """
         self.func = func
+        self.jac = jac
         self.name = name
         self.fit_params = fit_params
         self.p0_updated = False
@@ -136,8 +257,8 @@ class FitModel():
                 p0_fwd_f = p0_fwd
                 p0_bwd_f = p0_bwd
             try:
-                popt1, pcov1 = curve_fit(self.func, x_fwd, data_fwd, p0=p0_fwd_f)
-                popt2, pcov2 = curve_fit(self.func, x_bwd, data_bwd, p0=p0_bwd_f)
+                popt1, pcov1 = curve_fit(self.func, x_fwd, data_fwd, p0=p0_fwd_f, jac=self.jac)
+                popt2, pcov2 = curve_fit(self.func, x_bwd, data_bwd, p0=p0_bwd_f, jac=self.jac)
                 p0_fwd_f = popt1
                 p0_bwd_f = popt2
                 #print(pcov1)
@@ -154,6 +275,40 @@ class FitModel():
             return self.func(x_fwd, *popt1), self.func(x_bwd, *popt2),\
                 p0_fwd_f, p0_bwd_f, fit_suc
 
+    def submit_fits(self, engine, x_fwd, data_fwd, x_bwd, data_bwd):
+        """ Schedules fits of both directions on a FitEngine
+
+        Fits are warm-started from the previous results, unless new initial
+        guesses were entered.
+
+        :param engine: (FitEngine) engine to run the fits
+        :param x_fwd: (np.array) x values of the forward data
+        :param data_fwd: (np.array) forward data
+        :param x_bwd: (np.array) x values of the backward data
+        :param data_bwd: (np.array) backward data
+        """
+        if self.init_params is not None:
+            p0 = [self.init_params[param] for param in self.fit_params]
+            reset = self.p0_updated
+            self.p0_updated = False
+            engine.submit('fwd', self.func, x_fwd, data_fwd, p0, jac=self.jac, reset=reset)
+            engine.submit('bwd', self.func, x_bwd, data_bwd, p0, jac=self.jac, reset=reset)
+
+    def show_results(self, result_fwd, result_bwd, status=''):
+        """ Displays fitted parameters in the popup
+
+        :param result_fwd: (FitResult) forward result, None to keep the display
+        :param result_bwd: (FitResult) backward result, None to keep the display
+        :param status: (str) fit statistics to display
+        """
+        for labels, result in ((self.pop.fparams, result_fwd), (self.pop.fparams2, result_bwd)):
+            if result is None:
+                continue
+            popt = result.popt if result.success else np.zeros(len(self.fit_params))
+            for ind, param in enumerate(self.fit_params):
+                labels[param].setText(str(popt[ind]))
+        self.pop.status.setText(status)
+
     def init_ui(self, obj):
         obj.setObjectName("Form")
         obj.resize(982, 793)
@@ -233,6 +388,11 @@ class FitModel():
                                      row, col + 1, 1, 1)
             row = row + 1
         obj.main.setLayout(lab_ct + 1, QtWidgets.QFormLayout.FieldRole, obj.gridlayout)
+
+        obj.status = QtWidgets.QLabel(obj.formLayoutWidget)
+        obj.status.setObjectName("status")
+        obj.status.setText("")
+        obj.main.setWidget(lab_ct + 2, QtWidgets.QFormLayout.SpanningRole, obj.status)
         QtCore.QMetaObject.connectSlotsByName(obj)
         obj.show()
 
@@ -1,6 +1,9 @@
 import rpyc
 import traceback
 import time
+import threading
+import queue
+import atexit
 import logging
 import sys
 import os
@@ -8,6 +11,8 @@ import ctypes
 import signal
 import re
 import pickle
+import uuid
+from collections import deque
 from pylabnet.utils.helper_methods import get_os, get_dated_subdirectory_filepath, get_ip, load_config
 from pylabnet.utils.slackbot.slackbot import PylabnetSlackBot
 
@@ -129,7 +134,37 @@ class LogClient:
         DEBUG=10
     )
 
-    def __init__(self, host, port, key='pylabnet.pem', module_tag='', lab_name='', server_port=None, ui=None):
+    # Overflow policies of the asynchronous send queue
+    OVERFLOW_DROP = 'drop'
+    OVERFLOW_BLOCK = 'block'
+
+    # Minimum time [s] between warnings about batches that could not be sent
+    SEND_WARNING_INTERVAL = 10
+
+    def __init__(self, host, port, key='pylabnet.pem', module_tag='', lab_name='', server_port=None, ui=None,
+                 async_mode=False, queue_size=10000, batch_size=200, flush_interval=0.05,
+                 overflow=OVERFLOW_DROP, block_timeout=1.0):
+        """ Instantiates LogClient and connects to the log server
+
+        :param host: (str) hostname of the log server
+        :param port: (int) port of the log server
+        :param key: (str) name of keyfile
+        :param module_tag: (str) alias displayed with every log message
+        :param lab_name: (str) name of the lab displayed with every log message
+        :param server_port: (int) port of a server running in the client's thread
+        :param ui: (str) relevant .ui file for the client
+        :param async_mode: (bool) if True, log messages are put in a local queue
+            and sent in batches by a background thread, such that logging never
+            waits for the log server
+        :param queue_size: (int) maximum number of queued messages in async mode
+        :param batch_size: (int) maximum number of messages sent per batch
+        :param flush_interval: (float) maximum time [s] a message waits in the
+            queue before being sent
+        :param overflow: (str) policy if the queue is full: 'drop' discards the
+            new message, 'block' waits up to block_timeout for free space
+            (back-pressure) and only then discards it
+        :param block_timeout: (float) maximum waiting time [s] for 'block' policy
+        """
 
         # Declare all internal vars
         self._host = ''
@@ -146,9 +181,41 @@ class LogClient:
         self._module_tag = module_tag
         self._lab_name = lab_name
 
+        # Asynchronous sending
+        self._async_mode = async_mode
+        self._queue = None
+        self._flush_thread = None
+        self._flush_lock = threading.Lock()
+        self._stop_flush = threading.Event()
+        self._msg_queued = threading.Event()
+        self._batch_size = batch_size
+        self._flush_interval = flush_interval
+        self._overflow = overflow
+        self._block_timeout = block_timeout
+        self._dropped = 0
+        self._dropped_lock = threading.Lock()
+        self._unsent = 0
+        self._last_send_warning = None
+
+        # Log record subscription
+        self._serving_thread = None
+        self._subscription_callback = None
+        self._subscription_connection = None
+
+        if overflow not in (self.OVERFLOW_DROP, self.OVERFLOW_BLOCK):
+            raise ValueError(f'Unknown overflow policy {overflow}')
+
         # Connect to log server
         self.connect(host=host, port=port, key=key)
 
+        if self._async_mode:
+            self._queue = queue.Queue(maxsize=queue_size)
+            self._flush_thread = threading.Thread(target=self._flush_loop, daemon=True)
+            self._flush_thread.start()
+
+            # Make sure queued messages are not lost when the process exits
+            atexit.register(self.close)
+
         # Log test message
         self.info('Started logging')
 
@@ -162,6 +229,13 @@ class LogClient:
 
         # Clean-up old connection if it exists
         if self._connection is not None or self._service is not None:
+            if self._serving_thread is not None:
+                try:
+                    self._serving_thread.stop()
+                except:
+                    pass
+                self._serving_thread = None
+
             try:
                 self._connection.close()
             except:
@@ -290,6 +364,9 @@ class LogClient:
         # Prepending log message with module name and lab name.
         message = f' {self._module_tag}: LAB:{self._lab_name} - {msg_str}'
 
+        if self._async_mode:
+            return self._enqueue_msg(message, level_str)
+
         # Try sending message to the log server
         try:
             ret_code = self._service.exposed_log_msg(
@@ -322,9 +399,140 @@ class LogClient:
             )
             return ret_code
 
+    def _enqueue_msg(self, message, level_str):
+        """ Puts a formatted message into the asynchronous send queue
+
+        :param message: (str) formatted log message
+        :param level_str: (str) log level
+        :return: (int) 0 if the message was queued, -1 if it was dropped
+        """
+
+        try:
+            if self._overflow == self.OVERFLOW_BLOCK:
+                self._queue.put((message, level_str), timeout=self._block_timeout)
+            else:
+                self._queue.put_nowait((message, level_str))
+            self._msg_queued.set()
+            return 0
+        except queue.Full:
+            with self._dropped_lock:
+                self._dropped += 1
+            return -1
+
+    def _get_batch(self, timeout):
+        """ Collects up to batch_size messages from the send queue
+
+        :param timeout: (float) maximum time [s] to wait for the first message
+        :return: (list) of (message, level_str) tuples, may be empty
+        """
+
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=timeout))
+            while len(batch) < self._batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+
+        # Report messages that did not fit into the queue
+        with self._dropped_lock:
+            dropped, self._dropped = self._dropped, 0
+        if dropped > 0:
+            batch.append((
+                f' {self._module_tag}: LAB:{self._lab_name} - '
+                f'Log queue full, dropped {dropped} message(s)',
+                'WARN'
+            ))
+
+        return batch
+
+    def _send_batch(self, batch):
+        """ Sends a batch of messages to the log server
+
+        :param batch: (list) of (message, level_str) tuples
+        """
+
+        batch_pickle = pickle.dumps(batch)
+        try:
+            self._service.exposed_log_batch(batch_pickle)
+
+        # If connection was lost (EOFError) or was not initialized (AttributeError),
+        # try to reconnect and send the batch again. Since this runs in the
+        # background, failures are reported but not raised.
+        except (EOFError, AttributeError):
+            try:
+                self.connect()
+                self._service.exposed_log_batch(batch_pickle)
+            except Exception as exc_obj:
+                self._warn_unsent(len(batch), exc_obj)
+
+    def _warn_unsent(self, n_msgs, exc_obj):
+        """ Warns locally about messages that could not be sent, at most
+        once per SEND_WARNING_INTERVAL to avoid flooding the console while
+        the log server is unreachable
+
+        :param n_msgs: (int) number of messages that could not be sent
+        :param exc_obj: (Exception) error raised when sending
+        """
+
+        self._unsent += n_msgs
+        now = time.monotonic()
+        if (self._last_send_warning is not None
+                and now - self._last_send_warning < self.SEND_WARNING_INTERVAL):
+            return
+
+        logging.getLogger(__name__).warning(
+            f'Log server unreachable, dropped {self._unsent} log message(s): {exc_obj}'
+        )
+        self._unsent = 0
+        self._last_send_warning = now
+
+    def _flush_loop(self):
+        """ Background thread sending queued messages in batches """
+
+        while not self._stop_flush.is_set():
+
+            # Wait for messages without holding the lock, such that flush()
+            # is not blocked while the queue is empty
+            self._msg_queued.wait(timeout=self._flush_interval)
+            self._msg_queued.clear()
+
+            with self._flush_lock:
+                batch = self._get_batch(timeout=0)
+                if len(batch) > 0:
+                    self._send_batch(batch)
+
+    def flush(self):
+        """ Sends all queued messages immediately (async mode only) """
+
+        if not self._async_mode:
+            return
+
+        with self._flush_lock:
+            while True:
+                batch = self._get_batch(timeout=0)
+                if len(batch) == 0:
+                    break
+                self._send_batch(batch)
+
+    def close(self):
+        """ Flushes queued messages and stops the background sending thread """
+
+        if not self._async_mode or self._stop_flush.is_set():
+            return
+
+        # The exit hook would keep this client alive after closing
+        atexit.unregister(self.close)
+
+        self._stop_flush.set()
+        if self._flush_thread is not None:
+            self._flush_thread.join(timeout=2 * self._flush_interval + 1)
+        self.flush()
+
     def close_server(self):
         """ Closes the server to which the LogClient is connected"""
 
+        self.flush()
         try:
             self._service.close_server()
         except EOFError:
@@ -344,11 +552,143 @@ class LogClient:
     def get_client_data(self):
         return pickle.loads(self._service.exposed_get_client_data())
 
+    def subscribe(self, callback, from_seq=None, epoch=None):
+        """ Subscribes to log records pushed by the log server
+
+        Records are delivered in order, in batches, by a background thread
+        serving this client's connection. The subscription ends when the
+        connection is replaced, e.g. by a reconnect in _log_msg(), see
+        is_subscribed().
+
+        :param callback: (callable) called as callback(records) with a list
+            of (seq, text) tuples, seq being the record's sequence number
+        :param from_seq: (int, optional) first sequence number to deliver,
+            e.g. last seen + 1 after a reconnect. Records still held by the
+            server are replayed. If None, only new records are delivered.
+        :param epoch: (str, optional) journal epoch returned by a previous
+            subscription. If the log server was restarted since, sequence
+            numbers start again at 0 and its whole journal is replayed.
+
+        :return: (tuple) subscription id and journal epoch of the server
+        """
+
+        if self._serving_thread is None:
+            self._serving_thread = rpyc.BgServingThread(self._connection)
+
+        def deliver(records_pickle):
+            callback(pickle.loads(records_pickle))
+
+        # Keep a reference, since the server only holds a netref to it
+        self._subscription_callback = deliver
+        self._subscription_connection = self._connection
+        subscription_id, epoch = self._service.exposed_subscribe(deliver, from_seq, epoch)
+        return subscription_id, epoch
+
+    def is_connected(self):
+        """ Whether the connection to the log server is open
+
+        :return: (bool) True if connected
+        """
+
+        connection = self._connection
+        return connection is not None and not connection.closed
+
+    def is_subscribed(self):
+        """ Whether records are still delivered to the last subscribe() call
+
+        :return: (bool) False if there is no subscription, or the connection
+            it was made on was closed or replaced
+        """
+
+        connection = self._connection
+        return (self._subscription_callback is not None
+                and connection is not None
+                and connection is self._subscription_connection
+                and not connection.closed)
+
+    def unsubscribe(self, subscription_id):
+        """ Stops delivery of log records to a subscription
+
+        :param subscription_id: (int) id returned by subscribe()
+        """
+
+        self._service.exposed_unsubscribe(subscription_id)
+        self._subscription_callback = None
+        self._subscription_connection = None
+
+    def get_records_since(self, seq):
+        """ Returns the log records kept by the server from a sequence number on
+
+        :param seq: (int) first sequence number to return
+        :return: (list) of (seq, text) tuples
+        """
+
+        return pickle.loads(self._service.exposed_get_records_since(seq))
+
+
+class _JournalHandler(logging.Handler):
+    """ Forwards formatted log records to the journal of a LogService """
+
+    def __init__(self, service):
+        super().__init__()
+        self._service = service
+
+    def emit(self, record):
+        try:
+            self._service._append_record(self.format(record))
+        except Exception:
+            self.handleError(record)
+
+
+class _LogSubscriber:
+    """ Delivers journal records to one remote subscriber in a background thread """
+
+    def __init__(self, callback, batch_size=500):
+        """ Instantiates subscriber and starts delivery thread
+
+        :param callback: (netref) remote function taking pickled lists of
+            (seq, text) tuples
+        :param batch_size: (int) maximum number of records per call
+        """
+
+        self._callback = callback
+        self._batch_size = batch_size
+        self._queue = queue.Queue()
+        self.active = True
+
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def put(self, record):
+        self._queue.put(record)
+
+    def stop(self):
+        self.active = False
+        self._queue.put(None)
+
+    def _run(self):
+        while self.active:
+            records = [self._queue.get()]
+            while len(records) < self._batch_size:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            if None in records:
+                return
+
+            # Subscriber went away, it can resubscribe with from_seq later
+            try:
+                self._callback(pickle.dumps(records))
+            except Exception:
+                self.active = False
+
 
 class LogService(rpyc.Service):
 
     def __init__(self, form_string=None, console_level=logging.DEBUG, file_level=logging.DEBUG, log_output=False,
-                 name=None, dir_path=None):
+                 name=None, dir_path=None, journal_size=10000):
         """ Instantiate LogService
 
         If the log_output flag is set to True, a .log file will be generated.
@@ -361,10 +701,15 @@ class LogService(rpyc.Service):
             two parameters must be provided:
         :name: Name of the log-file.
         :dir_path: Directory where the log files will be generated.
+        :journal_size: Number of recent log records kept for replay to subscribers.
 
         Note: A dated subdirectory structure will be automatically generated, such that the
         log output will be logged in the following file:
             'dir_path/YEAR/MONTH/DAY/name.log'
+
+        Every log record is also assigned a sequence number and stored in a journal.
+        Clients can subscribe to have new records pushed to them (see exposed_subscribe)
+        and replay records they missed, e.g. after a reconnect.
         """
 
         super().__init__()
@@ -390,6 +735,20 @@ class LogService(rpyc.Service):
         # add ch to logger
         self.logger.addHandler(ch)
 
+        # Journal of sequence-numbered records for subscribers
+        self._journal = deque(maxlen=journal_size)
+        self._next_seq = 0
+
+        # Identifies this journal, since sequence numbers restart with the server
+        self._journal_epoch = uuid.uuid4().hex
+        self._subscribers = {}
+        self._next_subscriber_id = 0
+        self._journal_lock = threading.Lock()
+
+        jh = _JournalHandler(self)
+        jh.setFormatter(formatter)
+        self.logger.addHandler(jh)
+
         # create file handler which logs even debug messages
         if log_output:
 
@@ -439,6 +798,89 @@ class LogService(rpyc.Service):
 
         return 0
 
+    def _append_record(self, text):
+        """ Adds a formatted record to the journal and pushes it to subscribers
+
+        :param text: (str) formatted log record
+        """
+
+        with self._journal_lock:
+            record = (self._next_seq, text)
+            self._journal.append(record)
+            self._next_seq += 1
+
+            for subscriber_id, subscriber in list(self._subscribers.items()):
+                if subscriber.active:
+                    subscriber.put(record)
+                else:
+                    del self._subscribers[subscriber_id]
+
+    def exposed_subscribe(self, callback, from_seq=None, epoch=None):
+        """ Subscribes a client to log records
+
+        :param callback: (callable) function on the client called with a
+            pickled list of (seq, text) tuples whenever new records arrive
+        :param from_seq: (int, optional) first sequence number to deliver.
+            Records from from_seq on that are still in the journal are
+            replayed first. If None, only new records are delivered.
+        :param epoch: (str, optional) journal epoch from_seq refers to. If it
+            is not the epoch of this journal (e.g. the server was restarted),
+            the whole journal is replayed.
+
+        :return: (tuple) subscription id and journal epoch
+        """
+
+        if epoch is not None and epoch != self._journal_epoch:
+            from_seq = 0
+
+        subscriber = _LogSubscriber(callback)
+
+        # Replay and registration under the same lock, such that no record is
+        # missed or delivered twice
+        with self._journal_lock:
+            if from_seq is not None:
+                for record in self._journal:
+                    if record[0] >= from_seq:
+                        subscriber.put(record)
+
+            subscriber_id = self._next_subscriber_id
+            self._next_subscriber_id += 1
+            self._subscribers[subscriber_id] = subscriber
+
+        return subscriber_id, self._journal_epoch
+
+    def exposed_unsubscribe(self, subscriber_id):
+        """ Ends a subscription
+
+        :param subscriber_id: (int) id returned by exposed_subscribe()
+        """
+
+        with self._journal_lock:
+            subscriber = self._subscribers.pop(subscriber_id, None)
+        if subscriber is not None:
+            subscriber.stop()
+
+    def exposed_get_records_since(self, seq):
+        """ Returns journal records from a sequence number on
+
+        :param seq: (int) first sequence number to return
+        :return: (pickle) pickled list of (seq, text) tuples
+        """
+
+        with self._journal_lock:
+            return pickle.dumps([record for record in self._journal if record[0] >= seq])
+
+    def exposed_log_batch(self, batch_pickle):
+        """ Logs several messages sent in one call
+
+        :param batch_pickle: (pickle) pickled list of (msg_str, level_str) tuples
+        """
+
+        for msg_str, level_str in pickle.loads(batch_pickle):
+            self.exposed_log_msg(msg_str, level_str)
+
+        return 0
+
     def add_client_data(self, module_name, module_data_pickle):
         """ Add new client info
 
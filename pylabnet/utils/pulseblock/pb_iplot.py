@@ -5,6 +5,10 @@ pltly.init_notebook_mode()
 
 def iplot(pb_obj, use_gl=False):
 
+    # Plot repeats as individual pulses
+    if pb_obj.rep_list:
+        pb_obj = pb_obj.unroll()
+
     # Do nothing for empty PulseBlock
     if len(pb_obj.dflt_dict.keys()) == 0 and len(pb_obj.p_dict.keys()) == 0:
         return None
@@ -1,45 +1,30 @@
 import numpy as np
+from pylabnet.utils.pulseblock.sample_cache import get_sample_cache
 
+# Tolerance (in samples) when converting times to sample indices, such that
+# times which are nominally integer multiples of the sampling period are not
+# truncated to the previous sample due to floating point errors
+SAMPLE_INDEX_TOL = 1e-6
 
-def pb_sample(pb_obj, samp_rate, len_min=0, len_max=float('inf'), len_step=1, len_adj=True, debug=False):
-    """ Generate sample array.
 
-    Unlike PulseBlock class, which makes now assumptions beyond the base class
-    attributes, this function introduces one more requirement:
-        each Pulse and DfltPulse object in the block must have
-        get_value(t_ar) method with the following signature:
-            :param t_ar: (numpy.array) array of time points
-            :return: (numpy.array) array of samples
+def sample_index(t, samp_rate):
+    """ Index of the sample at (or directly before) time t
 
-    :param pb_obj: (PulseBlock) pulse block to be sampled
+    :param t: (float) time [s]
     :param samp_rate: (float) sampling rate [Hz]
+    :return: (int) sample index
+    """
 
-    Hardware memory waveform-length limitations
-
-    :param len_min: (int) minimal waveform length (used for sanity check and
-    auto-padding if len_adj is set to True)
-
-    :param len_max: (int) maximal waveform length (used for sanity check only)
+    return int(t * samp_rate + SAMPLE_INDEX_TOL)
 
-    :param len_step: (int) waveform length granularity (if length must be an
-    integer multiple of a given step)
 
-    :param len_adj: (bool) if True, sample array will be padded with default
-    values (determined by pb_odj.dflt_dict) to meet len_min and len_step.
-    If False and resulting sample array length does not meet these constraints,
-    ValueError will be produced. Note that if length exceeds len_max, ValueError
-    is always produced.
+def get_n_pts(pb_obj, samp_rate, len_min=0, len_max=float('inf'), len_step=1, len_adj=True):
+    """ Number of samples of a pulse block, adjusted to hardware length constraints
 
-    :param debug: (bool) if True, time-point array will be included as a last
-    element in the returned tuple
+    Parameters are the same as for pb_sample().
 
-    :return: (tuple)
-    (
-        samp_dict = {'ch_name': sample_array, ...}
-        n_pts - number of samples (per channel, number of time points)
-        add_pts - number of default points added to meet len_min and len_step
-        [t_ar] (if debug is set to True) - numpy float array of time points
-    )
+    :return: (tuple) (n_pts, add_pts) - total number of samples and number of
+        default points added to meet len_min and len_step
     """
 
     t_step = 1 / samp_rate
@@ -115,6 +100,65 @@ def pb_sample(pb_obj, samp_rate, len_min=0, len_max=float('inf'), len_step=1, le
             ''.format(n_pts, len_max)
         )
 
+    return n_pts, add_pts
+
+
+def pb_sample(pb_obj, samp_rate, len_min=0, len_max=float('inf'), len_step=1, len_adj=True, debug=False):
+    """ Generate sample array.
+
+    Unlike PulseBlock class, which makes now assumptions beyond the base class
+    attributes, this function introduces one more requirement:
+        each Pulse and DfltPulse object in the block must have
+        get_value(t_ar) method with the following signature:
+            :param t_ar: (numpy.array) array of time points
+            :return: (numpy.array) array of samples
+
+    :param pb_obj: (PulseBlock) pulse block to be sampled
+    :param samp_rate: (float) sampling rate [Hz]
+
+    Hardware memory waveform-length limitations
+
+    :param len_min: (int) minimal waveform length (used for sanity check and
+    auto-padding if len_adj is set to True)
+
+    :param len_max: (int) maximal waveform length (used for sanity check only)
+
+    :param len_step: (int) waveform length granularity (if length must be an
+    integer multiple of a given step)
+
+    :param len_adj: (bool) if True, sample array will be padded with default
+    values (determined by pb_odj.dflt_dict) to meet len_min and len_step.
+    If False and resulting sample array length does not meet these constraints,
+    ValueError will be produced. Note that if length exceeds len_max, ValueError
+    is always produced.
+
+    :param debug: (bool) if True, time-point array will be included as a last
+    element in the returned tuple
+
+    Repeats in pb_obj.rep_list are sampled only once and the samples are
+    tiled n_reps times. Sub-block durations should therefore be integer
+    multiples of 1/samp_rate, otherwise the repetition period is rounded to
+    the nearest number of samples.
+
+    :return: (tuple)
+    (
+        samp_dict = {'ch_name': sample_array, ...}
+        n_pts - number of samples (per channel, number of time points)
+        add_pts - number of default points added to meet len_min and len_step
+        [t_ar] (if debug is set to True) - numpy float array of time points
+    )
+    """
+
+    t_step = 1 / samp_rate
+    n_pts, add_pts = get_n_pts(
+        pb_obj=pb_obj,
+        samp_rate=samp_rate,
+        len_min=len_min,
+        len_max=len_max,
+        len_step=len_step,
+        len_adj=len_adj
+    )
+
     # Sample pulse block ------------------------------------------------------
 
     # Generate arrays of T-points
@@ -145,8 +189,8 @@ def pb_sample(pb_obj, samp_rate, len_min=0, len_max=float('inf'), len_step=1, le
             for p_item in pb_obj.p_dict[ch]:
 
                 # find indexes of pulse edges
-                indx_1 = int(p_item.t0 * samp_rate)
-                indx_2 = indx_1 + int(p_item.dur * samp_rate)
+                indx_1 = sample_index(p_item.t0, samp_rate)
+                indx_2 = indx_1 + sample_index(p_item.dur, samp_rate)
 
                 # calculate new values
                 val_ar = p_item.get_value(
@@ -156,6 +200,21 @@ def pb_sample(pb_obj, samp_rate, len_min=0, len_max=float('inf'), len_step=1, le
                 # set the values to sample array
                 samp_dict[ch_name][indx_1: indx_2] = val_ar
 
+    # Sample each repeated sub-block once and tile the samples
+    for rep in pb_obj.rep_list:
+        rep_samp_dict, rep_n_pts, _ = pb_sample(
+            pb_obj=rep.pb_obj,
+            samp_rate=samp_rate
+        )
+
+        indx_1 = sample_index(rep.t0, samp_rate)
+        indx_2 = min(indx_1 + rep_n_pts * rep.n_reps, n_pts)
+
+        for ch_name, rep_samp_ar in rep_samp_dict.items():
+            samp_dict[ch_name][indx_1: indx_2] = np.tile(
+                rep_samp_ar, rep.n_reps
+            )[:indx_2 - indx_1]
+
     if debug:
         return samp_dict, n_pts, add_pts, t_ar
     else:
@@ -175,8 +234,11 @@ def pulse_length_samples(pulse, samp_rate):
     return n_pts
 
 
-def pulse_sample(pulse, dflt_pulse, samp_rate, len_min=32, len_step=1, len_adj=True):
+def pulse_sample(pulse, dflt_pulse, samp_rate, len_min=32, len_step=1, len_adj=True, use_cache=True):
     """ Generate sample array from a single pulse object
+
+    :param use_cache: (bool) if True, the samples of the pulse are taken from
+        the process-level sample cache (see sample_cache.py) if available
     """
 
     t_step = 1 / samp_rate
@@ -222,7 +284,10 @@ def pulse_sample(pulse, dflt_pulse, samp_rate, len_min=32, len_step=1, len_adj=T
         num=n_pts
     )
     # calculate new values
-    samp_arr = pulse.get_value(t_ar=t_ar[:n_pts_orig])
+    if use_cache:
+        samp_arr = get_sample_cache().get_value(pulse, t_ar[:n_pts_orig], samp_rate)
+    else:
+        samp_arr = pulse.get_value(t_ar=t_ar[:n_pts_orig])
     # buffer the end with default values
     samp_arr = np.append(samp_arr, dflt_pulse.get_value(t_ar=t_ar[n_pts_orig:]))
 
@@ -240,3 +305,73 @@ def pulse_sample(pulse, dflt_pulse, samp_rate, len_min=32, len_step=1, len_adj=T
 
 
 #     return done, pulse
+
+
+def pb_digital_word_chunks(pb_obj, samp_rate, bit_dict, n_pts, chunk_size=2**20, dtype=np.uint32):
+    """ Generate packed digital sample words chunk by chunk.
+
+    Yields the same samples as packing the digital channels of pb_sample()
+    into one word per time point (bit bit_dict[ch_name] set if the channel is
+    True), but renders them directly from the pulse edges, one chunk at a
+    time. Memory use is therefore set by chunk_size rather than n_pts.
+
+    Requires all digital Pulse and DfltPulse objects to have a constant value
+    (such as PTrue, PFalse, DTrue, DFalse). Analog channels are ignored.
+    Repeats are expanded with PulseBlock.unroll().
+
+    :param pb_obj: (PulseBlock) pulse block to be sampled
+    :param samp_rate: (float) sampling rate [Hz]
+    :param bit_dict: (dict) {'ch_name': bit index} for each digital channel
+    :param n_pts: (int) total number of samples, see get_n_pts()
+    :param chunk_size: (int) number of samples per chunk
+    :param dtype: (numpy dtype) unsigned integer type of the words
+
+    :return: (generator) yielding numpy arrays of at most chunk_size words
+    """
+
+    if pb_obj.rep_list:
+        pb_obj = pb_obj.unroll()
+
+    # Pre-compute sample indices of all pulse edges for each channel
+    ch_edges = []
+    for ch in pb_obj.dflt_dict.keys():
+
+        # Skip the channel if it is not digital
+        if ch.is_analog:
+            continue
+
+        dflt_val = bool(pb_obj.dflt_dict[ch].get_value(t_ar=np.zeros(1))[0])
+        p_list = pb_obj.p_dict.get(ch, [])
+
+        # Same rounding as in pb_sample()
+        indx_1 = np.array([sample_index(p_item.t0, samp_rate) for p_item in p_list], dtype=np.int64)
+        indx_2 = indx_1 + np.array([sample_index(p_item.dur, samp_rate) for p_item in p_list], dtype=np.int64)
+        val_ar = np.array([bool(p_item.get_value(t_ar=np.zeros(1))[0]) for p_item in p_list], dtype=bool)
+
+        # Stable sort keeps the overwrite order of pb_sample() for overlapping pulses
+        order = np.argsort(indx_1, kind='stable')
+        indx_1, indx_2, val_ar = indx_1[order], indx_2[order], val_ar[order]
+
+        # Running maximum of pulse ends, used to find the first pulse reaching into a chunk
+        end_max = np.maximum.accumulate(indx_2) if len(indx_2) > 0 else indx_2
+
+        ch_edges.append((dtype(bit_dict[ch.name]), dflt_val, indx_1, indx_2, end_max, val_ar))
+
+    for chunk_start in range(0, n_pts, chunk_size):
+        chunk_end = min(chunk_start + chunk_size, n_pts)
+        words = np.zeros(chunk_end - chunk_start, dtype=dtype)
+
+        for bit, dflt_val, indx_1, indx_2, end_max, val_ar in ch_edges:
+            ch_ar = np.full(chunk_end - chunk_start, dflt_val, dtype=bool)
+
+            first = np.searchsorted(end_max, chunk_start, side='right')
+            last = np.searchsorted(indx_1, chunk_end, side='left')
+            for p_idx in range(first, last):
+                start = max(indx_1[p_idx], chunk_start) - chunk_start
+                stop = min(indx_2[p_idx], chunk_end) - chunk_start
+                if stop > start:
+                    ch_ar[start:stop] = val_ar[p_idx]
+
+            words |= ch_ar.astype(dtype) << bit
+
+        yield words
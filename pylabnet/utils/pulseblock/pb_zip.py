@@ -34,6 +34,97 @@ def pb_zip(pb_obj, dur_quant):
         Order: wait is the first element, non-repeated snippets go next in
             chronological order.
     }
+
+    Repeats: each Repeat in pb_obj.rep_list is output as a single snippet
+    (the repeated sub-block, named pb_obj.name + '_rep' + 'repeat number')
+    with repetition number n_reps, so the memory footprint does not depend
+    on n_reps. Its sub-block must be at least dur_quant long. The periods
+    between repeats are collapsed independently as described above and must
+    be either empty or at least dur_quant long.
+    """
+
+    # Construct 'wait' PulseBlock
+    wait_pb_name = pb_obj.name + '_wait'
+    wait_pb = pb.PulseBlock(name=wait_pb_name)
+    wait_pb.dur = dur_quant
+    wait_pb.dflt_dict = copy.deepcopy(pb_obj.dflt_dict)
+
+    if not pb_obj.rep_list:
+        seq_list, snip_list, _ = _zip_segment(
+            pb_obj=pb_obj,
+            dur_quant=dur_quant,
+            wait_pb_name=wait_pb_name,
+            snip_prefix=pb_obj.name
+        )
+        return {
+            'seq_list': seq_list,
+            'snip_list': [wait_pb] + snip_list
+        }
+
+    final_seq_list = []
+    final_snip_list = [wait_pb]
+
+    # These counters are used to keep track of PulseBlock names
+    pb_name_idx = 0
+    rep_idx = 0
+
+    for seg_t0, seg_item in pb_obj.segments():
+
+        # Repeat: output the sub-block n_reps times
+        if isinstance(seg_item, pb.Repeat):
+            if seg_item.pb_obj.dur < dur_quant:
+                raise ValueError(
+                    'pb_zip(): repeated sub-block "{}" is shorter than dur_quant: \n'
+                    '   sub-block dur = {:.2e} \n'
+                    '   dur_quant = {:.2e} \n'
+                    'Lengthen the sub-block or unroll() the PulseBlock'
+                    ''.format(seg_item.pb_obj.name, seg_item.pb_obj.dur, dur_quant)
+                )
+
+            rep_pb = seg_item.pb_obj.copy(name=pb_obj.name + '_rep{}'.format(rep_idx))
+            final_snip_list.append(rep_pb)
+            final_seq_list.append(
+                (rep_pb.name, seg_item.n_reps)
+            )
+            rep_idx += 1
+
+        # Period between repeats: collapse wait periods
+        else:
+            if seg_item.dur < dur_quant:
+                raise ValueError(
+                    'pb_zip(): period between repeats at t0={:.2e} is shorter than dur_quant: \n'
+                    '   period dur = {:.2e} \n'
+                    '   dur_quant = {:.2e}'
+                    ''.format(seg_t0, seg_item.dur, dur_quant)
+                )
+
+            seq_list, snip_list, pb_name_idx = _zip_segment(
+                pb_obj=seg_item,
+                dur_quant=dur_quant,
+                wait_pb_name=wait_pb_name,
+                snip_prefix=pb_obj.name,
+                first_idx=pb_name_idx
+            )
+            final_seq_list.extend(seq_list)
+            final_snip_list.extend(snip_list)
+
+    return {
+        'seq_list': final_seq_list,
+        'snip_list': final_snip_list
+    }
+
+
+def _zip_segment(pb_obj, dur_quant, wait_pb_name, snip_prefix, first_idx=0):
+    """ Collapse default periods of a PulseBlock without repeats
+
+    :param pb_obj: PulseBlock without repeats, at least dur_quant long
+    :param dur_quant: (float) see pb_zip()
+    :param wait_pb_name: (str) name of the repeated wait wfm
+    :param snip_prefix: (str) snippet names are snip_prefix + '_' + snip number
+    :param first_idx: (int) number of the first snippet
+
+    :return: (tuple) (seq_list, snip_list, next_idx) - sequence table and list
+        of non-wait snippets as in pb_zip(), and number for the next snippet
     """
 
     # Non-default intervals ---------------------------------------------------
@@ -133,20 +224,13 @@ def pb_zip(pb_obj, dur_quant):
     final_snip_list = []
     final_seq_list = []
 
-    # Construct 'wait' PulseBlock
-    wait_pb_name = pb_obj.name + '_wait'
-    wait_pb = pb.PulseBlock(name=wait_pb_name)
-    wait_pb.dur = dur_quant
-    wait_pb.dflt_dict = copy.deepcopy(pb_obj.dflt_dict)
-    final_snip_list.append(wait_pb)
-
     # Iterate through all pulse runs, take 'snippet pulse blocks',
     # and construct sequence table
 
     # The last run (must be non-wait) will be extended to include the reminder
     last_period_idx = len(period_dict['val_ar']) - 1
     # This counter is used to keep track of PulseBlock names
-    pb_name_idx = 0
+    pb_name_idx = first_idx
 
     for period_idx, period_val in enumerate(period_dict['val_ar']):
 
@@ -154,7 +238,7 @@ def pb_zip(pb_obj, dur_quant):
         if period_val:
 
             # Take a snippet of this pulse period
-            tmp_pb_name = pb_obj.name + '_{}'.format(pb_name_idx)
+            tmp_pb_name = snip_prefix + '_{}'.format(pb_name_idx)
 
             # Snippet edges
             start_t = period_dict['start_ar'][period_idx] * dur_quant
@@ -192,10 +276,7 @@ def pb_zip(pb_obj, dur_quant):
                 (wait_pb_name, period_dict['len_ar'][period_idx])
             )
 
-    return {
-        'seq_list': final_seq_list,
-        'snip_list': final_snip_list
-    }
+    return final_seq_list, final_snip_list, pb_name_idx
 
 
 def pb_expand_test(res_dict, indicate_bounds=True):
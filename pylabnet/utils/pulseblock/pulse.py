@@ -19,6 +19,32 @@ class PulseBase:
         self.t0 = t0
         self.dur = dur
 
+    def is_time_invariant(self):
+        """ Whether get_value() only depends on the number of time points
+
+        Samples of time-invariant pulses are shared between pulses at
+        different t0 by the sample cache (see sample_cache.py).
+
+        :return: (bool) True if the samples do not depend on t_ar values or t0
+        """
+
+        return False
+
+    def is_shift_invariant(self, mod=None):
+        """ Whether get_value() only depends on the time points relative to t0
+
+        Samples of shift-invariant pulses (e.g. unmodulated envelopes) are
+        shared between pulses at different t0 by the sample cache, keyed on
+        the offset of the first time point from t0 (see sample_cache.py).
+
+        :param mod: (bool) modulation flag passed to get_value(), None to
+            use the setting of the pulse
+        :return: (bool) True if shifting t0 and t_ar by the same amount
+            does not change the samples
+        """
+
+        return self.is_time_invariant()
+
 
 class DfltPulseBase:
     """ Base class for DfltPulse objects
@@ -51,6 +77,9 @@ class PTrue(PulseBase):
     def __str__(self):
         return 'True'
 
+    def is_time_invariant(self):
+        return True
+
     def get_value(self, t_ar):
         """ Returns array of samples
 
@@ -75,6 +104,9 @@ class PFalse(PulseBase):
     def __str__(self):
         return 'False'
 
+    def is_time_invariant(self):
+        return True
+
     def get_value(self, t_ar):
         """ Returns array of samples
 
@@ -200,6 +232,10 @@ class PGaussian(PulseBase):
 
         return ret_str
 
+    def is_shift_invariant(self, mod=None):
+        # The envelope is centered on the pulse, only the modulation depends on t0
+        return not (self.mod if mod is None else mod)
+
     def get_value(self, t_ar, mod=None):
         """ Returns array of samples
 
@@ -265,6 +301,13 @@ class PConst(PulseBase):
 
         return ret_str
 
+    def is_time_invariant(self):
+        # Only the modulation depends on time
+        return not self.mod
+
+    def is_shift_invariant(self, mod=None):
+        return not (self.mod if mod is None else mod)
+
     def get_value(self, t_ar, mod=None):
         """ Returns array of samples
 
@@ -1,5 +1,5 @@
-import numpy as np
 import copy
+from pylabnet.utils.pulseblock.placeholder import Placeholder
 
 
 class Channel:
@@ -34,6 +34,70 @@ class Channel:
         return hash(self.name)
 
 
+def _bisect_t0(p_list, t0, right=False):
+    """ Binary search in a t0-ordered list of Pulse objects
+
+    :param p_list: (list) Pulse objects sorted by t0
+    :param t0: start time to search for
+    :param right: (bool) if False, return the index of the first pulse with
+        p_item.t0 >= t0, otherwise of the first pulse with p_item.t0 > t0
+    :return: (int) insertion index
+    """
+
+    lo, hi = 0, len(p_list)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if (p_list[mid].t0 <= t0) if right else (p_list[mid].t0 < t0):
+            lo = mid + 1
+        else:
+            hi = mid
+    return lo
+
+
+class Repeat:
+    """ Class to represent a PulseBlock played n_reps times back-to-back.
+
+    The repetition is kept symbolic: the sub-block is stored once and only
+    expanded by consumers which cannot express loops (see PulseBlock.unroll()).
+    Repeat objects are placed into a PulseBlock with insert_rep()/append_rep().
+    """
+
+    def __init__(self, pb_obj, n_reps, t0=0):
+        """ Construct new Repeat.
+
+        :param pb_obj: (PulseBlock) sub-block to be repeated. It must not
+            contain repeats itself.
+        :param n_reps: (int) number of repetitions, at least 1
+        :param t0: (numeric) position of the beginning of the first repetition
+        """
+
+        if int(n_reps) != n_reps or n_reps < 1:
+            raise ValueError(
+                'Repeat(): n_reps must be a positive integer, got {}'.format(n_reps)
+            )
+        if pb_obj.rep_list:
+            raise ValueError(
+                'Repeat(): nested repeats are not supported, sub-block "{}" '
+                'already contains repeats'.format(pb_obj.name)
+            )
+        if not pb_obj.dur > 0:
+            raise ValueError(
+                'Repeat(): sub-block "{}" has zero duration'.format(pb_obj.name)
+            )
+
+        self.pb_obj = pb_obj
+        self.n_reps = int(n_reps)
+        self.t0 = t0
+
+    @property
+    def dur(self):
+        """ Total duration of all repetitions """
+        return self.pb_obj.dur * self.n_reps
+
+    def __str__(self):
+        return 'Repeat({}, n_reps={})'.format(self.pb_obj.name, self.n_reps)
+
+
 class PulseBlock:
     """ Class for construction of pulse sequences.
 
@@ -75,6 +139,21 @@ class PulseBlock:
         name (str) - name of the sequence
         dur (numeric) - total duration of the sequence
                         (t0+dur of the latest Pulse object)
+
+    Since each channel's pulse list is kept t0-ordered, it serves as the
+    index for conflict checks: a new pulse is located by binary search and
+    only compared to its neighbours. Pulse objects are copied (shallowly)
+    when added, so the caller's objects are never shifted in time. To build
+    large sequences, add all pulses at once with extend() rather than
+    calling insert() for each of them.
+
+    Periodic parts of a sequence can be added as Repeat objects with
+    insert_rep()/append_rep() instead of unrolling them with append_pb()
+    in a loop. Repeats are stored in rep_list (t0-ordered) and own the
+    entire block during their interval: no pulse on any channel and no other
+    repeat may overlap them. pb_sample(), pb_zip() and the HDAWG handler keep
+    the repetition symbolic; other consumers can call unroll() to get an
+    equivalent plain PulseBlock.
     """
 
     def __init__(self, p_obj_list=None, dflt_dict=None, name='', use_auto_dflt=True):
@@ -110,6 +189,7 @@ class PulseBlock:
         self.dur = 0
         self.p_dict = dict()
         self.dflt_dict = dict()
+        self.rep_list = []
         self.use_auto_dflt = use_auto_dflt
         self.latest_t0 = 0
         self.latest_dur = 0
@@ -124,11 +204,9 @@ class PulseBlock:
         elif type(p_obj_list) is not list:
             p_obj_list = [p_obj_list]
 
-        # Iterate through all given pulses and _insert them into the block
-        # (_insert should be used - it does not reset edges)
-        for p_obj in p_obj_list:
-            p_obj = copy.deepcopy(p_obj)
-            self._insert(p_obj=p_obj, use_auto_dflt=self.use_auto_dflt)
+        # Insert all given pulses into the block
+        # (_extend should be used - it does not reset edges)
+        self._extend(p_obj_list=p_obj_list, use_auto_dflt=self.use_auto_dflt)
 
         # Reset edges: set the left-most edge to zero
         # and set self.dur to the right-most edge
@@ -158,7 +236,7 @@ class PulseBlock:
                         Pulse object.
         """
 
-        p_obj = copy.deepcopy(p_obj)
+        p_obj = copy.copy(p_obj)
         ch = Channel(name=p_obj.ch, is_analog=p_obj.is_analog)
 
         # Sanity check:
@@ -169,10 +247,7 @@ class PulseBlock:
 
             # Find the position, into which
             # the new pulse should be inserted
-            t0_list = np.array(
-                [p_item.t0 for p_item in p_list]
-            )
-            idx = np.searchsorted(t0_list, p_obj.t0)
+            idx = _bisect_t0(p_list, p_obj.t0)
 
             # If the new pulse will not be the left-most [idx = 0],
             # check for overlap with existing pulse to the left
@@ -218,6 +293,9 @@ class PulseBlock:
                         )
                     )
 
+        # Pulses cannot be placed into the interval of a repeat
+        self._check_rep_overlap(p_obj.t0, p_obj.dur, 'insert()', str(p_obj))
+
         # Check if the channel already exists with the samne name but a
         # different type
         for key in self.p_dict.keys():
@@ -235,13 +313,10 @@ class PulseBlock:
         if ch not in self.p_dict.keys():
             self.p_dict[ch] = []
 
-        # Add p_obj as a new entry in 'ch' pulse list
-        self.p_dict[ch].append(p_obj)
-
-        # T-order pulses within 'ch'
-        self.p_dict[ch].sort(
-            key=lambda p_item: p_item.t0
-        )
+        # Add p_obj into 'ch' pulse list, keeping it T-ordered
+        # (after existing pulses with the same t0)
+        p_list = self.p_dict[ch]
+        p_list.insert(_bisect_t0(p_list, p_obj.t0, right=True), p_obj)
 
         # Automatically assign default pulse
         if use_auto_dflt:
@@ -276,6 +351,139 @@ class PulseBlock:
         self._insert(p_obj=p_obj, cflct_er=cflct_er)
         self.reset_edges()
 
+    def _extend(self, p_obj_list, cflct_er=True, use_auto_dflt=True):
+        """ Technical method for inserting many Pulse objects at once
+        Here start and stop edges of PulseBlock are not adjusted.
+
+        Equivalent to calling _insert() for each element of p_obj_list, but
+        each affected channel is sorted and checked for conflicts only once.
+        If any conflict is found, PulseBlock is not altered and ValueError is
+        produced.
+
+        :param p_obj_list: (list) Pulse objects to be inserted
+        :param cflct_er: (bool) 'conflict-error' check, see _insert()
+        :param use_auto_dflt: (bool) assign default pulses based on
+            auto_default parameter of Pulse objects
+        """
+
+        if len(p_obj_list) == 0:
+            return
+
+        # Group copies of the new pulses by channel
+        new_p_dict = dict()
+        new_p_list = []
+        for p_obj in p_obj_list:
+            p_obj = copy.copy(p_obj)
+            new_p_list.append(p_obj)
+            ch = Channel(name=p_obj.ch, is_analog=p_obj.is_analog)
+            if ch not in new_p_dict:
+                new_p_dict[ch] = []
+            new_p_dict[ch].append(p_obj)
+
+        merged_p_dict = dict()
+        for ch, new_list in new_p_dict.items():
+
+            # Check that the channel is used with a single type
+            for key in list(self.p_dict.keys()) + [ch]:
+                for p_item in new_list:
+                    if key.name == p_item.ch and key.is_analog != p_item.is_analog:
+                        raise ValueError('extend(): tried to insert pulse name {} '
+                                         'with pulse type {} when the channel already had pulses '
+                                         'of type {}'.format(
+                                             ch.name,
+                                             'analog' if p_item.is_analog else 'digital',
+                                             'analog' if key.is_analog else 'digital'
+                                         )
+                                         )
+
+            # Existing pulses come first for equal t0, as with _insert()
+            p_list = self.p_dict.get(ch, []) + new_list
+            p_list.sort(key=lambda p_item: p_item.t0)
+
+            # Sanity check:
+            #   neighbouring pulses do not overlap
+            if cflct_er:
+                for left_item, right_item in zip(p_list[:-1], p_list[1:]):
+                    if not (left_item.t0 + left_item.dur) <= right_item.t0:
+                        raise ValueError(
+                            'extend(): conflict on ch="{}": pulse \n'
+                            '   {}, t0={:.2e}, dur={:.2e} \n'
+                            'overlaps with pulse \n'
+                            '   {}, t0={:.2e}, dur={:.2e}'
+                            ''.format(
+                                ch,
+                                str(left_item),
+                                left_item.t0,
+                                left_item.dur,
+                                str(right_item),
+                                right_item.t0,
+                                right_item.dur
+                            )
+                        )
+
+            merged_p_dict[ch] = p_list
+
+        for p_obj in new_p_list:
+            self._check_rep_overlap(p_obj.t0, p_obj.dur, 'extend()', str(p_obj))
+
+        # All checks passed - modify the block
+        for ch, p_list in merged_p_dict.items():
+            self.p_dict[ch] = p_list
+
+            # Automatically assign default pulse
+            if use_auto_dflt:
+                self.dflt_dict[ch] = new_p_dict[ch][-1].auto_default
+
+        # Update the latest values that have been added to the PB
+        self.latest_t0 = p_obj.t0
+        self.latest_dur = p_obj.dur
+
+    def extend(self, p_obj_list, cflct_er=True):
+        """ Insert many Pulse objects into PulseBlock at once
+
+        All t0 values refer to the current time origin of the block, which is
+        only shifted once after all pulses are inserted (as for p_obj_list in
+        the constructor). Each affected channel is sorted and checked for
+        conflicts only once, so building a block of N pulses takes
+        O(N log N) rather than O(N^2) time.
+
+        :param p_obj_list: (list) Pulse objects to be inserted
+        :param cflct_er: (bool) 'conflict-error' check.
+                         If True, a check is performed to ensure that no two
+                         pulses overlap on any channel. In the case of overlap,
+                         PulseBlock is not altered and ValueError is produced.
+        :return: None
+        """
+
+        self._extend(p_obj_list=p_obj_list, cflct_er=cflct_er)
+        self.reset_edges()
+
+    def copy(self, name=None):
+        """ Returns a copy of PulseBlock
+
+        Pulse and DfltPulse objects are copied shallowly: their attributes
+        (t0, dur, ch, ...) can be changed independently in both blocks, while
+        nested parameters (e.g. iq_params dictionaries) are shared. Repeat
+        objects are copied, but share their (unmodified) sub-blocks.
+
+        :param name: (str, opt) name of the new PulseBlock, defaults to self.name
+        :return: (PulseBlock) the copy
+        """
+
+        new_pb = copy.copy(self)
+        new_pb.p_dict = {
+            ch: [copy.copy(p_item) for p_item in p_list]
+            for ch, p_list in self.p_dict.items()
+        }
+        new_pb.dflt_dict = {
+            ch: copy.copy(dflt) for ch, dflt in self.dflt_dict.items()
+        }
+        new_pb.rep_list = [copy.copy(rep) for rep in self.rep_list]
+        if name is not None:
+            new_pb.name = name
+
+        return new_pb
+
     def join(self, p_obj, name='', cflct_er=True):
         """ Same as insert(), but instead of changing the existing PulseBlock,
         a new one is created and the original PulseBlock is not altered.
@@ -284,8 +492,7 @@ class PulseBlock:
         :return: (PulseBlock) the new PulseBlock - self with p_obj inserted.
         """
 
-        new_pb = copy.deepcopy(self)
-        new_pb.name = name
+        new_pb = self.copy(name=name)
         new_pb.insert(
             p_obj=p_obj,
             cflct_er=cflct_er
@@ -303,7 +510,7 @@ class PulseBlock:
                               is created [join() method is called]
         """
 
-        p_obj = copy.deepcopy(p_obj)
+        p_obj = copy.copy(p_obj)
         p_obj.t0 += self.dur
 
         if join:
@@ -362,14 +569,16 @@ class PulseBlock:
 
         # TODO: re-implement using reset_edges()
 
-        pb_obj = copy.deepcopy(pb_obj)
+        pb_obj = pb_obj.copy()
 
         #
         # Sanity checks
         #
 
         # No overlap between blocks
-        if cflct_er and (set(self.p_dict.keys()) & set(pb_obj.p_dict.keys())):
+        # (repeats occupy all channels, so they always have to be checked)
+        if (self.rep_list or pb_obj.rep_list) or (
+                cflct_er and (set(self.p_dict.keys()) & set(pb_obj.p_dict.keys()))):
             if t0 >= 0:
                 if not self.dur <= t0:
                     raise ValueError(
@@ -416,10 +625,14 @@ class PulseBlock:
             for ch in pb_obj.p_dict.keys():
                 for p_item in pb_obj.p_dict[ch]:
                     p_item.t0 += t0
+            for rep in pb_obj.rep_list:
+                rep.t0 += t0
         else:
             for ch in self.p_dict.keys():
                 for p_item in self.p_dict[ch]:
                     p_item.t0 += abs(t0)
+            for rep in self.rep_list:
+                rep.t0 += abs(t0)
 
         # Register new channels
         for ch in pb_obj.p_dict.keys():
@@ -439,12 +652,15 @@ class PulseBlock:
                     key=lambda pulse_item: pulse_item.t0
                 )
 
+        # Add new repeats
+        if pb_obj.rep_list:
+            self.rep_list.extend(pb_obj.rep_list)
+            self.rep_list.sort(key=lambda rep: rep.t0)
+
         # Add new default pulse objects
         for ch in pb_obj.dflt_dict.keys():
             if ch not in self.dflt_dict.keys():
-                self.dflt_dict[ch] = copy.deepcopy(
-                    pb_obj.dflt_dict[ch]
-                )
+                self.dflt_dict[ch] = pb_obj.dflt_dict[ch]
 
         # Update the latest values that have been added to the PB
         self.latest_t0 = t0
@@ -457,8 +673,7 @@ class PulseBlock:
         :return: (PulseBlock) new PulseBlock - self with pb_obj inserted.
         """
 
-        new_pb = copy.deepcopy(self)
-        new_pb.name = name
+        new_pb = self.copy(name=name)
         new_pb.insert_pb(
             pb_obj=pb_obj,
             t0=t0,
@@ -489,10 +704,210 @@ class PulseBlock:
                 t0=self.dur + offset
             )
 
+    def _check_rep_overlap(self, t0, dur, method_name, item_str):
+        """ Raise ValueError if [t0, t0+dur] overlaps with any repeat
+
+        :param t0: start of the interval
+        :param dur: duration of the interval
+        :param method_name: (str) name of the calling method for the message
+        :param item_str: (str) description of the checked item for the message
+        """
+
+        for rep in self.rep_list:
+            if rep.t0 < t0 + dur and t0 < rep.t0 + rep.dur:
+                raise ValueError(
+                    '{}: given item \n'
+                    '   {}, t0={:.2e}, dur={:.2e} \n'
+                    'overlaps with repeat \n'
+                    '   {}, t0={:.2e}, dur={:.2e} \n'
+                    'Repeats occupy all channels during their interval.'
+                    ''.format(
+                        method_name,
+                        item_str,
+                        t0,
+                        dur,
+                        str(rep),
+                        rep.t0,
+                        rep.dur
+                    )
+                )
+
+    def insert_rep(self, pb_obj, n_reps, t0=0, cflct_er=True):
+        """ Insert pb_obj repeated n_reps times back-to-back into self
+
+        The repetition is stored as a single Repeat object in rep_list rather
+        than n_reps copies of the pulses of pb_obj.
+
+        :param pb_obj: (PulseBlock) sub-block to be repeated, must not contain
+            repeats itself
+        :param n_reps: (int) number of repetitions
+        :param t0: position where the beginning of the first repetition should
+            be placed with respect to the beginning of self. If t0 is negative,
+            time origin is shifted into the beginning of the repeat.
+        :param cflct_er: (bool) If True, default pulses of pb_obj must agree
+            with those of self on common channels. Overlap with pulses and other
+            repeats is never allowed.
+        :return: None
+        """
+
+        rep = Repeat(pb_obj=pb_obj.copy(), n_reps=n_reps, t0=t0)
+
+        #
+        # Sanity checks
+        #
+
+        # Repeat interval is not occupied by pulses on any channel
+        for ch, p_list in self.p_dict.items():
+            for p_item in p_list[:_bisect_t0(p_list, t0 + rep.dur)]:
+                if t0 < p_item.t0 + p_item.dur:
+                    raise ValueError(
+                        'insert_rep(): repeat of "{}", t0={:.2e}, dur={:.2e} \n'
+                        'overlaps with existing pulse on ch="{}" \n'
+                        '   {}, t0={:.2e}, dur={:.2e} \n'
+                        'Repeats occupy all channels during their interval.'
+                        ''.format(
+                            pb_obj.name,
+                            t0,
+                            rep.dur,
+                            ch,
+                            str(p_item),
+                            p_item.t0,
+                            p_item.dur
+                        )
+                    )
+
+        # No overlap with other repeats
+        self._check_rep_overlap(t0, rep.dur, 'insert_rep()', str(rep))
+
+        # No conflicts between default pulse objects
+        if cflct_er:
+            for ch in pb_obj.dflt_dict.keys():
+                if ch in self.dflt_dict.keys() and pb_obj.dflt_dict[ch] != self.dflt_dict[ch]:
+                    raise ValueError(
+                        'insert_rep(): conflict between default pulse objects on channel "{}": \n'
+                        '   self.dflt_dict[{}] = {} \n'
+                        ' pb_obj.dflt_dict[{}] = {}'
+                        ''.format(
+                            ch,
+                            ch,
+                            str(self.dflt_dict[ch]),
+                            ch,
+                            str(pb_obj.dflt_dict[ch])
+                        )
+                    )
+
+        #
+        # Insert repeat
+        #
+
+        self.rep_list.insert(_bisect_t0(self.rep_list, t0, right=True), rep)
+
+        # Add new default pulse objects
+        for ch in rep.pb_obj.dflt_dict.keys():
+            if ch not in self.dflt_dict.keys():
+                self.dflt_dict[ch] = rep.pb_obj.dflt_dict[ch]
+
+        # Update the latest values that have been added to the PB
+        self.latest_t0 = t0
+        self.latest_dur = rep.dur
+
+        self.reset_edges()
+
+    def append_rep(self, pb_obj, n_reps, offset=0, cflct_er=True):
+        """ Same as insert_rep(), but the position of the first repetition is
+        given with respect to the end of self.
+
+        :param offset: the position into which the beginning of the repeat
+                       should be placed with respect to the end of self.
+        """
+
+        self.insert_rep(
+            pb_obj=pb_obj,
+            n_reps=n_reps,
+            t0=self.dur + offset,
+            cflct_er=cflct_er
+        )
+
+    def segments(self):
+        """ Split the block at the edges of its repeats
+
+        :return: (list) of (t0, item) tuples in chronological order covering
+            [0, self.dur]. item is either a Repeat, or a PulseBlock without
+            repeats containing the pulses between two repeats, with its time
+            origin at t0 and dur set to the length of the gap. Zero-length gaps
+            are omitted.
+        """
+
+        seg_list = []
+        seg_start = 0
+
+        # Pulse indices per channel of the first pulse not yet assigned
+        p_idx_dict = {ch: 0 for ch in self.p_dict.keys()}
+
+        for seg_idx, rep in enumerate(self.rep_list + [None]):
+            seg_end = self.dur if rep is None else rep.t0
+
+            if seg_end > seg_start:
+                seg_pb = PulseBlock(name='{}_seg{}'.format(self.name, seg_idx))
+                seg_pb.dur = seg_end - seg_start
+                seg_pb.dflt_dict = {
+                    ch: copy.copy(dflt) for ch, dflt in self.dflt_dict.items()
+                }
+
+                for ch, p_list in self.p_dict.items():
+                    idx_1 = p_idx_dict[ch]
+                    idx_2 = _bisect_t0(p_list, seg_end) if rep is not None else len(p_list)
+                    p_idx_dict[ch] = idx_2
+
+                    if idx_2 > idx_1:
+                        seg_pb.p_dict[ch] = []
+                        for p_item in p_list[idx_1:idx_2]:
+                            p_item = copy.copy(p_item)
+                            p_item.t0 -= seg_start
+                            seg_pb.p_dict[ch].append(p_item)
+
+                seg_list.append((seg_start, seg_pb))
+
+            if rep is not None:
+                seg_list.append((rep.t0, rep))
+                seg_start = rep.t0 + rep.dur
+
+        return seg_list
+
+    def unroll(self, name=None):
+        """ Returns an equivalent PulseBlock with all repeats expanded
+
+        Useful for consumers which cannot express loops (plotting, hardware
+        without sequencing). Memory and time scale with the number of
+        repetitions.
+
+        :param name: (str, opt) name of the new PulseBlock, defaults to self.name
+        :return: (PulseBlock) block without repeats
+        """
+
+        new_pb = self.copy(name=name)
+        new_pb.rep_list = []
+
+        p_obj_list = []
+        for rep in self.rep_list:
+            for rep_idx in range(rep.n_reps):
+                rep_t0 = rep.t0 + rep_idx * rep.pb_obj.dur
+                for p_list in rep.pb_obj.p_dict.values():
+                    for p_item in p_list:
+                        p_item = copy.copy(p_item)
+                        p_item.t0 += rep_t0
+                        p_obj_list.append(p_item)
+
+        # The block keeps its origin and duration
+        new_pb._extend(p_obj_list=p_obj_list, cflct_er=False, use_auto_dflt=False)
+        new_pb.dur = self.dur
+
+        return new_pb
+
     def reset_edges(self):
 
         p_ch_list = list(self.p_dict.keys())
-        if len(p_ch_list) == 0:
+        if len(p_ch_list) == 0 and len(self.rep_list) == 0:
             self.dur = 0
             return
 
@@ -502,13 +917,18 @@ class PulseBlock:
         left_edge_list = [
             self.p_dict[ch][0].t0 for ch in p_ch_list
         ]
+        if self.rep_list:
+            left_edge_list.append(self.rep_list[0].t0)
         left_edge = min(left_edge_list)
 
-        # Shift all pulses such that the left-most edge
+        # Shift all pulses and repeats such that the left-most edge
         # coincides with zero
-        for ch in p_ch_list:
-            for p_item in self.p_dict[ch]:
-                p_item.t0 -= left_edge
+        if isinstance(left_edge, Placeholder) or left_edge != 0:
+            for ch in p_ch_list:
+                for p_item in self.p_dict[ch]:
+                    p_item.t0 -= left_edge
+            for rep in self.rep_list:
+                rep.t0 -= left_edge
 
         # Right edge ==============
 
@@ -516,6 +936,8 @@ class PulseBlock:
         right_edge_list = [
             self.p_dict[ch][-1].t0 + self.p_dict[ch][-1].dur for ch in p_ch_list
         ]
+        if self.rep_list:
+            right_edge_list.append(self.rep_list[-1].t0 + self.rep_list[-1].dur)
         self.dur = max(right_edge_list)
 
     def __str__(self):
@@ -542,6 +964,12 @@ class PulseBlock:
             ret_str += ch_str
             ret_str += '\n'
 
+        if self.rep_list:
+            ret_str += 'rep_list: \n'
+            for rep in self.rep_list:
+                ret_str += '    {{{:.2e}, {:.2e}, {}}}\n'.format(rep.t0, rep.dur, str(rep))
+            ret_str += '\n'
+
         ret_str += 'dflt_dict: \n'
         for ch in self.dflt_dict.keys():
             ret_str += '    {}: {} \n'.format(ch, str(self.dflt_dict[ch]))
@@ -621,6 +1049,12 @@ class PulseBlock:
             for p_item in self.p_dict[new_ch]:
                 p_item.ch = new_ch
 
+        # Rename channels of the repeated sub-blocks
+        # (on copies, since sub-blocks are shared with copies of self)
+        for rep in self.rep_list:
+            rep.pb_obj = rep.pb_obj.copy()
+            rep.pb_obj.ch_map(map_dict=map_dict)
+
         del tmp_p_dict, tmp_dflt_dict
 
     def add_offset(self, offset_dict):
@@ -632,6 +1066,9 @@ class PulseBlock:
         This is normally used when one needs to compensate for the physical delay
         between channels.
 
+        Pulses inside repeated sub-blocks are not shifted, and shifted pulses
+        must not move into the interval of a repeat.
+
         :param offset_dict: (dict) offset dictionary:
                             Key - channel name
                             Value - offset (both positive and negative
@@ -652,6 +1089,13 @@ class PulseBlock:
                 )
             )
 
+        # Sanity check: shifted pulses do not overlap with repeats
+        for ch in offset_dict.keys():
+            for p_item in self.p_dict[ch]:
+                self._check_rep_overlap(
+                    p_item.t0 + offset_dict[ch], p_item.dur, 'add_offset()', str(p_item)
+                )
+
         for ch in offset_dict.keys():
             offset = offset_dict[ch]
 
@@ -0,0 +1,168 @@
+""" Content-addressed cache of pulse sample arrays
+
+Compiling a PulseBlock evaluates get_value() of every pulse, even if the block
+was only slightly modified since the last compilation. SampleCache stores the
+sample arrays keyed by the pulse content - pulse type and all parameters
+(except the channel name), the sampling rate, the first time point and the
+number of samples - so unchanged and identical pulses are only sampled once:
+
+    cache = get_sample_cache()
+    samp_ar = cache.get_value(p_obj, t_ar, samp_rate)
+
+The key is computed from the current attributes each time, so modifying a
+pulse (e.g. after a Placeholder edit) simply results in a new entry. For
+time-invariant pulses (see PulseBase.is_time_invariant()), t0 and the first
+time point are left out of the key, so that repeated pulses at different
+positions share one array. For shift-invariant pulses (see
+PulseBase.is_shift_invariant(), e.g. unmodulated Gaussians), t0 is left out
+and the first time point is keyed relative to t0 instead, so that identical
+envelopes at different positions share one array as well.
+
+Least recently used arrays are evicted once the total size exceeds max_bytes.
+Returned arrays are shared between callers and therefore read-only.
+"""
+
+import threading
+from collections import OrderedDict
+import numpy as np
+from pylabnet.utils.pulseblock.placeholder import Placeholder
+
+
+def _key_item(val):
+    """ Hashable representation of a pulse attribute
+
+    :param val: attribute value
+    :return: hashable object, raises TypeError if val cannot be represented
+    """
+
+    # Placeholders compare by their forced value, keep name and offset instead
+    if isinstance(val, Placeholder):
+        return ('Placeholder', frozenset(val.name.items()), float(val))
+    if isinstance(val, (list, tuple)):
+        return tuple(_key_item(item) for item in val)
+    if isinstance(val, dict):
+        return tuple(sorted((key, _key_item(item)) for key, item in val.items()))
+    if hasattr(val, '__dict__'):
+        return pulse_key(val)
+
+    hash(val)
+    return val
+
+
+def pulse_key(p_obj, exclude=('ch',)):
+    """ Content key of a Pulse or DfltPulse object
+
+    :param p_obj: Pulse or DfltPulse object
+    :param exclude: (tuple) names of attributes not affecting the samples
+    :return: (tuple) hashable key, raises TypeError if an attribute cannot
+        be represented
+    """
+
+    return (type(p_obj).__name__,) + tuple(
+        (name, _key_item(val)) for name, val in sorted(vars(p_obj).items())
+        if name not in exclude
+    )
+
+
+class SampleCache:
+    """ LRU cache of pulse sample arrays with a memory cap """
+
+    def __init__(self, max_bytes=256 * 2**20):
+        """ Instantiates an empty cache
+
+        :param max_bytes: (int) maximum total size of the cached arrays
+        """
+
+        self.max_bytes = max_bytes
+
+        self.hits = 0
+        self.misses = 0
+
+        self._cache = OrderedDict()
+        self._n_bytes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def n_bytes(self):
+        """ Total size of the cached arrays """
+        return self._n_bytes
+
+    def __len__(self):
+        return len(self._cache)
+
+    def _make_key(self, p_obj, t_ar, samp_rate, mod):
+        """ Cache key of the samples of p_obj at t_ar, None if not cacheable """
+
+        try:
+            if p_obj.is_time_invariant() and not mod:
+                return (pulse_key(p_obj, exclude=('ch', 't0')), samp_rate, len(t_ar), mod)
+            if p_obj.is_shift_invariant(mod):
+                t_offset = float(t_ar[0]) - float(p_obj.t0)
+                return (pulse_key(p_obj, exclude=('ch', 't0')), samp_rate, t_offset, len(t_ar), mod)
+            return (pulse_key(p_obj), samp_rate, float(t_ar[0]), len(t_ar), mod)
+        except (TypeError, AttributeError):
+            return None
+
+    def get_value(self, p_obj, t_ar, samp_rate, mod=None):
+        """ Returns p_obj.get_value(t_ar), from the cache if possible
+
+        :param p_obj: Pulse object
+        :param t_ar: (numpy.array) equally spaced time points with spacing
+            1/samp_rate
+        :param samp_rate: (float) sampling rate
+        :param mod: (bool, opt) passed on to get_value() if not None
+        :return: (numpy.array) read-only array of samples
+        """
+
+        if len(t_ar) == 0:
+            return p_obj.get_value(t_ar) if mod is None else p_obj.get_value(t_ar, mod)
+
+        key = self._make_key(p_obj, t_ar, samp_rate, mod)
+
+        if key is not None:
+            with self._lock:
+                samp_ar = self._cache.get(key)
+                if samp_ar is not None:
+                    self._cache.move_to_end(key)
+                    self.hits += 1
+                    return samp_ar
+                self.misses += 1
+
+        samp_ar = np.asarray(
+            p_obj.get_value(t_ar) if mod is None else p_obj.get_value(t_ar, mod)
+        )
+        samp_ar.setflags(write=False)
+
+        if key is not None and samp_ar.nbytes <= self.max_bytes:
+            with self._lock:
+                if key not in self._cache:
+                    self._cache[key] = samp_ar
+                    self._n_bytes += samp_ar.nbytes
+
+                # Evict least recently used arrays
+                while self._n_bytes > self.max_bytes:
+                    _, old_ar = self._cache.popitem(last=False)
+                    self._n_bytes -= old_ar.nbytes
+
+        return samp_ar
+
+    def clear(self):
+        """ Removes all cached arrays and resets the statistics """
+
+        with self._lock:
+            self._cache.clear()
+            self._n_bytes = 0
+            self.hits = 0
+            self.misses = 0
+
+
+_sample_cache = SampleCache()
+
+
+def get_sample_cache():
+    """ Returns the cache shared by all pulse sampling functions in this process
+
+    :return: (SampleCache) process-level sample cache
+    """
+
+    return _sample_cache
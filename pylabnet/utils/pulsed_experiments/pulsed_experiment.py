@@ -1,9 +1,20 @@
 
 import os
+import re
+import hashlib
+import numpy as np
 from pylabnet.hardware.awg.zi_hdawg import Driver, Sequence, AWGModule
 from pylabnet.utils.zi_hdawg_pulseblock_handler.zi_hdawg_pb_handler import AWGPulseBlockHandler
 
 
+# Number of user registers per AWG core
+NUM_USER_REGS = 16
+
+# Numeric literals in AWG code
+NUMBER_REGEX = r'([-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)'
+FLOAT_REGEX = r'(?<![\w.])(?:\d+\.\d*|\.\d+|\d+[eE][-+]?\d+)'
+
+
 class PulsedExperiment():
     """ Wrapper class for Pulsed experiments using the ZI HDAWG.
     This class conveniently allows for the generation and the AWG upload of
@@ -27,10 +38,168 @@ class PulsedExperiment():
         return files_trimmed
 
     def replace_placeholders(self):
-        """Replace all sequence placeholders with values."""
-        self.seq.replace_placeholders(self.placeholder_dict)
+        """Replace all sequence placeholders with values.
+
+        Entries of the placeholder dict which do not appear as placeholders in
+        the sequence are kept as candidates for user register variables, see
+        prepare_user_register_vars().
+        """
+
+        template_dict = {}
+        for name, value in self.placeholder_dict.items():
+            if name in self.seq.unresolved_placeholders:
+                template_dict[name] = value
+            else:
+                self.register_var_candidates[name] = value
+
+        self.seq.replace_placeholders(template_dict)
         self.hd.log.info("Replaced placeholders.")
 
+    def prepare_user_register_vars(self):
+        """ Declares AWG variables used by the pulseblocks (Placeholders) which
+        have a value in the placeholder dict but are not declared in the sequence.
+
+        AWG variables read from user registers only support integer addition and
+        subtraction, while the pulseblock code scales variables by constant factors
+        (e.g. wait(300.0*dur_var + -12)). A variable is therefore read from a free
+        user register only if all of its uses share one scale factor and the scaled
+        value is an integer: the register then holds the scaled value (e.g. the
+        number of AWG time steps) and the uses are rewritten to integer expressions
+        (e.g. wait(dur_var + -12)). Its value can then be changed with
+        set_user_registers() without compiling the sequence again. All other
+        variables are declared with their value.
+        """
+
+        # User registers which are already used by the template
+        used_regs = {int(match.group(1)) for match in
+                     re.finditer(r'(?:get|set)UserReg\(\s*(\d+)', self.seq.sequence)}
+        free_regs = [reg for reg in range(NUM_USER_REGS) if reg not in used_regs]
+
+        declarations = ""
+
+        # Sort by name so that the register assignment is reproducible
+        for name, value in sorted(self.register_var_candidates.items()):
+            name_regex = re.escape(name)
+
+            if re.search(rf'\b{name_regex}\b', self.seq.sequence) is None:
+                self.hd.log.warn(f"Placeholder {name} not found in sequence.")
+                continue
+
+            # Variable was declared by the user
+            if re.search(rf'\bvar\s+{name_regex}\b', self.seq.sequence) is not None:
+                continue
+
+            register_var = self._register_var(name, value)
+
+            if register_var is not None and len(free_regs) > 0:
+                scale, reg_value, sequence = register_var
+                reg = free_regs.pop(0)
+                self.seq.sequence = sequence
+                self.user_reg_dict[name] = (reg, reg_value)
+                declarations += f"var {name} = getUserReg({reg});"
+                declarations += f" // {name} * {scale:g}\n" if scale != 1 else "\n"
+            else:
+                if register_var is not None:
+                    self.hd.log.warn(f"No free user register left for variable {name}.")
+                declarations += f"var {name} = {value};\n"
+
+        self.seq.prepend_sequence(declarations)
+
+    def _register_var(self, name, value):
+        """ Checks whether a variable can be read from a user register, see
+        prepare_user_register_vars().
+
+        :name: (str) Name of the variable.
+        :value: Value of the variable.
+        :return: (tuple) of the scale factor, the integer register value and the
+            sequence with the uses of the variable rewritten, or None if the
+            variable has to be declared with its value.
+        """
+
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            return None
+
+        name_regex = re.escape(name)
+        scaled_regex = re.compile(rf'(?<![\w.]){NUMBER_REGEX}\*{name_regex}\b')
+
+        # Uses of the variable are either scaled (e.g. 300.0*dur_var, as
+        # generated from Placeholders) or plain uses, which are scaled by 1.
+        n_uses = len(re.findall(rf'\b{name_regex}\b', self.seq.sequence))
+        scales = [float(match.group(1)) for match in scaled_regex.finditer(self.seq.sequence)]
+        if len(scales) < n_uses:
+            scales.append(1)
+
+        # All uses must share the scale factor up to the sign
+        scale = abs(scales[0])
+        if scale == 0 or any(abs(other) != scale for other in scales):
+            return None
+
+        reg_value = round(scale * value)
+        if not np.isclose(scale * value, reg_value, rtol=0, atol=1e-6):
+            return None
+
+        def rewrite(match):
+            return name if float(match.group(1)) > 0 else f"(-{name})"
+
+        sequence = scaled_regex.sub(rewrite, self.seq.sequence)
+
+        # All expressions using the variable must be integer-only
+        for line in sequence.splitlines():
+            if re.search(rf'\b{name_regex}\b', line) is None:
+                continue
+            code = re.sub(r'//.*', '', re.sub(r'"[^"]*"|\'[^\']*\'', '', line))
+            if re.search(r'[*/]', code) is not None or re.search(FLOAT_REGEX, code) is not None:
+                return None
+
+        return scale, int(reg_value), sequence
+
+    def set_user_registers(self, awg):
+        """ Writes the values of the user register variables to the AWG.
+
+        :awg: (AWGModule) AWG core running the sequence.
+        """
+
+        for name, (reg, value) in self.user_reg_dict.items():
+            awg.set_user_register(reg, value)
+            self.hd.log.info(f"Set user register {reg} ({name}) to {value}.")
+
+    def get_structure_key(self, awg_number):
+        """ Returns an object that compares equal for two prepared experiments
+        iff they result in the same AWG program, waveforms and settings, i.e.
+        only differ by the values of user register variables.
+
+        :awg_number: (int) Core number of the AWG.
+        """
+
+        def wave_key(waveform):
+            # Compare the waveform data by a digest instead of the array
+            return hashlib.sha1(np.ascontiguousarray(waveform).tobytes()).hexdigest()
+
+        waveforms = tuple(
+            (tuple(waveform_tuple[:-1]), wave_key(waveform_tuple[-1]))
+            for waveform_tuple in self.upload_waveforms
+        )
+        iq_waveforms = tuple(
+            (waveform_idx, wave_key(wave_i), wave_key(wave_q))
+            for (waveform_idx, wave_i, wave_q) in self.upload_iq_waveforms
+        )
+        setup = tuple(
+            (tuple(sorted(pb_handler.used_dio_bits)), repr(pb_handler.setup_config_dict))
+            for pb_handler in self.pulseblock_handlers
+        )
+
+        return (
+            awg_number,
+            repr(self.assignment_dict),
+            self.seq.sequence,
+            waveforms,
+            iq_waveforms,
+            setup,
+            tuple(sorted((name, reg) for name, (reg, _) in self.user_reg_dict.items()))
+        )
+
     def replace_awg_commands(self, pulseblock):
         """Replace all waveform placeholders with actual AWG waveform commands.
 
@@ -46,7 +215,8 @@ class PulsedExperiment():
             pb=pulseblock,
             assignment_dict=self.assignment_dict,
             exp_config_dict=self.exp_config_dict,
-            hd=self.hd
+            hd=self.hd,
+            edge_compile=self.exp_config_dict.get("edge_compile", False)
         )
 
         # Generate instruction set which represents pulse sequence.
@@ -76,6 +246,9 @@ class PulsedExperiment():
             pb_handler = self.replace_awg_commands(pulseblock)
             self.pulseblock_handlers.append(pb_handler)
 
+        # Declare variables that are not defined in the template
+        self.prepare_user_register_vars()
+
         # Add setup code required for preserving DIO bits
         if self.exp_config_dict["preserve_bits"]:
             self.prepare_preserve_dio_seq()
@@ -119,7 +292,7 @@ class PulsedExperiment():
         self.hd.log.info("Preparing to upload sequence.")
 
         # Upload sequence
-        awg.compile_upload_sequence(self.seq)
+        self.uploaded = awg.compile_upload_sequence(self.seq)
 
         # Upload waveforms to AWG
         for waveform_tuple in self.upload_waveforms:
@@ -139,6 +312,8 @@ class PulsedExperiment():
             awg.setup_dio(pb_handler.used_dio_bits)
             awg.setup_analog(pb_handler.setup_config_dict, self.assignment_dict)
 
+        self.set_user_registers(awg)
+
         return awg
 
     def prepare_microwave(self):
@@ -167,14 +342,30 @@ class PulsedExperiment():
         # mw_client.set_power() # TODO: any default value for powers?
         #self.mw_client.output_on()
 
-    def get_ready(self, awg_number):
+    def get_ready(self, awg_number, awg=None, structure_key=None):
         """Prepare AWG for sequence execution.
 
         This function will generate the sequence based on the placeholders and the
         pulseblocks, upload it to the AWG and configure the DIO output bits.
+
+        :awg_number: (int) Core number of AWG to be started.
+        :awg: (AWGModule, optional) AWG core which already runs a previously
+            uploaded sequence.
+        :structure_key: (optional) get_structure_key() of the previously
+            uploaded experiment. If it matches the new one, only the user
+            registers of awg are updated and the compilation is skipped.
         """
         self.prepare_sequence()
         self.prepare_microwave()
+
+        self.structure_key = self.get_structure_key(awg_number)
+
+        if awg is not None and structure_key == self.structure_key:
+            self.hd.log.info("Sequence structure unchanged, only updating user registers.")
+            self.set_user_registers(awg)
+            self.uploaded = True
+            return awg
+
         return self.prepare_awg(awg_number) # TODO YQ
 
     def __init__(self,
@@ -197,7 +388,9 @@ class PulsedExperiment():
             Format: {channel_name : [ "analog"/"dio", channel_number ]}
         :hd: Instance of ZI AWG Driver
         :placeholder_dict: Dictionary containing placeholder names and values for the .seqct file.
-        :exp_config_dict: Dictionary containing any additional configs.
+        :exp_config_dict: Dictionary containing any additional configs, e.g.
+            "preserve_bits" or "edge_compile" (compile DIO commands directly
+            from pulse edges instead of sampling the digital channels).
         :use_template: (bool) If True, look for .seqc template, if false, use
             sequence_string .
         :template_name: (str) Name of the .seqct template file (must be stored in sequence_template_folders)
@@ -231,6 +424,16 @@ class PulsedExperiment():
         self.upload_waveforms = []
         self.upload_iq_waveforms = []
 
+        # Placeholder dict entries not found in the template, and the variables
+        # read from user registers as {var name: (register index, value)}
+        self.register_var_candidates = {}
+        self.user_reg_dict = {}
+
+        # Whether the sequence was successfully uploaded by get_ready(), and
+        # its get_structure_key()
+        self.uploaded = False
+        self.structure_key = None
+
         # Check if template is available, and store it.
         if use_template:
             templates = self.get_templates(template_directory)
@@ -0,0 +1,173 @@
+""" Preallocated buffers for incrementally growing data, e.g. time traces
+
+RingBuffer keeps the most recent `capacity` values, GrowableBuffer keeps
+all values. Both append in O(1) per value (amortized for GrowableBuffer) and
+expose their contents as a contiguous NumPy view without copying, which can
+be passed directly to plotting functions.
+
+Views share memory with the buffer and are only guaranteed to hold the
+current contents until the next append. Appends overwrite a RingBuffer view
+in place, so consumers that keep a reference to the array, e.g. pyqtgraph's
+setData(), must be given a copy.
+"""
+
+import numpy as np
+
+
+class RingBuffer:
+    """ Fixed-capacity circular buffer with contiguous, copy-free views.
+
+    Each value is written twice, at index i and i + capacity of a backing
+    array of length 2 * capacity. The logical contents (oldest to newest) are
+    therefore always available as the contiguous slice
+    [start, start + len) of the backing array.
+    """
+
+    def __init__(self, capacity, dtype=float):
+        """ Instantiates an empty buffer
+
+        :param capacity: (int) maximum number of values stored
+        :param dtype: data type of the stored values
+        """
+
+        self.capacity = int(capacity)
+        if self.capacity < 1:
+            raise ValueError(f'RingBuffer capacity must be positive, got {capacity}')
+
+        self._data = np.zeros(2 * self.capacity, dtype=dtype)
+
+        # Physical index of the oldest value and number of stored values
+        self._start = 0
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def append(self, values):
+        """ Appends one or several values, discarding the oldest ones if full
+
+        :param values: (scalar or array) values to add
+        """
+
+        values = np.ravel(values)
+        n_values = len(values)
+        cap = self.capacity
+
+        # Only the last `capacity` values survive
+        if n_values >= cap:
+            self._data[:cap] = values[-cap:]
+            self._data[cap:] = values[-cap:]
+            self._start = 0
+            self._len = cap
+            return
+
+        # Physical write position, wrapped into the first half
+        write = (self._start + self._len) % cap
+
+        # Write up to the end of the first half, then wrap around
+        n_first = min(n_values, cap - write)
+        self._data[write:write + n_first] = values[:n_first]
+        self._data[write + cap:write + cap + n_first] = values[:n_first]
+
+        n_rest = n_values - n_first
+        if n_rest > 0:
+            self._data[:n_rest] = values[n_first:]
+            self._data[cap:cap + n_rest] = values[n_first:]
+
+        new_len = self._len + n_values
+        if new_len > cap:
+            self._start = (self._start + new_len - cap) % cap
+            self._len = cap
+        else:
+            self._len = new_len
+
+    def view(self):
+        """ Returns the stored values, oldest first, without copying
+
+        :return: (np.ndarray) contiguous view of length len(self), overwritten
+            in place by later appends
+        """
+
+        return self._data[self._start:self._start + self._len]
+
+    def clear(self):
+        """ Removes all values """
+
+        self._start = 0
+        self._len = 0
+
+
+class GrowableBuffer:
+    """ Unbounded buffer backed by a preallocated array grown in chunks.
+
+    When full, the backing array grows to the next multiple of chunk_size
+    that is at least twice its current length, so appends cost amortized O(1).
+    """
+
+    def __init__(self, chunk_size=10000, dtype=float):
+        """ Instantiates an empty buffer
+
+        :param chunk_size: (int) allocation granularity (number of values)
+        :param dtype: data type of the stored values
+        """
+
+        self.chunk_size = int(chunk_size)
+        if self.chunk_size < 1:
+            raise ValueError(f'GrowableBuffer chunk_size must be positive, got {chunk_size}')
+
+        self._data = np.zeros(self.chunk_size, dtype=dtype)
+        self._len = 0
+
+    def __len__(self):
+        return self._len
+
+    def _reserve(self, n_total):
+        """ Ensures the backing array can hold n_total values
+
+        :param n_total: (int) required number of values
+        """
+
+        if n_total <= len(self._data):
+            return
+
+        n_new = max(n_total, 2 * len(self._data))
+        n_new = -(-n_new // self.chunk_size) * self.chunk_size
+        new_data = np.zeros(n_new, dtype=self._data.dtype)
+        new_data[:self._len] = self._data[:self._len]
+        self._data = new_data
+
+    def append(self, values):
+        """ Appends one or several values
+
+        :param values: (scalar or array) values to add
+        """
+
+        values = np.ravel(values)
+        n_values = len(values)
+
+        self._reserve(self._len + n_values)
+        self._data[self._len:self._len + n_values] = values
+        self._len += n_values
+
+    def view(self):
+        """ Returns all stored values without copying
+
+        :return: (np.ndarray) contiguous view of length len(self), overwritten
+            in place by appends after clear()
+        """
+
+        return self._data[:self._len]
+
+    def tail(self, n_values):
+        """ Returns the most recent values without copying
+
+        :param n_values: (int) maximum number of values to return
+        :return: (np.ndarray) contiguous view of the last n_values values
+        """
+
+        return self._data[max(self._len - n_values, 0):self._len]
+
+    def clear(self):
+        """ Removes all values, keeping the allocated memory """
+
+        self._len = 0
@@ -2,6 +2,7 @@ import re
 import numpy as np
 from pylabnet.utils.pulseblock.pb_sample import pb_sample, pulse_sample
 from pylabnet.utils.pulseblock.placeholder import Placeholder
+from pylabnet.utils.pulseblock.pulse_block import Repeat
 from pylabnet.utils.pulseblock.pulse import PCombined
 
 
@@ -14,11 +15,19 @@ ANA_SAMP_RATE = 2.4e9
 SETDIO_OFFSET = 4
 
 
+def _step_value(step):
+    """ Numerical value of an AWG time step used for ordering; Placeholders
+    are evaluated with Placeholder.force_value(). """
+    if isinstance(step, Placeholder):
+        return step.force_value()
+    return float(step)
+
+
 class AWGPulseBlockHandler():
 
     def __init__(self, pb, assignment_dict=None, exp_config_dict=None,
                  dig_samp_rate=DIG_SAMP_RATE, ana_samp_rate=ANA_SAMP_RATE,
-                 hd=None, end_low=True):
+                 hd=None, end_low=True, edge_compile=False):
         """ Initializes the pulse block handler for the ZI HDAWG.
 
         :hd: (object) An instance of the zi_hdawg.Driver()
@@ -40,6 +49,14 @@ class AWGPulseBlockHandler():
             provided, user is asked to provide all channel values.
         :exp_config_dict: (dict) Dictionary of any experiment configurations.
         :end_low: (bool) whether or not to force the sequence to end low
+        :edge_compile: (bool) if True, DIO codewords and wait times are
+            computed directly from the pulse edges instead of sampling the
+            digital channels, so memory and time scale with the number of
+            pulses rather than the sequence duration.
+
+        Repeats in pb.rep_list are compiled into seqc repeat() loops, so the
+        sequence length and waveform memory do not depend on the number of
+        repetitions.
         """
 
         # Use the log client of the HDAWG.
@@ -51,6 +68,7 @@ class AWGPulseBlockHandler():
 
         # Handle end low case
         self.end_low = end_low
+        self.edge_compile = edge_compile
 
         self.digital_sr = dig_samp_rate
         self.analog_sr = ana_samp_rate
@@ -69,14 +87,26 @@ class AWGPulseBlockHandler():
             # Check key value integrity of assignment dict.
             self._check_key_assignments()
 
-        # Store remapped samples, number of samples and number of traces for the
-        # digital channels.
-        (self.digital_sample_dict,
-         self.num_digital_samples,
-         self.num_digital_traces) = self._get_remapped_digital_samples(samp_rate=dig_samp_rate)
+        if self.edge_compile or self.pb.rep_list:
+            # Edge-based compilation never samples the digital channels.
+            # With repeats, each part of the block is sampled separately.
+            digital_bit_dict = self._get_digital_bits()
+            self.digital_sample_dict = None
+            self.num_digital_samples = None
+            self.num_digital_traces = len(digital_bit_dict)
 
-        # List of DIO bits that are used by pulses in this pulseblock
-        self.used_dio_bits = list(self.digital_sample_dict.keys())
+            # List of DIO bits that are used by pulses in this pulseblock
+            self.used_dio_bits = list(digital_bit_dict.values())
+
+        else:
+            # Store remapped samples, number of samples and number of traces for the
+            # digital channels.
+            (self.digital_sample_dict,
+             self.num_digital_samples,
+             self.num_digital_traces) = self._get_remapped_digital_samples(samp_rate=dig_samp_rate)
+
+            # List of DIO bits that are used by pulses in this pulseblock
+            self.used_dio_bits = list(self.digital_sample_dict.keys())
 
         # Stores a list of configs for each type of config (e.g. osc freq, DC offset)
         # Populated when we parse the Pulseblocks and then used when we setup the
@@ -170,6 +200,48 @@ class AWGPulseBlockHandler():
 
         return digital_sample_dict, num_digital_samples, num_digital_traces
 
+    def _get_digital_bits(self):
+        """Map the digital channels of the pulseblock onto their DIO bits.
+
+        Returns dictionary with keys corresponding to digital Channel objects
+        and values to the assigned DIO bit numbers.
+        """
+
+        digital_bit_dict = {}
+        for ch in self.pb.dflt_dict.keys():
+
+            # Skip the channel if it is not digital
+            if ch.is_analog:
+                continue
+
+            if self.assignment_dict[ch.name][0] == "analog":
+                self.log.warn(f"Attempted to map an analog channel {ch.name} using the functions for digital signals.")
+                continue
+
+            # assignment_dict items are in the form (analog/digital, channel)
+            digital_bit_dict[ch] = int(self.assignment_dict[ch.name][1])
+
+        return digital_bit_dict
+
+    def _pulse_edge_steps(self, p_item):
+        """Start and end of a pulse in AWG time steps.
+
+        :p_item: Pulse object
+        :return: (tuple) of start and end step, each an int or a Placeholder
+            if the pulse timing is variable.
+        """
+
+        if type(p_item.t0) == Placeholder:
+            indx_1 = (p_item.t0 * self.digital_sr).round_val().int_val()
+        else:
+            indx_1 = int(round(p_item.t0 * self.digital_sr))
+        if type(p_item.t0 + p_item.dur) == Placeholder:
+            indx_2 = (indx_1 + p_item.dur * self.digital_sr).round_val().int_val()
+        else:
+            indx_2 = int(round(indx_1 + p_item.dur * self.digital_sr))
+
+        return indx_1, indx_2
+
     def gen_single_digital_codeword(self, sample_dict):
         """ Generate a single DIO codeword.
 
@@ -199,7 +271,30 @@ class AWGPulseBlockHandler():
         """Generate array of DIO codewords.
 
         Given the remapped sample array, translate it into an
-        array of DIO codewords, sample by sample.
+        array of DIO codewords. Instead of building one codeword per sample,
+        each DIO trace is shifted to its bit position and OR-ed into the
+        codeword array as a whole, so the number of Python-level iterations
+        scales with the number of DIO bits rather than the number of samples.
+
+        :return: dio_codewords: (np.array) of int64 codewords, one per sample.
+        """
+
+        # Array storing one codeword per sample.
+        dio_codewords = np.zeros(self.num_digital_samples, dtype='int64')
+
+        for dio_bit, ch_samples in self.digital_sample_dict.items():
+            # E.g., for DIO-bit 3: each True sample becomes 0000 ... 0001000
+            bit_samples = np.asarray(ch_samples).astype(bool).astype('int64')
+            dio_codewords |= (bit_samples << int(dio_bit))
+
+        return dio_codewords
+
+    def gen_digital_codewords_per_sample(self):
+        """Generate array of DIO codewords, one sample at a time.
+
+        Reference implementation of gen_digital_codewords() which calls
+        gen_single_digital_codeword() for every sample. Very slow for long
+        pulseblocks; kept for cross-checking and benchmarking.
         """
 
         # Array storing one codeword per sample.
@@ -490,16 +585,7 @@ class AWGPulseBlockHandler():
         for ch in [ch for ch in self.pb.p_dict.keys() if not ch.is_analog]:
             for p_item in self.pb.p_dict[ch]:
                 # Find indexes of pulse edges
-                if type(p_item.t0) == Placeholder:
-                    indx_1 = (p_item.t0 * self.digital_sr).round_val().int_val()
-                else:
-                    indx_1 = int(round(p_item.t0 * self.digital_sr))
-                if type(p_item.t0 + p_item.dur) == Placeholder:
-                    indx_2 = (indx_1 + p_item.dur * self.digital_sr).round_val().int_val()
-                else:
-                    indx_2 = int(round(indx_1 + p_item.dur * self.digital_sr))
-
-                codeword_times.extend([indx_1, indx_2])
+                codeword_times.extend(self._pulse_edge_steps(p_item))
 
         codeword_times = list(set(codeword_times))
         codeword_times.sort()
@@ -519,6 +605,68 @@ class AWGPulseBlockHandler():
 
         return codewords, codeword_times
 
+    def gen_digital_commands_from_edges(self):
+        """Generate zipped DIO commands directly from the pulse edges.
+
+        Equivalent to zip_digital_commands(gen_digital_codewords()), but the
+        digital channels are never sampled: the DIO codeword is only evaluated
+        at the pulse edges stored in the pulseblock, so time and memory scale
+        with the number of pulses rather than the number of AWG time steps.
+
+        :return: codewords: (np.array) of unique DIO codewords ordered in time
+        :return: codeword_times: (list) of times in AWG timesteps to output the
+            DIO codewords
+        """
+
+        digital_bit_dict = self._get_digital_bits()
+
+        # Collect the edges (in AWG time steps) and output value of every
+        # pulse on each DIO bit.
+        codeword_times = {0}
+        channel_edges = []
+        for ch, dio_bit in digital_bit_dict.items():
+            dflt_val = bool(self.pb.dflt_dict[ch].get_value([0])[0])
+            p_list = self.pb.p_dict.get(ch, [])
+
+            edges = [self._pulse_edge_steps(p_item) for p_item in p_list]
+            codeword_times.update(edge for edge_pair in edges for edge in edge_pair)
+
+            starts = np.array([_step_value(edge_pair[0]) for edge_pair in edges], dtype=float)
+            ends = np.array([_step_value(edge_pair[1]) for edge_pair in edges], dtype=float)
+            vals = np.array([bool(p_item.get_value([p_item.t0])[0]) for p_item in p_list], dtype=bool)
+
+            # Pulses are ordered by t0, but sort again in case of Placeholders
+            order = np.argsort(starts, kind='stable')
+            channel_edges.append((dio_bit, dflt_val, starts[order], ends[order], vals[order]))
+
+        codeword_times = sorted(codeword_times, key=_step_value)
+        times_f = np.array([_step_value(time) for time in codeword_times], dtype=float)
+
+        # Evaluate the state of each DIO bit right after every edge.
+        codewords = np.zeros(len(codeword_times), dtype='int64')
+        for dio_bit, dflt_val, starts, ends, vals in channel_edges:
+            bit_vals = np.full(len(codeword_times), dflt_val)
+            if len(starts) > 0:
+                # Index of the latest pulse starting at or before each time
+                idx = np.searchsorted(starts, times_f, side='right') - 1
+                safe_idx = np.maximum(idx, 0)
+                inside = (idx >= 0) & (times_f < ends[safe_idx])
+                bit_vals = np.where(inside, vals[safe_idx], dflt_val)
+            codewords |= (bit_vals.astype('int64') << dio_bit)
+
+        # Force final output to be zero
+        if self.end_low:
+            codewords[-1] = 0
+
+        # Only keep the edges where the codeword actually changes, plus the
+        # initial DIO value.
+        change_index = np.where(codewords[:-1] != codewords[1:])[0] + 1
+        if len(change_index) == 0:
+            return [], []
+
+        keep_index = [0] + list(change_index)
+        return codewords[keep_index], [codeword_times[index] for index in keep_index]
+
     def combine_command_timings(self, digital_codewords, digital_times, waveforms):
         """ Combine the commands and timings from the analog and digital commands
         to give a combined list of codewords and wait time intervals.
@@ -695,35 +843,84 @@ class AWGPulseBlockHandler():
             account for duration of setDIO() command.
         """
 
-        mask = None
+        sequence = f"// Start of Pulseblock {self.pb.name}\n"
+        sequence = self.setup_variable_settings(sequence)
+        sequence += self._command_sequence(commands, waittimes, self._dio_mask(), wait_offset)
+        sequence += f"// End of Pulseblock {self.pb.name}\n"
+
+        return sequence
+
+    def _dio_mask(self):
+        """ Mask of the DIO bits used by this pulseblock, None if existing
+        bits do not have to be preserved. """
+
         if self.exp_config_dict["preserve_bits"]:
-            mask = sum(1 << bit for bit in self.used_dio_bits)
+            return sum(1 << bit for bit in self.used_dio_bits)
+        return None
+
+    def _wait_command(self, waittime, wait_offset):
+        """ Generate a wait() command, shortened by wait_offset.
+
+        :waittime: (int or Placeholder) wait time in AWG timesteps
+        :wait_offset: (int) Number of samples taken by the following command.
+        :return: (str) AWG code, empty if the wait is not longer than wait_offset
+        """
 
-        sequence = f"// Start of Pulseblock {self.pb.name}\n"
         wait_cmd = "wait({});\n"
 
-        sequence = self.setup_variable_settings(sequence)
+        if not waittime > wait_offset:
+            return ""
+
+        if type(waittime) == Placeholder:
+            # Subtract the default duration from the Placeholder which was used since
+            # their initial length is unknown.
+            waittime -= Placeholder.default_values["dur_var"] * 1e-6 * DIG_SAMP_RATE
+            return wait_cmd.format((waittime - wait_offset).int_str())
+        else:
+            return wait_cmd.format(int(waittime - wait_offset))
+
+    def _command_sequence(self, commands, waittimes, mask, wait_offset=SETDIO_OFFSET):
+        """ Generate interspersed wait() and output commands, see
+        construct_awg_sequence(). """
+
+        sequence = ""
 
         # Waits and commands are interspersed (wait-command-wait-command-...)
         # If the first wait is 0, it is not displayed due to the wait_offset
         for i, waittime in enumerate(waittimes):
 
             # Add waittime to sequence but subtract the wait offset
-            if waittime > wait_offset:
-                if type(waittime) == Placeholder:
-                    # Subtract the default duration from the Placeholder which was used since
-                    # their initial length is unknown.
-                    waittime -= Placeholder.default_values["dur_var"] * 1e-6 * DIG_SAMP_RATE
-                    sequence += wait_cmd.format((waittime - wait_offset).int_str())
-                else:
-                    sequence += wait_cmd.format(int(waittime - wait_offset))
-
+            sequence += self._wait_command(waittime, wait_offset)
             sequence += self.awg_seq_command(commands[i], mask)
 
-        sequence += f"// End of Pulseblock {self.pb.name}\n"
-
         return sequence
 
+    def _command_duration(self, waittimes, wait_offset=SETDIO_OFFSET):
+        """ Duration of the code generated by _command_sequence() in AWG
+        time steps: each command takes wait_offset, so waits shorter than
+        wait_offset delay the following commands.
+
+        :waittimes: (list) of wait times between commands
+        :wait_offset: (int) see construct_awg_sequence()
+        :return: (int or Placeholder) total duration
+        """
+
+        duration = 0
+        for waittime in waittimes:
+            duration = duration + (waittime if waittime > wait_offset else wait_offset)
+        return duration
+
+    def _time_steps(self, t):
+        """ Convert a time into AWG time steps.
+
+        :t: (float or Placeholder) time
+        :return: (int or Placeholder) number of AWG time steps
+        """
+
+        if type(t) == Placeholder:
+            return (t * self.digital_sr).round_val().int_val()
+        return int(round(t * self.digital_sr))
+
     def get_awg_sequence(self, waveform_idx):
         """Generate a set of .seqc instructions for the AWG to output a set of
         pulses over multiple channels
@@ -742,11 +939,36 @@ class AWGPulseBlockHandler():
             will generate the pulses described by the pulseblock.
         """
 
-        # Get sample-wise sets of codewords for the digital channels.
-        digital_codewords_samples = self.gen_digital_codewords()
+        if self.pb.rep_list:
+            return self.get_awg_sequence_with_repeats(waveform_idx)
+
+        (analog_setup, combined_commands, combined_waittimes,
+         waveforms, iq_waveforms) = self.gen_commands(waveform_idx)
+
+        # Reconstruct set of .seqc instructions representing the digital waveform.
+        sequence = self.construct_awg_sequence(combined_commands, combined_waittimes)
+
+        return analog_setup, sequence, waveforms, iq_waveforms
 
-        # Reduce this array to a set of codewords + waittimes.
-        digital_codewords, digital_times = self.zip_digital_commands(digital_codewords_samples)
+    def gen_commands(self, waveform_idx):
+        """Generate the combined list of digital and analog commands of a
+        pulseblock without repeats.
+
+        :param: waveform_idx (int): see get_awg_sequence()
+        :return: (tuple) (analog_setup, combined_commands, combined_waittimes,
+            waveforms, iq_waveforms), see gen_analog_instructions() and
+            combine_command_timings()
+        """
+
+        if self.edge_compile:
+            # Get codewords + waittimes straight from the pulse edges.
+            digital_codewords, digital_times = self.gen_digital_commands_from_edges()
+        else:
+            # Get sample-wise sets of codewords for the digital channels.
+            digital_codewords_samples = self.gen_digital_codewords()
+
+            # Reduce this array to a set of codewords + waittimes.
+            digital_codewords, digital_times = self.zip_digital_commands(digital_codewords_samples)
 
         # Get instructions for the analog channels
         # List of tuples (waveform var name, ch_name, start_step, end_step, np.array waveform)
@@ -758,7 +980,239 @@ class AWGPulseBlockHandler():
             digital_times,
             waveforms)
 
-        # Reconstruct set of .seqc instructions representing the digital waveform.
-        sequence = self.construct_awg_sequence(combined_commands, combined_waittimes)
+        return analog_setup, combined_commands, combined_waittimes, waveforms, iq_waveforms
+
+    def get_awg_sequence_with_repeats(self, waveform_idx):
+        """Generate .seqc instructions for a pulseblock containing repeats.
+
+        The pulseblock is split at the repeat edges (PulseBlock.segments()).
+        The periods between repeats are compiled like plain pulseblocks, and
+        each repeated sub-block is compiled once and wrapped into a
+        repeat(n_reps) loop, padded with a wait() to the repetition period.
+        Sub-block durations should be integer multiples of the AWG time step.
+
+        The DIO output is the same as for the unrolled pulseblock
+        (PulseBlock.unroll()) compiled with get_awg_sequence(), including the
+        delays of commands with waits shorter than SETDIO_OFFSET. To achieve
+        this, the first or last repetition may be compiled without the loop.
+
+        Parameters and return values are the same as for get_awg_sequence().
+        """
+
+        mask = self._dio_mask()
+
+        analog_setup = ""
+        waveforms = []
+        iq_waveforms = []
+
+        # Compile each part of the pulseblock separately
+        parts = []
+        segments = self.pb.segments()
+        rep_idx = 0
+
+        for seg_idx, (seg_t0, seg_item) in enumerate(segments):
+            is_rep = isinstance(seg_item, Repeat)
+
+            if is_rep:
+                # Unique name, since the same sub-block can be repeated several
+                # times. Channels which are not used by the sub-block are kept
+                # at their defaults by the DIO codewords.
+                seg_pb = seg_item.pb_obj.copy(name=f"{self.pb.name}_rep{rep_idx}")
+                for ch, dflt in self.pb.dflt_dict.items():
+                    seg_pb.dflt_dict.setdefault(ch, dflt)
+                rep_idx += 1
+            else:
+                seg_pb = seg_item
+
+            handler = AWGPulseBlockHandler(
+                pb=seg_pb,
+                assignment_dict=self.assignment_dict,
+                exp_config_dict=self.exp_config_dict,
+                dig_samp_rate=self.digital_sr,
+                ana_samp_rate=self.analog_sr,
+                hd=self.hd,
+                end_low=self.end_low and seg_idx == len(segments) - 1 and not is_rep,
+                edge_compile=self.edge_compile
+            )
+
+            (seg_setup, commands, waittimes,
+             seg_waveforms, seg_iq_waveforms) = handler.gen_commands(waveform_idx + len(waveforms))
+
+            analog_setup += seg_setup
+            waveforms.extend(seg_waveforms)
+            iq_waveforms.extend(seg_iq_waveforms)
+            self.setup_config_dict.update(handler.setup_config_dict)
+
+            parts.append((
+                self._time_steps(seg_t0),
+                self._time_steps(seg_pb.dur),
+                seg_item.n_reps if is_rep else None,
+                commands,
+                waittimes
+            ))
+
+        def starts_with_dio(commands, waittimes):
+            return len(commands) > 0 and commands[0][0] == "dio" and waittimes[0] == 0
+
+        def ends_with_dio(commands, waittimes, part_dur):
+            last = 0
+            for waittime in waittimes:
+                last = last + waittime
+            return len(commands) > 1 and commands[-1][0] == "dio" and last == part_dur
+
+        def last_codeword(commands, codeword):
+            for command in reversed(commands):
+                if command[0] == "dio":
+                    return command[1]
+            return codeword
+
+        def starts_with_codeword(commands, codeword):
+            return len(commands) > 0 and commands[0][0] == "dio" and commands[0][1] == codeword
+
+        def drop_first(commands, waittimes):
+            # The wait before the dropped command is added to the next one
+            if len(commands) == 1:
+                return [], []
+            remaining = list(waittimes[1:])
+            remaining[0] = waittimes[0] + remaining[0]
+            return commands[1:], remaining
+
+        def catch_up(waittime, lag):
+            """ Wait before a command with the intended waittime, such that
+            it is output at the same time as in the unrolled pulseblock,
+            and the remaining lag of the sequencer """
+            duration = self._command_duration([waittime])
+            shortened = duration - lag
+            return shortened, lag + self._command_duration([shortened]) - duration
+
+        body = ""
+
+        # Intended AWG time step of the last emitted command, and the lag of
+        # the sequencer behind the time at which the same command is output
+        # when compiling the unrolled pulseblock. Commands with a wait shorter
+        # than SETDIO_OFFSET are delayed (see _command_duration()), which the
+        # repeats reproduce. Any further lag, e.g. from a loop which cannot be
+        # entered early enough, is taken from the following wait.
+        elapsed = 0
+        lag = 0
+
+        # Last DIO codeword that was output
+        codeword = None
+
+        # A DIO command at the very end of a part is superseded by the initial
+        # DIO codeword of the following part (or repetition), and outputting
+        # both would delay the rest of the sequence. It is only output after
+        # the last repetition if the following part does not supersede it.
+        pending = []
+        for part_idx, (start, part_dur, n_reps, commands, waittimes) in enumerate(parts):
+            next_starts_with_dio = (
+                part_idx < len(parts) - 1 and starts_with_dio(*parts[part_idx + 1][3:])
+            )
+            trailing_command = None
+            if ends_with_dio(commands, waittimes, part_dur) and (
+                    next_starts_with_dio or (n_reps is not None and starts_with_dio(commands, waittimes))):
+                if not next_starts_with_dio:
+                    trailing_command = commands[-1]
+                commands, waittimes = commands[:-1], waittimes[:-1]
+            pending.append((start, part_dur, n_reps, commands, waittimes, trailing_command))
+
+        while pending:
+            start, part_dur, n_reps, commands, waittimes, trailing_command = pending.pop(0)
+
+            # A single repetition is compiled without the loop, as is the first
+            # repetition if its initial codeword is already set, but has to be
+            # output again by the following ones
+            if n_reps == 1 or (n_reps is not None and starts_with_codeword(commands, codeword)
+                               and not starts_with_codeword(commands, last_codeword(commands, None))):
+                pending.insert(0, (start, part_dur, None, commands, waittimes,
+                                   trailing_command if n_reps == 1 else None))
+                if n_reps > 1:
+                    pending.insert(1, (start + part_dur, part_dur, n_reps - 1,
+                                       commands, waittimes, trailing_command))
+                continue
+
+            if n_reps is None and starts_with_codeword(commands, codeword):
+                # The initial DIO codeword of the part is already set
+                commands, waittimes = drop_first(commands, waittimes)
+
+            elif n_reps is not None and starts_with_codeword(commands, last_codeword(commands, None)):
+                # Each repetition starts with the codeword it ends with, such
+                # that it is only output before the loop
+                if commands[0][1] != codeword:
+                    waittime, lag = catch_up(waittimes[0] + (start - elapsed), lag)
+                    body += self._command_sequence(commands[:1], [waittime], mask)
+                    elapsed = start + waittimes[0]
+                    codeword = commands[0][1]
+                commands, waittimes = drop_first(commands, waittimes)
+
+            if len(commands) > 0:
+                # Time of the last command relative to the part start
+                part_last = 0
+                for waittime in waittimes:
+                    part_last = part_last + waittime
+
+                # The first wait also covers the gap since the previous command
+                first_wait = waittimes[0] + (start - elapsed)
+
+                if n_reps is not None:
+                    # Enter the loop such that the first command is output on
+                    # time, and pad each repetition to the time of the first
+                    # command of the next one
+                    first_duration = self._command_duration(waittimes[:1])
+                    pre_wait = self._command_duration([first_wait]) - lag - first_duration
+                    pad = (self._command_duration([part_dur - part_last + waittimes[0]])
+                           - first_duration)
+
+                    # The padding is done at the start of each repetition if
+                    # there is enough time before the loop. Otherwise it is
+                    # done at the end, and the last repetition is compiled
+                    # without the loop, such that the padding does not delay
+                    # the following commands.
+                    pad_first = pre_wait >= pad
+                    if pad_first:
+                        pre_wait = pre_wait - pad
+                    elif pad > 0:
+                        pending.insert(0, (start + (n_reps - 1) * part_dur, part_dur, None,
+                                           commands, waittimes, trailing_command))
+                        n_reps, trailing_command = n_reps - 1, None
+
+                    body += self._wait_command(pre_wait, 0)
+                    body += f"repeat({n_reps}) {{\n"
+                    if pad_first:
+                        body += self._wait_command(pad, 0)
+                    body += self._command_sequence(commands, waittimes, mask)
+                    if not pad_first:
+                        body += self._wait_command(pad, 0)
+                    body += "}\n"
+
+                    lag = max(-pre_wait, 0) + (0 if pad_first else pad)
+                    elapsed = start + (n_reps - 1) * part_dur + part_last
+
+                else:
+                    waittimes = list(waittimes)
+                    waittimes[0], lag = catch_up(first_wait, lag)
+                    body += self._command_sequence(commands, waittimes, mask)
+                    elapsed = start + part_last
+
+                codeword = last_codeword(commands, codeword)
+
+            # Output the dropped command after the last repetition
+            if trailing_command is not None:
+                end = start + (n_reps or 1) * part_dur
+                waittime, lag = catch_up(end - elapsed, lag)
+                body += self._command_sequence([trailing_command], [waittime], mask)
+                elapsed = end
+                codeword = trailing_command[1]
+
+        # Force final output to be zero if the block ends with a repeat,
+        # unless the last repetition already ends low
+        if (self.end_low and parts[-1][2] is not None and len(self.used_dio_bits) > 0
+                and codeword != 0):
+            body += self.awg_seq_command(("dio", 0), mask)
+
+        sequence = f"// Start of Pulseblock {self.pb.name}\n"
+        sequence = self.setup_variable_settings(sequence)
+        sequence += body
+        sequence += f"// End of Pulseblock {self.pb.name}\n"
 
         return analog_setup, sequence, waveforms, iq_waveforms
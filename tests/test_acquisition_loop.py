@@ -0,0 +1,97 @@
+""" Checks of the paced acquisition loop of live-updating GUIs """
+
+import itertools
+import threading
+import time
+import pytest
+
+QtWidgets = pytest.importorskip('PyQt5.QtWidgets')
+
+from pylabnet.gui.pyqt.acquisition_loop import AcquisitionLoop
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def process_events_until(app, condition, timeout=5):
+    end = time.perf_counter() + timeout
+    while not condition() and time.perf_counter() < end:
+        app.processEvents()
+        time.sleep(1e-3)
+    return condition()
+
+
+def test_results_displayed(app):
+    values = itertools.count()
+    displayed = []
+    loop = AcquisitionLoop(acquire=lambda: next(values), display=displayed.append, rate=200)
+
+    loop.start()
+    assert process_events_until(app, lambda: len(displayed) >= 3)
+    loop.stop()
+    assert process_events_until(app, lambda: not loop._thread.is_alive())
+    app.processEvents()
+
+    # Results are displayed in order, possibly coalesced
+    assert displayed == sorted(displayed)
+    stats = loop.get_statistics()
+    assert stats['displayed'] == len(displayed)
+    assert stats['iterations'] >= len(displayed)
+
+
+def test_restart_does_not_block(app):
+    release = threading.Event()
+    acquiring = threading.Event()
+
+    def acquire():
+        acquiring.set()
+        release.wait()
+        return 1
+
+    loop = AcquisitionLoop(acquire=acquire, display=lambda data: None, rate=None)
+    loop.start()
+    assert acquiring.wait(5)
+    first = loop._thread
+
+    # The worker is still in acquire() when the loop is restarted
+    loop.stop()
+    start = time.perf_counter()
+    loop.start()
+    assert time.perf_counter() - start < 0.5
+    assert loop.is_running()
+    assert loop._thread is first
+
+    # The new worker starts once the previous one has finished
+    acquiring.clear()
+    release.set()
+    assert process_events_until(app, lambda: loop._thread is not first and acquiring.is_set())
+    assert loop.is_running()
+    loop.stop()
+    assert process_events_until(app, lambda: not loop._thread.is_alive())
+
+
+def test_stop_cancels_restart(app):
+    release = threading.Event()
+    acquiring = threading.Event()
+
+    def acquire():
+        acquiring.set()
+        release.wait()
+        return None
+
+    loop = AcquisitionLoop(acquire=acquire, display=lambda data: None, rate=None)
+    loop.start()
+    assert acquiring.wait(5)
+    first = loop._thread
+
+    loop.stop()
+    loop.start()
+    loop.stop()
+    release.set()
+    assert process_events_until(app, lambda: not first.is_alive())
+    app.processEvents()
+
+    assert loop._thread is first
+    assert not loop.is_running()
@@ -0,0 +1,62 @@
+""" Checks of the decimation of long traces for plotting """
+
+import numpy as np
+import pytest
+
+pytest.importorskip('pyqtgraph')
+
+from pylabnet.gui.pyqt.external_gui import min_max_decimate
+
+
+def test_short_trace_unchanged():
+    x = np.arange(10)
+    y = np.random.rand(10)
+
+    x_dec, y_dec = min_max_decimate(x, y, 5)
+
+    assert x_dec is x and y_dec is y
+
+
+def test_min_max_kept():
+    x = np.arange(10000)
+    y = np.sin(x / 100) + np.random.rand(10000)
+
+    x_dec, y_dec = min_max_decimate(x, y, 100)
+
+    # Each segment keeps its extrema in order, as well as both end points
+    assert len(y_dec) <= 2 * 100 + 2
+    assert np.all(np.diff(x_dec) > 0)
+    np.testing.assert_array_equal(y_dec, y[x_dec])
+    assert x_dec[0] == 0 and x_dec[-1] == 9999
+    for start in range(0, 10000, 100):
+        segment = (x_dec >= start) & (x_dec < start + 100)
+        assert y_dec[segment].min() == y[start:start + 100].min()
+        assert y_dec[segment].max() == y[start:start + 100].max()
+
+
+def test_short_remainder():
+    x = np.arange(1050)
+    y = np.random.rand(1050)
+
+    x_dec, y_dec = min_max_decimate(x, y, 100)
+
+    # Segments are 11 points long, the last 5 points that do not fill a
+    # segment are all kept
+    np.testing.assert_array_equal(x_dec[-5:], np.arange(1045, 1050))
+    assert np.all(np.diff(x_dec) > 0)
+    np.testing.assert_array_equal(y_dec, y[x_dec])
+
+
+def test_nan_segments():
+    x = np.arange(10000)
+    y = np.random.rand(10000)
+    y[:500] = np.nan
+    y[1050] = np.nan
+
+    x_dec, y_dec = min_max_decimate(x, y, 100)
+
+    # Segments of only NaNs are kept as a single NaN, other NaNs are ignored
+    assert np.isnan(y_dec[x_dec < 500]).all()
+    assert np.sum(x_dec < 500) == 5
+    assert not np.isnan(y_dec[x_dec >= 500]).any()
+    assert y_dec[(x_dec >= 1000) & (x_dec < 1100)].max() == np.nanmax(y[1000:1100])
@@ -0,0 +1,115 @@
+""" Checks of the background fitting of live data """
+
+import threading
+import numpy as np
+import pytest
+
+pytest.importorskip('scipy')
+
+from pylabnet.scripts.fit_engine import FitEngine
+
+X = np.linspace(0, 1, 50)
+Y = 2 * X + 1
+
+
+def line(x, a, b):
+    return a * x + b
+
+
+class BlockingLine:
+    """ Linear model whose evaluation blocks until released, to hold a fit running """
+
+    def __init__(self):
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def __call__(self, x, a, b):
+        self.started.set()
+        assert self.release.wait(timeout=5)
+        return line(x, a, b)
+
+
+@pytest.fixture
+def engine():
+    engine = FitEngine()
+    yield engine
+    engine.close()
+
+
+def test_identical_data_skipped(engine):
+    assert engine.submit('fit', line, X, Y, [1, 0])
+    assert engine.wait(timeout=5)
+    result = engine.take_result('fit')
+    np.testing.assert_allclose(result.popt, [2, 1])
+
+    # Unchanged data is not fitted again, unless a reset is requested
+    assert not engine.submit('fit', line, X, Y.copy(), [1, 0])
+    assert engine.submit('fit', line, X, Y, [1, 0], reset=True)
+    assert engine.wait(timeout=5)
+
+    stats = engine.get_statistics()
+    assert (stats['fits'], stats['skipped']) == (2, 1)
+    assert not engine.take_result('fit').warm_start
+
+
+def test_reset_kept_when_coalesced(engine):
+    model = BlockingLine()
+    engine.submit('fit', model, X, Y, [1, 0])
+    assert model.started.wait(timeout=5)
+
+    # The reset of the replaced submission applies to the one replacing it
+    engine.submit('fit', model, X, Y + 1, [1, 0], reset=True)
+    engine.submit('fit', model, X, Y + 2, [1, 0])
+    model.release.set()
+    assert engine.wait(timeout=5)
+
+    result = engine.take_result('fit')
+    assert result.success and not result.warm_start
+    np.testing.assert_allclose(result.popt, [2, 3])
+    assert engine.get_statistics()['coalesced'] == 1
+
+
+def test_failed_fit_restarts_from_p0(engine):
+    fail = threading.Event()
+
+    def model(x, a, b):
+        if fail.is_set():
+            raise ValueError('model failed')
+        return line(x, a, b)
+
+    engine.submit('fit', model, X, Y, [1, 0])
+    engine.wait(timeout=5)
+    assert engine.take_result('fit').success
+
+    fail.set()
+    engine.submit('fit', model, X, Y + 1, [1, 0])
+    engine.wait(timeout=5)
+    result = engine.take_result('fit')
+    assert not result.success and isinstance(result.error, ValueError)
+
+    # The next fit starts from the initial guesses again
+    fail.clear()
+    engine.submit('fit', model, X, Y + 2, [1, 0])
+    engine.wait(timeout=5)
+    result = engine.take_result('fit')
+    assert result.success and not result.warm_start
+    assert engine.get_statistics()['failed'] == 1
+
+
+def test_clear_during_running_fit(engine):
+    model = BlockingLine()
+    engine.submit('fit', model, X, Y, [1, 0])
+    assert model.started.wait(timeout=5)
+
+    engine.clear()
+
+    # The running fit is still waited for, but its result is discarded
+    assert not engine.wait(timeout=0.1)
+    model.release.set()
+    assert engine.wait(timeout=5)
+    assert engine.take_result('fit') is None
+
+    # Data of the discarded fit is fitted again, from the initial guesses
+    assert engine.submit('fit', line, X, Y, [1, 0])
+    assert engine.wait(timeout=5)
+    assert not engine.take_result('fit').warm_start
@@ -0,0 +1,118 @@
+""" Checks of the incremental autosave writer of the data taker """
+
+import threading
+import numpy as np
+
+from pylabnet.scripts.data_center.incremental_writer import IncrementalWriter, load_incremental
+
+
+def save(writer, arrays):
+    writer.save(arrays)
+    writer.flush()
+    return load_incremental(writer.path)
+
+
+def test_appended_rows(tmp_path):
+    writer = IncrementalWriter(str(tmp_path))
+    trace = list(range(7))
+
+    save(writer, {'trace': trace})
+    trace.append(7)
+    loaded = save(writer, {'trace': trace})
+    writer.close()
+
+    np.testing.assert_array_equal(loaded['trace'], np.arange(8))
+    assert len(writer._streams['trace'].segments) == 2
+
+
+def test_changed_saved_row(tmp_path):
+    writer = IncrementalWriter(str(tmp_path))
+    trace = list(range(7))
+
+    save(writer, {'trace': trace})
+    trace[0] = 99
+    trace.append(7)
+    loaded = save(writer, {'trace': trace})
+    writer.close()
+
+    np.testing.assert_array_equal(loaded['trace'], [99] + list(range(1, 8)))
+    assert len(writer._streams['trace'].segments) == 1
+
+
+def test_failed_snapshot_retried(tmp_path, monkeypatch):
+    writer = IncrementalWriter(str(tmp_path))
+    histogram = np.arange(5)
+    save(writer, {'histogram': histogram})
+
+    def fail(*args, **kwargs):
+        raise OSError('disk full')
+
+    # The failed snapshot must not be skipped as unchanged afterwards
+    with monkeypatch.context() as patch:
+        patch.setattr(np, 'save', fail)
+        save(writer, {'histogram': 2 * histogram})
+    loaded = save(writer, {'histogram': 2 * histogram})
+    writer.close()
+
+    np.testing.assert_array_equal(loaded['histogram'], 2 * histogram)
+
+
+def test_changed_long_array(tmp_path):
+    writer = IncrementalWriter(str(tmp_path))
+    trace = np.arange(1000)
+    save(writer, {'trace': trace})
+
+    # Changes of many saved rows are detected from the sampled rows
+    trace = np.append(trace + 1, 0)
+    loaded = save(writer, {'trace': trace})
+    writer.close()
+
+    np.testing.assert_array_equal(loaded['trace'], trace)
+    assert len(writer._streams['trace'].segments) == 1
+
+
+def test_samples_of_saved_rows(tmp_path):
+    writer = IncrementalWriter(str(tmp_path), fsync='none')
+    trace = []
+    for value in range(200):
+        trace.append(value)
+        writer.save({'trace': trace})
+    writer.close()
+
+    # The sampled rows are copies of the saved rows
+    stream = writer._streams['trace']
+    assert len(stream.sample_indices) == 16
+    assert 199 in stream.samples
+    assert all(stream.samples[index] == index for index in stream.samples)
+
+
+def test_scheduled_append_skipped_after_failure(tmp_path, monkeypatch):
+    writer = IncrementalWriter(str(tmp_path))
+    trace = list(range(5))
+    save(writer, {'trace': trace})
+
+    write = writer._write
+    started = threading.Event()
+    release = threading.Event()
+
+    def fail(updates):
+        monkeypatch.setattr(writer, '_write', write)
+        started.set()
+        release.wait()
+        raise OSError('disk full')
+
+    # The second append is scheduled while the first one is being written
+    monkeypatch.setattr(writer, '_write', fail)
+    trace.append(5)
+    writer.save({'trace': trace})
+    started.wait()
+    trace.append(6)
+    writer.save({'trace': trace})
+    release.set()
+    writer.flush()
+    np.testing.assert_array_equal(load_incremental(writer.path)['trace'], np.arange(5))
+
+    trace.append(7)
+    loaded = save(writer, {'trace': trace})
+    writer.close()
+    np.testing.assert_array_equal(loaded['trace'], np.arange(8))
@@ -0,0 +1,68 @@
+""" Checks of the NI DAQmx driver in dummy mode """
+
+import pytest
+
+pytest.importorskip('nidaqmx')
+
+from pylabnet.hardware.ni_daqs.nidaqmx_card import Driver
+
+
+@pytest.fixture
+def daq():
+    driver = Driver(device_name='Dev1', dummy=True)
+    yield driver
+    driver.close_tasks()
+
+
+def test_alternating_ai_channels(daq):
+    """ Reading ai0 and ai1 in turns, as in Daq_voltage_pzt_time.py """
+
+    for _ in range(3):
+        assert daq.get_ai_voltage('ai0') == [0.0]
+        assert daq.get_ai_voltage('ai1', num_samples=2) == [0.0, 0.0]
+
+    # Only the last AI task is kept open
+    assert len(daq._tasks) == 1
+
+
+def test_ai_voltage_and_waveform(daq):
+    """ On-demand reads and timed records share the AI timing engine """
+
+    daq.get_ai_voltage('ai0')
+    assert len(daq.read_ai_waveform('ai1', num_samples=10, sample_rate=1e3)) == 10
+    assert daq.get_ai_voltage('ai0') == [0.0]
+
+
+def test_ao_task_kept_open(daq):
+    """ Outputs are independent of the analog inputs """
+
+    daq.set_ao_voltage('ao0', [1.0])
+    daq.get_ai_voltage('ai0')
+    daq.get_ai_voltage('ai1')
+    daq.set_ao_voltage('ao0', [2.0])
+
+    assert len(daq._tasks) == 2
+
+
+@pytest.fixture
+def client(daq):
+    """ Client calling the service directly, without a connection """
+
+    from pylabnet.network.client_server.nidaqmx_card import Service, Client
+
+    service = Service()
+    service.assign_module(daq)
+    client = Client.__new__(Client)
+    client._service = service
+    return client
+
+
+def test_client_return_types(client):
+    """ Readings arrive as returned by the driver, records as writeable arrays """
+
+    assert client.get_ai_voltage('ai0') == [0.0]
+    assert client.get_ai_voltage('ai1', num_samples=2) == [0.0, 0.0]
+
+    record = client.read_ai_waveform('ai1', num_samples=10, sample_rate=1e3)
+    record -= 1
+    assert record.shape == (10,)
@@ -0,0 +1,41 @@
+""" Checks that repeats are sampled like the unrolled pulseblock """
+
+import numpy as np
+import pytest
+
+from pylabnet.utils.pulseblock.pulse_block import PulseBlock
+from pylabnet.utils.pulseblock.pulse import PTrue, PSin, PGaussian
+from pylabnet.utils.pulseblock.pb_sample import pb_sample
+
+SAMP_RATE = 1e9
+
+
+def repeated_pb(offset):
+    sub = PulseBlock(
+        [PTrue('gate', dur=20e-9, t0=5e-9), PSin('mw', dur=30e-9, amp=0.5, freq=1e8)],
+        name='sub'
+    )
+    sub.dur = 50e-9
+
+    sub2 = PulseBlock([PGaussian('mw', dur=40e-9, amp=1, stdev=10e-9)], name='sub2')
+
+    pb = PulseBlock(name='main')
+    pb.append(PTrue('gate', dur=10e-9, t0=3e-9))
+    pb.append_rep(sub, n_reps=3, offset=offset)
+    pb.append_rep(sub2, n_reps=2)
+    pb.append_rep(sub, n_reps=1, offset=7e-9)
+    pb.append(PTrue('gate', dur=4e-9))
+    return pb
+
+
+@pytest.mark.parametrize('offset', [0, 2e-9, 15e-9])
+def test_repeats_match_unrolled(offset):
+    pb = repeated_pb(offset)
+
+    samp_dict, n_pts, add_pts = pb_sample(pb, SAMP_RATE, len_step=16)
+    unrolled_dict, unrolled_n_pts, unrolled_add_pts = pb_sample(pb.unroll(), SAMP_RATE, len_step=16)
+
+    assert (n_pts, add_pts) == (unrolled_n_pts, unrolled_add_pts)
+    assert samp_dict.keys() == unrolled_dict.keys()
+    for ch in samp_dict:
+        np.testing.assert_allclose(samp_dict[ch], unrolled_dict[ch], atol=1e-12)
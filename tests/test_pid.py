@@ -0,0 +1,70 @@
+""" Checks of the PID and MultiPID controllers """
+
+import numpy as np
+
+from pylabnet.scripts.pid import PID, MultiPID
+
+
+def test_compute_keeps_derivative_filter():
+    pid = MultiPID(n_channels=2, p=1, i=1, d=1, d_filter=0.5)
+    pid.push([1, 2])
+
+    first = pid.compute().copy()
+    np.testing.assert_array_equal(pid.compute(), first)
+
+
+def test_push_and_compute_match_step():
+    stepped = MultiPID(p=1, i=0.5, d=2, memory=5, d_filter=0.3)
+    pushed = MultiPID(p=1, i=0.5, d=2, memory=5, d_filter=0.3)
+
+    for pv in np.random.default_rng(0).random(30):
+        cv = stepped.step(pv)
+        pushed.push(pv)
+        pushed.compute()
+        np.testing.assert_allclose(pushed.compute(), cv)
+
+
+def test_batch_push_filters_every_sample():
+    batch = MultiPID(p=1, i=0.5, d=2, memory=5, d_filter=0.3)
+    single = MultiPID(p=1, i=0.5, d=2, memory=5, d_filter=0.3)
+
+    samples = np.random.default_rng(1).random(8)
+    batch.push(samples)
+    for pv in samples:
+        single.push(pv)
+
+    np.testing.assert_allclose(batch.compute(), single.compute())
+
+
+def test_full_window_matches_legacy():
+    pid = PID(p=1, i=2, d=3, setpoint=0.5, memory=20)
+    legacy = PID(p=1, i=2, d=3, setpoint=0.5, memory=20, legacy_history=True)
+
+    for pv in np.random.default_rng(2).random((10, 20)):
+        for controller in (pid, legacy):
+            controller.set_pv(pv)
+            controller.set_cv()
+        assert np.isclose(pid.cv, legacy.cv)
+
+
+def test_legacy_single_sample_updates():
+    pid = PID(p=1, i=2, d=3, setpoint=0.5, memory=20, legacy_history=True)
+
+    for pv in [1, 2, 3]:
+        pid.set_pv(np.atleast_1d(pv))
+        pid.set_cv()
+
+    # Only the latest sample is kept and no derivative is applied
+    np.testing.assert_array_equal(pid._pv, [3])
+    assert np.isclose(pid.cv, 2.5 + 2 * 2.5 / 20)
+
+
+def test_single_sample_updates_average_memory():
+    pid = PID(p=0, i=1, setpoint=0, memory=4)
+
+    for pv in [1, 2, 3, 4, 5]:
+        pid.set_pv(np.atleast_1d(pv))
+    pid.set_cv()
+
+    np.testing.assert_array_equal(pid._pv, [2, 3, 4, 5])
+    assert np.isclose(pid.cv, 3.5)
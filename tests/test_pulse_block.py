@@ -0,0 +1,85 @@
+""" Checks of the equivalence of the ways of building a PulseBlock """
+
+import numpy as np
+import pytest
+
+from pylabnet.utils.pulseblock.pulse import PTrue
+from pylabnet.utils.pulseblock.pulse_block import PulseBlock
+
+N_CHANNELS = 4
+PULSE_DUR = 1e-6
+PULSE_PERIOD = 2e-6
+
+
+def make_pulses(n_pulses, t_offset=0):
+    """ Non-overlapping pulses distributed round-robin over the channels """
+
+    return [
+        PTrue(ch=f'ch{i % N_CHANNELS}', dur=PULSE_DUR, t0=(i // N_CHANNELS) * PULSE_PERIOD + t_offset)
+        for i in range(n_pulses)
+    ]
+
+
+def summary(pb):
+    """ Block duration and (t0, dur) of the pulses on each channel """
+
+    pulses = {
+        ch.name: [(p_obj.t0, p_obj.dur) for p_obj in p_list]
+        for ch, p_list in pb.p_dict.items()
+    }
+    defaults = sorted(ch.name for ch in pb.dflt_dict)
+    return pb.dur, pulses, defaults
+
+
+def assert_same_block(pb, reference):
+    dur, pulses, defaults = summary(pb)
+    ref_dur, ref_pulses, ref_defaults = summary(reference)
+
+    assert dur == pytest.approx(ref_dur)
+    assert defaults == ref_defaults
+    assert pulses.keys() == ref_pulses.keys()
+    for ch, p_list in pulses.items():
+        np.testing.assert_allclose(p_list, ref_pulses[ch], rtol=0, atol=1e-15)
+
+
+@pytest.mark.parametrize('t_offset', [0, 3e-7, -5e-7])
+def test_extend_matches_insert(t_offset):
+    pulses = make_pulses(40, t_offset=t_offset)
+    np.random.default_rng(0).shuffle(pulses)
+
+    # All t0 refer to the same time origin, which is shifted once at the end
+    inserted = PulseBlock()
+    for p_obj in pulses:
+        inserted._insert(p_obj)
+    inserted.reset_edges()
+
+    extended = PulseBlock()
+    extended.extend(pulses)
+
+    assert_same_block(extended, inserted)
+
+
+def test_extend_matches_append_pb():
+    pulses = make_pulses(40)
+
+    extended = PulseBlock()
+    extended.extend(pulses)
+
+    appended = PulseBlock()
+    appended.extend(pulses[:N_CHANNELS])
+    step = PulseBlock(pulses[:N_CHANNELS])
+    for _ in range(len(pulses) // N_CHANNELS - 1):
+        appended.append_pb(step, offset=PULSE_PERIOD - PULSE_DUR)
+
+    assert_same_block(appended, extended)
+
+
+def test_extend_conflict_leaves_block_unchanged():
+    pb = PulseBlock()
+    pb.extend(make_pulses(8))
+    before = summary(pb)
+
+    with pytest.raises(ValueError):
+        pb.extend([PTrue('ch9', dur=PULSE_DUR), PTrue('ch0', dur=PULSE_DUR, t0=PULSE_DUR / 2)])
+
+    assert summary(pb) == before
@@ -0,0 +1,253 @@
+""" Checks of the binary trace transfer and cached axes of the DPO2014 and E4405B drivers """
+
+import os
+import sys
+import numpy as np
+import pytest
+
+pyvisa = pytest.importorskip('pyvisa')
+
+from pylabnet.hardware.oscilloscopes.tektronix_dpo2014 import Driver as ScopeDriver
+from pylabnet.hardware.spectrum_analyzer.agilent_e4405B import Driver as SpectrumDriver
+
+# The simulated instruments are shared with the transfer benchmark
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'benchmarks'))
+from benchmark_scpi_transfer import SimulatedScope, SimulatedSpectrumAnalyzer, _ResourceManager
+
+# pyvisa-sim description of the instruments
+SIM_YAML = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scpi_sim.yaml')
+
+
+class RecordingScope(SimulatedScope):
+    """ Simulated scope without link delay that records all commands """
+
+    def __init__(self, **kwargs):
+        super().__init__(rate=np.inf, latency=0, **kwargs)
+        self.commands = []
+
+    def write(self, command):
+        self.commands.append(command)
+        super().write(command)
+
+    def count(self, command):
+        return sum(sent.upper() == command.upper() for sent in self.commands)
+
+
+class RecordingSpectrumAnalyzer(SimulatedSpectrumAnalyzer):
+    """ Simulated spectrum analyzer without link delay that records all commands """
+
+    def __init__(self, **kwargs):
+        super().__init__(rate=np.inf, latency=0, **kwargs)
+        self.commands = []
+
+    def write(self, command):
+        self.commands.append(command)
+        super().write(command)
+
+    def count(self, command):
+        return sum(sent.upper() == command.upper() for sent in self.commands)
+
+
+class SimResourceManager:
+    """ Opens pyvisa-sim resources with the terminations of the simulated instruments """
+
+    def __init__(self):
+        self.rm = pyvisa.ResourceManager(f'{SIM_YAML}@sim')
+
+    def open_resource(self, address):
+        return self.rm.open_resource(address, read_termination='\n', write_termination='\n')
+
+
+@pytest.fixture
+def scope():
+    resource = RecordingScope(n_points=1000)
+    return ScopeDriver('GPIB0::1::INSTR', logger=None, resource_manager=_ResourceManager(resource)), resource
+
+
+@pytest.fixture
+def spectrum():
+    resource = RecordingSpectrumAnalyzer(n_points=401)
+    return SpectrumDriver('GPIB0::2::INSTR', logger=None, resource_manager=_ResourceManager(resource)), resource
+
+
+@pytest.mark.parametrize('curve_res', [1, 2])
+def test_scope_binary_matches_ascii(scope, curve_res):
+    driver, _ = scope
+
+    np.random.seed(0)
+    ascii_trace = driver.read_out_trace('CH1', curve_res=curve_res, binary=False)
+    np.random.seed(0)
+    binary_trace = driver.read_out_trace('CH1', curve_res=curve_res, binary=True)
+
+    np.testing.assert_array_equal(binary_trace['trace'], ascii_trace['trace'])
+    np.testing.assert_array_equal(binary_trace['ts'], ascii_trace['ts'])
+    assert binary_trace['x_unit'] == ascii_trace['x_unit'] == 's'
+    assert binary_trace['y_unit'] == ascii_trace['y_unit'] == 'V'
+
+
+def test_spectrum_binary_matches_ascii(spectrum):
+    driver, _ = spectrum
+
+    np.random.seed(0)
+    ascii_trace = driver.read_trace(binary=False)
+    np.random.seed(0)
+    binary_trace = driver.read_trace(binary=True)
+
+    # ASCII values are sent with 4 significant digits
+    np.testing.assert_array_equal(binary_trace[:, 0], ascii_trace[:, 0])
+    np.testing.assert_allclose(binary_trace[:, 1], ascii_trace[:, 1], rtol=1e-3)
+    assert binary_trace[200, 1] == -20
+
+
+def test_scope_preamble_reused(scope):
+    driver, resource = scope
+
+    first = driver.read_out_trace('CH1')
+    resource.commands = []
+    for _ in range(3):
+        trace = driver.read_out_trace('CH1')
+
+    # Neither the preamble nor the data settings are sent again
+    assert resource.count('WFMPre?') == 0
+    assert resource.count('DATa:WIDth 1') == 0
+    assert trace['ts'] is first['ts']
+
+    # Changed data settings are sent and the preamble is read again
+    driver.read_out_trace('CH2')
+    assert resource.count('DATa:SOUrce CH2') == 1
+    assert resource.count('WFMPre?') == 1
+
+
+@pytest.mark.parametrize('change_settings', [
+    lambda driver: driver.set_timing_scale(1e-6),
+    lambda driver: driver.set_channel_attenuation('CH1', 10),
+    lambda driver: driver.set_channel_scale('CH1', 0.1),
+    lambda driver: driver.set_channel_pos('CH1', 1),
+    lambda driver: driver.set_horizontal_position(1e-6),
+    lambda driver: driver.reset(),
+    lambda driver: driver.clear_cache()
+])
+def test_scope_preamble_invalidated(scope, change_settings):
+    driver, resource = scope
+
+    driver.read_out_trace('CH1')
+    change_settings(driver)
+    resource.commands = []
+    driver.read_out_trace('CH1')
+
+    assert resource.count('WFMPre?') == 1
+
+
+def test_scope_preamble_invalidated_by_write(scope):
+    pytest.importorskip('plotly')
+    from pylabnet.network.client_server.tektronix_dpo2014 import Service
+
+    driver, resource = scope
+    service = Service()
+    service.assign_module(driver)
+
+    driver.read_out_trace('CH1')
+    service.exposed_write('DATa:WIDth 2')
+    resource.commands = []
+    driver.read_out_trace('CH1')
+
+    # Data settings are restored and the preamble is read again
+    assert resource.count('DATa:WIDth 1') == 1
+    assert resource.count('WFMPre?') == 1
+
+
+def test_scope_record_length_change(scope):
+    driver, resource = scope
+
+    driver.read_out_trace('CH1')
+
+    # Record length changed on the scope
+    resource.n_points = 500
+    resource.commands = []
+    trace = driver.read_out_trace('CH1')
+
+    assert resource.count('WFMPre?') == 1
+    assert len(trace['trace']) == len(trace['ts']) == 500
+
+
+def test_spectrum_frequencies_reused(spectrum):
+    driver, resource = spectrum
+
+    first = driver.read_trace()
+    resource.commands = []
+    for _ in range(3):
+        trace = driver.read_trace()
+
+    assert resource.count(':SENSe:FREQuency:STARt?') == 0
+    assert resource.count('FORM:DATA REAL,32') == 0
+    np.testing.assert_array_equal(trace[:, 0], first[:, 0])
+
+
+@pytest.mark.parametrize('change_settings', [
+    lambda driver: driver.set_center_frequency(1e9),
+    lambda driver: driver.set_frequency_span(1e6),
+    lambda driver: driver.reset(),
+    lambda driver: driver.clear_cache()
+])
+def test_spectrum_frequencies_invalidated(spectrum, change_settings):
+    driver, resource = spectrum
+
+    driver.read_trace()
+    change_settings(driver)
+    resource.commands = []
+    driver.read_trace()
+
+    assert resource.count(':SENSe:FREQuency:STARt?') == 1
+
+
+def test_spectrum_frequencies_invalidated_by_write(spectrum):
+    pytest.importorskip('matplotlib')
+    from pylabnet.network.client_server.agilent_e4405B import Service
+
+    driver, resource = spectrum
+    service = Service()
+    service.assign_module(driver)
+
+    driver.read_trace()
+    service.exposed_write('FORM:DATA ASC')
+    resource.commands = []
+    trace = driver.read_trace()
+
+    # Data format is restored and the frequency axis is read again
+    assert resource.count('FORM:DATA REAL,32') == 1
+    assert resource.count(':SENSe:FREQuency:STARt?') == 1
+    assert trace.shape == (401, 2)
+
+
+def test_spectrum_sweep_points_change(spectrum):
+    driver, resource = spectrum
+
+    driver.read_trace()
+
+    # Number of sweep points changed on the device
+    resource.n_points = 201
+    trace = driver.read_trace()
+
+    assert trace.shape == (201, 2)
+    np.testing.assert_array_equal(trace[:, 0], np.linspace(1e9, 2e9, 201))
+
+
+def test_scope_ascii_pyvisa_sim():
+    pytest.importorskip('pyvisa_sim')
+
+    driver = ScopeDriver('GPIB0::1::INSTR', logger=None, resource_manager=SimResourceManager())
+    trace = driver.read_out_trace('CH1', binary=False)
+
+    np.testing.assert_allclose(trace['trace'], np.array([-100, -3, 0, 25, 127]) * 4e-2)
+    np.testing.assert_allclose(trace['ts'], -20e-6 + np.arange(5) * 4e-9)
+    assert trace['y_unit'] == 'V'
+
+
+def test_spectrum_ascii_pyvisa_sim():
+    pytest.importorskip('pyvisa_sim')
+
+    driver = SpectrumDriver('GPIB0::2::INSTR', logger=None, resource_manager=SimResourceManager())
+    trace = driver.read_trace(binary=False)
+
+    np.testing.assert_allclose(trace[:, 0], np.linspace(1e9, 2e9, 5))
+    np.testing.assert_allclose(trace[:, 1], [-90.1, -89.5, -20.0, -88.9, -90.3])
@@ -0,0 +1,160 @@
+""" Checks of the online time tag stream analyzers and pipeline """
+
+import threading
+import numpy as np
+import pytest
+
+from pylabnet.hardware.counter.swabian_instruments.stream_pipeline import (
+    ConditionalHistogram, G2Correlator, GatedCounter, StreamPipeline
+)
+
+START, CLICK, GATE = 1, 2, 3
+
+
+class RecordingLog:
+    """ Logger recording all messages by level """
+
+    def __init__(self):
+        self.messages = []
+
+    def __getattr__(self, level):
+        return lambda msg_str: self.messages.append((level, msg_str))
+
+
+def tag_stream(n_events=5000, seed=0):
+    """ Random stream of start, click and gate rising/falling edge events
+
+    Gate edges alternate between rising and falling, with occasional
+    repeated rising edges that restart a window.
+    """
+
+    rng = np.random.default_rng(seed)
+    timestamps = np.cumsum(rng.integers(1, 500, n_events)).astype(np.int64)
+    channels = rng.choice([START, CLICK, CLICK, CLICK, GATE], n_events)
+
+    gate = channels == GATE
+    edges = np.where(np.arange(gate.sum()) % 2 == 0, GATE, -GATE)
+    edges[rng.random(len(edges)) < 0.1] = GATE
+    channels[gate] = edges
+    return channels, timestamps
+
+
+def split(channels, timestamps, seed=1):
+    """ Splits a stream into random chunks, including empty ones """
+
+    rng = np.random.default_rng(seed)
+    bounds = np.sort(np.concatenate(([0, len(timestamps)], rng.integers(0, len(timestamps), 40))))
+    return [(channels[lo:hi], timestamps[lo:hi]) for lo, hi in zip(bounds[:-1], bounds[1:])]
+
+
+def process(analyzer, chunks):
+    for channels, timestamps in chunks:
+        analyzer.process(channels, timestamps)
+    return analyzer.get_result()
+
+
+@pytest.mark.parametrize('make_analyzer', [
+    lambda: ConditionalHistogram(START, CLICK, binwidth=100, n_bins=50),
+    lambda: G2Correlator(START, CLICK, binwidth=100, n_bins=50),
+    lambda: GatedCounter(CLICK, GATE, n_bins=100)
+])
+@pytest.mark.parametrize('seed', range(5))
+def test_split_stream_matches_unsplit(make_analyzer, seed):
+    channels, timestamps = tag_stream(seed=seed)
+
+    unsplit = process(make_analyzer(), [(channels, timestamps)])
+    chunked = process(make_analyzer(), split(channels, timestamps, seed=seed))
+
+    np.testing.assert_array_equal(chunked, unsplit)
+    assert unsplit.sum() > 0
+
+
+def test_conditional_histogram_reference():
+    channels, timestamps = tag_stream()
+    histogram = process(ConditionalHistogram(START, CLICK, binwidth=100, n_bins=50), split(channels, timestamps))
+
+    expected = np.zeros(50, dtype=np.int64)
+    last_start = None
+    for channel, timestamp in zip(channels, timestamps):
+        if channel == START:
+            last_start = timestamp
+        elif channel == CLICK and last_start is not None and timestamp - last_start < 5000:
+            expected[(timestamp - last_start) // 100] += 1
+
+    np.testing.assert_array_equal(histogram, expected)
+
+
+def test_gated_counter_reference():
+    channels, timestamps = tag_stream()
+    counts = process(GatedCounter(CLICK, GATE, n_bins=10000), split(channels, timestamps))
+
+    expected = []
+    window = None
+    for channel in channels:
+        if channel == GATE:
+            window = 0
+        elif channel == -GATE and window is not None:
+            expected.append(window)
+            window = None
+        elif channel == CLICK and window is not None:
+            window += 1
+
+    np.testing.assert_array_equal(counts, expected)
+
+
+def test_gate_window_spanning_chunks():
+    counter = GatedCounter(CLICK, GATE, n_bins=10)
+
+    counter.process(np.array([GATE, CLICK]), np.array([0, 1]))
+    counter.process(np.array([CLICK, CLICK]), np.array([2, 3]))
+    counter.process(np.array([], dtype=int), np.array([], dtype=np.int64))
+    counter.process(np.array([CLICK, -GATE, CLICK]), np.array([4, 5, 6]))
+
+    np.testing.assert_array_equal(counter.get_result(), [4])
+
+
+def test_pipeline_stops_after_failures():
+    log = RecordingLog()
+
+    def read_chunk():
+        raise RuntimeError('stream closed')
+
+    pipeline = StreamPipeline(read_chunk, chunk_interval=0, logger=log)
+    pipeline.MAX_FAILURES = 5
+    pipeline.start()
+    pipeline._thread.join(timeout=5)
+
+    status = pipeline.get_status()
+    assert not status['running']
+    assert status['n_failures'] == 5
+    assert status['error'] == 'stream closed'
+
+    # The failure is logged once, and once more when processing stops
+    assert [level for level, _ in log.messages] == ['error', 'error']
+    pipeline.stop()
+
+
+def test_pipeline_recovers():
+    log = RecordingLog()
+    channels, timestamps = tag_stream(n_events=100)
+    reads = [RuntimeError('busy'), RuntimeError('busy'), (channels, timestamps, 0)]
+    processed = threading.Event()
+
+    def read_chunk():
+        if reads:
+            result = reads.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        processed.set()
+        return channels[:0], timestamps[:0], 100
+
+    pipeline = StreamPipeline(read_chunk, chunk_interval=0, logger=log)
+    pipeline.add_analyzer('hist', ConditionalHistogram(START, CLICK, binwidth=100, n_bins=50))
+    pipeline.start()
+    assert processed.wait(timeout=5)
+    pipeline.stop()
+
+    assert pipeline.get_status() == dict(running=False, n_events=100, n_failures=0, error='busy')
+    assert [level for level, _ in log.messages] == ['error', 'info']
+    assert pipeline.get_result('hist').sum() > 0
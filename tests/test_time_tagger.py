@@ -0,0 +1,99 @@
+""" Checks of the incremental count trace transfer of the Swabian Instruments TimeTagger wrapper """
+
+import numpy as np
+import pytest
+
+pytest.importorskip('TimeTagger')
+
+from pylabnet.hardware.counter.swabian_instruments import time_tagger
+from pylabnet.network.client_server.si_tt import Service, Client, CountTrace
+
+BIN_WIDTH = 1000
+N_BINS = 10
+
+
+class FakeTagger:
+
+    def getSerial(self):
+        return 'fake'
+
+    def getModel(self):
+        return 'fake'
+
+
+class FakeCounter:
+    """ Counter of one channel whose bin k (counted from the last clear) holds k + offset """
+
+    def __init__(self, tagger, channels, binwidth, n_values):
+        self.n_values = n_values
+        self.offset = 0
+        self.n_completed = 0
+
+    def advance(self, n_bins):
+        self.n_completed += n_bins
+
+    def clear(self, offset=1000):
+        self.offset += offset
+        self.n_completed = 0
+
+    def getCaptureDuration(self):
+        return self.n_completed * BIN_WIDTH
+
+    def getData(self):
+        indices = np.arange(self.n_completed - self.n_values, self.n_completed)
+        return np.where(indices >= 0, indices + self.offset, 0)[np.newaxis]
+
+
+@pytest.fixture
+def trace(monkeypatch):
+    monkeypatch.setattr(time_tagger.TT, 'Counter', FakeCounter)
+    driver = time_tagger.Wrap(FakeTagger())
+    driver.start_trace(name='trace', ch_list=[1], bin_width=BIN_WIDTH, n_bins=N_BINS)
+
+    # Client calling the service directly, without a connection
+    service = Service()
+    service.assign_module(driver)
+    client = Client.__new__(Client)
+    client._service = service
+
+    return driver, driver._ctr['trace'], CountTrace(client, name='trace', n_bins=N_BINS)
+
+
+def test_new_bins_only(trace):
+    driver, counter, count_trace = trace
+
+    counter.advance(4)
+    assert count_trace.update() == N_BINS
+    counter.advance(3)
+    assert count_trace.update() == 3
+
+    np.testing.assert_array_equal(count_trace.get_traces()[0], counter.getData()[0])
+
+
+def test_clear_detected_after_growing_past_index(trace):
+    driver, counter, count_trace = trace
+
+    counter.advance(4)
+    count_trace.update()
+
+    # Cleared counter grows past the previous write index before the next update
+    driver.clear_ctr(name='trace')
+    counter.advance(6)
+    assert count_trace.update() == N_BINS
+
+    np.testing.assert_array_equal(count_trace.get_traces()[0], counter.getData()[0])
+
+
+def test_setup_again_detected(trace):
+    driver, counter, count_trace = trace
+
+    counter.advance(4)
+    count_trace.update()
+
+    driver.start_trace(name='trace', ch_list=[1], bin_width=BIN_WIDTH, n_bins=N_BINS)
+    counter = driver._ctr['trace']
+    counter.clear(offset=500)
+    counter.advance(6)
+    count_trace.update()
+
+    np.testing.assert_array_equal(count_trace.get_traces()[0], counter.getData()[0])
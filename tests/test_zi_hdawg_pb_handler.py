@@ -0,0 +1,189 @@
+""" Checks of the DIO codewords of the AWG pulseblock handler and of the
+compilation of pulseblocks with repeats into seqc repeat() loops """
+
+import re
+import numpy as np
+import pytest
+
+from pylabnet.utils.pulseblock.pulse_block import PulseBlock
+from pylabnet.utils.pulseblock.pulse import PTrue
+from pylabnet.utils.zi_hdawg_pulseblock_handler.zi_hdawg_pb_handler import AWGPulseBlockHandler, SETDIO_OFFSET
+
+ASSIGNMENT = {'a': ['dio', 0], 'b': ['dio', 1], 'c': ['dio', 2]}
+
+# Duration of 30 AWG time steps
+U = 1e-7
+
+
+class SilentLog:
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+class FakeHDAWG:
+    """ Provides the log and settings used by the pulseblock handler """
+
+    log = SilentLog()
+
+    def geti(self, node):
+        return 0
+
+
+def dio_timeline(sequence):
+    """ Runs the wait(), setDIO() and repeat() commands of a sequence
+
+    Each wait(n) takes n time steps and each setDIO() SETDIO_OFFSET time steps,
+    after which its codeword is output.
+
+    :param sequence: (str) seqc code
+    :return: (list) of (time step, codeword) tuples at which the DIO output changes
+    """
+
+    lines = [line.strip() for line in sequence.splitlines() if line.strip() and not line.startswith('//')]
+    events = []
+
+    def run(index, time):
+        while index < len(lines):
+            line = lines[index]
+            if line == '}':
+                return index + 1, time
+            wait = re.fullmatch(r'wait\((\d+)\);', line)
+            dio = re.fullmatch(r'setDIO\((\d+)\);', line)
+            repeat = re.fullmatch(r'repeat\((\d+)\) \{', line)
+            if wait:
+                time += int(wait.group(1))
+                index += 1
+            elif dio:
+                time += SETDIO_OFFSET
+                events.append((time, int(dio.group(1))))
+                index += 1
+            elif repeat:
+                for _ in range(int(repeat.group(1))):
+                    end, time = run(index + 1, time)
+                index = end
+            else:
+                raise ValueError(f'Unexpected command {line}')
+        return index, time
+
+    run(0, 0)
+
+    timeline = []
+    for time, codeword in events:
+        if not timeline or timeline[-1][1] != codeword:
+            timeline.append((time, codeword))
+    return timeline
+
+
+def compile_pb(pb, end_low=True, edge_compile=True):
+    handler = AWGPulseBlockHandler(
+        pb,
+        assignment_dict=ASSIGNMENT,
+        exp_config_dict={'preserve_bits': False},
+        hd=FakeHDAWG(),
+        end_low=end_low,
+        edge_compile=edge_compile
+    )
+    return handler.get_awg_sequence(0)[1]
+
+
+def sub_block(name, *pulses, dur=None):
+    pb = PulseBlock(list(pulses), name=name)
+    if dur is not None:
+        pb.dur = dur
+    return pb
+
+
+def one_repeat():
+    # Sub-block with pulses at its start and its end, entered without a gap
+    pb = PulseBlock(name='one_repeat')
+    pb.append_rep(sub_block('sub', PTrue('a', dur=2 * U), PTrue('b', dur=U, t0=3 * U)), n_reps=4)
+    return pb
+
+
+def two_repeats():
+    # Repeats separated by a gap with pulses, the second repeat at an offset
+    pb = PulseBlock(name='two_repeats')
+    pb.append(PTrue('c', dur=U, t0=U))
+    pb.append_rep(sub_block('sub', PTrue('a', dur=U, t0=U), dur=5 * U), n_reps=3)
+    pb.append(PTrue('c', dur=4 * U, t0=2 * U))
+    pb.append_rep(sub_block('sub2', PTrue('b', dur=2 * U), PTrue('a', dur=U, t0=2 * U)), n_reps=2, offset=3 * U)
+    pb.append(PTrue('c', dur=U, t0=U))
+    return pb
+
+
+def three_repeats():
+    # Back-to-back repeats, the last one ending the block
+    pb = PulseBlock(name='three_repeats')
+    pb.append_rep(sub_block('sub', PTrue('a', dur=2 * U), PTrue('b', dur=3 * U, t0=U)), n_reps=4)
+    pb.append(PTrue('c', dur=4 * U))
+    pb.append_rep(sub_block('sub2', PTrue('a', dur=2 * U, t0=U), PTrue('b', dur=U, t0=4 * U), dur=8 * U), n_reps=3)
+    pb.append_rep(sub_block('sub3', PTrue('c', dur=U), PTrue('b', dur=U, t0=U)), n_reps=2)
+    return pb
+
+
+@pytest.mark.parametrize('make_pb', [one_repeat, two_repeats, three_repeats])
+@pytest.mark.parametrize('end_low', [True, False])
+def test_repeats_match_unrolled(make_pb, end_low):
+    pb = make_pb()
+
+    sequence = compile_pb(pb, end_low=end_low)
+    unrolled_sequence = compile_pb(pb.unroll(), end_low=end_low)
+
+    assert 'repeat(' in sequence
+    assert dio_timeline(sequence) == dio_timeline(unrolled_sequence)
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_random_repeats_match_unrolled(seed):
+    rng = np.random.default_rng(seed)
+    steps = lambda low, high: int(rng.integers(low, high)) * U / 30
+
+    pb = PulseBlock(name='random')
+    for index in range(int(rng.integers(1, 4))):
+        if rng.random() < 0.5:
+            pb.append(PTrue(str(rng.choice(['a', 'b', 'c'])), dur=steps(1, 60), t0=steps(0, 20)))
+
+        # Pulses at the edges of the sub-block are frequent
+        sub = PulseBlock(name=f'sub{index}')
+        t0 = 0 if rng.random() < 0.5 else steps(1, 20)
+        sub.insert(PTrue('a', dur=steps(1, 30), t0=t0))
+        sub.insert(PTrue('b', dur=steps(1, 30), t0=steps(0, 40)))
+        if rng.random() < 0.5:
+            sub.dur = sub.dur + steps(1, 20)
+
+        pb.append_rep(sub, n_reps=int(rng.integers(1, 5)), offset=0 if rng.random() < 0.5 else steps(1, 20))
+
+    sequence = compile_pb(pb)
+    assert dio_timeline(sequence) == dio_timeline(compile_pb(pb.unroll()))
+
+
+def random_pulse_train(rng, n_pulses=20):
+    """ Non-overlapping pulses of random duration and spacing on all channels """
+
+    pb = PulseBlock(name='random_train')
+    pulses = []
+    for ch in ASSIGNMENT:
+        t0 = 0
+        for _ in range(n_pulses):
+            t0 += int(rng.integers(0, 40)) * U / 30
+            dur = int(rng.integers(1, 40)) * U / 30
+            pulses.append(PTrue(ch, dur=dur, t0=t0))
+            t0 += dur
+    pb.extend(pulses)
+    return pb
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_vectorized_codewords_match_per_sample(seed):
+    handler = AWGPulseBlockHandler(
+        random_pulse_train(np.random.default_rng(seed)),
+        assignment_dict=ASSIGNMENT,
+        exp_config_dict={'preserve_bits': False},
+        hd=FakeHDAWG(),
+        edge_compile=False
+    )
+
+    codewords = handler.gen_digital_codewords()
+
+    assert codewords.any()
+    np.testing.assert_array_equal(codewords, handler.gen_digital_codewords_per_sample())